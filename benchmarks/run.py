@@ -0,0 +1,555 @@
+"""DocBuddy benchmark suite.
+
+Measures the server and client hot paths and writes machine-readable JSON:
+
+- ``docs_page``: ``/docs`` latency (cold and warm), throughput and ``304``
+  revalidation.
+- ``static_assets``: throughput of ``/docbuddy-static`` (gzip, identity and
+  conditional requests).
+- ``import_time``: wall time of a fresh interpreter importing ``docbuddy``
+  (and ``docbuddy.cli``) versus ``docbuddy.plugin``; also lists which heavy
+  web modules ``import docbuddy`` loaded, which must stay empty.
+- ``context_builder``: time and output size of the OpenAPI prompt context and
+  tool definition for synthetic schemas (10, 1k and 10k operations by
+  default), in Python and, when ``node`` is installed, in ``core.js``.
+- ``prompt_prefix``: replays an agent session through ``core.js`` against a
+  local stand-in server that models automatic prefix caching, and reports
+  the share of prompt bytes it could reuse with the previous prompt layout
+  and with the stable one (requires ``node``).
+
+Usage::
+
+    python benchmarks/run.py -o results.json
+    python benchmarks/run.py --quick
+    python benchmarks/run.py --compare old.json new.json
+
+Requires the ``dev`` extra (the HTTP benchmarks use ``fastapi.testclient``).
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+_HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(_HERE.parent / "src"))
+sys.path.insert(0, str(_HERE))
+
+from schemas import make_schema  # noqa: E402
+
+DEFAULT_SIZES = (10, 1000, 10000)
+RETRIEVAL_QUERY = "create an invoice and send a reminder email"
+
+
+def _time_calls(fn: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    """Call ``fn`` ``iterations`` times and summarize the per-call latency."""
+    samples: List[float] = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        "ops_per_sec": iterations / total if total else 0.0,
+    }
+
+
+def _make_client(**setup_kwargs: Any):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from docbuddy import setup_docs
+
+    app = FastAPI(title="Benchmark App")
+    setup_docs(app, **setup_kwargs)
+    return TestClient(app)
+
+
+def bench_docs_page(iterations: int) -> Dict[str, Any]:
+    """Latency and throughput of the docs page."""
+    client = _make_client()
+
+    t0 = time.perf_counter()
+    first = client.get("/docs")
+    cold_ms = (time.perf_counter() - t0) * 1000
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    def revalidate() -> None:
+        assert client.get("/docs", headers={"If-None-Match": etag}).status_code == 304
+
+    return {
+        "cold_ms": cold_ms,
+        "bytes": len(first.content),
+        "warm": _time_calls(lambda: client.get("/docs"), iterations),
+        "not_modified": _time_calls(revalidate, iterations),
+    }
+
+
+def bench_static_assets(iterations: int) -> Dict[str, Any]:
+    """Throughput of the in-memory static asset route."""
+    client = _make_client()
+    html = client.get("/docs").text
+    start = html.index("/docbuddy-static/core.js")
+    url = html[start : html.index('"', start)]
+
+    gzip_response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    identity_response = client.get(url, headers={"Accept-Encoding": "identity"})
+    etag = gzip_response.headers["etag"]
+
+    def conditional() -> None:
+        response = client.get(
+            url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+    return {
+        "asset": "core.js",
+        "identity_bytes": len(identity_response.content),
+        "gzip_bytes": int(gzip_response.headers["content-length"]),
+        "gzip": _time_calls(
+            lambda: client.get(url, headers={"Accept-Encoding": "gzip"}), iterations
+        ),
+        "identity": _time_calls(
+            lambda: client.get(url, headers={"Accept-Encoding": "identity"}),
+            iterations,
+        ),
+        "not_modified": _time_calls(conditional, iterations),
+    }
+
+
+_HEAVY_MODULES = ("fastapi", "starlette", "jinja2", "pydantic", "httpx")
+
+
+def bench_import_time(iterations: int) -> Dict[str, Any]:
+    """Cold import cost of the package, measured in fresh interpreters."""
+    env = dict(os.environ, PYTHONPATH=str(_HERE.parent / "src"))
+    python = [sys.executable]
+
+    def timed(statement: str) -> Dict[str, float]:
+        code = (
+            "import time; t0 = time.perf_counter(); "
+            f"{statement}; print(time.perf_counter() - t0)"
+        )
+        samples = sorted(
+            float(
+                subprocess.run(
+                    python + ["-c", code],
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+            )
+            for _ in range(iterations)
+        )
+        return {
+            "iterations": iterations,
+            "mean_ms": statistics.fmean(samples) * 1000,
+            "p50_ms": samples[len(samples) // 2] * 1000,
+        }
+
+    loaded = subprocess.run(
+        python
+        + [
+            "-c",
+            "import sys, docbuddy, docbuddy.cli; "
+            f"print(','.join(m for m in {_HEAVY_MODULES!r} if m in sys.modules))",
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+    return {
+        "docbuddy": timed("import docbuddy"),
+        "cli": timed("import docbuddy.cli"),
+        "plugin": timed("import docbuddy.plugin"),
+        "heavy_modules_loaded": [m for m in loaded.split(",") if m],
+    }
+
+
+# Loads core.js into node with just enough of a browser environment
+_NODE_PRELUDE = r"""
+const fs = require('fs');
+const noop = () => {};
+const el = () => ({
+  style: {}, appendChild: noop, setAttribute: noop, addEventListener: noop,
+});
+global.window = global;
+global.document = {
+  addEventListener: noop, getElementById: () => null, createElement: el,
+  head: { appendChild: noop }, body: { appendChild: noop },
+  documentElement: { style: { setProperty: noop } }, querySelector: () => null,
+};
+global.localStorage = { getItem: () => null, setItem: noop, removeItem: noop };
+// Nothing to fetch from: prompt presets fall back to the inline defaults
+global.fetch = () => Promise.reject(new Error('offline'));
+console.debug = noop;
+(0, eval)(fs.readFileSync(process.argv[1], 'utf8'));
+const DB = window.DocBuddy;
+"""
+
+_NODE_BENCH = (
+    _NODE_PRELUDE
+    + r"""
+const schema = JSON.parse(fs.readFileSync(process.argv[2], 'utf8'));
+const iterations = Number(process.argv[3]);
+const query = process.argv[4];
+const time = (fn) => {
+  const samples = [];
+  let out;
+  for (let i = 0; i < iterations; i++) {
+    const t0 = process.hrtime.bigint();
+    out = fn();
+    samples.push(Number(process.hrtime.bigint() - t0) / 1e6);
+  }
+  samples.sort((a, b) => a - b);
+  return { out, mean_ms: samples.reduce((a, b) => a + b, 0) / iterations,
+           p50_ms: samples[Math.floor(iterations / 2)] };
+};
+const full = time(() => DB.buildOpenApiContext(schema));
+const tool = time(() => JSON.stringify(DB.buildApiRequestTool(schema)));
+const index = time(() => DB.buildOperationIndex(schema));
+DB.getOperationIndex(schema);  // built once per schema, like in the browser
+const retrieval = time(() => DB.buildOpenApiContext(schema, query));
+const result = {};
+for (const [name, r] of Object.entries({ full, tool, index, retrieval })) {
+  result[name] = { mean_ms: r.mean_ms, p50_ms: r.p50_ms };
+  if (typeof r.out === 'string') result[name].bytes = Buffer.byteLength(r.out, 'utf8');
+}
+process.stdout.write(JSON.stringify(result));
+"""
+)
+
+
+def _bench_core_js(schema: Dict[str, Any], iterations: int) -> Optional[Dict[str, Any]]:
+    node = shutil.which("node")
+    if node is None:
+        return None
+    core_js = _HERE.parent / "src" / "docbuddy" / "static" / "core.js"
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(schema, f)
+    try:
+        result = subprocess.run(
+            [node, "-e", _NODE_BENCH, str(core_js), f.name, str(iterations)]
+            + [RETRIEVAL_QUERY],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    finally:
+        os.unlink(f.name)
+    return json.loads(result.stdout)
+
+
+def bench_context_builder(sizes: List[int], iterations: int) -> List[Dict[str, Any]]:
+    """Time and output size of the prompt context builders per schema size."""
+    from docbuddy.digest import (
+        OperationIndex,
+        build_api_request_tool,
+        build_openapi_context,
+    )
+
+    results = []
+    for size in sizes:
+        schema = make_schema(size)
+        # Fewer repetitions for the biggest schemas keeps the suite quick
+        reps = max(1, iterations * 10 // max(size, 10))
+        context = build_openapi_context(schema)
+        tool = json.dumps(
+            build_api_request_tool(schema), ensure_ascii=False, separators=(",", ":")
+        )
+        index = OperationIndex(schema)
+        retrieval = build_openapi_context(schema, RETRIEVAL_QUERY, index)
+        results.append(
+            {
+                "operations": size,
+                "schema_bytes": len(json.dumps(schema)),
+                "python": {
+                    "full": dict(
+                        _time_calls(
+                            functools.partial(build_openapi_context, schema), reps
+                        ),
+                        bytes=len(context.encode()),
+                    ),
+                    "tool": dict(
+                        _time_calls(
+                            functools.partial(build_api_request_tool, schema), reps
+                        ),
+                        bytes=len(tool.encode()),
+                    ),
+                    "index": _time_calls(
+                        functools.partial(OperationIndex, schema), reps
+                    ),
+                    "retrieval": dict(
+                        _time_calls(
+                            functools.partial(
+                                build_openapi_context, schema, RETRIEVAL_QUERY, index
+                            ),
+                            reps,
+                        ),
+                        bytes=len(retrieval.encode()),
+                    ),
+                },
+                "javascript": _bench_core_js(schema, reps),
+            }
+        )
+    return results
+
+
+# Replays an agent session and prints the messages of every request, once
+# with the previous layout (volatile state in the system prompt) and once with
+# the stable layout (getPromptLayout + assemblePrompt).
+_NODE_PROMPTS = (
+    _NODE_PRELUDE
+    + r"""
+const schema = JSON.parse(fs.readFileSync(process.argv[2], 'utf8'));
+const queries = JSON.parse(process.argv[3]);
+const actNote = (i) =>
+  'You are currently in ACT mode. Current iteration: ' + i + '/5.';
+const history = [];
+const requests = { baseline: [], stable_layout: [] };
+const trimState = {};
+DB.ensureSystemPromptConfig().then(() => queries.forEach((query, turn) => {
+  history.push({ role: 'user', content: query });
+  for (let step = 1; step <= 2; step++) {
+    const baseline = DB.getSystemPromptForPreset('agent', schema, '', query) +
+      '\n\n' + actNote(step);
+    requests.baseline.push([{ role: 'system', content: baseline }].concat(history));
+    const layout = DB.getPromptLayout('agent', schema, '', query);
+    requests.stable_layout.push(DB.assemblePrompt({
+      system: layout.system, context: layout.context, note: actNote(step),
+      history: history, contextWindow: 131072, maxTokens: 4096, trimState: trimState,
+    }).messages);
+    if (step === 1) {
+      const id = 'call_' + turn;
+      history.push({ role: 'assistant', tool_calls: [{ id: id, type: 'function',
+        function: { name: 'api_request',
+          arguments: '{"method":"GET","path":"/v1/items"}' } }] });
+      const items = Array.from(
+        { length: 40 }, (_, i) => ({ id: i, turn: turn, status: 'open' }));
+      history.push({ role: 'tool', tool_call_id: id,
+        content: 'Status: 200 OK\n\n' + JSON.stringify(items) });
+    }
+  }
+  history.push({ role: 'assistant', content: 'Done with step ' + turn + '.' });
+})).then(() => process.stdout.write(JSON.stringify(requests)));
+"""
+)
+
+PREFIX_QUERIES = [
+    RETRIEVAL_QUERY,
+    "list every customer with an overdue invoice",
+    "update the shipping address of order 42",
+    "delete the test webhook",
+    "summarize today's payments",
+]
+
+
+def _render_prompt(messages: List[Dict[str, Any]]) -> bytes:
+    """Flatten chat messages the way a chat template would."""
+    parts = []
+    for msg in messages:
+        content = msg.get("content")
+        if content is None:
+            content = json.dumps(msg.get("tool_calls"), sort_keys=True)
+        parts.append(f"<|{msg['role']}|>\n{content}<|end|>\n")
+    return "".join(parts).encode()
+
+
+def _start_prefix_cache_server():
+    """Start a stand-in completion server that models automatic prefix caching.
+
+    For each prompt it reports how many leading bytes match a prompt it has
+    already seen, which is the part a vLLM/llama.cpp server would not prefill
+    again. Returns ``(server, url)``.
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    seen: Dict[str, List[bytes]] = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = _render_prompt(payload["messages"])
+            previous = seen.setdefault(payload["user"], [])
+            cached = max(
+                (len(os.path.commonprefix([p, prompt])) for p in previous), default=0
+            )
+            previous.append(prompt)
+            body = json.dumps(
+                {"prompt_bytes": len(prompt), "cached_bytes": cached}
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+
+def bench_prompt_prefix(size: int = 100) -> Optional[Dict[str, Any]]:
+    """Share of each agent request's prompt a prefix-caching server can reuse."""
+    import urllib.request
+
+    node = shutil.which("node")
+    if node is None:
+        return None
+    core_js = _HERE.parent / "src" / "docbuddy" / "static" / "core.js"
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(make_schema(size), f)
+    try:
+        result = subprocess.run(
+            [
+                node,
+                "-e",
+                _NODE_PROMPTS,
+                str(core_js),
+                f.name,
+                json.dumps(PREFIX_QUERIES),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    finally:
+        os.unlink(f.name)
+
+    server, url = _start_prefix_cache_server()
+    results: Dict[str, Any] = {"operations": size}
+    try:
+        for layout, requests in json.loads(result.stdout).items():
+            prompt_bytes = cached_bytes = 0
+            for messages in requests:
+                body = json.dumps({"user": layout, "messages": messages}).encode()
+                request = urllib.request.Request(
+                    url, data=body, headers={"Content-Type": "application/json"}
+                )
+                with urllib.request.urlopen(request) as response:
+                    stats = json.loads(response.read())
+                prompt_bytes += stats["prompt_bytes"]
+                cached_bytes += stats["cached_bytes"]
+            results[layout] = {
+                "requests": len(requests),
+                "prompt_bytes": prompt_bytes,
+                "cached_bytes": cached_bytes,
+                "prefill_bytes": prompt_bytes - cached_bytes,
+                "reuse_ratio": cached_bytes / prompt_bytes if prompt_bytes else 0.0,
+            }
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def run(sizes: List[int], iterations: int) -> Dict[str, Any]:
+    import docbuddy
+
+    return {
+        "meta": {
+            "docbuddy": docbuddy.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "iterations": iterations,
+        },
+        "docs_page": bench_docs_page(iterations),
+        "static_assets": bench_static_assets(iterations),
+        "import_time": bench_import_time(max(3, iterations // 20)),
+        "context_builder": bench_context_builder(sizes, iterations),
+        "prompt_prefix": bench_prompt_prefix(),
+    }
+
+
+def _flatten(node: Any, prefix: str = "") -> Dict[str, float]:
+    """Flatten numeric leaves to ``a.b.c`` keys (list items keyed by size)."""
+    out: Dict[str, float] = {}
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key != "meta":
+                out.update(_flatten(value, f"{prefix}{key}."))
+    elif isinstance(node, list):
+        for item in node:
+            label = item.get("operations", "?") if isinstance(item, dict) else "?"
+            out.update(_flatten(item, f"{prefix}{label}."))
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        out[prefix.rstrip(".")] = float(node)
+    return out
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Return report lines comparing the timing metrics of two result files."""
+    before, after = _flatten(old), _flatten(new)
+    lines = [f"{'metric':<60} {'old':>12} {'new':>12} {'change':>9}"]
+    for key in sorted(before.keys() & after.keys()):
+        if not key.endswith(("_ms", "ops_per_sec", "bytes")):
+            continue
+        a, b = before[key], after[key]
+        change = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+        lines.append(f"{key:<60} {a:>12.3f} {b:>12.3f} {change:>9}")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the DocBuddy benchmarks")
+    parser.add_argument("-o", "--output", help="Write JSON results to this file")
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(x) for x in s.split(",")],
+        default=list(DEFAULT_SIZES),
+        help="Comma-separated operation counts (default: 10,1000,10000)",
+    )
+    parser.add_argument(
+        "-n", "--iterations", type=int, default=200, help="Requests per HTTP benchmark"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="Small sizes and few iterations"
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="Compare two result files instead of running",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        old, new = (json.loads(Path(p).read_text()) for p in args.compare)
+        print("\n".join(compare(old, new)))
+        return
+
+    if args.quick:
+        args.sizes, args.iterations = [10, 100], 20
+    results = run(args.sizes, args.iterations)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
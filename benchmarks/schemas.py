@@ -0,0 +1,76 @@
+"""Synthetic OpenAPI schemas of arbitrary size for the benchmarks.
+
+The operations and component schemas are copied from the demo server in
+``examples/demo_server.py`` so that the generated schemas have realistic
+shapes (query/path parameters, ``$ref`` request bodies, several responses).
+Each copy gets its own path prefix, tag and component names.
+"""
+
+import copy
+import json
+import os
+import sys
+from functools import lru_cache
+from typing import Any, Dict
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+_REF_PREFIX = "#/components/schemas/"
+
+
+@lru_cache(maxsize=None)
+def demo_schema() -> str:
+    """Return the demo server's OpenAPI schema as JSON (imported once)."""
+    sys.path.insert(0, os.path.join(_ROOT, "examples"))
+    try:
+        import demo_server
+    finally:
+        sys.path.pop(0)
+    return json.dumps(demo_server.app.openapi())
+
+
+def _rename_refs(node: Any, suffix: str) -> Any:
+    if isinstance(node, dict):
+        return {
+            key: (
+                value + suffix
+                if key == "$ref" and isinstance(value, str)
+                else _rename_refs(value, suffix)
+            )
+            for key, value in node.items()
+        }
+    if isinstance(node, list):
+        return [_rename_refs(value, suffix) for value in node]
+    return node
+
+
+def make_schema(n_operations: int) -> Dict[str, Any]:
+    """Return an OpenAPI schema with exactly ``n_operations`` operations."""
+    base = json.loads(demo_schema())
+    templates = [
+        (path, method, operation)
+        for path, item in base["paths"].items()
+        for method, operation in item.items()
+    ]
+    components = base.get("components", {}).get("schemas", {})
+
+    schema = copy.deepcopy(base)
+    schema["info"]["title"] = f"Synthetic API ({n_operations} operations)"
+    schema["paths"] = {}
+    schema["components"] = {"schemas": {}}
+    copy_index = 0
+    while n_operations > 0:
+        suffix = f"V{copy_index}" if copy_index else ""
+        prefix = f"/v{copy_index}" if copy_index else ""
+        for path, method, operation in templates[:n_operations]:
+            op = _rename_refs(copy.deepcopy(operation), suffix)
+            if "operationId" in op:
+                op["operationId"] += suffix
+            op["tags"] = [f"{tag}{suffix}" for tag in op.get("tags", [])]
+            schema["paths"].setdefault(prefix + path, {})[method] = op
+        for name, definition in components.items():
+            schema["components"]["schemas"][name + suffix] = _rename_refs(
+                definition, suffix
+            )
+        n_operations -= len(templates)
+        copy_index += 1
+    return schema
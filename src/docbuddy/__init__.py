@@ -1,12 +1,37 @@
 """docbuddy: Add an LLM configuration panel to your FastAPI Swagger UI docs."""
 
-from importlib.metadata import version, PackageNotFoundError
+import importlib
+from typing import TYPE_CHECKING, Any, List
 
-try:
-    __version__ = version("docbuddy")
-except PackageNotFoundError:
-    __version__ = "unknown"
+if TYPE_CHECKING:  # pragma: no cover
+    from .plugin import get_swagger_ui_html, setup_docs
+    from .proxy import LLMProxy
 
-from .plugin import setup_docs, get_swagger_ui_html
+__all__ = ["setup_docs", "get_swagger_ui_html", "LLMProxy"]
 
-__all__ = ["setup_docs", "get_swagger_ui_html"]
+# Public names and the submodules that define them. They are imported on first
+# access so that ``import docbuddy`` (and the ``docbuddy`` CLI) does not pay for
+# importing FastAPI, Starlette, Jinja2 and Pydantic.
+_LAZY_ATTRIBUTES = {
+    "setup_docs": ".plugin",
+    "get_swagger_ui_html": ".plugin",
+    "LLMProxy": ".proxy",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        from ._version import get_version
+
+        value: Any = get_version()
+    elif name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # cache: later lookups bypass __getattr__
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | {"__version__"})
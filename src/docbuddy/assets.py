@@ -0,0 +1,364 @@
+"""In-memory static asset serving with precompressed variants and content hashes.
+
+This module has no web-framework dependencies: :class:`StaticAssets` is a plain
+ASGI application, and the negotiation helpers are reused by the CLI server.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import parse_qs
+
+try:  # Optional: ``pip install docbuddy[brotli]``
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+
+# Files smaller than this are not worth compressing
+_MIN_COMPRESS_SIZE = 512
+
+_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+    "image/vnd.microsoft.icon",
+    "image/x-icon",
+)
+
+# Preference order when the client accepts several encodings equally
+_ENCODINGS = ("br", "gzip")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Return True if an ``If-None-Match`` header value matches ``etag``.
+
+    Weak comparison is used, as RFC 9110 requires for ``If-None-Match``.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified_since(if_modified_since: str, mtime: float) -> bool:
+    """Return True if ``mtime`` is not newer than an ``If-Modified-Since`` date.
+
+    HTTP dates have one-second resolution, so ``mtime`` is truncated first.
+    """
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError, IndexError):
+        return False
+    if since is None or since.tzinfo is None:
+        return False
+    return int(mtime) <= since.timestamp()
+
+
+def select_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """Pick the best content-coding from ``available`` for an ``Accept-Encoding``.
+
+    Returns ``None`` when the identity representation should be sent.
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name.strip()] = q
+
+    best, best_q = None, 0.0
+    for encoding in _ENCODINGS:
+        if encoding not in available:
+            continue
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=11)
+    # mtime=0 keeps the output (and therefore the ETag) deterministic
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+class Asset:
+    """A single static file held in memory along with its compressed variants.
+
+    Compressed variants are computed on first use and then kept, so each
+    encoding is produced at most once per process. ``encodings`` limits which
+    content-codings are offered.
+    """
+
+    __slots__ = (
+        "body",
+        "content_type",
+        "digest",
+        "mtime",
+        "encodings",
+        "_variants",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        body: bytes,
+        content_type: str,
+        mtime: Optional[float] = None,
+        encodings: Iterable[str] = _ENCODINGS,
+    ):
+        self.body = body
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.mtime = mtime
+        self.encodings = tuple(encodings)
+        self._variants: Dict[str, Optional[bytes]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def compressible(self) -> bool:
+        return len(self.body) >= _MIN_COMPRESS_SIZE and self.content_type.startswith(
+            _COMPRESSIBLE_TYPES
+        )
+
+    def available_encodings(self) -> List[str]:
+        """Return the content-codings this asset can be served with."""
+        if not self.compressible:
+            return []
+        return [
+            e
+            for e in _ENCODINGS
+            if e in self.encodings and (e != "br" or brotli is not None)
+        ]
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """Return the content-coding to serve for an ``Accept-Encoding`` value."""
+        encodings = self.available_encodings()
+        return select_encoding(accept_encoding, encodings) if encodings else None
+
+    def has_variant(self, encoding: Optional[str]) -> bool:
+        """Return True if :meth:`variant` can answer without compressing."""
+        return encoding is None or encoding in self._variants
+
+    def variant(self, encoding: Optional[str]) -> Optional[bytes]:
+        """Return the body for ``encoding``, or ``None`` if it would not be smaller."""
+        if encoding is None:
+            return self.body
+        with self._lock:
+            if encoding not in self._variants:
+                data = _compress(self.body, encoding)
+                self._variants[encoding] = data if len(data) < len(self.body) else None
+            return self._variants[encoding]
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """Strong ETag for the given representation of this asset."""
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def respond(
+        self,
+        *,
+        accept_encoding: str = "",
+        if_none_match: Optional[str] = None,
+        if_modified_since: Optional[str] = None,
+        immutable: bool = False,
+    ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        """Negotiate a representation and return ``(status, headers, body)``.
+
+        ``If-Modified-Since`` is only consulted when ``If-None-Match`` is
+        absent, as RFC 9110 requires.
+        """
+        encoding = self.negotiate(accept_encoding)
+        body = self.variant(encoding)
+        if body is None:
+            encoding, body = None, self.body
+
+        etag = self.etag(encoding)
+        headers = [
+            ("etag", etag),
+            (
+                "cache-control",
+                IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            ),
+        ]
+        if self.mtime is not None:
+            headers.append(("last-modified", formatdate(self.mtime, usegmt=True)))
+        if self.available_encodings():
+            headers.append(("vary", "Accept-Encoding"))
+        if if_none_match:
+            if etag_matches(if_none_match, etag):
+                return 304, headers, b""
+        elif if_modified_since and self.mtime is not None:
+            if not_modified_since(if_modified_since, self.mtime):
+                return 304, headers, b""
+
+        headers.append(("content-type", self.content_type))
+        headers.append(("content-length", str(len(body))))
+        if encoding:
+            headers.append(("content-encoding", encoding))
+        return 200, headers, body
+
+
+def _guess_content_type(path: str) -> str:
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in (
+        "application/javascript",
+        "application/json",
+    ):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+class StaticAssets:
+    """ASGI app that serves a directory of static files from memory.
+
+    Every file is read once and identified by a content hash, which
+    :meth:`url_for` appends to asset URLs. Requests that carry the current
+    hash are served with ``Cache-Control: immutable``; all others are served
+    with ``no-cache`` and a strong ``ETag`` so browsers revalidate cheaply.
+    gzip (and brotli, when the optional ``brotli`` package is installed)
+    variants are chosen according to ``Accept-Encoding``.
+
+    Args:
+        directory: Directory whose files are served.
+        reload: If True, files are re-read when their mtime changes (for
+            development); otherwise the first read is kept for the process.
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike], *, reload: bool = False):
+        self.directory = Path(directory).resolve()
+        self.reload = reload
+        self._assets: Dict[str, Asset] = {}
+        self._virtual: Dict[str, Asset] = {}
+        self._lock = threading.Lock()
+        for file in sorted(self.directory.rglob("*")):
+            if file.is_file():
+                self._load(file.relative_to(self.directory).as_posix())
+
+    def _load(self, path: str) -> Optional[Asset]:
+        file = self.directory / path
+        try:
+            stat = file.stat()
+            body = file.read_bytes()
+        except OSError:
+            return None
+        asset = Asset(body, _guess_content_type(path), mtime=stat.st_mtime)
+        with self._lock:
+            self._assets[path] = asset
+        return asset
+
+    def add(self, path: str, body: bytes, content_type: Optional[str] = None) -> Asset:
+        """Register an in-memory asset that does not exist on disk."""
+        asset = Asset(body, content_type or _guess_content_type(path))
+        with self._lock:
+            self._virtual[path] = asset
+        return asset
+
+    def get(self, path: str) -> Optional[Asset]:
+        """Return the asset at ``path`` (relative, ``/``-separated) or ``None``."""
+        path = path.lstrip("/")
+        asset = self._virtual.get(path)
+        if asset is not None:
+            return asset
+        asset = self._assets.get(path)
+        if self.reload and asset is not None:
+            try:
+                if (self.directory / path).stat().st_mtime != asset.mtime:
+                    asset = self._load(path)
+            except OSError:
+                asset = None
+        return asset
+
+    def precompress(self, *, background: bool = True) -> None:
+        """Compute every compressed variant ahead of the first request.
+
+        With ``background=True`` the work runs on a daemon thread so that app
+        startup is not delayed; requests arriving earlier compress on demand.
+        """
+
+        def work() -> None:
+            for asset in list(self._assets.values()) + list(self._virtual.values()):
+                for encoding in asset.available_encodings():
+                    asset.variant(encoding)
+
+        if background:
+            threading.Thread(
+                target=work, name="docbuddy-precompress", daemon=True
+            ).start()
+        else:
+            work()
+
+    def url_for(self, path: str, prefix: str = "/docbuddy-static") -> str:
+        """Return a cache-busting URL (``?v=<hash>``) for the asset at ``path``."""
+        asset = self.get(path)
+        url = f"{prefix.rstrip('/')}/{path.lstrip('/')}"
+        return f"{url}?v={asset.digest}" if asset is not None else url
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":  # pragma: no cover - websockets/lifespan
+            return
+
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            await _send(send, 405, [("allow", "GET, HEAD")], b"Method Not Allowed")
+            return
+
+        # Starlette's Mount leaves ``path`` intact and extends ``root_path``
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path) :]
+        asset = self.get(path)
+        if asset is None:
+            await _send(
+                send,
+                404,
+                [("content-type", "text/plain"), ("content-length", "9")],
+                b"Not Found",
+            )
+            return
+
+        headers = {
+            k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]
+        }
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        accept_encoding = headers.get("accept-encoding", "")
+        encoding = asset.negotiate(accept_encoding)
+        if not asset.has_variant(encoding):
+            # Not precompressed yet: compress on a worker thread, not the loop
+            await asyncio.to_thread(asset.variant, encoding)
+        status, response_headers, body = asset.respond(
+            accept_encoding=accept_encoding,
+            if_none_match=headers.get("if-none-match"),
+            if_modified_since=headers.get("if-modified-since"),
+            immutable=query.get("v", [None])[0] == asset.digest,
+        )
+        await _send(send, status, response_headers, b"" if method == "HEAD" else body)
+
+
+async def _send(send, status: int, headers: List[Tuple[str, str]], body: bytes) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,294 @@
+"""Build a single minified DocBuddy script bundle with a source map.
+
+The minifier is deliberately conservative: it understands JavaScript strings,
+template literals, regular-expression literals and comments well enough to
+remove comments, indentation and blank lines, but it never joins lines, so
+automatic semicolon insertion behaves exactly as in the original sources.
+Because every output line comes from a single input line, the source map is a
+simple line-to-line mapping.
+"""
+
+import json
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+# Load order of the browser modules (each one extends ``window.DocBuddy``)
+BUNDLE_FILES = (
+    "core.js",
+    "chat.js",
+    "settings.js",
+    "workflow.js",
+    "agent.js",
+    "plugin.js",
+)
+
+BUNDLE_NAME = "docbuddy.bundle.js"
+
+# Keywords after which a ``/`` starts a regular expression, not a division
+_REGEX_KEYWORDS = frozenset(
+    (
+        "return",
+        "typeof",
+        "instanceof",
+        "in",
+        "of",
+        "new",
+        "delete",
+        "void",
+        "throw",
+        "case",
+        "do",
+        "else",
+        "yield",
+        "await",
+    )
+)
+_REGEX_PRECEDERS = frozenset("(,=:[!&|?{};+-*%<>~^")
+
+_B64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+
+def _vlq(value: int) -> str:
+    """Encode a signed integer as a base64 VLQ (source map v3)."""
+    value = (-value << 1) | 1 if value < 0 else value << 1
+    out = ""
+    while True:
+        digit = value & 31
+        value >>= 5
+        if value:
+            digit |= 32
+        out += _B64[digit]
+        if not value:
+            return out
+
+
+def minify_lines(source: str) -> List[Tuple[int, int, str]]:
+    """Strip comments and indentation from ``source``.
+
+    Returns ``(line, column, text)`` tuples for every non-empty output line,
+    where ``line``/``column`` (0-based) locate the start of ``text`` in the
+    original source.
+    """
+    out: List[Tuple[int, int, str]] = []
+    buf: List[str] = []
+    buf_line, buf_col = 0, 0
+    line, col = 0, 0
+    # Stack of open template literals; each entry counts the ``{`` nesting of
+    # the ``${ ... }`` expression currently being scanned inside it.
+    templates: List[int] = []
+    in_template_text = False
+    last_token = ""  # last significant code character or identifier
+    n = len(source)
+    i = 0
+
+    def emit_line() -> None:
+        text = "".join(buf).rstrip()
+        buf.clear()
+        if not text:
+            return
+        # Multi-line template literals keep their newlines; map each line
+        for k, part in enumerate(text.split("\n")):
+            out.append((buf_line + k, buf_col if k == 0 else 0, part))
+
+    def push(text: str) -> None:
+        nonlocal buf_line, buf_col
+        if not buf:
+            buf_line, buf_col = line, col
+        buf.append(text)
+
+    while i < n:
+        ch = source[i]
+
+        if in_template_text:
+            if ch == "\\":
+                push(source[i : i + 2])
+                i += 2
+                col += 2
+                continue
+            if ch == "`":
+                push(ch)
+                templates.pop()
+                in_template_text = False
+                last_token = "`"
+                i += 1
+                col += 1
+                continue
+            if source.startswith("${", i):
+                push("${")
+                in_template_text = False
+                templates[-1] = 0
+                last_token = "{"
+                i += 2
+                col += 2
+                continue
+            # Template text is content: keep newlines and whitespace verbatim
+            push(ch)
+            i += 1
+            if ch == "\n":
+                line, col = line + 1, 0
+            else:
+                col += 1
+            continue
+
+        if ch == "\n":
+            emit_line()
+            i += 1
+            line, col = line + 1, 0
+            continue
+
+        if ch in " \t\r":
+            # Collapse runs of whitespace between tokens to a single space
+            if buf and buf[-1] != " ":
+                push(" ")
+            i += 1
+            col += 1
+            continue
+
+        if source.startswith("//", i):
+            while i < n and source[i] != "\n":
+                i += 1
+            continue
+
+        if source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            comment = source[i:end]
+            newlines = comment.count("\n")
+            if newlines:
+                # A multi-line comment acts as a line terminator
+                emit_line()
+                line += newlines
+                col = len(comment) - comment.rfind("\n") - 1
+            else:
+                if buf:
+                    push(" ")
+                col += len(comment)
+            i = end
+            continue
+
+        if ch in "\"'":
+            j = i + 1
+            while j < n and source[j] != ch and source[j] != "\n":
+                j += 2 if source[j] == "\\" else 1
+            chunk = source[i : j + 1]
+            push(chunk)
+            if "\n" in chunk:  # line continuation inside the string
+                line += chunk.count("\n")
+                col = len(chunk) - chunk.rfind("\n") - 1
+            else:
+                col += len(chunk)
+            i = j + 1
+            last_token = ch
+            continue
+
+        if ch == "`":
+            push(ch)
+            templates.append(0)
+            in_template_text = True
+            i += 1
+            col += 1
+            continue
+
+        if ch == "/" and (
+            not last_token
+            or last_token in _REGEX_PRECEDERS
+            or last_token in _REGEX_KEYWORDS
+        ):
+            j = i + 1
+            in_class = False
+            while j < n and source[j] != "\n":
+                c = source[j]
+                if c == "\\":
+                    j += 2
+                    continue
+                if c == "[":
+                    in_class = True
+                elif c == "]":
+                    in_class = False
+                elif c == "/" and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and (source[j].isalnum() or source[j] == "_"):
+                j += 1  # flags
+            push(source[i:j])
+            col += j - i
+            i = j
+            last_token = "/regex"
+            continue
+
+        if ch.isalnum() or ch in "_$":
+            j = i
+            while j < n and (source[j].isalnum() or source[j] in "_$"):
+                j += 1
+            word = source[i:j]
+            push(word)
+            col += j - i
+            i = j
+            last_token = word
+            continue
+
+        if templates and not in_template_text:
+            if ch == "{":
+                templates[-1] += 1
+            elif ch == "}":
+                if templates[-1] == 0:
+                    # End of a ``${ ... }`` expression: back to template text
+                    push(ch)
+                    in_template_text = True
+                    i += 1
+                    col += 1
+                    continue
+                templates[-1] -= 1
+
+        push(ch)
+        last_token = ch
+        i += 1
+        col += 1
+
+    emit_line()
+    return out
+
+
+def build_bundle(
+    static_dir: Path, files: Sequence[str] = BUNDLE_FILES
+) -> Tuple[bytes, bytes]:
+    """Concatenate and minify ``files`` into one script with a source map.
+
+    Args:
+        static_dir: Directory containing the module sources.
+        files: Module file names, in execution order.
+
+    Returns:
+        ``(bundle, source_map)`` as UTF-8 encoded bytes. The bundle ends with
+        a ``sourceMappingURL`` comment pointing at ``<BUNDLE_NAME>.map``.
+    """
+    lines: List[str] = []
+    segments: List[str] = []
+    prev_src = prev_line = prev_col = 0
+
+    for src_index, name in enumerate(files):
+        source = (static_dir / name).read_text(encoding="utf-8")
+        for line, col, text in minify_lines(source):
+            segments.append(
+                "A"
+                + _vlq(src_index - prev_src)
+                + _vlq(line - prev_line)
+                + _vlq(col - prev_col)
+            )
+            prev_src, prev_line, prev_col = src_index, line, col
+            lines.append(text)
+        # Guard against a module that does not end its last statement
+        lines.append(";")
+        segments.append("")
+
+    lines.append(f"//# sourceMappingURL={BUNDLE_NAME}.map")
+    source_map = {
+        "version": 3,
+        "file": BUNDLE_NAME,
+        "sources": list(files),
+        "names": [],
+        "mappings": ";".join(segments),
+    }
+    bundle = "\n".join(lines) + "\n"
+    return bundle.encode("utf-8"), json.dumps(source_map).encode("utf-8")
@@ -4,11 +4,26 @@
 import argparse
 import functools
 import http.server
+import io
+import json
+import os
 import pathlib
+import queue
+import socket
 import sys
 import threading
 import time
 import webbrowser
+from typing import Any, Optional, Tuple, cast
+from urllib.parse import parse_qs, urlsplit
+
+from .assets import Asset, StaticAssets
+from .bundle import BUNDLE_FILES
+
+# Idle keep-alive connections are closed after this many seconds. Each open
+# connection holds a worker, so this stays short: a browser that stopped
+# sending requests frees its worker almost immediately
+_KEEPALIVE_TIMEOUT = 2
 
 
 def _pkg_dir() -> pathlib.Path:
@@ -16,8 +31,235 @@ def _pkg_dir() -> pathlib.Path:
     return pathlib.Path(__file__).parent
 
 
+class _Site:
+    """In-memory copy of standalone.html and static/ for one package directory.
+
+    standalone.html is served with a map of static asset content hashes so it
+    can request ``static/<name>?v=<hash>`` URLs, which are cached as immutable.
+    """
+
+    def __init__(self, directory: pathlib.Path):
+        self.static = StaticAssets(directory / "static")
+        self.static.precompress()
+        versions = {}
+        for name in BUNDLE_FILES:
+            asset = self.static.get(name)
+            if asset is not None:
+                versions[name] = asset.digest
+        html = (directory / "standalone.html").read_text(encoding="utf-8")
+        script = (
+            "<script>window.DOCBUDDY_ASSET_VERSIONS = "
+            + json.dumps(versions).replace("</", "<\\/")
+            + ";</script>\n"
+        )
+        html = html.replace("</head>", script + "</head>", 1)
+        self.page = Asset(
+            html.encode("utf-8"),
+            "text/html; charset=utf-8",
+            mtime=(directory / "standalone.html").stat().st_mtime,
+        )
+
+    def get(self, path: str) -> Optional[Asset]:
+        if path == "/standalone.html":
+            return self.page
+        if path.startswith("/static/"):
+            return self.static.get(path[len("/static/") :])
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _site(directory: str) -> _Site:
+    return _Site(pathlib.Path(directory))
+
+
+class DocBuddyRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve standalone.html and static/ from memory over HTTP/1.1.
+
+    Responses use keep-alive, gzip (or brotli) when accepted, ``ETag`` and
+    ``Last-Modified`` validators, and ``Cache-Control: immutable`` for
+    content-hashed static URLs. Only the standalone page and its static
+    assets are exposed; everything else in ``directory`` returns 404.
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = _KEEPALIVE_TIMEOUT
+
+    def handle_one_request(self) -> None:
+        # Wait for the next request line here, so that an idle keep-alive
+        # connection timing out is closed quietly instead of being logged as
+        # "Request timed out" (timeouts within a request are still logged)
+        try:
+            # rfile is buffered (rbufsize is -1), so peeking does not consume
+            cast(io.BufferedReader, self.rfile).peek(1)
+        except socket.timeout:
+            self.close_connection = True
+            return
+        super().handle_one_request()
+
+    def do_GET(self) -> None:
+        self._serve(head=False)
+
+    def do_HEAD(self) -> None:
+        self._serve(head=True)
+
+    def _serve(self, *, head: bool) -> None:
+        url = urlsplit(self.path)
+        if url.path in ("/", "/index.html"):
+            self.send_response(302)
+            self.send_header("Location", "/standalone.html")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        asset = _site(self.directory).get(url.path)
+        if asset is None:
+            self.send_error(404, "File not found")
+            return
+
+        status, headers, body = asset.respond(
+            accept_encoding=self.headers.get("Accept-Encoding", ""),
+            if_none_match=self.headers.get("If-None-Match"),
+            if_modified_since=self.headers.get("If-Modified-Since"),
+            immutable=parse_qs(url.query).get("v", [None])[0] == asset.digest,
+        )
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+class DocBuddyHTTPServer(http.server.ThreadingHTTPServer):
+    """HTTP server that handles connections on a bounded pool of worker threads.
+
+    Args:
+        server_address: ``(host, port)`` to bind.
+        handler: Request handler class (or ``functools.partial`` of one).
+        workers: Maximum number of connections served concurrently; further
+            connections wait in the accept queue. An open keep-alive
+            connection holds its worker until it has been idle for
+            ``_KEEPALIVE_TIMEOUT`` seconds, and a browser opens up to about
+            six connections per page, so the default of 16 serves two or
+            three page loads at once.
+    """
+
+    def __init__(self, server_address, handler, *, workers: int = 16):
+        super().__init__(server_address, handler)
+        self.workers = workers
+        self._connections: "queue.SimpleQueue[Optional[Tuple[socket.socket, Any]]]" = (
+            queue.SimpleQueue()
+        )
+        # Daemon threads, so open keep-alive connections never delay exit
+        for i in range(workers):
+            threading.Thread(
+                target=self._work, name=f"docbuddy-http-{i}", daemon=True
+            ).start()
+
+    def _work(self) -> None:
+        while True:
+            item = self._connections.get()
+            if item is None:
+                return
+            self.process_request_thread(*item)
+
+    def process_request(self, request, client_address) -> None:
+        self._connections.put((request, client_address))
+
+    def server_close(self) -> None:
+        super().server_close()
+        for _ in range(self.workers):
+            self._connections.put(None)
+
+
+def _add_run_parser(subparsers) -> None:
+    run = subparsers.add_parser(
+        "run",
+        help="Run exported workflows headlessly",
+        description=(
+            "Run workflows exported from the Workflow tab against an "
+            "OpenAI-compatible endpoint and report per-block latency and "
+            "token throughput."
+        ),
+        epilog=(
+            "Example: docbuddy run workflow.json --model llama3 --repeat 100 "
+            "--concurrency 8 --format jsonl -o results.jsonl"
+        ),
+    )
+    run.add_argument("workflow", nargs="+", help="Exported workflow JSON file(s)")
+    run.add_argument(
+        "--base-url",
+        default="http://localhost:11434/v1",
+        help="OpenAI-compatible API base URL (default: http://localhost:11434/v1)",
+    )
+    run.add_argument(
+        "--api-key",
+        default=os.environ.get("OPENAI_API_KEY"),
+        help="API key for the LLM endpoint (default: $OPENAI_API_KEY)",
+    )
+    run.add_argument("--model", default="llama3", help="Model ID (default: llama3)")
+    run.add_argument("--max-tokens", type=int, default=4096)
+    run.add_argument("--temperature", type=float, default=0.7)
+    run.add_argument(
+        "--preset",
+        default="api_assistant",
+        help="System prompt preset (default: api_assistant)",
+    )
+    run.add_argument(
+        "--openapi", help="OpenAPI schema file or URL used for the prompt and tools"
+    )
+    run.add_argument(
+        "--tools",
+        action="store_true",
+        help="Let blocks call the target API through the api_request tool",
+    )
+    run.add_argument(
+        "--api-base-url",
+        help="Target API base URL for tool calls (default: the schema's servers)",
+    )
+    run.add_argument("--api-token", help="Bearer token sent with tool calls")
+    run.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Run each workflow this many times (default: 1)",
+    )
+    run.add_argument(
+        "--concurrency",
+        "-c",
+        type=int,
+        default=4,
+        help="Maximum number of LLM streams in flight (default: 4)",
+    )
+    run.add_argument(
+        "--max-parallel-requests",
+        type=int,
+        default=4,
+        help="Maximum concurrent GET/HEAD tool calls per block (default: 4)",
+    )
+    run.add_argument(
+        "--timeout",
+        type=float,
+        default=300.0,
+        help="Seconds to wait for each response (default: 300)",
+    )
+    run.add_argument(
+        "--format",
+        choices=("text", "jsonl"),
+        default="text",
+        help="Output format (default: text)",
+    )
+    run.add_argument(
+        "--stream",
+        action="store_true",
+        help="Also write tokens as they arrive (text: lines labelled "
+        "[run.block]; JSONL: 'delta' events)",
+    )
+    run.add_argument("--output", "-o", help="Write output to this file")
+
+
 def main() -> None:
-    """Launch DocBuddy standalone webpage on port 8008."""
+    """Launch DocBuddy standalone webpage on port 8008, or run workflows."""
     parser = argparse.ArgumentParser(
         prog="docbuddy",
         description="Launch the DocBuddy standalone AI-enhanced API documentation page.",
@@ -36,8 +278,28 @@ def main() -> None:
         default=8008,
         help="Port to run the server on (default: 8008)",
     )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=16,
+        help=(
+            "Maximum number of connections served concurrently; each browser "
+            "uses up to ~6 (default: 16)"
+        ),
+    )
+
+    _add_run_parser(parser.add_subparsers(dest="command", metavar="command"))
 
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    if args.command == "run":
+        # Imported here so that serving the page does not load asyncio
+        from .runner import main as run_main
+
+        sys.exit(run_main(args))
 
     # Locate the package directory using __file__ – this is the most reliable
     # way to find the installed package assets regardless of Python version,
@@ -53,16 +315,19 @@ def main() -> None:
         sys.exit(1)
 
     # Serve only the package directory – not the whole repo/site-packages root.
-    handler = functools.partial(
-        http.server.SimpleHTTPRequestHandler, directory=str(pkg_dir)
-    )
+    handler = functools.partial(DocBuddyRequestHandler, directory=str(pkg_dir))
 
     url = f"http://{args.host}:{args.port}/standalone.html"
 
+    # Load and start compressing the assets before the first request arrives
+    _site(str(pkg_dir))
+
     print(f"Serving DocBuddy at {url}")
     print("Press Ctrl+C to stop the server")
 
-    with http.server.HTTPServer((args.host, args.port), handler) as httpd:
+    with DocBuddyHTTPServer(
+        (args.host, args.port), handler, workers=args.workers
+    ) as httpd:
 
         def open_browser():
             time.sleep(0.5)
@@ -0,0 +1,788 @@
+"""Server-side OpenAPI digest: LLM prompt context and tool definition.
+
+These functions are Python ports of ``buildOpenApiContext`` and
+``buildApiRequestTool`` in ``static/core.js`` and must produce identical
+output, so that the browser can use a digest computed once on the server in
+place of walking the schema itself. JavaScript semantics (truthiness, string
+conversion and property order) are reproduced where they affect the output.
+"""
+
+import math
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+HTTP_METHODS = ("get", "post", "put", "patch", "delete", "head", "options")
+TOOL_METHODS = ("get", "post", "put", "patch", "delete")
+
+# Large schemas switch to a retrieval layout: a compact index of every
+# operation plus full detail only for the operations relevant to the query.
+# Mirrors ``RETRIEVAL_OPTIONS`` in ``static/core.js``.
+RETRIEVAL_OPTIONS = {"min_operations": 40, "top_k": 8, "max_index_entries": 250}
+
+SCHEMA_REF_PREFIX = "#/components/schemas/"
+_ARRAY_INDEX_RE = re.compile(r"0|[1-9][0-9]*")
+
+
+def _truthy(value: Any) -> bool:
+    """JavaScript truthiness (empty arrays and objects are truthy)."""
+    if isinstance(value, (list, dict)):
+        return True
+    return bool(value)
+
+
+def _or(value: Any, default: Any) -> Any:
+    """JavaScript ``value || default``."""
+    return value if _truthy(value) else default
+
+
+def _js_str(value: Any) -> str:
+    """Convert ``value`` to a string the way JavaScript concatenation does."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, list):
+        return ",".join("" if v is None else _js_str(v) for v in value)
+    if isinstance(value, dict):
+        return "[object Object]"
+    return str(value)
+
+
+def _is_array_index(key: str) -> bool:
+    return key.isdigit() and (key == "0" or key[0] != "0") and int(key) < 2**32 - 1
+
+
+def _js_keys(obj: Any) -> List[str]:
+    """``Object.keys`` order: integer-like keys ascending, then insertion order."""
+    if not isinstance(obj, dict):
+        return []
+    keys = list(obj)
+    index_keys = sorted((k for k in keys if _is_array_index(k)), key=int)
+    if not index_keys:
+        return keys
+    return index_keys + [k for k in keys if not _is_array_index(k)]
+
+
+def _is_object(value: Any) -> bool:
+    """JavaScript ``typeof value === 'object'`` for non-null JSON values."""
+    return isinstance(value, (dict, list))
+
+
+def _props(value: Any) -> Dict[str, Any]:
+    """Property lookups on a JSON value: non-objects have no named properties."""
+    return value if isinstance(value, dict) else {}
+
+
+def _join(values: List[Any]) -> str:
+    """JavaScript ``array.join(', ')`` (``null`` becomes an empty string)."""
+    return ", ".join("" if v is None else _js_str(v) for v in values)
+
+
+def _is_ref(node: Any) -> bool:
+    return isinstance(node, dict) and isinstance(node.get("$ref"), str)
+
+
+def _pointer_lookup(schema: Any, ref: str) -> Any:
+    """Return the value at the local JSON pointer ``ref`` (None if missing)."""
+    if ref[:2] != "#/":
+        return None
+    node = schema
+    for key in ref[2:].split("/"):
+        key = key.replace("~1", "/").replace("~0", "~")
+        if isinstance(node, list):
+            if not _ARRAY_INDEX_RE.fullmatch(key) or int(key) >= len(node):
+                return None
+            node = node[int(key)]
+        elif isinstance(node, dict) and key in node:
+            node = node[key]
+        else:
+            return None
+    return node
+
+
+def _follow_ref(schema: Any, ref: str) -> Any:
+    """Final target of ``ref``, or None when it is missing, empty or circular."""
+    seen: List[str] = []
+    while True:
+        seen.append(ref)
+        target = _pointer_lookup(schema, ref)
+        next_ref = target["$ref"] if _is_ref(target) else None
+        if next_ref is None or next_ref in seen:
+            break
+        ref = next_ref
+    return target if next_ref is None and _truthy(target) else None
+
+
+def _schema_ref_names(node: Any, names: List[str]) -> List[str]:
+    """Append the names of component schemas referenced inside ``node``."""
+    if _is_ref(node):
+        ref = node["$ref"]
+        if ref.startswith(SCHEMA_REF_PREFIX):
+            name = ref[len(SCHEMA_REF_PREFIX) :]
+            if name not in names:
+                names.append(name)
+    elif isinstance(node, dict):
+        for key in _js_keys(node):
+            _schema_ref_names(node[key], names)
+    elif isinstance(node, list):
+        for item in node:
+            _schema_ref_names(item, names)
+    return names
+
+
+class RefIndex:
+    """Memoized resolution of the local ``$ref`` pointers of a schema.
+
+    Mirrors ``createRefIndex`` in ``static/core.js``: each reference is looked
+    up once, chains of references are followed, ``allOf`` compositions are
+    flattened, and recursive models are cut where they refer back to a model
+    being expanded.
+    """
+
+    def __init__(self, schema: Any):
+        self.schema = schema
+        self._targets: Dict[str, Any] = {}
+        self._shapes: Dict[str, Any] = {}
+        self._nested: Dict[str, List[str]] = {}
+
+    def resolve(self, node: Any) -> Any:
+        """The node a reference points to (``node`` itself if unresolvable)."""
+        if not _is_ref(node):
+            return node
+        ref = node["$ref"]
+        if ref not in self._targets:
+            self._targets[ref] = _follow_ref(self.schema, ref)
+        target = self._targets[ref]
+        return node if target is None else target
+
+    def shape(self, node: Any) -> Any:
+        """Resolved schema with ``allOf`` members merged into one object."""
+        return self._shape(node, [])
+
+    def _shape(self, node: Any, stack: List[str]) -> Any:
+        # Shapes of references are memoized, except while a cycle is being cut
+        ref = node["$ref"] if _is_ref(node) else None
+        memo = not stack
+        if memo and ref is not None and ref in self._shapes:
+            return self._shapes[ref]
+        target = self.resolve(node)
+        result = target
+        if isinstance(target, dict) and isinstance(target.get("allOf"), list):
+            result = self._merge_all_of(
+                target, stack + [ref] if ref is not None else stack
+            )
+        if memo and ref is not None:
+            self._shapes[ref] = result
+        return result
+
+    def _merge_all_of(self, target: Dict[str, Any], stack: List[str]) -> Any:
+        merged: Dict[str, Any] = {}
+        properties: Dict[str, Any] = {}
+        required: List[Any] = []
+        members = target["allOf"]
+        for i, part in enumerate(members + [target]):
+            s = part
+            if i < len(members):
+                if _is_ref(part) and part["$ref"] in stack:
+                    continue
+                s = self._shape(part, stack)
+            if not isinstance(s, dict):
+                continue
+            for key in s:
+                if key not in ("allOf", "properties", "required"):
+                    merged[key] = s[key]
+            props = s.get("properties")
+            if _truthy(props) and isinstance(props, dict):
+                properties.update(props)
+            if isinstance(s.get("required"), list):
+                for name in s["required"]:
+                    if name not in required:
+                        required.append(name)
+        merged["properties"] = properties
+        merged["required"] = required
+        return merged
+
+    def related_models(self, names: List[str], limit: int) -> List[str]:
+        """``names`` followed by the models they reference, breadth-first.
+
+        Only existing component schemas are kept, at most ``limit`` of them.
+        """
+        schemas = _props(_props(_props(self.schema).get("components")).get("schemas"))
+        result: List[str] = []
+
+        def add(name: str) -> None:
+            if (
+                name not in result
+                and _truthy(schemas.get(name))
+                and _is_object(schemas[name])
+            ):
+                result.append(name)
+
+        for name in names:
+            add(name)
+        i = 0
+        while i < len(result) and len(result) < limit:
+            if result[i] not in self._nested:
+                self._nested[result[i]] = _schema_ref_names(schemas[result[i]], [])
+            for name in self._nested[result[i]]:
+                add(name)
+            i += 1
+        return result[:limit]
+
+
+_COMPOSITION_JOINERS = (("allOf", " & "), ("anyOf", " | "), ("oneOf", " | "))
+
+
+def _type_label(node: Any, fallback: str) -> Any:
+    """Short type of a JSON schema for prompts, like ``_typeLabel`` in core.js."""
+    if not _is_object(node):
+        return fallback
+    node = _props(node)
+    ref = node.get("$ref")
+    if isinstance(ref, str) and ref:
+        return ref.replace(SCHEMA_REF_PREFIX, "", 1)
+    type_ = node.get("type")
+    if _truthy(type_):
+        if type_ == "array" and _truthy(node.get("items")):
+            return "array[" + _js_str(_type_label(node["items"], "object")) + "]"
+        return type_
+    for key, joiner in _COMPOSITION_JOINERS:
+        members = node.get(key)
+        if isinstance(members, list) and members:
+            return joiner.join(_js_str(_type_label(m, "any")) for m in members)
+    return fallback
+
+
+def _content_label(content: Any) -> Any:
+    """Type of the first media type in ``content`` that declares a schema."""
+    content = _props(content)
+    for content_type in _js_keys(content):
+        media = content[content_type]
+        if _is_object(media) and _is_object(_props(media).get("schema")):
+            return _type_label(media["schema"], "")
+    return ""
+
+
+def _api_header_lines(schema: Dict[str, Any]) -> List[str]:
+    lines: List[str] = []
+    info = _props(schema.get("info"))
+    lines.append("# API Information")
+    lines.append("## " + _js_str(_or(info.get("title"), "Untitled API")))
+    lines.append("Version: " + _js_str(_or(info.get("version"), "N/A")))
+
+    description = info.get("description")
+    if _truthy(description):
+        lines.append("")
+        lines.append("### Description")
+        lines.append(_js_str(description))
+
+    servers = _or(schema.get("servers"), [])
+    if isinstance(servers, list) and servers:
+        lines.append("")
+        lines.append("### Base URLs")
+        for server in servers:
+            server = _props(server)
+            url = _js_str(_or(server.get("url"), ""))
+            desc = _or(server.get("description"), "")
+            if _truthy(desc):
+                lines.append("- " + url + " (" + _js_str(desc) + ")")
+            else:
+                lines.append("- " + url)
+    return lines
+
+
+def _schema_model_lines(schema_name: str, schema_def: Dict[str, Any]) -> List[str]:
+    lines = ["", "## `" + schema_name + "`"]
+    desc = _or(schema_def.get("description"), "")
+    if _truthy(desc):
+        lines.append("*" + _js_str(desc) + "*")
+    props = _props(schema_def.get("properties"))
+    if _js_keys(props):
+        lines.append("")
+        lines.append("**Properties:**")
+        schema_required = _or(schema_def.get("required"), [])
+        for prop_name in _js_keys(props)[:10]:
+            if not _is_object(props[prop_name]):
+                continue
+            prop_def = _props(props[prop_name])
+            ptype = _js_str(_type_label(prop_def, "any"))
+            preq = "[required]" if prop_name in schema_required else "[optional]"
+            pdesc = _js_str(_or(prop_def.get("description"), ""))
+            lines.append(
+                "- `" + prop_name + "` (" + ptype + ", " + preq + "): " + pdesc
+            )
+    return lines
+
+
+def build_openapi_context(
+    schema: Any,
+    query: Optional[str] = None,
+    index: Optional["OperationIndex"] = None,
+) -> str:
+    """Return the Markdown API summary used as ``{openapi_context}``.
+
+    Mirrors ``buildOpenApiContext`` in ``static/core.js``. When ``query`` is
+    given and the schema has more than ``RETRIEVAL_OPTIONS["min_operations"]``
+    operations, only a compact index of all operations plus full details of
+    the operations most relevant to ``query`` are included. ``index`` may be
+    passed to reuse an :class:`OperationIndex` already built for ``schema``.
+    """
+    if not isinstance(schema, dict):
+        return ""
+
+    if query is not None:
+        if index is None:
+            index = OperationIndex(schema)
+        if len(index.operations) > RETRIEVAL_OPTIONS["min_operations"]:
+            return _build_retrieval_context(schema, index, query)
+
+    refs = index.refs if index is not None else RefIndex(schema)
+    lines = _api_header_lines(schema)
+
+    paths = _or(schema.get("paths"), {})
+    if _js_keys(paths):
+        lines.append("")
+        lines.append("# API Endpoints")
+        for path in _js_keys(paths):
+            if not _is_object(paths[path]):
+                continue
+            path_item = _props(paths[path])
+            lines.append("")
+            lines.append("## `" + path + "`")
+            for method in HTTP_METHODS:
+                operation = path_item.get(method)
+                if not _truthy(operation) or not isinstance(operation, dict):
+                    continue
+                lines.extend(_operation_lines(refs, method, operation))
+
+    schemas = _props(_props(schema.get("components")).get("schemas"))
+    if _js_keys(schemas):
+        lines.append("")
+        lines.append("# Data Models (Schemas)")
+        for schema_name in _js_keys(schemas)[:20]:
+            if not _is_object(schemas[schema_name]):
+                continue
+            lines.extend(
+                _schema_model_lines(
+                    schema_name, _props(refs.shape(schemas[schema_name]))
+                )
+            )
+
+    return "\n".join(lines)
+
+
+def _operation_lines(
+    refs: RefIndex, method: str, operation: Dict[str, Any]
+) -> List[str]:
+    lines = ["### " + method.upper()]
+    summary = _or(operation.get("summary"), "")
+    desc = _or(operation.get("description"), "")
+    if _truthy(summary):
+        lines.append("**Summary:** " + _js_str(summary))
+    if _truthy(desc):
+        lines.append("**Description:** " + _js_str(desc))
+
+    tags = _or(operation.get("tags"), [])
+    if isinstance(tags, list) and tags:
+        lines.append("**Tags:** " + _join(tags))
+
+    params = _or(operation.get("parameters"), [])
+    if isinstance(params, list) and params:
+        lines.append("")
+        lines.append("**Parameters:**")
+        for param in params:
+            if not _is_object(param):
+                continue
+            param = _props(refs.resolve(param))
+            name = _js_str(_or(param.get("name"), "unknown"))
+            in_loc = _js_str(_or(param.get("in"), "query"))
+            required = "[required]" if _truthy(param.get("required")) else "[optional]"
+            p_desc = _js_str(_or(param.get("description"), ""))
+            lines.append(
+                "- `" + name + "` (" + in_loc + ", " + required + ") - " + p_desc
+            )
+
+    request_body = refs.resolve(operation.get("requestBody"))
+    if _truthy(request_body) and isinstance(request_body, dict):
+        content = _props(request_body.get("content"))
+        if _js_keys(content):
+            lines.append("")
+            lines.append("**Request Body:**")
+            for content_type in _js_keys(content):
+                if not _is_object(content[content_type]):
+                    continue
+                schema_def = _or(_props(content[content_type]).get("schema"), {})
+                if not _is_object(schema_def):
+                    continue
+                schema_def = _props(schema_def)
+                lines.append("- Content-Type: `" + content_type + "`")
+                shape = refs.shape(schema_def)
+                if shape is not schema_def and _is_ref(schema_def):
+                    ref_name = schema_def["$ref"].replace(SCHEMA_REF_PREFIX, "", 1)
+                    lines.append("- Schema: `" + ref_name + "`")
+                resolved = _props(shape)
+                if resolved.get("type") == "object" or _truthy(
+                    resolved.get("properties")
+                ):
+                    props = _props(resolved.get("properties"))
+                    required_fields = _or(resolved.get("required"), [])
+                    for p_name in _js_keys(props)[:10]:
+                        p_def = _props(props[p_name])
+                        p_type = _type_label(props[p_name], "any")
+                        p_req = "required" if p_name in required_fields else "optional"
+                        p_desc = _or(p_def.get("description"), "")
+                        lines.append(
+                            "  - `"
+                            + p_name
+                            + "` ("
+                            + _js_str(p_type)
+                            + ", "
+                            + p_req
+                            + ")"
+                            + (": " + _js_str(p_desc) if _truthy(p_desc) else "")
+                        )
+
+    responses = _or(operation.get("responses"), {})
+    if _js_keys(responses):
+        lines.append("")
+        lines.append("**Responses:**")
+        for status_code in sorted(_js_keys(responses)):
+            if not _is_object(responses[status_code]):
+                continue
+            response = refs.resolve(responses[status_code])
+            if not _is_object(response):
+                continue
+            response = _props(response)
+            res_desc = _js_str(_or(response.get("description"), "No description"))
+            model = _content_label(response.get("content"))
+            lines.append(
+                "- `"
+                + status_code
+                + "`: "
+                + res_desc
+                + (" → `" + _js_str(model) + "`" if _truthy(model) else "")
+            )
+
+    return lines
+
+
+class Operation(NamedTuple):
+    path: str
+    method: str
+    operation: Dict[str, Any]
+
+
+def list_operations(schema: Any) -> List[Operation]:
+    """Return every operation of ``schema`` in document order."""
+    operations: List[Operation] = []
+    paths = _props(_props(schema).get("paths"))
+    for path in _js_keys(paths):
+        if not _is_object(paths[path]):
+            continue
+        path_item = _props(paths[path])
+        for method in HTTP_METHODS:
+            operation = path_item.get(method)
+            if not _truthy(operation) or not _is_object(operation):
+                continue
+            operations.append(Operation(path, method, _props(operation)))
+    return operations
+
+
+# ── Operation retrieval (BM25) ─────────────────────────────────────────────
+# Mirrors the tokenizer and scoring in ``static/core.js`` exactly.
+
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_STOPWORDS = frozenset(
+    (
+        "a an and are as at be by can do for from get how i in is it me my of on or "
+        "please show that the this to what which with you your"
+    ).split()
+)
+_CAMEL_RE = re.compile(r"([a-z0-9])([A-Z])")
+_SPLIT_RE = re.compile(r"[^a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split ``text`` into lowercase search terms.
+
+    camelCase is split, stopwords and one-letter words are dropped, and a
+    trailing plural ``s`` is removed so that "invoices" matches "invoice".
+    """
+    tokens = []
+    for word in _SPLIT_RE.split(_CAMEL_RE.sub(r"\1 \2", text or "").lower()):
+        if len(word) < 2 or word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word[-1] == "s" and word[-2] != "s":
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def _ref_name(node: Any) -> str:
+    node = _props(node)
+    ref = node.get("$ref")
+    if not isinstance(ref, str):
+        ref = _props(node.get("items")).get("$ref")
+    if not isinstance(ref, str):
+        return ""
+    return ref[ref.rfind("/") + 1 :]
+
+
+def _operation_schema_names(
+    operation: Dict[str, Any], refs: Optional[RefIndex] = None
+) -> List[str]:
+    """Names of component schemas referenced by an operation's bodies/responses.
+
+    With ``refs``, referenced request bodies and responses are resolved first.
+    """
+    names: List[str] = []
+
+    def from_content(content: Any) -> None:
+        content = _props(content)
+        for content_type in _js_keys(content):
+            name = _ref_name(_props(content[content_type]).get("schema"))
+            if name and name not in names:
+                names.append(name)
+
+    def resolve(node: Any) -> Any:
+        return refs.resolve(node) if refs is not None else node
+
+    from_content(_props(resolve(operation.get("requestBody"))).get("content"))
+    responses = _props(operation.get("responses"))
+    for status_code in sorted(_js_keys(responses)):
+        from_content(_props(resolve(responses[status_code])).get("content"))
+    return names
+
+
+def _operation_text(op: Operation) -> str:
+    operation = op.operation
+    parts = [
+        op.path,
+        operation.get("operationId"),
+        operation.get("summary"),
+        operation.get("description"),
+    ]
+    tags = operation.get("tags")
+    if isinstance(tags, list):
+        parts.extend(tags)
+    params = operation.get("parameters")
+    if isinstance(params, list):
+        for param in params:
+            param = _props(param)
+            parts.extend((param.get("name"), param.get("description")))
+    parts.extend(_operation_schema_names(operation))
+    return " ".join(p for p in parts if isinstance(p, str))
+
+
+class OperationIndex:
+    """BM25 index over the operations of an OpenAPI schema.
+
+    Each operation is indexed by its path, operationId, summary, description,
+    tags, parameter names and descriptions, and referenced schema names.
+    Build it once per schema and reuse it for every query.
+    """
+
+    def __init__(self, schema: Any):
+        self.operations = list_operations(schema)
+        self.refs = RefIndex(schema)
+        self._docs: List[Tuple[Dict[str, int], int]] = []
+        self._df: Dict[str, int] = {}
+        total_length = 0
+        for op in self.operations:
+            tokens = tokenize(_operation_text(op))
+            tf: Dict[str, int] = {}
+            for token in tokens:
+                tf[token] = tf.get(token, 0) + 1
+            for token in tf:
+                self._df[token] = self._df.get(token, 0) + 1
+            self._docs.append((tf, len(tokens)))
+            total_length += len(tokens)
+        self._avg_length = total_length / len(self.operations) if self.operations else 0
+
+    def search(self, query: str, k: int = RETRIEVAL_OPTIONS["top_k"]) -> List[int]:
+        """Return the indices of the top ``k`` operations for ``query``, best first."""
+        n = len(self.operations)
+        terms: List[str] = []
+        for token in tokenize(query):
+            if token not in terms and token in self._df:
+                terms.append(token)
+        if not terms:
+            return []
+        scored = []
+        for i, (tf, length) in enumerate(self._docs):
+            score = 0.0
+            for term in terms:
+                f = tf.get(term)
+                if not f:
+                    continue
+                df = self._df[term]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                norm = length / self._avg_length if self._avg_length else 0
+                score += (
+                    idf
+                    * (f * (_BM25_K1 + 1))
+                    / (f + _BM25_K1 * (1 - _BM25_B + _BM25_B * norm))
+                )
+            if score > 0:
+                scored.append((-score, i))
+        scored.sort()
+        return [i for _, i in scored[:k]]
+
+
+def _compact_index_lines(index: OperationIndex) -> List[str]:
+    ops = index.operations
+    limit = min(len(ops), RETRIEVAL_OPTIONS["max_index_entries"])
+    lines = []
+    for op in ops[:limit]:
+        summary = op.operation.get("summary")
+        lines.append(
+            "- "
+            + op.method.upper()
+            + " "
+            + op.path
+            + (" — " + summary if summary and isinstance(summary, str) else "")
+        )
+    if len(ops) > limit:
+        lines.append("- … " + str(len(ops) - limit) + " more operations not listed")
+    return lines
+
+
+def _build_retrieval_context(
+    schema: Dict[str, Any], index: OperationIndex, query: str
+) -> str:
+    lines = _api_header_lines(schema)
+    lines.append("")
+    lines.append("# API Endpoints")
+    lines.append(
+        "This API has " + str(len(index.operations)) + " operations. Compact index:"
+    )
+    lines.extend(_compact_index_lines(index))
+
+    hits = index.search(query, RETRIEVAL_OPTIONS["top_k"])
+    if hits:
+        model_names: List[str] = []
+        lines.append("")
+        lines.append("# Relevant Endpoints")
+        lines.append(
+            "Full details for the operations most relevant to the current request:"
+        )
+        for i in hits:
+            op = index.operations[i]
+            lines.append("")
+            lines.append("## `" + op.path + "`")
+            lines.extend(_operation_lines(index.refs, op.method, op.operation))
+            for name in _operation_schema_names(op.operation, index.refs):
+                if name not in model_names:
+                    model_names.append(name)
+
+        # Include the models those reference (line items of an invoice, ...)
+        schemas = _props(_props(schema.get("components")).get("schemas"))
+        model_names = index.refs.related_models(model_names, 20)
+        if model_names:
+            lines.append("")
+            lines.append("# Data Models (Schemas)")
+            for name in model_names:
+                lines.extend(
+                    _schema_model_lines(name, _props(index.refs.shape(schemas[name])))
+                )
+    return "\n".join(lines)
+
+
+def build_api_request_tool(schema: Any) -> Dict[str, Any]:
+    """Return the ``api_request`` tool definition for LLM tool calling.
+
+    Mirrors ``buildApiRequestTool`` in ``static/core.js``.
+    """
+    endpoints = []
+    refs = RefIndex(schema)
+    paths = _or(schema.get("paths"), {}) if isinstance(schema, dict) else {}
+    for path in _js_keys(paths):
+        if not _is_object(paths[path]):
+            continue
+        path_item = _props(paths[path])
+        for method in TOOL_METHODS:
+            op = path_item.get(method)
+            if not _truthy(op) or not isinstance(op, dict):
+                continue
+            desc = method.upper() + " " + path
+            summary = _or(op.get("summary"), "")
+            if _truthy(summary):
+                desc += " — " + _js_str(summary)
+            request_body = refs.resolve(op.get("requestBody"))
+            body = (
+                _content_label(request_body.get("content"))
+                if _truthy(request_body) and isinstance(request_body, dict)
+                else ""
+            )
+            if _truthy(body):
+                desc += " (body: " + _js_str(body) + ")"
+            endpoints.append(desc)
+
+    # Keep the tool description bounded for very large APIs
+    omitted = len(endpoints) - RETRIEVAL_OPTIONS["max_index_entries"]
+    if omitted > 0:
+        endpoints = endpoints[: RETRIEVAL_OPTIONS["max_index_entries"]]
+    endpoint_list = (
+        "\n" + "\n".join("- " + e for e in endpoints)
+        if endpoints
+        else "No endpoints found."
+    )
+    if omitted > 0:
+        endpoint_list += (
+            "\n- … "
+            + str(omitted)
+            + " more endpoints (see the API index in the system prompt)"
+        )
+
+    return {
+        "type": "function",
+        "function": {
+            "name": "api_request",
+            "description": (
+                "Execute an HTTP request against the API. "
+                "Available endpoints:" + endpoint_list
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "method": {
+                        "type": "string",
+                        "enum": sorted(m.upper() for m in TOOL_METHODS),
+                        "description": "HTTP method",
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": "API endpoint path, e.g. /users/{id}",
+                    },
+                    "query_params": {
+                        "type": "object",
+                        "description": "Query string parameters as key-value pairs",
+                        "additionalProperties": True,
+                    },
+                    "path_params": {
+                        "type": "object",
+                        "description": "Path parameters to substitute in the URL template",
+                        "additionalProperties": True,
+                    },
+                    "body": {
+                        "type": "object",
+                        "description": "JSON request body (for POST/PUT/PATCH requests)",
+                        "additionalProperties": True,
+                    },
+                },
+                "required": ["method", "path"],
+            },
+        },
+    }
+
+
+def build_digest(schema: Any, openapi_url: str) -> Dict[str, Any]:
+    """Return the digest payload served to the browser for ``schema``."""
+    return {
+        "openapi_url": openapi_url,
+        "context": build_openapi_context(schema),
+        "tool": build_api_request_tool(schema),
+    }
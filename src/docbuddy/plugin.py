@@ -1,18 +1,30 @@
 """Core plugin logic: functions to mount the custom LLM-enhanced Swagger UI docs."""
 
+import contextlib
+import hashlib
+import json
 import threading
 import weakref
-from importlib.metadata import PackageNotFoundError
-from importlib.metadata import version as get_version
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional, Union
 
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
 from jinja2 import Environment, FileSystemLoader
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
 from starlette.routing import Route
 
+from ._version import get_version
+from .assets import Asset, StaticAssets, etag_matches
+from .bundle import BUNDLE_NAME, build_bundle
+from .digest import build_digest
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .proxy import LLMProxy
+
 
 # Locate package static/template directories
 _PACKAGE_DIR = Path(__file__).parent
@@ -28,6 +40,166 @@ _llm_apps: weakref.WeakSet = weakref.WeakSet()
 # Module-level Jinja2 environment (reused across requests)
 _jinja_env = Environment(loader=FileSystemLoader(str(_TEMPLATES_DIR)), autoescape=True)
 
+# Guards one-time construction of the minified script bundle
+_bundle_lock = threading.Lock()
+
+# URL prefix under which the package's static files are mounted
+_STATIC_URL = "/docbuddy-static"
+
+# URL of the precomputed OpenAPI digest (prompt context + tool definition)
+_DIGEST_URL = "/docbuddy-digest"
+_LLM_PROXY_URL = "/docbuddy-llm"
+
+
+@lru_cache(maxsize=2)
+def _static_assets(reload: bool = False) -> StaticAssets:
+    """Return the shared in-memory store of the package's static files.
+
+    The non-reloading store is built once per process and shared by every app;
+    debug mode uses a separate store that picks up edits on disk.
+    """
+    assets = StaticAssets(_STATIC_DIR, reload=reload)
+    if not reload:
+        assets.precompress()
+    return assets
+
+
+def _ensure_bundle(assets: StaticAssets) -> None:
+    """Register the minified script bundle and its source map with ``assets``.
+
+    The bundle is built once for the shared store; the reloading (debug) store
+    rebuilds it on every call so edits to the module sources show up.
+    """
+    with _bundle_lock:
+        if assets.get(BUNDLE_NAME) is not None and not assets.reload:
+            return
+        bundle_js, source_map = build_bundle(_STATIC_DIR)
+        assets.add(BUNDLE_NAME, bundle_js)
+        assets.add(BUNDLE_NAME + ".map", source_map, "application/json")
+    if not assets.reload:
+        assets.precompress()
+
+
+def _render_swagger_ui(
+    *,
+    debug: bool,
+    bundle: bool = False,
+    digest_url: Optional[str] = None,
+    llm_proxy_url: Optional[str] = None,
+    **context: Optional[str],
+) -> str:
+    """Render ``swagger_ui.html`` with the given template context."""
+    # Use a fresh (uncached) environment per debug call to avoid mutating the
+    # shared singleton; non-debug requests share the cached module-level env.
+    env = (
+        Environment(loader=FileSystemLoader(str(_TEMPLATES_DIR)), autoescape=True)
+        if debug
+        else _jinja_env
+    )
+    assets = _static_assets(reload=debug)
+    if bundle:
+        _ensure_bundle(assets)
+    theme_css_url = context.get("theme_css_url") or ""
+    if theme_css_url.startswith(_STATIC_URL + "/"):
+        context["theme_css_url"] = assets.url_for(theme_css_url[len(_STATIC_URL) :])
+    context["version"] = context.get("version") or get_version()
+    return env.get_template("swagger_ui.html").render(
+        static_url=assets.url_for,
+        bundle=bundle,
+        digest_url=digest_url,
+        llm_proxy_url=llm_proxy_url,
+        **context,
+    )
+
+
+class _PrerenderedPage:
+    """Immutable rendered page bytes with a strong, content-derived ETag."""
+
+    __slots__ = ("body", "etag", "media_type")
+
+    def __init__(self, body: bytes, media_type: str = "text/html; charset=utf-8"):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.media_type = media_type
+
+    def response_for(self, request: Request) -> Response:
+        """Return the full page, or ``304 Not Modified`` if the client has it."""
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+
+class _OpenApiDigestCache:
+    """JSON digest of ``app.openapi()``, rebuilt only when the schema changes.
+
+    The cache key is the identity of the app's route objects plus the identity
+    of FastAPI's cached ``app.openapi_schema``, so adding or removing routes
+    (or resetting ``openapi_schema``) invalidates it while ordinary requests
+    cost a tuple comparison. The serialized schema itself (with a strong ETag
+    and a gzip variant) is cached under the same key.
+    """
+
+    def __init__(self, app: FastAPI, openapi_url: str):
+        self._app = app
+        self._openapi_url = openapi_url
+        self._key: Optional[tuple] = None
+        self._page: Optional[_PrerenderedPage] = None
+        self._schema_key: Optional[tuple] = None
+        self._schema_assets: Dict[str, Asset] = {}
+
+    def _current_key(self) -> tuple:
+        schema = getattr(self._app, "openapi_schema", None)
+        return (id(schema) if schema is not None else None,) + tuple(
+            id(r) for r in self._app.router.routes
+        )
+
+    def _build(self) -> _PrerenderedPage:
+        schema = self._app.openapi()
+        digest = build_digest(schema, self._openapi_url)
+        body = json.dumps(digest, ensure_ascii=False, separators=(",", ":"))
+        return _PrerenderedPage(body.encode("utf-8"), "application/json")
+
+    async def get(self) -> _PrerenderedPage:
+        page, key = self._page, self._current_key()
+        if page is None or key != self._key or key[0] is None:
+            # Walking a large schema is CPU-bound; keep it off the event loop
+            page = await run_in_threadpool(self._build)
+            self._page, self._key = page, self._current_key()
+        return page
+
+    def _build_schema(self, root_path: str) -> Asset:
+        # Same document as FastAPI's own openapi route
+        schema = self._app.openapi()
+        if root_path and self._app.root_path_in_servers:
+            server_urls = {s.get("url") for s in schema.get("servers", [])}
+            if root_path not in server_urls:
+                schema = dict(schema)
+                schema["servers"] = [{"url": root_path}] + schema.get("servers", [])
+        body = json.dumps(
+            schema, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        # gzip only: brotli at quality 11 is too slow for multi-megabyte schemas
+        asset = Asset(body, "application/json", encodings=("gzip",))
+        for encoding in asset.available_encodings():
+            asset.variant(encoding)
+        return asset
+
+    async def schema(self, root_path: str = "") -> Asset:
+        """Return the serialized schema as served under ``root_path``."""
+        key = self._current_key()
+        if key != self._schema_key or key[0] is None:
+            self._schema_assets = {}
+        asset = self._schema_assets.get(root_path)
+        if asset is None:
+            asset = await run_in_threadpool(self._build_schema, root_path)
+            key = self._current_key()
+            if key != self._schema_key:
+                self._schema_assets, self._schema_key = {}, key
+            self._schema_assets[root_path] = asset
+        return asset
+
 
 def get_swagger_ui_html(
     *,
@@ -40,6 +212,7 @@ def get_swagger_ui_html(
     theme_css_url: str = "/docbuddy-static/themes/light-theme.css",
     debug: bool = False,
     version: Optional[str] = None,
+    bundle: bool = False,
 ) -> HTMLResponse:
     """Return an HTMLResponse with the custom Swagger UI + LLM settings panel.
 
@@ -57,22 +230,13 @@ def get_swagger_ui_html(
         debug: If True, disables template caching for development.
         version: Version string to display in the UI (defaults to the installed
             package version).
+        bundle: If True, load DocBuddy as a single minified script
+            (``docbuddy.bundle.js``, with a source map) instead of the six
+            individual modules.
     """
-    # Use a fresh (uncached) environment per debug call to avoid mutating the
-    # shared singleton; non-debug requests share the cached module-level env.
-    env = (
-        Environment(loader=FileSystemLoader(str(_TEMPLATES_DIR)), autoescape=True)
-        if debug
-        else _jinja_env
-    )
-
-    try:
-        pkg_version = get_version("docbuddy")
-    except PackageNotFoundError:
-        pkg_version = "unknown"
-
-    template = env.get_template("swagger_ui.html")
-    html = template.render(
+    html = _render_swagger_ui(
+        debug=debug,
+        bundle=bundle,
         title=title,
         openapi_url=openapi_url,
         swagger_js_url=swagger_js_url,
@@ -80,7 +244,7 @@ def get_swagger_ui_html(
         swagger_js_sri=swagger_js_sri,
         swagger_css_sri=swagger_css_sri,
         theme_css_url=theme_css_url,
-        version=version or pkg_version,
+        version=version,
     )
     return HTMLResponse(html)
 
@@ -98,14 +262,29 @@ def setup_docs(
     theme_css_url: str = "/docbuddy-static/themes/light-theme.css",
     debug: bool = False,
     version: Optional[str] = None,
+    bundle: bool = False,
+    llm_proxy: Optional[Union[str, "LLMProxy"]] = None,
 ) -> None:
     """Mount the LLM-enhanced Swagger UI docs on a FastAPI application.
 
     This function:
     1. Disables FastAPI's default ``/docs`` route.
-    2. Mounts the package's static JS files at ``/docbuddy-static``.
+    2. Mounts the package's static JS files at ``/docbuddy-static``, served
+       from memory with gzip/brotli variants and content-hashed URLs.
     3. Registers a new ``docs_url`` route that serves the custom Swagger UI page
        with the LLM settings panel injected.
+    4. When the page uses the app's own schema, registers ``/docbuddy-digest``,
+       which serves the LLM prompt context and tool definition computed once
+       from ``app.openapi()``, and serves the schema itself serialized once,
+       with a strong ``ETag`` and gzip, so reloads revalidate with ``304``.
+    5. With ``llm_proxy``, registers ``/docbuddy-llm/chat/completions`` and
+       ``/docbuddy-llm/models``, which relay LLM calls from the page to the
+       configured provider over a shared connection pool. These routes are
+       not authenticated: with a server-side ``api_key``, anyone who can
+       reach the app can spend it, so keep such docs behind your own auth.
+
+    Outside debug mode the page is rendered once, on first request, and served
+    from memory with a strong ``ETag``; conditional requests get ``304``.
 
     Calling this function more than once on the same app instance is a no-op;
     subsequent calls are silently ignored.
@@ -123,10 +302,20 @@ def setup_docs(
         debug: If True, enables debug mode with template auto-reload (default False).
         version: Version string to display in the UI (defaults to the installed
             package version).
+        bundle: If True, serve DocBuddy as a single minified script with a
+            source map instead of six separately loaded modules (default False).
+        llm_proxy: Provider base URL (e.g. ``"http://localhost:11434/v1"``) or
+            an :class:`~docbuddy.proxy.LLMProxy` to relay LLM requests through
+            this app instead of calling the provider from the browser. Requires
+            the ``proxy`` extra (``pip install docbuddy[proxy]``).
     """
     resolved_title = title or f"{app.title} – LLM Docs"
     resolved_openapi_url = openapi_url or app.openapi_url or "/openapi.json"
 
+    # The digest is computed from app.openapi(), so it only describes the
+    # schema the page loads when that is the app's own schema.
+    own_schema = bool(app.openapi_url) and resolved_openapi_url == app.openapi_url
+
     with _route_lock:
         if app in _llm_apps:
             return
@@ -134,6 +323,9 @@ def setup_docs(
         original_routes = list(app.router.routes)
 
         paths_to_remove = {docs_url}
+        if own_schema and app.openapi_url:
+            # Replaced by the cached, conditional route registered below
+            paths_to_remove.add(app.openapi_url)
         if app.docs_url:
             paths_to_remove.add(app.docs_url)
         if app.redoc_url:
@@ -154,23 +346,94 @@ def setup_docs(
         )
         if not already_mounted:
             app.mount(
-                "/docbuddy-static",
-                StaticFiles(directory=str(_STATIC_DIR)),
+                _STATIC_URL,
+                _static_assets(reload=debug),
                 name="docbuddy-static",
             )
 
         _llm_apps.add(app)
 
-    @app.get(docs_url, include_in_schema=False)
-    def custom_docs() -> HTMLResponse:
-        return get_swagger_ui_html(
-            openapi_url=resolved_openapi_url,
+    if bundle:
+        _ensure_bundle(_static_assets(reload=debug))
+
+    digest_url = _DIGEST_URL if own_schema else None
+
+    if isinstance(llm_proxy, str):
+        from .proxy import LLMProxy
+
+        llm_proxy = LLMProxy(llm_proxy)
+    llm_proxy_url = _LLM_PROXY_URL if llm_proxy is not None else None
+
+    def render_page() -> _PrerenderedPage:
+        html = _render_swagger_ui(
+            debug=debug,
+            bundle=bundle,
+            digest_url=digest_url,
+            llm_proxy_url=llm_proxy_url,
             title=resolved_title,
+            openapi_url=resolved_openapi_url,
             swagger_js_url=swagger_js_url,
             swagger_css_url=swagger_css_url,
             swagger_js_sri=swagger_js_sri,
             swagger_css_sri=swagger_css_sri,
             theme_css_url=theme_css_url,
-            debug=debug,
             version=version,
         )
+        return _PrerenderedPage(html.encode("utf-8"))
+
+    # The rendered page depends only on this configuration, so render it once.
+    # Debug mode re-renders per request to pick up template edits.
+    cached_page: Optional[_PrerenderedPage] = None
+
+    @app.get(docs_url, include_in_schema=False)
+    async def custom_docs(request: Request) -> Response:
+        nonlocal cached_page
+        if debug:
+            return render_page().response_for(request)
+        if cached_page is None:
+            cached_page = render_page()
+        return cached_page.response_for(request)
+
+    if digest_url is not None:
+        digest_cache = _OpenApiDigestCache(app, resolved_openapi_url)
+
+        async def openapi_schema(request: Request) -> Response:
+            root_path = request.scope.get("root_path", "").rstrip("/")
+            asset = await digest_cache.schema(root_path)
+            status, headers, body = asset.respond(
+                accept_encoding=request.headers.get("accept-encoding", ""),
+                if_none_match=request.headers.get("if-none-match"),
+            )
+            return Response(body, status_code=status, headers=dict(headers))
+
+        app.add_route(resolved_openapi_url, openapi_schema, include_in_schema=False)
+
+        @app.get(digest_url, include_in_schema=False)
+        async def docbuddy_digest(request: Request) -> Response:
+            return (await digest_cache.get()).response_for(request)
+
+    if llm_proxy is not None:
+        proxy = llm_proxy
+        proxy_prefix = llm_proxy_url or _LLM_PROXY_URL
+
+        @app.post(proxy_prefix + "/chat/completions", include_in_schema=False)
+        async def docbuddy_llm_chat(request: Request) -> Response:
+            return await proxy.forward(request, "chat/completions")
+
+        @app.get(proxy_prefix + "/models", include_in_schema=False)
+        async def docbuddy_llm_models(request: Request) -> Response:
+            return await proxy.forward(request, "models")
+
+        # Close the pool when the app shuts down. Shutdown handlers are ignored
+        # for apps built with ``lifespan=``, so wrap the lifespan itself.
+        lifespan = app.router.lifespan_context
+
+        @contextlib.asynccontextmanager
+        async def lifespan_with_proxy(app_: Any) -> AsyncIterator[Any]:
+            try:
+                async with lifespan(app_) as state:
+                    yield state
+            finally:
+                await proxy.aclose()
+
+        app.router.lifespan_context = lifespan_with_proxy
@@ -0,0 +1,146 @@
+"""Server-side relay for OpenAI-compatible LLM providers.
+
+:class:`LLMProxy` forwards ``/chat/completions`` and ``/models`` requests from
+the docs page to a single configured upstream through one shared, keep-alive
+connection pool. Streaming responses (SSE) are relayed chunk by chunk as they
+arrive, without buffering. Requires the optional ``httpx`` dependency
+(``pip install docbuddy[proxy]``).
+"""
+
+import json
+from typing import AsyncIterator, Optional
+
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+
+try:  # Optional: ``pip install docbuddy[proxy]``
+    import httpx
+except ImportError:  # pragma: no cover - depends on the environment
+    httpx = None  # type: ignore[assignment]
+
+# Request headers forwarded upstream (everything else, notably cookies for the
+# docs site, stays on this side of the proxy)
+_FORWARD_REQUEST_HEADERS = ("accept", "authorization", "content-type")
+
+# Response headers relayed back to the browser
+_FORWARD_RESPONSE_HEADERS = ("cache-control", "content-type", "retry-after")
+
+
+class LLMProxy:
+    """Relay OpenAI-compatible API calls to ``upstream_url`` over a pooled client.
+
+    Args:
+        upstream_url: Base URL of the provider, including any ``/v1`` prefix
+            (e.g. ``"http://localhost:11434/v1"``).
+        api_key: Optional API key sent as ``Authorization: Bearer ...``. When
+            set it replaces any key sent by the browser, so the key never has
+            to leave the server. The relay itself does not authenticate
+            callers, so anyone who can reach the app can use the key.
+        max_connections: Maximum number of concurrent upstream connections.
+        max_keepalive_connections: Maximum number of idle connections kept open
+            for reuse.
+        keepalive_expiry: Seconds an idle connection is kept before closing.
+        timeout: Seconds to wait for each read from the upstream (generation
+            can pause for a long time before the first token).
+        connect_timeout: Seconds to wait when opening a new connection.
+        transport: Optional ``httpx`` transport, e.g. for tests.
+    """
+
+    def __init__(
+        self,
+        upstream_url: str,
+        *,
+        api_key: Optional[str] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 300.0,
+        connect_timeout: float = 10.0,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+    ):
+        if httpx is None:
+            raise ImportError(
+                "LLMProxy requires httpx; install it with: pip install 'docbuddy[proxy]'"
+            )
+        self.upstream_url = upstream_url.rstrip("/")
+        self.api_key = api_key
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            transport=transport,
+        )
+
+    def _upstream_headers(self, request: Request) -> dict:
+        headers = {
+            name: request.headers[name]
+            for name in _FORWARD_REQUEST_HEADERS
+            if name in request.headers
+        }
+        if self.api_key:
+            headers["authorization"] = f"Bearer {self.api_key}"
+        # Relay bytes exactly as produced; compressing SSE would delay tokens
+        headers["accept-encoding"] = "identity"
+        return headers
+
+    async def forward(self, request: Request, path: str) -> Response:
+        """Forward ``request`` to ``<upstream_url>/<path>`` and stream the reply."""
+        upstream = self._client.build_request(
+            request.method,
+            f"{self.upstream_url}/{path.lstrip('/')}",
+            headers=self._upstream_headers(request),
+            content=await request.body(),
+        )
+        try:
+            response = await self._client.send(upstream, stream=True)
+        except httpx.HTTPError as exc:
+            return JSONResponse(
+                {"error": "LLM provider unreachable", "details": str(exc)},
+                status_code=502,
+            )
+
+        event_stream = response.headers.get("content-type", "").startswith(
+            "text/event-stream"
+        )
+
+        async def relay() -> AsyncIterator[bytes]:
+            try:
+                # Decoded bytes, so a provider that ignores ``identity`` and
+                # compresses anyway is still relayed correctly
+                async for chunk in response.aiter_bytes():
+                    yield chunk
+            except httpx.HTTPError as exc:
+                # The status line is already sent, so a lost upstream becomes a
+                # final SSE error event the panels show instead of a cut-off reply
+                if event_stream:
+                    error = {
+                        "error": "LLM provider connection lost",
+                        "details": str(exc),
+                    }
+                    yield b"\n\ndata: " + json.dumps(error).encode() + b"\n\n"
+            finally:
+                # Returns the connection to the pool (or drops it if the
+                # browser disconnected mid-stream)
+                await response.aclose()
+
+        headers = {
+            name: response.headers[name]
+            for name in _FORWARD_RESPONSE_HEADERS
+            if name in response.headers
+        }
+        # Tell reverse proxies such as nginx not to buffer the event stream
+        headers["x-accel-buffering"] = "no"
+        return StreamingResponse(
+            relay(),
+            status_code=response.status_code,
+            headers=headers,
+            background=BackgroundTask(response.aclose),
+        )
+
+    async def aclose(self) -> None:
+        """Close all pooled upstream connections."""
+        await self._client.aclose()
@@ -0,0 +1,833 @@
+"""Headless workflow runner behind ``docbuddy run``.
+
+Runs workflows exported from the Workflow tab (the JSON written by its Export
+button) against an OpenAI-compatible ``/chat/completions`` endpoint and,
+when tools are enabled, the target API. Blocks follow the same rules as in
+the browser: each block waits for the blocks it depends on, sees only their
+conversation, and independent blocks run concurrently.
+
+Only the standard library is used. The scheduling runs on asyncio; each HTTP
+request runs on a worker thread and hands its server-sent events back to the
+event loop as they arrive, so tokens are streamed while other requests are in
+flight.
+"""
+
+import asyncio
+import http.client
+import json
+import math
+import re
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from .digest import OperationIndex, build_api_request_tool, build_openapi_context
+
+DEFAULT_BASE_URL = "http://localhost:11434/v1"
+DEFAULT_MODEL = "llama3"
+
+# Same limits as the browser (MAX_PARALLEL_REQUESTS / TOOL_RESULT_TOKENS)
+TOOL_RESULT_TOKENS = 1000
+SAFE_TOOL_METHODS = ("GET", "HEAD")
+
+_WORKFLOW_NOTE = (
+    "You are executing a multi-step workflow. Be concise. "
+    "Execute each instruction precisely."
+)
+_TOOL_NOTE = (
+    "Use the `api_request` tool via native tool calling when the user asks to "
+    "call an API endpoint. Do NOT output tool calls as JSON text — the system "
+    "handles tool execution automatically."
+)
+
+
+class Block(NamedTuple):
+    """One workflow step: its prompt and the indices of the blocks it needs."""
+
+    position: int
+    prompt: str
+    deps: List[int]
+
+
+class RunnerConfig(NamedTuple):
+    """Endpoints, model settings and limits for :func:`run_batch`."""
+
+    base_url: str = DEFAULT_BASE_URL
+    api_key: Optional[str] = None
+    model: str = DEFAULT_MODEL
+    max_tokens: int = 4096
+    temperature: float = 0.7
+    system_prompt: str = "{openapi_context}"
+    schema: Optional[Dict[str, Any]] = None
+    tools: bool = False
+    api_base_url: Optional[str] = None
+    api_token: Optional[str] = None
+    concurrency: int = 4
+    max_parallel_requests: int = 4
+    timeout: float = 300.0
+    stream: bool = False
+
+
+def load_workflow(data: Any) -> List[Block]:
+    """Parse an exported workflow into blocks.
+
+    Accepts the Export button's list of ``{"block", "prompt", "dependsOn"}``
+    objects (``dependsOn`` holds 1-based block numbers) and the
+    ``{"blocks": [...]}`` form the panel saves, whose ``dependsOn`` holds
+    block ids. Blocks without ``dependsOn`` depend on the previous block, and
+    only earlier blocks can be dependencies, as in ``workflowDependencies``
+    in ``static/core.js``.
+    """
+    if isinstance(data, dict) and isinstance(data.get("blocks"), list):
+        items, prompt_key = data["blocks"], "content"
+    elif isinstance(data, list):
+        items, prompt_key = data, "prompt"
+    else:
+        raise ValueError("not an exported DocBuddy workflow")
+    if not all(isinstance(item, dict) for item in items):
+        raise ValueError("not an exported DocBuddy workflow (blocks must be objects)")
+    if prompt_key == "content":
+        keys = [item.get("id") for item in items]
+    else:
+        keys = [item.get("block", i + 1) for i, item in enumerate(items)]
+
+    position = {key: i for i, key in enumerate(keys) if key is not None}
+    blocks = []
+    for i, item in enumerate(items):
+        depends_on = item.get("dependsOn")
+        if isinstance(depends_on, list):
+            deps = sorted(
+                {position[k] for k in depends_on if k in position and position[k] < i}
+            )
+        else:
+            deps = [i - 1] if i > 0 else []
+        blocks.append(Block(i, str(item.get(prompt_key) or ""), deps))
+    return blocks
+
+
+def upstream(blocks: List[Block], index: int) -> List[int]:
+    """Indices of every block ``index`` depends on, transitively, in order."""
+    seen = set()
+    stack = list(blocks[index].deps)
+    while stack:
+        j = stack.pop()
+        if j not in seen:
+            seen.add(j)
+            stack.extend(blocks[j].deps)
+    return sorted(seen)
+
+
+_TOKEN_RUN = re.compile(r"[A-Za-z]+|[0-9]+|\S")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count, like ``estimateTokens`` in ``static/core.js``.
+
+    Used for throughput when the server does not report ``usage``.
+    """
+    count = 0
+    for match in _TOKEN_RUN.finditer(text or ""):
+        run = match.group()
+        if run[0].isdigit():
+            count += math.ceil(len(run) / 3)
+        elif len(run) > 1 or run.isascii() and run.isalpha():
+            count += math.ceil(len(run) / 4)
+        else:
+            count += 1
+    return count
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to about ``max_tokens`` tokens, like ``truncateToTokens``."""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    note = f"\n…[truncated {len(text)} characters]"
+    keep = max(0, (len(text) * (max_tokens - estimate_tokens(note))) // tokens)
+    return text[:keep] + f"\n…[truncated {len(text) - keep} characters]"
+
+
+# Stricter at each step; see ``TOOL_CONDENSE_LEVELS`` in static/core.js
+_CONDENSE_LEVELS = (
+    (50, 500, 50, 64, 8),
+    (20, 200, 30, 48, 6),
+    (10, 100, 20, 32, 5),
+    (5, 60, 12, 24, 4),
+    (3, 40, 8, 16, 3),
+    (1, 20, 5, 12, 2),
+)
+
+# Keys listed by the shape summary; see ``TOOL_SUMMARY_KEYS``
+_SUMMARY_KEYS = (50, 20, 5, 0)
+
+
+def _short_key(key: str, chars: int) -> str:
+    return key if len(key) <= chars else key[:chars] + "…"
+
+
+def _condense_json(value: Any, level: tuple, depth: int) -> Any:
+    items, chars, keys, key_chars, max_depth = level
+    if isinstance(value, str):
+        if len(value) <= chars:
+            return value
+        return value[:chars] + f"…[+{len(value) - chars} chars]"
+    if isinstance(value, list):
+        if depth >= max_depth and value:
+            return f"…[{len(value)} items]"
+        out = [_condense_json(item, level, depth + 1) for item in value[:items]]
+        if len(value) > items:
+            out.append(f"…[{len(value) - items} more items, {len(value)} total]")
+        return out
+    if isinstance(value, dict):
+        names = list(value)
+        if depth >= max_depth and names:
+            return f"…{{{len(names)} keys}}"
+        result: Dict[str, Any] = {}
+        for name in names[:keys]:
+            short = _short_key(name, key_chars)
+            if short != name and short in result:
+                short = name
+            result[short] = _condense_json(value[name], level, depth + 1)
+        omitted = names[keys:]
+        if omitted:
+            result["…omitted"] = (
+                f"{len(omitted)} keys: "
+                + ", ".join(_short_key(name, key_chars) for name in omitted[:keys])
+                + (", …" if len(omitted) > keys else "")
+            )
+        return result
+    return value
+
+
+def _json_shape(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, str):
+        return f"string({len(value)})"
+    if isinstance(value, list):
+        return f"array({len(value)})"
+    if isinstance(value, dict):
+        return f"object({len(value)})"
+    return "number"
+
+
+def _summarize_json(value: Any, limit: int) -> Dict[str, Any]:
+    if isinstance(value, list):
+        summary: Dict[str, Any] = {"…summary": f"array of {len(value)} items"}
+        if limit and value:
+            summary["…first item"] = _json_shape(value[0])
+        return summary
+    summary = {"…summary": f"object with {len(value)} keys"}
+    if limit and value:
+        key_chars = _CONDENSE_LEVELS[-1][3]
+        summary["…keys"] = {
+            _short_key(name, key_chars): _json_shape(value[name])
+            for name in list(value)[:limit]
+        }
+    return summary
+
+
+def _dump_compact(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def condense_tool_response(body: str, max_tokens: int = TOOL_RESULT_TOKENS) -> str:
+    """Fit a response body into ``max_tokens``, like ``condenseToolResponse``.
+
+    JSON objects and arrays are shrunk structurally and stay valid JSON, down
+    to a summary of their shape; other bodies are truncated as text.
+    """
+    if estimate_tokens(body) <= max_tokens:
+        return body
+    try:
+        value = json.loads(body)
+    except ValueError:
+        return truncate_to_tokens(body, max_tokens)
+    if not isinstance(value, (dict, list)):
+        return truncate_to_tokens(body, max_tokens)
+    condensed = body
+    for level in _CONDENSE_LEVELS:
+        condensed = _dump_compact(_condense_json(value, level, 0))
+        if estimate_tokens(condensed) <= max_tokens:
+            return condensed
+    for limit in _SUMMARY_KEYS:
+        condensed = _dump_compact(_summarize_json(value, limit))
+        if estimate_tokens(condensed) <= max_tokens:
+            return condensed
+    # Smaller than any budget worth using; still valid JSON
+    return condensed
+
+
+def load_preset(name: str) -> str:
+    """Return the prompt of a preset from ``static/system-prompt-config.json``."""
+    config_path = Path(__file__).parent / "static" / "system-prompt-config.json"
+    presets = json.loads(config_path.read_text(encoding="utf-8"))["presets"]
+    if name not in presets:
+        raise ValueError(
+            f"unknown preset {name!r} (available: {', '.join(sorted(presets))})"
+        )
+    return presets[name]["prompt"]
+
+
+def schema_base_url(schema: Optional[Dict[str, Any]]) -> Optional[str]:
+    """First absolute URL in the schema's ``servers`` (or Swagger 2.0 host)."""
+    if not isinstance(schema, dict):
+        return None
+    for server in schema.get("servers") or []:
+        url = str((server or {}).get("url") or "")
+        if url.startswith(("http://", "https://")):
+            return url.rstrip("/")
+    if schema.get("host"):
+        scheme = (schema.get("schemes") or ["https"])[0]
+        return f"{scheme}://{schema['host']}{schema.get('basePath') or ''}".rstrip("/")
+    return None
+
+
+# ── HTTP on worker threads ──────────────────────────────────────────────────
+
+
+def _http_error(exc: urllib.error.HTTPError) -> RuntimeError:
+    text = exc.read().decode("utf-8", "replace")
+    return RuntimeError(
+        f"HTTP {exc.code}: {exc.reason}" + (f" - {text}" if text else "")
+    )
+
+
+def _post_sse(
+    url: str,
+    payload: Dict[str, Any],
+    headers: Dict[str, str],
+    timeout: float,
+    emit: Callable[[Dict[str, Any]], Any],
+) -> None:
+    """POST ``payload`` and call ``emit`` with every SSE ``data:`` chunk."""
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers=headers, method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            for raw in response:
+                line = raw.decode("utf-8", "replace").strip()
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: ") :]
+                if data == "[DONE]":
+                    return
+                try:
+                    emit(json.loads(data))
+                except ValueError:
+                    continue
+    except urllib.error.HTTPError as exc:
+        raise _http_error(exc) from None
+
+
+async def stream_chunks(
+    url: str, payload: Dict[str, Any], headers: Dict[str, str], timeout: float
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the SSE chunks of a streaming completion as they arrive."""
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue[Any]" = asyncio.Queue()
+    done = object()
+
+    def work() -> None:
+        try:
+            _post_sse(
+                url,
+                payload,
+                headers,
+                timeout,
+                lambda chunk: loop.call_soon_threadsafe(queue.put_nowait, chunk),
+            )
+        except Exception as exc:
+            loop.call_soon_threadsafe(queue.put_nowait, exc)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    worker = loop.run_in_executor(None, work)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        await asyncio.shield(worker)
+
+
+def _request(
+    method: str,
+    url: str,
+    headers: Dict[str, str],
+    body: Optional[bytes],
+    timeout: float,
+) -> Dict[str, Any]:
+    request = urllib.request.Request(url, data=body, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, reason, data = response.status, response.reason, response.read()
+    except urllib.error.HTTPError as exc:
+        status, reason, data = exc.code, exc.reason, exc.read()
+    return {
+        "status": status,
+        "statusText": reason,
+        "body": data.decode("utf-8", "replace"),
+    }
+
+
+def build_api_url(base_url: str, args: Dict[str, Any]) -> str:
+    """Resolve ``api_request`` tool arguments to a URL on ``base_url``.
+
+    Applies the same checks as ``executeApiRequest`` in ``static/core.js``:
+    the path must be relative and must not contain ``..`` after path
+    parameters are substituted. Raises ``ValueError`` otherwise.
+    """
+    path = urllib.parse.unquote(str(args.get("path") or ""))
+    if not path.startswith("/"):
+        raise ValueError("Tool call path must be a relative URL starting with /")
+    for key, value in (args.get("path_params") or {}).items():
+        path = path.replace("{" + key + "}", urllib.parse.quote(str(value), safe=""))
+    if ".." in path:
+        raise ValueError('Tool call path must not contain ".."')
+    query = args.get("query_params") or {}
+    if query:
+        path += ("&" if "?" in path else "?") + urllib.parse.urlencode(
+            {k: str(v) for k, v in query.items()}, quote_via=urllib.parse.quote
+        )
+    return base_url.rstrip("/") + path
+
+
+async def execute_tool_call(config: RunnerConfig, tool_call: Dict[str, Any]) -> str:
+    """Run one ``api_request`` tool call and format its result for the model."""
+    try:
+        args = json.loads(tool_call["function"].get("arguments") or "{}") or {}
+    except ValueError:
+        args = {}
+    base_url = config.api_base_url or schema_base_url(config.schema)
+    if not base_url:
+        return "Error: No API base URL (pass --api-base-url)"
+    try:
+        url = build_api_url(base_url, args)
+    except ValueError as exc:
+        return f"Error: {exc}"
+
+    method = str(args.get("method") or "GET").upper()
+    headers = {}
+    if config.api_token:
+        headers["Authorization"] = f"Bearer {config.api_token}"
+    body = None
+    if method in ("POST", "PUT", "PATCH") and args.get("body") is not None:
+        headers["Content-Type"] = "application/json"
+        body = json.dumps(args["body"]).encode("utf-8")
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(
+            None, _request, method, url, headers, body, config.timeout
+        )
+    except (OSError, ValueError, http.client.HTTPException) as exc:
+        return f"Error: {exc}"
+    return (
+        f"Status: {result['status']} {result['statusText']}\n\n"
+        + condense_tool_response(result["body"])
+    )
+
+
+# ── Workflow execution ──────────────────────────────────────────────────────
+
+
+def _system_prompt(
+    config: RunnerConfig, query: str, index: Optional[OperationIndex]
+) -> str:
+    prompt = config.system_prompt
+    if "{openapi_context}" in prompt and config.schema is not None:
+        context = build_openapi_context(config.schema, query, index)
+        prompt = prompt.replace("{openapi_context}", "\n\n" + context + "\n")
+    if config.tools:
+        prompt = re.sub(r"## Tool Calling Instructions[\s\S]*$", "", prompt).rstrip()
+        prompt += "\n\n" + _TOOL_NOTE
+    return prompt + "\n\n" + _WORKFLOW_NOTE
+
+
+async def run_block(
+    config: RunnerConfig,
+    block: Block,
+    history: List[Dict[str, Any]],
+    index: Optional[OperationIndex],
+    on_delta: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """Run one block and return its output, messages and timing."""
+    user_message = {"role": "user", "content": block.prompt}
+    payload: Dict[str, Any] = {
+        "model": config.model,
+        "messages": [
+            {"role": "system", "content": _system_prompt(config, block.prompt, index)}
+        ]
+        + history
+        + [user_message],
+        "max_tokens": config.max_tokens,
+        "temperature": config.temperature,
+        "stream": True,
+        "stream_options": {"include_usage": True},
+    }
+    if config.tools and config.schema is not None:
+        payload["tools"] = [build_api_request_tool(config.schema)]
+        payload["tool_choice"] = "auto"
+    headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+    if config.api_key:
+        headers["Authorization"] = f"Bearer {config.api_key}"
+
+    content = ""
+    tool_calls: Dict[int, Dict[str, Any]] = {}
+    usage: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    started = time.perf_counter()
+    first_token: Optional[float] = None
+    try:
+        async for chunk in stream_chunks(
+            config.base_url.rstrip("/") + "/chat/completions",
+            payload,
+            headers,
+            config.timeout,
+        ):
+            if chunk.get("error"):
+                err = chunk["error"]
+                error = (
+                    err
+                    if isinstance(err, str)
+                    else err.get("message") or json.dumps(err)
+                )
+                continue
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+            for choice in chunk.get("choices") or []:
+                delta = choice.get("delta") or {}
+                if delta.get("content") or delta.get("tool_calls"):
+                    first_token = first_token or time.perf_counter()
+                if delta.get("content"):
+                    content += delta["content"]
+                    if on_delta:
+                        on_delta(delta["content"])
+                for tc in delta.get("tool_calls") or []:
+                    call = tool_calls.setdefault(
+                        tc.get("index", 0),
+                        {
+                            "id": "",
+                            "type": "function",
+                            "function": {"name": "", "arguments": ""},
+                        },
+                    )
+                    call["id"] = tc.get("id") or call["id"]
+                    function = tc.get("function") or {}
+                    call["function"]["name"] = (
+                        function.get("name") or call["function"]["name"]
+                    )
+                    call["function"]["arguments"] += function.get("arguments") or ""
+    except (OSError, RuntimeError, ValueError, http.client.HTTPException) as exc:
+        error = str(exc)
+    finished = time.perf_counter()
+
+    messages: List[Dict[str, Any]] = []
+    output = content
+    if error is not None:
+        output = f"Error: {error}"
+    elif tool_calls:
+        calls = [tool_calls[k] for k in sorted(tool_calls)]
+        messages.append({"role": "assistant", "content": None, "tool_calls": calls})
+        # Reads run concurrently; a batch with any write runs in order
+        if all(_is_safe(call) for call in calls):
+            semaphore = asyncio.Semaphore(max(1, config.max_parallel_requests))
+
+            async def bounded(call: Dict[str, Any]) -> str:
+                async with semaphore:
+                    return await execute_tool_call(config, call)
+
+            results = await asyncio.gather(*(bounded(call) for call in calls))
+        else:
+            results = [await execute_tool_call(config, call) for call in calls]
+        for call, result in zip(calls, results):
+            messages.append(
+                {"role": "tool", "tool_call_id": call["id"], "content": result}
+            )
+            output += (
+                f"\n\n[Tool Call]\n{_describe_call(config, call)}"
+                f"\n\n[Tool Result]\n{result}"
+            )
+
+    tokens = (usage or {}).get("completion_tokens")
+    generating = finished - (first_token or finished)
+    if tokens is None:
+        tokens = estimate_tokens(content) + sum(
+            estimate_tokens(call["function"]["arguments"])
+            for call in tool_calls.values()
+        )
+    return {
+        "output": output or "(no output)",
+        "error": error,
+        "messages": [user_message]
+        + messages
+        + [{"role": "assistant", "content": output}],
+        "latency_ms": round((finished - started) * 1000, 1),
+        "ttft_ms": round((first_token - started) * 1000, 1) if first_token else None,
+        "completion_tokens": tokens,
+        "tokens_estimated": usage is None or "completion_tokens" not in usage,
+        "tokens_per_sec": round(tokens / generating, 1) if generating > 0 else None,
+        "tool_calls": len(tool_calls),
+    }
+
+
+def _is_safe(call: Dict[str, Any]) -> bool:
+    try:
+        args = json.loads(call["function"].get("arguments") or "{}") or {}
+    except ValueError:
+        args = {}
+    return str(args.get("method") or "GET").upper() in SAFE_TOOL_METHODS
+
+
+def _describe_call(config: RunnerConfig, call: Dict[str, Any]) -> str:
+    try:
+        args = json.loads(call["function"].get("arguments") or "{}") or {}
+    except ValueError:
+        args = {}
+    method = str(args.get("method") or "GET").upper()
+    base_url = config.api_base_url or schema_base_url(config.schema) or ""
+    try:
+        line = f"{method} {build_api_url(base_url, args)}"
+    except ValueError:
+        line = f"{method} {args.get('path') or ''}"
+    if args.get("body") is not None and method in ("POST", "PUT", "PATCH"):
+        line += "\n" + json.dumps(args["body"], indent=2)
+    return line
+
+
+async def run_workflow(
+    config: RunnerConfig,
+    blocks: List[Block],
+    run: int,
+    limit: asyncio.Semaphore,
+    emit: Callable[[Dict[str, Any]], None],
+    index: Optional[OperationIndex] = None,
+) -> Dict[str, Any]:
+    """Run all blocks of one workflow, each once its dependencies are done.
+
+    ``limit`` bounds the number of LLM streams in flight across every run.
+    Emits a ``block`` event per finished block and returns a ``run`` event.
+    """
+    histories: List[List[Dict[str, Any]]] = [[] for _ in blocks]
+    tasks: List["asyncio.Task[Dict[str, Any]]"] = []
+    started = time.perf_counter()
+
+    async def run_one(block: Block) -> Dict[str, Any]:
+        if block.deps:
+            await asyncio.gather(*(tasks[d] for d in block.deps))
+        history = [m for j in upstream(blocks, block.position) for m in histories[j]]
+        on_delta = None
+        if config.stream:
+
+            def on_delta(text: str) -> None:
+                emit(
+                    {
+                        "event": "delta",
+                        "run": run,
+                        "block": block.position + 1,
+                        "content": text,
+                    }
+                )
+
+        async with limit:
+            result = await run_block(config, block, history, index, on_delta)
+        histories[block.position] = result.pop("messages")
+        event = dict(
+            {"event": "block", "run": run, "block": block.position + 1}, **result
+        )
+        emit(event)
+        return event
+
+    for block in blocks:  # dependencies are earlier blocks, so they exist already
+        tasks.append(asyncio.ensure_future(run_one(block)))
+    results = await asyncio.gather(*tasks)
+    return {
+        "event": "run",
+        "run": run,
+        "blocks": len(blocks),
+        "errors": sum(1 for r in results if r["error"]),
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def run_batch(
+    config: RunnerConfig,
+    workflows: List[List[Block]],
+    emit: Callable[[Dict[str, Any]], None],
+) -> Dict[str, Any]:
+    """Run every workflow and return a ``summary`` event with aggregate timing."""
+    loop = asyncio.get_running_loop()
+    # One thread per in-flight LLM stream plus headroom for tool calls
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, config.concurrency)
+        * (1 + max(1, config.max_parallel_requests)),
+        thread_name_prefix="docbuddy-run",
+    )
+    # asyncio.run() shuts the default executor down (waiting for its threads)
+    # before it returns, so no executor work outlives the run
+    loop.set_default_executor(executor)
+    limit = asyncio.Semaphore(max(1, config.concurrency))
+    index = OperationIndex(config.schema) if config.schema is not None else None
+    block_events: List[Dict[str, Any]] = []
+
+    def collect(event: Dict[str, Any]) -> None:
+        if event["event"] == "block":
+            block_events.append(event)
+        emit(event)
+
+    started = time.perf_counter()
+
+    async def run_and_emit(run: int, blocks: List[Block]) -> Dict[str, Any]:
+        event = await run_workflow(config, blocks, run, limit, collect, index)
+        emit(event)
+        return event
+
+    runs = await asyncio.gather(
+        *(run_and_emit(i + 1, blocks) for i, blocks in enumerate(workflows))
+    )
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(e["latency_ms"] for e in block_events)
+    rates = [e["tokens_per_sec"] for e in block_events if e["tokens_per_sec"]]
+    tokens = sum(e["completion_tokens"] for e in block_events)
+    return {
+        "event": "summary",
+        "runs": len(runs),
+        "blocks": len(block_events),
+        "errors": sum(r["errors"] for r in runs),
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "block_latency_p50_ms": latencies[len(latencies) // 2] if latencies else None,
+        "block_latency_p95_ms": (
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            if latencies
+            else None
+        ),
+        "completion_tokens": tokens,
+        "tokens_per_sec": round(tokens / elapsed, 1) if elapsed > 0 else None,
+        "mean_block_tokens_per_sec": round(sum(rates) / len(rates), 1)
+        if rates
+        else None,
+    }
+
+
+# ── Output ──────────────────────────────────────────────────────────────────
+
+
+def _text_writer(out: IO[str]) -> Callable[[Dict[str, Any]], None]:
+    # Blocks stream concurrently, so streamed text is written a whole line at a
+    # time with a "[run.block]" label: (run, block) -> [streamed, partial line]
+    streams: Dict[Tuple[int, int], List[str]] = {}
+
+    def write(event: Dict[str, Any]) -> None:
+        kind = event["event"]
+        if kind == "delta":
+            key = (event["run"], event["block"])
+            stream = streams.setdefault(key, ["", ""])
+            stream[0] += event["content"]
+            *lines, stream[1] = (stream[1] + event["content"]).split("\n")
+            for line in lines:
+                out.write(f"[{key[0]}.{key[1]}] {line}\n")
+        elif kind == "block":
+            key = (event["run"], event["block"])
+            streamed, partial = streams.pop(key, ("", ""))
+            if partial:
+                out.write(f"[{key[0]}.{key[1]}] {partial}\n")
+            output = event["output"]
+            if streamed and output.startswith(streamed):
+                # Only what was not streamed: tool calls and their results
+                output = output[len(streamed) :].lstrip("\n")
+            rate = event["tokens_per_sec"]
+            out.write(
+                f"\n── run {event['run']} · block {event['block']} · "
+                f"{event['latency_ms'] / 1000:.2f} s · "
+                f"{event['completion_tokens']} tokens"
+                + (f" · {rate} tok/s" if rate else "")
+                + " ──\n"
+            )
+            if output:
+                out.write(output + "\n")
+        elif kind == "summary":
+            out.write(
+                f"\n{event['runs']} run(s), {event['blocks']} block(s), "
+                f"{event['errors']} error(s) in {event['elapsed_ms'] / 1000:.2f} s; "
+                f"block latency p50 {event['block_latency_p50_ms']} ms, "
+                f"p95 {event['block_latency_p95_ms']} ms; "
+                f"{event['tokens_per_sec']} tok/s overall\n"
+            )
+        out.flush()
+
+    return write
+
+
+def _jsonl_writer(out: IO[str]) -> Callable[[Dict[str, Any]], None]:
+    def write(event: Dict[str, Any]) -> None:
+        out.write(json.dumps(event, ensure_ascii=False) + "\n")
+        out.flush()
+
+    return write
+
+
+def _read_json(source: str) -> Any:
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=60) as response:
+            return json.loads(response.read())
+    return json.loads(Path(source).read_text(encoding="utf-8"))
+
+
+def main(args: Any) -> int:
+    """Entry point for ``docbuddy run`` (``args`` from the CLI parser)."""
+    try:
+        workflows = [load_workflow(_read_json(path)) for path in args.workflow]
+        schema = _read_json(args.openapi) if args.openapi else None
+        system_prompt = load_preset(args.preset)
+    except (OSError, ValueError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    config = RunnerConfig(
+        base_url=args.base_url,
+        api_key=args.api_key,
+        model=args.model,
+        max_tokens=args.max_tokens,
+        temperature=args.temperature,
+        system_prompt=system_prompt,
+        schema=schema,
+        tools=args.tools,
+        api_base_url=args.api_base_url,
+        api_token=args.api_token,
+        concurrency=args.concurrency,
+        max_parallel_requests=args.max_parallel_requests,
+        timeout=args.timeout,
+        stream=args.stream,
+    )
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        emit = (_jsonl_writer if args.format == "jsonl" else _text_writer)(out)
+        summary = asyncio.run(run_batch(config, workflows * args.repeat, emit))
+        emit(summary)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if summary["errors"] else 0
@@ -9,12 +9,12 @@
   // ── Constants ─────────────────────────────────────────────────────────────
   var MAX_TOOL_CALL_RETRIES = 3;
   var MAX_AGENT_ITERATIONS = 5;
-  var MAX_TOOL_RESPONSE_LENGTH = 4000;
 
   // ── Agent panel component ─────────────────────────────────────────────────
   function AgentPanelFactory(system) {
     var React = system.React;
     var CodeBlock = DB.createCodeBlock(React);
+    var VirtualList = DB.createVirtualList(React);
 
     return class AgentPanel extends React.Component {
       constructor(props) {
@@ -25,8 +25,10 @@
           isTyping: false,
           isProcessingToolCall: false,
           agentHistory: DB.loadAgentHistory(),
+          historyHasMore: false,
           copiedId: null,
           pendingToolCall: null,
+          pendingToolBatch: null,
           pendingToolCallQueue: [],
           editMethod: 'GET',
           editPath: '',
@@ -50,12 +52,15 @@
         this.renderTypingIndicator = this.renderTypingIndicator.bind(this);
         this.formatMessageContent = this.formatMessageContent.bind(this);
         this.renderMessage = this.renderMessage.bind(this);
+        this.loadHistoryPage = this.loadHistoryPage.bind(this);
         this.handleExecuteToolCall = this.handleExecuteToolCall.bind(this);
         this.sendToolResult = this.sendToolResult.bind(this);
         this.renderToolCallPanel = this.renderToolCallPanel.bind(this);
         this.toggleMode = this.toggleMode.bind(this);
         this._copyTimeoutId = null;
-        this._executedToolCallMsg = null;
+        this._promptTrimState = {};
+        // GET/HEAD tool responses reused within this conversation
+        this._toolCache = DB.createToolResponseCache();
         this._debouncedSaveAgentHistory = DB.debounce(function(history) {
           DB.saveAgentHistory(history);
         }, 500);
@@ -65,9 +70,11 @@
 
       componentDidMount() {
         this.fetchOpenApiSchema();
+        this.loadHistoryPage(false);
       }
 
       componentWillUnmount() {
+        this._unmounted = true;
         if (this._currentCancelToken) {
           this._currentCancelToken.abort();
           this._currentCancelToken = null;
@@ -79,14 +86,25 @@
         window.dispatchEvent(new CustomEvent('docbuddy-agent-streaming', { detail: { streaming: false } }));
       }
 
-      fetchOpenApiSchema() {
-        DB.ensureOpenapiSchemaCached(function(schema) {
-          if (schema) {
-            DB.dispatchAction(system, 'setOpenApiSchema', schema);
-          }
+      loadHistoryPage(older) {
+        var self = this;
+        DB.agentHistoryStore.loadPage({ older: older }).then(function(page) {
+          if (self._unmounted) return;
+          self.setState(function(prev) {
+            return {
+              agentHistory: older
+                ? page.messages.concat(prev.agentHistory || [])
+                : DB.mergeLoadedHistory(page.messages, prev.agentHistory),
+              historyHasMore: page.hasMore
+            };
+          });
         });
       }
 
+      fetchOpenApiSchema() {
+        DB.ensureOpenapiSchemaCached();
+      }
+
       toggleMode() {
         this.setState(function(prev) {
           return { mode: prev.mode === 'plan' ? 'act' : 'plan' };
@@ -157,12 +175,15 @@
         }
 
         if (self._pendingToolCallMsg) {
+          var executedId = s.pendingToolCall ? s.pendingToolCall.id : null;
           var toolMsg = Object.assign({}, self._pendingToolCallMsg, {
             _displayContent: 'Tool call: api_request(' + executedArgs.method + ' ' + executedArgs.path + ')',
             _toolArgs: executedArgs
           });
           if (toolMsg.tool_calls && toolMsg.tool_calls.length > 0) {
+            // Only the call being executed was edited; the rest keep their arguments
             toolMsg.tool_calls = toolMsg.tool_calls.map(function(tc) {
+              if (executedId && tc.id !== executedId) return tc;
               return Object.assign({}, tc, {
                 function: Object.assign({}, tc.function, {
                   arguments: JSON.stringify(executedArgs)
@@ -171,71 +192,10 @@
             });
           }
           self.addMessage(toolMsg);
-          self._executedToolCallMsg = toolMsg;
           self._pendingToolCallMsg = null;
         }
 
-        var url = s.editPath;
-
-        try { url = decodeURIComponent(url); } catch (e) { console.warn('Failed to decode URL component:', e); }
-        if (!url || !/^\//.test(url)) {
-          console.error('[Agent Tool Call] Rejected invalid path:', url);
-          var rejectObj = { status: 0, statusText: 'Blocked', body: 'Tool call path must be a relative URL starting with /' };
-          self.setState({ toolCallResponse: rejectObj });
-          self.sendToolResult(rejectObj);
-          return;
-        }
-
-        try {
-          var pathParams = JSON.parse(s.editPathParams || '{}');
-          Object.keys(pathParams).forEach(function(key) {
-            url = url.replace('{' + key + '}', encodeURIComponent(pathParams[key]));
-          });
-          if (/\.\./.test(url)) {
-            console.error('[Agent Tool Call] Rejected path with ".." after param substitution:', url);
-            var rejectObj = { status: 0, statusText: 'Blocked', body: 'Tool call path must not contain ".."' };
-            self.setState({ toolCallResponse: rejectObj });
-            self.sendToolResult(rejectObj);
-            return;
-          }
-        } catch (e) { console.warn('Failed to apply path params:', e); }
-
-        try {
-          var queryParams = JSON.parse(s.editQueryParams || '{}');
-          var queryKeys = Object.keys(queryParams);
-          if (queryKeys.length > 0) {
-            var qs = queryKeys.map(function(k) {
-              return encodeURIComponent(k) + '=' + encodeURIComponent(queryParams[k]);
-            }).join('&');
-            url += (url.indexOf('?') >= 0 ? '&' : '?') + qs;
-          }
-        } catch (e) { console.warn('Failed to parse query params:', e); }
-
-        // Use the new resolveApiBaseUrl function which handles:
-        // 1. User-configured API Base URL (highest priority)
-        // 2. OpenAPI schema servers array
-        // 3. Auto-detect from loaded schema URL
-        // 4. Fallback to page origin (for local development)
-        var apiBaseUrl = DB.resolveApiBaseUrl(DB._cachedOpenapiSchema);
-        url = apiBaseUrl + url;
-
-        var fetchHeaders = {};
-        var toolSettings = DB.loadToolSettings();
-        var toolApiKey = toolSettings.apiKey && typeof toolSettings.apiKey === 'string' ? toolSettings.apiKey.trim() : '';
-        if (toolApiKey) {
-          fetchHeaders['Authorization'] = 'Bearer ' + toolApiKey;
-        }
-
         var hasBody = (s.editMethod === 'POST' || s.editMethod === 'PUT' || s.editMethod === 'PATCH') && s.editBody;
-        if (hasBody) {
-          fetchHeaders['Content-Type'] = 'application/json';
-        }
-
-        var fetchOpts = {
-          method: s.editMethod,
-          headers: fetchHeaders,
-        };
-
         if (hasBody) {
           try {
             JSON.parse(s.editBody);
@@ -245,29 +205,118 @@
             self.sendToolResult(parseErrObj);
             return;
           }
-          fetchOpts.body = s.editBody;
+        } else {
+          delete executedArgs.body;
         }
 
         self.setState({ toolCallResponse: { status: 'loading', body: '' } });
         window.dispatchEvent(new CustomEvent('docbuddy-agent-streaming', { detail: { streaming: true } }));
 
-        fetch(url, fetchOpts)
-          .then(function(res) {
-            return res.text().then(function(text) {
-              var responseObj = { status: res.status, statusText: res.statusText, body: text };
-              self.setState({ toolCallResponse: responseObj });
-              self.sendToolResult(responseObj);
-            });
-          })
-          .catch(function(err) {
-            var responseObj = { status: 0, statusText: 'Network Error', body: err.message };
-            console.error('[Agent Tool Call Error]', err.message);
-            self.setState({ toolCallResponse: responseObj });
-            self.sendToolResult(responseObj);
+        DB.executeApiRequest(executedArgs, null, self._toolCache).then(function(responseObj) {
+          self.setState({ toolCallResponse: responseObj });
+          self.sendToolResult(responseObj);
+        });
+      }
+
+      // Shows the next tool call of ``queue`` for review or, when
+      // auto-executing in Act mode, runs it. Consecutive GET/HEAD calls at the
+      // head of the queue are executed together (see _executeToolCallBatch).
+      _startToolCalls(queue, extraState) {
+        var self = this;
+        var toolSettings = DB.loadToolSettings();
+        var auto = toolSettings.autoExecute && self.state.mode === 'act';
+        var safeCount = 0;
+        while (safeCount < queue.length && DB.isSafeToolCall(queue[safeCount])) safeCount++;
+
+        if (auto && safeCount > 1) {
+          var batch = queue.slice(0, safeCount);
+          self.setState(Object.assign({
+            pendingToolCall: batch[0],
+            pendingToolBatch: batch,
+            pendingToolCallQueue: queue.slice(safeCount),
+            toolCallResponse: { status: 'loading', body: '' },
+          }, extraState), function() {
+            self._executeToolCallBatch(batch, toolSettings);
+          });
+          return;
+        }
+
+        var args = DB.toolCallArgs(queue[0]);
+        self.setState(Object.assign({
+          pendingToolCall: queue[0],
+          pendingToolBatch: null,
+          pendingToolCallQueue: queue.slice(1),
+          editMethod: args.method || 'GET',
+          editPath: args.path || '',
+          editQueryParams: JSON.stringify(args.query_params || {}, null, 2),
+          editPathParams: JSON.stringify(args.path_params || {}, null, 2),
+          editBody: JSON.stringify(args.body || {}, null, 2),
+          toolCallResponse: null,
+        }, extraState), function() {
+          if (auto) self.handleExecuteToolCall();
+        });
+      }
+
+      // Runs independent GET/HEAD tool calls concurrently (bounded by the
+      // "Parallel Requests" setting) and records the results in call order,
+      // so a multi-call step takes about as long as its slowest request.
+      _executeToolCallBatch(batch, toolSettings) {
+        var self = this;
+
+        if (self._pendingToolCallMsg) {
+          var toolMsg = Object.assign({}, self._pendingToolCallMsg, {
+            _displayContent: 'Tool calls: ' + batch.map(function(tc) {
+              var args = DB.toolCallArgs(tc);
+              return 'api_request(' + (args.method || 'GET') + ' ' + (args.path || '') + ')';
+            }).join(', ')
           });
+          self.addMessage(toolMsg);
+          self._pendingToolCallMsg = null;
+        }
+
+        window.dispatchEvent(new CustomEvent('docbuddy-agent-streaming', { detail: { streaming: true } }));
+        var cancelToken = new AbortController();
+        self._currentCancelToken = cancelToken;
+
+        DB.mapWithConcurrency(batch, DB.getMaxParallelRequests(toolSettings), function(tc) {
+          return DB.executeApiRequest(DB.toolCallArgs(tc), cancelToken.signal, self._toolCache);
+        }).then(function(responses) {
+          if (self._unmounted) return;
+          if (self._currentCancelToken === cancelToken) self._currentCancelToken = null;
+          if (cancelToken.signal.aborted) {
+            // The assistant tool_calls message is already in history; every
+            // call in it needs a result or the next request is rejected
+            batch.concat(self.state.pendingToolCallQueue || []).forEach(function(tc) {
+              self.addMessage({
+                role: 'tool',
+                content: 'Aborted by user',
+                tool_call_id: tc.id,
+                messageId: DB.generateMessageId(),
+                _displayContent: 'Tool result: Aborted by user'
+              });
+            });
+            self.setState({ pendingToolCall: null, pendingToolBatch: null, pendingToolCallQueue: [], toolCallResponse: null });
+            window.dispatchEvent(new CustomEvent('docbuddy-agent-streaming', { detail: { streaming: false } }));
+            return;
+          }
+          self.setState({ toolCallResponse: responses[responses.length - 1] });
+          self._recordToolResults(batch.map(function(tc, i) {
+            return { id: tc.id, response: responses[i] };
+          }));
+        });
       }
 
       sendToolResult(responseObj) {
+        var s = this.state;
+        this._recordToolResults([{
+          id: s.pendingToolCall ? s.pendingToolCall.id : 'call_unknown',
+          response: responseObj
+        }]);
+      }
+
+      // Adds one tool result message per executed call (in call order), then
+      // moves on to the rest of the queue or asks the model for its next step.
+      _recordToolResults(results) {
         var self = this;
         var s = this.state;
 
@@ -278,12 +327,17 @@
             content: 'Maximum iterations (' + MAX_AGENT_ITERATIONS + ') reached. Review the progress above and use **Continue** to keep going, or send a new message.',
             messageId: DB.generateMessageId()
           });
-          self.setState({ pendingToolCall: null, pendingToolCallQueue: [], isTyping: false, maxIterationsReached: true });
+          self.setState({ pendingToolCall: null, pendingToolBatch: null, pendingToolCallQueue: [], isTyping: false, maxIterationsReached: true });
           window.dispatchEvent(new CustomEvent('docbuddy-agent-streaming', { detail: { streaming: false } }));
           return;
         }
 
+        var failed = results.filter(function(r) {
+          return r.response.status < 200 || r.response.status >= 300;
+        });
+
         if (s.toolRetryCount >= MAX_TOOL_CALL_RETRIES) {
+          var responseObj = (failed.length ? failed[failed.length - 1] : results[results.length - 1]).response;
           var lastError = 'Status ' + responseObj.status + ' ' + (responseObj.statusText || '');
           var lastBody = (responseObj.body || '').substring(0, 500);
           var errorDetail = lastError + (lastBody ? '\n\n```\n' + lastBody + '\n```' : '');
@@ -293,65 +347,38 @@
             content: 'Max tool call retries (' + MAX_TOOL_CALL_RETRIES + ') reached. Last error: ' + errorDetail + '\n\nPlease try a different approach.',
             messageId: DB.generateMessageId()
           });
-          self.setState({ pendingToolCall: null, pendingToolCallQueue: [], isTyping: false });
+          self.setState({ pendingToolCall: null, pendingToolBatch: null, pendingToolCallQueue: [], isTyping: false });
           window.dispatchEvent(new CustomEvent('docbuddy-agent-streaming', { detail: { streaming: false } }));
           return;
         }
 
-        var toolCallId = s.pendingToolCall ? s.pendingToolCall.id : 'call_unknown';
-        var isError = responseObj.status < 200 || responseObj.status >= 300;
+        var isError = failed.length > 0;
         var remainingQueue = (s.pendingToolCallQueue || []).slice();
 
-        var truncatedBody = (responseObj.body || '').substring(0, MAX_TOOL_RESPONSE_LENGTH);
-        var resultContent = 'Status: ' + responseObj.status + ' ' + (responseObj.statusText || '') + '\n\n' + truncatedBody;
-
-        var toolResultMsg = {
-          role: 'tool',
-          content: resultContent,
-          tool_call_id: toolCallId,
-          messageId: DB.generateMessageId(),
-          _displayContent: 'Tool result: Status ' + responseObj.status
-        };
+        var toolResultMsgs = results.map(function(r) {
+          return {
+            role: 'tool',
+            content: DB.formatToolResult(r.response),
+            tool_call_id: r.id,
+            messageId: DB.generateMessageId(),
+            _displayContent: 'Tool result: Status ' + r.response.status
+          };
+        });
 
-        // Synchronous rejection paths (URL validation, path traversal, JSON parse) call
-        // sendToolResult on the same tick as addMessage(toolMsg), so that setState may not
-        // have flushed yet. Manually ensure the assistant tool_calls message is present in
-        // the snapshot so the OpenAI API tool-calls → tool-result contract is not broken.
-        var currentHistory = (self.state.agentHistory || []).slice();
-        if (self._executedToolCallMsg) {
-          var alreadyPresent = currentHistory.some(function(m) {
-            return m.messageId === self._executedToolCallMsg.messageId;
-          });
-          if (!alreadyPresent) currentHistory.push(self._executedToolCallMsg);
-          self._executedToolCallMsg = null;
-        }
-        currentHistory.push(toolResultMsg);
+        // addMessage queues functional updates, so even when the assistant
+        // tool_calls message was added on this same tick (synchronous
+        // rejection paths) it still precedes its results in history.
+        toolResultMsgs.forEach(function(msg) { self.addMessage(msg); });
 
-        self.addMessage(toolResultMsg);
+        var nextState = {
+          toolRetryCount: isError ? s.toolRetryCount + 1 : 0,
+          iterationCount: s.iterationCount + 1,
+        };
 
         if (remainingQueue.length > 0) {
-          // More tool calls from the same LLM response — advance the queue and execute
-          // the next one. Do NOT re-stream until all tool results have been collected.
-          var nextTc = remainingQueue[0];
-          var nextArgs = {};
-          try { nextArgs = JSON.parse(nextTc.function.arguments || '{}'); } catch (e) {}
-          self.setState({
-            pendingToolCall: nextTc,
-            pendingToolCallQueue: remainingQueue.slice(1),
-            toolRetryCount: isError ? s.toolRetryCount + 1 : 0,
-            iterationCount: s.iterationCount + 1,
-            editMethod: nextArgs.method || 'GET',
-            editPath: nextArgs.path || '',
-            editQueryParams: JSON.stringify(nextArgs.query_params || {}, null, 2),
-            editPathParams: JSON.stringify(nextArgs.path_params || {}, null, 2),
-            editBody: JSON.stringify(nextArgs.body || {}, null, 2),
-            toolCallResponse: null,
-          }, function() {
-            var toolSettings = DB.loadToolSettings();
-            if (self.state.mode === 'act' && toolSettings.autoExecute) {
-              self.handleExecuteToolCall();
-            }
-          });
+          // More tool calls from the same LLM response — execute them before
+          // re-streaming, once all tool results have been collected.
+          self._startToolCalls(remainingQueue, nextState);
           return;
         }
 
@@ -359,12 +386,11 @@
         // Rebuild apiMessages in the setState callback so all preceding addMessage
         // setState calls have been applied and the full tool-result chain is in history.
         var streamMsgId = DB.generateMessageId();
-        self.setState({
+        self.setState(Object.assign({
           pendingToolCall: null,
+          pendingToolBatch: null,
           pendingToolCallQueue: [],
-          toolRetryCount: isError ? s.toolRetryCount + 1 : 0,
-          iterationCount: s.iterationCount + 1,
-        }, function() {
+        }, nextState), function() {
           var fullHistory = (self.state.agentHistory || []).slice();
           var freshApiMessages = DB.buildApiMessages(fullHistory);
           self._streamLLMResponse(freshApiMessages, streamMsgId, DB._cachedOpenapiSchema);
@@ -436,20 +462,25 @@
 
         Promise.all([configReady, schemaReady]).then(function() {
           var schema = DB._cachedOpenapiSchema || fullSchema;
-          self._streamWithPrompt(apiMessages, streamMsgId, schema, settings, toolSettings, selectedPreset);
+          return DB.warmSchemaPrompt(schema, DB.lastUserQuery(apiMessages), toolSettings.enableTools).then(function() {
+            self._streamWithPrompt(apiMessages, streamMsgId, schema, settings, toolSettings, selectedPreset);
+          });
         });
       }
 
       _streamWithPrompt(apiMessages, streamMsgId, fullSchema, settings, toolSettings, selectedPreset) {
         var self = this;
 
-        var systemPrompt = DB.getSystemPromptForPreset(selectedPreset, fullSchema);
+        var layout = DB.getPromptLayout(selectedPreset, fullSchema, '', DB.lastUserQuery(apiMessages));
+        var systemPrompt = layout.system;
 
-        // Append mode context
+        // Mode and iteration change between requests, so they go in a
+        // trailing note rather than the (cacheable) system prompt
+        var modeNote;
         if (self.state.mode === 'plan') {
-          systemPrompt += "\n\nYou are currently in PLAN mode. Focus on understanding the user's request, asking clarification questions if needed, and proposing a clear step-by-step plan. Do NOT execute tools yet — wait for the user to switch to Act mode or approve the plan.";
+          modeNote = "You are currently in PLAN mode. Focus on understanding the user's request, asking clarification questions if needed, and proposing a clear step-by-step plan. Do NOT execute tools yet — wait for the user to switch to Act mode or approve the plan.";
         } else {
-          systemPrompt += "\n\nYou are currently in ACT mode. Execute the plan using available tools. Be autonomous — call tools, process results, and iterate until the task is complete. Signal each step clearly. Current iteration: " + (self.state.iterationCount + 1) + "/" + MAX_AGENT_ITERATIONS + ".";
+          modeNote = "You are currently in ACT mode. Execute the plan using available tools. Be autonomous — call tools, process results, and iterate until the task is complete. Signal each step clearly. Current iteration: " + (self.state.iterationCount + 1) + "/" + MAX_AGENT_ITERATIONS + ".";
         }
 
         if (toolSettings.enableTools) {
@@ -472,7 +503,28 @@
         var currentStreamMessageId = streamMsgId;
         var lastResponseText = "";
 
+        // Tokens arrive much faster than the screen refreshes: apply at most
+        // one history update (and markdown render) per animation frame.
+        var contentBatcher = DB.createFrameBatcher(function(accum) {
+          self.setState(function(prev) {
+            var history = prev.agentHistory || [];
+            if (history.length > 0 && history[history.length - 1].role === 'assistant' &&
+                history[history.length - 1].messageId === currentStreamMessageId) {
+              var updated = history.slice(0, -1).concat([{
+                role: 'assistant',
+                content: accum,
+                messageId: history[history.length - 1].messageId
+              }]);
+              self._debouncedSaveAgentHistory(updated);
+              return { agentHistory: updated };
+            }
+            return {};
+          });
+          scrollToBottom();
+        });
+
         var finalize = function(content, saveContent, isError) {
+          contentBatcher.cancel();
           if (saveContent && content && content.trim() && content !== "*(cancelled)*") {
             var isErrorMsg = isError || (content && content.toLowerCase().startsWith('error:'));
 
@@ -495,10 +547,8 @@
           setTimeout(scrollToBottom, 30);
         };
 
-        var messages = [{ role: 'system', content: systemPrompt }].concat(apiMessages);
-
         var payload = {
-          messages: messages,
+          messages: [],
           model: settings.modelId || "llama3",
           max_tokens: settings.maxTokens != null && settings.maxTokens !== '' ? parseInt(settings.maxTokens) : 4096,
           temperature: settings.temperature != null && settings.temperature !== '' ? parseFloat(settings.temperature) : 0.7,
@@ -506,10 +556,21 @@
         };
 
         if (toolSettings.enableTools && fullSchema && self.state.mode === 'act') {
-          payload.tools = [DB.buildApiRequestTool(fullSchema)];
+          payload.tools = [DB.getApiRequestTool(fullSchema)];
           payload.tool_choice = "auto";
         }
 
+        payload.messages = DB.assemblePrompt({
+          system: systemPrompt,
+          context: layout.context,
+          note: modeNote,
+          history: apiMessages,
+          tools: payload.tools,
+          contextWindow: settings.contextWindow,
+          maxTokens: payload.max_tokens,
+          trimState: self._promptTrimState
+        }).messages;
+
         var fetchHeaders = {
           "Content-Type": "application/json",
         };
@@ -517,7 +578,7 @@
           fetchHeaders["Authorization"] = "Bearer " + settings.apiKey;
         }
 
-        var baseUrl = (settings.baseUrl || "").replace(/\/+$/, "");
+        var baseUrl = DB.getLLMBaseUrl(settings);
 
         DB.streamLLMCompletion(
           baseUrl + "/chat/completions",
@@ -526,27 +587,10 @@
           self._currentCancelToken.signal,
           {
             onContent: function(delta, accum) {
-              self.setState(function(prev) {
-                var history = prev.agentHistory || [];
-                if (history.length > 0 && history[history.length - 1].role === 'assistant' &&
-                    history[history.length - 1].messageId === currentStreamMessageId) {
-                  var updated = history.slice(0, -1).concat([{
-                    role: 'assistant',
-                    content: accum,
-                    messageId: history[history.length - 1].messageId
-                  }]);
-                  self._debouncedSaveAgentHistory(updated);
-                  return { agentHistory: updated };
-                }
-                return {};
-              });
-              scrollToBottom();
+              contentBatcher.push(accum);
             },
             onToolCalls: function(toolCallsList) {
-              var tc = toolCallsList[0];
-              var args = {};
-              try { args = JSON.parse(tc.function.arguments || '{}'); } catch (e) { args = {}; }
-
+              contentBatcher.cancel();
               var assistantToolMsg = {
                 role: 'assistant',
                 content: null,
@@ -565,22 +609,7 @@
                 return { agentHistory: history };
               });
 
-              self.setState({
-                isTyping: false,
-                pendingToolCall: toolCallsList[0],
-                pendingToolCallQueue: toolCallsList.slice(1),
-                editMethod: args.method || 'GET',
-                editPath: args.path || '',
-                editQueryParams: JSON.stringify(args.query_params || {}, null, 2),
-                editPathParams: JSON.stringify(args.path_params || {}, null, 2),
-                editBody: JSON.stringify(args.body || {}, null, 2),
-                toolCallResponse: null,
-              }, function() {
-                var toolSettings = DB.loadToolSettings();
-                if (toolSettings.autoExecute && self.state.mode === 'act') {
-                  self.handleExecuteToolCall();
-                }
-              });
+              self._startToolCalls(toolCallsList, { isTyping: false });
               window.dispatchEvent(new CustomEvent('docbuddy-agent-streaming', { detail: { streaming: false } }));
               self._currentCancelToken = null;
             },
@@ -654,7 +683,9 @@
 
       clearHistory() {
         DB.saveAgentHistory([]);
-        this.setState({ agentHistory: [], iterationCount: 0 });
+        this._promptTrimState = {};
+        this._toolCache.clear();
+        this.setState({ agentHistory: [], historyHasMore: false, iterationCount: 0 });
       }
 
       renderMessage(msg, idx) {
@@ -818,13 +849,13 @@
               { className: "llm-chat-message-content" },
               msg._errorInfo
                 ? this._renderErrorInChat(msg._errorInfo)
-                : this.formatMessageContent(msg.content, isStreamingThisMessage)
+                : this.formatMessageContent(msg.content, isStreamingThisMessage, msg.messageId)
             )
           )
         );
       }
 
-      formatMessageContent(content, isStreaming) {
+      formatMessageContent(content, isStreaming, messageId) {
         if (!content || !content.trim()) {
           if (isStreaming) {
             return React.createElement("span", {
@@ -835,7 +866,7 @@
           return null;
         }
 
-        var html = DB.parseMarkdown(content);
+        var html = DB.renderMarkdownCached(messageId, content);
 
         return React.createElement("div", {
           className: "llm-chat-message-text",
@@ -867,7 +898,12 @@
               }
             },
             React.createElement("span", { style: { animation: "docbuddy-pulse 1.4s infinite ease-in-out", display: "inline-block" } }, "⚡"),
-            React.createElement("span", null, "Executing: " + s.editMethod + " " + s.editPath)
+            React.createElement("span", null, s.pendingToolBatch
+              ? "Executing " + s.pendingToolBatch.length + " requests: " + s.pendingToolBatch.map(function(tc) {
+                  var args = DB.toolCallArgs(tc);
+                  return (args.method || 'GET') + " " + (args.path || '');
+                }).join(", ")
+              : "Executing: " + s.editMethod + " " + s.editPath)
           );
         }
 
@@ -973,17 +1009,25 @@
         return React.createElement(
           "div",
           { className: "llm-chat-container", style: { display: 'flex', flexDirection: 'column', height: '100%', minHeight: '300px' } },
-          React.createElement(
-            "div",
-            { id: "llm-agent-messages", style: { flex: 1, overflowY: 'auto', padding: '12px', display: 'flex', flexDirection: 'column', gap: '12px', scrollBehavior: 'smooth' } },
-            agentHistory.length === 0
-              ? React.createElement(
-                  "div",
-                  { style: { textAlign: 'center', color: 'var(--theme-text-secondary)', padding: '40px 20px', fontSize: '20px', whiteSpace: 'pre-line' } },
-                  "🤖 Agent Mode\n\nDescribe a task and the agent will help you accomplish it.\n\n1. Start in Plan mode to clarify and plan\n2. Switch to Act mode to execute with tools\n\nExamples:\n• List all invoices and summarize the totals\n• Create a test invoice and verify it was stored\n• Analyze the API endpoints and their capabilities"
-                )
-              : agentHistory.map(this.renderMessage)
-            ),
+          React.createElement(VirtualList, {
+            id: "llm-agent-messages",
+            style: { flex: 1, overflowY: 'auto', padding: '12px', scrollBehavior: 'smooth' },
+            items: agentHistory,
+            gap: 12,
+            getKey: function(msg, idx) { return msg.messageId || msg.timestamp || 'msg-' + idx; },
+            renderItem: this.renderMessage,
+            header: this.state.historyHasMore
+              ? React.createElement("button", {
+                  onClick: function() { self.loadHistoryPage(true); },
+                  style: { display: 'block', margin: '0 auto 12px', background: 'none', border: '1px solid var(--theme-border-color)', borderRadius: '4px', color: 'var(--theme-text-secondary)', padding: '4px 12px', cursor: 'pointer', fontSize: '12px' }
+                }, "Load earlier messages")
+              : null,
+            empty: React.createElement(
+              "div",
+              { style: { textAlign: 'center', color: 'var(--theme-text-secondary)', padding: '40px 20px', fontSize: '20px', whiteSpace: 'pre-line' } },
+              "🤖 Agent Mode\n\nDescribe a task and the agent will help you accomplish it.\n\n1. Start in Plan mode to clarify and plan\n2. Switch to Act mode to execute with tools\n\nExamples:\n• List all invoices and summarize the totals\n• Create a test invoice and verify it was stored\n• Analyze the API endpoints and their capabilities"
+            )
+          }),
           this.state.isTyping
             ? React.createElement(
                 "div",
@@ -10,6 +10,7 @@
   function ChatPanelFactory(system) {
     var React = system.React;
     var CodeBlock = DB.createCodeBlock(React);
+    var VirtualList = DB.createVirtualList(React);
 
     return class ChatPanel extends React.Component {
       constructor(props) {
@@ -19,6 +20,7 @@
           isTyping: false,
           isProcessingToolCall: false,
           chatHistory: DB.loadChatHistory(),
+          historyHasMore: false,
           copiedId: null,
           pendingToolCall: null,
           editMethod: 'GET',
@@ -40,10 +42,14 @@
         this.renderTypingIndicator = this.renderTypingIndicator.bind(this);
         this.formatMessageContent = this.formatMessageContent.bind(this);
         this.renderMessage = this.renderMessage.bind(this);
+        this.loadHistoryPage = this.loadHistoryPage.bind(this);
         this.handleExecuteToolCall = this.handleExecuteToolCall.bind(this);
         this.sendToolResult = this.sendToolResult.bind(this);
         this.renderToolCallPanel = this.renderToolCallPanel.bind(this);
         this._copyTimeoutId = null;
+        this._promptTrimState = {};
+        // GET/HEAD tool responses reused within this conversation
+        this._toolCache = DB.createToolResponseCache();
         this._debouncedSaveChatHistory = DB.debounce(function(history) {
           DB.saveChatHistory(history);
         }, 500);
@@ -53,9 +59,11 @@
 
       componentDidMount() {
         this.fetchOpenApiSchema();
+        this.loadHistoryPage(false);
       }
 
       componentWillUnmount() {
+        this._unmounted = true;
         if (this._currentCancelToken) {
           this._currentCancelToken.abort();
           this._currentCancelToken = null;
@@ -66,15 +74,25 @@
         }
       }
 
-      fetchOpenApiSchema() {
+      loadHistoryPage(older) {
         var self = this;
-        DB.ensureOpenapiSchemaCached(function(schema) {
-          if (schema) {
-            DB.dispatchAction(system, 'setOpenApiSchema', schema);
-          }
+        DB.chatHistoryStore.loadPage({ older: older }).then(function(page) {
+          if (self._unmounted) return;
+          self.setState(function(prev) {
+            return {
+              chatHistory: older
+                ? page.messages.concat(prev.chatHistory || [])
+                : DB.mergeLoadedHistory(page.messages, prev.chatHistory),
+              historyHasMore: page.hasMore
+            };
+          });
         });
       }
 
+      fetchOpenApiSchema() {
+        DB.ensureOpenapiSchemaCached();
+      }
+
       addMessage(msg) {
         this.setState(function (prev) {
           var history = prev.chatHistory || [];
@@ -214,13 +232,10 @@
 
         self.setState({ toolCallResponse: { status: 'loading', body: '' } });
 
-        fetch(url, fetchOpts)
-          .then(function(res) {
-            return res.text().then(function(text) {
-              var responseObj = { status: res.status, statusText: res.statusText, body: text };
-              self.setState({ toolCallResponse: responseObj });
-              self.sendToolResult(responseObj);
-            });
+        self._toolCache.request(url, fetchOpts)
+          .then(function(responseObj) {
+            self.setState({ toolCallResponse: responseObj });
+            self.sendToolResult(responseObj);
           })
           .catch(function(err) {
             var responseObj = { status: 0, statusText: 'Network Error', body: err.message };
@@ -250,8 +265,7 @@
 
         var toolCallId = s.pendingToolCall ? s.pendingToolCall.id : 'call_unknown';
 
-        var truncatedBody = (responseObj.body || '').substring(0, 4000);
-        var resultContent = 'Status: ' + responseObj.status + ' ' + (responseObj.statusText || '') + '\n\n' + truncatedBody;
+        var resultContent = DB.formatToolResult(responseObj);
 
         var toolResultMsg = {
           role: 'tool',
@@ -415,14 +429,17 @@
         Promise.all([configReady, schemaReady]).then(function() {
           // Re-read schema from cache (it may have loaded after handleSend captured null)
           var schema = DB._cachedOpenapiSchema || fullSchema;
-          self._streamWithPrompt(apiMessages, streamMsgId, schema, settings, toolSettings, selectedPreset, customPromptText);
+          return DB.warmSchemaPrompt(schema, DB.lastUserQuery(apiMessages), toolSettings.enableTools).then(function() {
+            self._streamWithPrompt(apiMessages, streamMsgId, schema, settings, toolSettings, selectedPreset, customPromptText);
+          });
         });
       }
 
       _streamWithPrompt(apiMessages, streamMsgId, fullSchema, settings, toolSettings, selectedPreset, customPromptText) {
         var self = this;
 
-        var systemPrompt = DB.getSystemPromptForPreset(selectedPreset, fullSchema, customPromptText);
+        var layout = DB.getPromptLayout(selectedPreset, fullSchema, customPromptText, DB.lastUserQuery(apiMessages));
+        var systemPrompt = layout.system;
 
         if (toolSettings.enableTools) {
           systemPrompt = systemPrompt.replace(/## Tool Calling Instructions[\s\S]*$/, '').trimEnd();
@@ -445,7 +462,28 @@
 
         var lastResponseText = "";
 
+        // Tokens arrive much faster than the screen refreshes: apply at most
+        // one history update (and markdown render) per animation frame.
+        var contentBatcher = DB.createFrameBatcher(function(accum) {
+          self.setState(function(prev) {
+            var history = prev.chatHistory || [];
+            if (history.length > 0 && history[history.length - 1].role === 'assistant' &&
+                history[history.length - 1].messageId === currentStreamMessageId) {
+              var updated = history.slice(0, -1).concat([{
+                role: 'assistant',
+                content: accum,
+                messageId: history[history.length - 1].messageId
+              }]);
+              self._debouncedSaveChatHistory(updated);
+              return { chatHistory: updated };
+            }
+            return {};
+          });
+          scrollToBottom();
+        });
+
         var finalize = function(content, saveContent, isError) {
+          contentBatcher.cancel();
           if (saveContent && content && content.trim() && content !== "*(cancelled)*") {
             var isErrorMsg = isError || (content && content.toLowerCase().startsWith('error:'));
 
@@ -468,10 +506,8 @@
           setTimeout(scrollToBottom, 30);
         };
 
-        var messages = [{ role: 'system', content: systemPrompt }].concat(apiMessages);
-
         var payload = {
-          messages: messages,
+          messages: [],
           model: settings.modelId || "llama3",
           max_tokens: settings.maxTokens != null && settings.maxTokens !== '' ? parseInt(settings.maxTokens) : 4096,
           temperature: settings.temperature != null && settings.temperature !== '' ? parseFloat(settings.temperature) : 0.7,
@@ -479,10 +515,20 @@
         };
 
         if (toolSettings.enableTools && fullSchema) {
-          payload.tools = [DB.buildApiRequestTool(fullSchema)];
+          payload.tools = [DB.getApiRequestTool(fullSchema)];
           payload.tool_choice = "auto";
         }
 
+        payload.messages = DB.assemblePrompt({
+          system: systemPrompt,
+          context: layout.context,
+          history: apiMessages,
+          tools: payload.tools,
+          contextWindow: settings.contextWindow,
+          maxTokens: payload.max_tokens,
+          trimState: self._promptTrimState
+        }).messages;
+
         var fetchHeaders = {
           "Content-Type": "application/json",
         };
@@ -490,7 +536,7 @@
           fetchHeaders["Authorization"] = "Bearer " + settings.apiKey;
         }
 
-        var baseUrl = (settings.baseUrl || "").replace(/\/+$/, "");
+        var baseUrl = DB.getLLMBaseUrl(settings);
 
         DB.streamLLMCompletion(
           baseUrl + "/chat/completions",
@@ -499,23 +545,10 @@
           self._currentCancelToken.signal,
           {
             onContent: function(delta, accum) {
-              self.setState(function(prev) {
-                var history = prev.chatHistory || [];
-                if (history.length > 0 && history[history.length - 1].role === 'assistant' &&
-                    history[history.length - 1].messageId === currentStreamMessageId) {
-                  var updated = history.slice(0, -1).concat([{
-                    role: 'assistant',
-                    content: accum,
-                    messageId: history[history.length - 1].messageId
-                  }]);
-                  self._debouncedSaveChatHistory(updated);
-                  return { chatHistory: updated };
-                }
-                return {};
-              });
-              scrollToBottom();
+              contentBatcher.push(accum);
             },
             onToolCalls: function(toolCallsList) {
+              contentBatcher.cancel();
               var tc = toolCallsList[0];
               var args = {};
               try { args = JSON.parse(tc.function.arguments || '{}'); } catch (e) { args = {}; }
@@ -624,7 +657,9 @@
 
       clearHistory() {
         DB.saveChatHistory([]);
-        this.setState({ chatHistory: [] });
+        this._promptTrimState = {};
+        this._toolCache.clear();
+        this.setState({ chatHistory: [], historyHasMore: false });
       }
 
       renderMessage(msg, idx) {
@@ -789,13 +824,13 @@
               { className: "llm-chat-message-content" },
               msg._errorInfo
                 ? this._renderErrorInChat(msg._errorInfo)
-                : this.formatMessageContent(msg.content, isStreamingThisMessage)
+                : this.formatMessageContent(msg.content, isStreamingThisMessage, msg.messageId)
             )
           )
         );
       }
 
-      formatMessageContent(content, isStreaming) {
+      formatMessageContent(content, isStreaming, messageId) {
         var React = system.React;
 
         if (!content || !content.trim()) {
@@ -808,7 +843,7 @@
           return null;
         }
 
-        var html = DB.parseMarkdown(content);
+        var html = DB.renderMarkdownCached(messageId, content);
 
         return React.createElement("div", {
           className: "llm-chat-message-text",
@@ -926,17 +961,25 @@
         return React.createElement(
           "div",
           { className: "llm-chat-container", style: { display: 'flex', flexDirection: 'column', height: '100%', minHeight: '300px' } },
-          React.createElement(
-            "div",
-            { id: "llm-chat-messages", style: { flex: 1, overflowY: 'auto', padding: '12px', display: 'flex', flexDirection: 'column', gap: '12px', scrollBehavior: 'smooth' } },
-            chatHistory.length === 0
-              ? React.createElement(
-                  "div",
-                  { style: { textAlign: 'center', color: 'var(--theme-text-secondary)', padding: '40px 20px', fontSize: '20px', whiteSpace: 'pre-line' } },
-                  "Ask questions about your API!\n\nExamples:\n• What endpoints are available?\n• How do I use the chat completions endpoint?\n• Generate a curl command for /health"
-                )
-              : chatHistory.map(this.renderMessage)
-            ),
+          React.createElement(VirtualList, {
+            id: "llm-chat-messages",
+            style: { flex: 1, overflowY: 'auto', padding: '12px', scrollBehavior: 'smooth' },
+            items: chatHistory,
+            gap: 12,
+            getKey: function(msg, idx) { return msg.messageId || msg.timestamp || 'msg-' + idx; },
+            renderItem: this.renderMessage,
+            header: this.state.historyHasMore
+              ? React.createElement("button", {
+                  onClick: function() { self.loadHistoryPage(true); },
+                  style: { display: 'block', margin: '0 auto 12px', background: 'none', border: '1px solid var(--theme-border-color)', borderRadius: '4px', color: 'var(--theme-text-secondary)', padding: '4px 12px', cursor: 'pointer', fontSize: '12px' }
+                }, "Load earlier messages")
+              : null,
+            empty: React.createElement(
+              "div",
+              { style: { textAlign: 'center', color: 'var(--theme-text-secondary)', padding: '40px 20px', fontSize: '20px', whiteSpace: 'pre-line' } },
+              "Ask questions about your API!\n\nExamples:\n• What endpoints are available?\n• How do I use the chat completions endpoint?\n• Generate a curl command for /health"
+            )
+          }),
           this.state.isTyping
             ? React.createElement(
                 "div",
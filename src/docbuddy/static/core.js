@@ -253,13 +253,16 @@
   }
 
   // ── Get system prompt for a preset ────────────────────────────────────────
-  function getSystemPromptForPreset(presetName, openapiSchema, customPromptText) {
+  // ``query`` (optional) is the current user turn; for large schemas it
+  // selects which operations are described in full (see buildOpenApiContext).
+  // Renders a preset (or the custom prompt) with ``context`` in place of
+  // ``{openapi_context}``; the placeholder is kept when ``context`` is null.
+  function _renderPreset(presetName, customPromptText, context) {
     // Handle custom user-provided prompt
     if (presetName === 'custom' && customPromptText) {
       var customPrompt = customPromptText;
-      if (customPrompt.includes('{openapi_context}') && openapiSchema) {
-        var ctx = buildOpenApiContext(openapiSchema);
-        customPrompt = customPrompt.replace('{openapi_context}', '\n\n' + ctx + '\n');
+      if (customPrompt.includes('{openapi_context}') && context != null) {
+        customPrompt = customPrompt.replace('{openapi_context}', '\n\n' + context + '\n');
       }
       return customPrompt;
     }
@@ -278,15 +281,81 @@
 
     var prompt = preset.prompt || '';
 
-    if (prompt.includes('{openapi_context}') && openapiSchema) {
-      var context = buildOpenApiContext(openapiSchema);
+    if (prompt.includes('{openapi_context}') && context != null) {
       prompt = prompt.replace('{openapi_context}', '\n\n' + context + '\n');
     }
 
     return prompt;
   }
+
+  function getSystemPromptForPreset(presetName, openapiSchema, customPromptText, query) {
+    return _renderPreset(presetName, customPromptText,
+      openapiSchema ? getOpenApiContext(openapiSchema, query) : null);
+  }
   DocBuddy.getSystemPromptForPreset = getSystemPromptForPreset;
 
+  // ── Prefix-cache-friendly prompt layout ───────────────────────────────────
+  // Local servers (vLLM automatic prefix caching, llama.cpp and Ollama KV
+  // reuse) skip prefill for the longest prompt prefix they have already seen.
+  // ``system`` therefore depends only on the preset and the schema and is
+  // byte-identical from turn to turn. ``context`` holds the endpoints relevant
+  // to the latest user message (large schemas only); assemblePrompt appends it
+  // to that message, so the system message stays the only one and the cached
+  // prefix survives across turns.
+  function _promptContextParts(schema, query) {
+    var index = getOperationIndex(schema);
+    if (index.operations.length <= RETRIEVAL_OPTIONS.minOperations) {
+      return { query: query, apiContext: getOpenApiContext(schema), relevant: '' };
+    }
+    var entry = _derivedFor(schema);
+    if (entry.stableContext === undefined) {
+      entry.stableContext = _retrievalIndexLines(schema, index).join('\n');
+    }
+    return {
+      query: query,
+      apiContext: entry.stableContext,
+      relevant: query ? _relevantEndpointLines(schema, index, query).join('\n').trim() : ''
+    };
+  }
+
+  // Context parts for the last few queries, per schema (also filled in by
+  // the schema worker, see warmSchemaPrompt)
+  var PROMPT_PARTS_LIMIT = 8;
+
+  function _rememberPromptParts(entry, parts) {
+    if (!entry.promptParts) entry.promptParts = new Map();
+    if (!entry.promptParts.has(parts.query) && entry.promptParts.size >= PROMPT_PARTS_LIMIT) {
+      entry.promptParts.delete(entry.promptParts.keys().next().value);
+    }
+    entry.promptParts.set(parts.query, parts);
+    return parts;
+  }
+
+  function getPromptLayout(presetName, openapiSchema, customPromptText, query) {
+    var parts = null;
+    if (openapiSchema && typeof openapiSchema === 'object') {
+      var entry = _derivedFor(openapiSchema);
+      var q = query ? String(query) : '';
+      parts = (entry.promptParts && entry.promptParts.get(q)) ||
+        _rememberPromptParts(entry, _promptContextParts(openapiSchema, q));
+    }
+    return {
+      system: _renderPreset(presetName, customPromptText, parts ? parts.apiContext : null),
+      context: parts ? parts.relevant : ''
+    };
+  }
+  DocBuddy.getPromptLayout = getPromptLayout;
+
+  // Text of the most recent user message, used as the retrieval query
+  function lastUserQuery(messages) {
+    for (var i = (messages || []).length - 1; i >= 0; i--) {
+      var msg = messages[i];
+      if (msg && msg.role === 'user' && typeof msg.content === 'string') return msg.content;
+    }
+    return '';
+  }
+  DocBuddy.lastUserQuery = lastUserQuery;
+
   // ── LLM Provider configurations ─────────────────────────────────────────────
   var LLM_PROVIDERS = {
     ollama: { name: 'Ollama', url: 'http://localhost:11434/v1' },
@@ -297,9 +366,193 @@
   DocBuddy.LLM_PROVIDERS = LLM_PROVIDERS;
 
   // ── Build OpenAPI context from schema (for system prompt) ──────────────────
-  function buildOpenApiContext(schema) {
-    if (!schema || typeof schema !== 'object') return '';
+  var HTTP_METHODS = ['get', 'post', 'put', 'patch', 'delete', 'head', 'options'];
+
+  // Large schemas switch to a retrieval layout: a compact index of every
+  // operation plus full detail only for the operations relevant to the query.
+  var RETRIEVAL_OPTIONS = { minOperations: 40, topK: 8, maxIndexEntries: 250 };
+  DocBuddy.RETRIEVAL_OPTIONS = RETRIEVAL_OPTIONS;
+
+  // ── $ref resolution ───────────────────────────────────────────────────────
+  // Local references ("#/components/schemas/Pet", "#/components/parameters/
+  // limit", ...) are resolved through an index built per schema (see
+  // getRefIndex): each reference is looked up once, chains of references are
+  // followed, allOf compositions are flattened, and recursive models are cut
+  // where they refer back to a model being expanded. Mirrored by RefIndex in
+  // docbuddy/digest.py.
+  var SCHEMA_REF_PREFIX = '#/components/schemas/';
+
+  function _isRef(node) {
+    return !!node && typeof node === 'object' && typeof node['$ref'] === 'string';
+  }
+
+  function _pointerLookup(schema, ref) {
+    if (ref.slice(0, 2) !== '#/') return undefined;
+    var node = schema;
+    var keys = ref.slice(2).split('/');
+    for (var i = 0; i < keys.length; i++) {
+      var key = keys[i].replace(/~1/g, '/').replace(/~0/g, '~');
+      if (!node || typeof node !== 'object') return undefined;
+      if (Array.isArray(node)) {
+        if (!/^(0|[1-9][0-9]*)$/.test(key) || Number(key) >= node.length) return undefined;
+      } else if (!Object.prototype.hasOwnProperty.call(node, key)) {
+        return undefined;
+      }
+      node = node[key];
+    }
+    return node;
+  }
+
+  // Final target of ``ref``, or null when it is missing, empty or circular
+  function _followRef(schema, ref) {
+    var seen = [];
+    var target;
+    do {
+      seen.push(ref);
+      target = _pointerLookup(schema, ref);
+      ref = _isRef(target) ? target['$ref'] : null;
+    } while (ref !== null && seen.indexOf(ref) < 0);
+    return target && ref === null ? target : null;
+  }
+
+  // Names of the component schemas referenced anywhere inside ``node``
+  function _schemaRefNames(node, names) {
+    if (!node || typeof node !== 'object') return names;
+    if (_isRef(node)) {
+      var ref = node['$ref'];
+      if (ref.indexOf(SCHEMA_REF_PREFIX) === 0) {
+        var name = ref.slice(SCHEMA_REF_PREFIX.length);
+        if (names.indexOf(name) < 0) names.push(name);
+      }
+      return names;
+    }
+    Object.keys(node).forEach(function(key) { _schemaRefNames(node[key], names); });
+    return names;
+  }
+
+  function createRefIndex(schema) {
+    var targets = new Map();
+    var shapes = new Map();
+    var nested = new Map();
+
+    // The node a reference points to (``node`` itself if it is not a
+    // reference or cannot be resolved)
+    function resolve(node) {
+      if (!_isRef(node)) return node;
+      var ref = node['$ref'];
+      if (!targets.has(ref)) targets.set(ref, _followRef(schema, ref));
+      var target = targets.get(ref);
+      return target === null ? node : target;
+    }
+
+    // Resolved schema with allOf members merged into one object. Shapes of
+    // references are memoized, except while a cycle is being cut.
+    function shape(node, stack) {
+      stack = stack || [];
+      var ref = _isRef(node) ? node['$ref'] : null;
+      var memo = ref !== null && !stack.length;
+      if (memo && shapes.has(ref)) return shapes.get(ref);
+      var target = resolve(node);
+      var result = target;
+      if (target && typeof target === 'object' && Array.isArray(target.allOf)) {
+        result = _mergeAllOf(target, ref !== null ? stack.concat([ref]) : stack);
+      }
+      if (memo) shapes.set(ref, result);
+      return result;
+    }
+
+    function _mergeAllOf(target, stack) {
+      var merged = {};
+      var properties = {};
+      var required = [];
+      var parts = target.allOf.concat([target]);
+      parts.forEach(function(part, i) {
+        var s = part;
+        if (i < parts.length - 1) {
+          if (_isRef(part) && stack.indexOf(part['$ref']) >= 0) return;
+          s = shape(part, stack);
+        }
+        if (!s || typeof s !== 'object' || Array.isArray(s)) return;
+        Object.keys(s).forEach(function(key) {
+          if (key !== 'allOf' && key !== 'properties' && key !== 'required') merged[key] = s[key];
+        });
+        var props = s.properties;
+        if (props && typeof props === 'object' && !Array.isArray(props)) {
+          Object.keys(props).forEach(function(name) { properties[name] = props[name]; });
+        }
+        if (Array.isArray(s.required)) {
+          s.required.forEach(function(name) {
+            if (required.indexOf(name) < 0) required.push(name);
+          });
+        }
+      });
+      merged.properties = properties;
+      merged.required = required;
+      return merged;
+    }
+
+    // ``names`` followed by the models they reference, transitively and
+    // breadth-first, up to ``limit`` existing component schemas
+    function relatedModels(names, limit) {
+      var schemas = (schema.components || {}).schemas || {};
+      var result = [];
+      var add = function(name) {
+        if (result.indexOf(name) < 0 && schemas[name] && typeof schemas[name] === 'object') {
+          result.push(name);
+        }
+      };
+      names.forEach(add);
+      for (var i = 0; i < result.length && result.length < limit; i++) {
+        if (!nested.has(result[i])) nested.set(result[i], _schemaRefNames(schemas[result[i]], []));
+        nested.get(result[i]).forEach(add);
+      }
+      return result.slice(0, limit);
+    }
+
+    return {
+      resolve: resolve,
+      shape: function(node) { return shape(node); },
+      relatedModels: relatedModels
+    };
+  }
+  DocBuddy.createRefIndex = createRefIndex;
+
+  // Short type of a JSON schema for prompts: a model name, ``array[...]``,
+  // a composition such as ``Cat | Dog``, or the schema's type
+  var COMPOSITION_JOINERS = [['allOf', ' & '], ['anyOf', ' | '], ['oneOf', ' | ']];
+
+  function _typeLabel(node, fallback) {
+    if (!node || typeof node !== 'object') return fallback;
+    var ref = node['$ref'];
+    if (typeof ref === 'string' && ref) return ref.replace(SCHEMA_REF_PREFIX, '');
+    var type = node.type;
+    if (type) {
+      if (type === 'array' && node.items) return 'array[' + _typeLabel(node.items, 'object') + ']';
+      return type;
+    }
+    for (var i = 0; i < COMPOSITION_JOINERS.length; i++) {
+      var members = node[COMPOSITION_JOINERS[i][0]];
+      if (Array.isArray(members) && members.length) {
+        return members.map(function(m) { return _typeLabel(m, 'any'); }).join(COMPOSITION_JOINERS[i][1]);
+      }
+    }
+    return fallback;
+  }
 
+  // Type of the first media type in ``content`` that declares a schema
+  function _contentLabel(content) {
+    if (!content || typeof content !== 'object') return '';
+    var types = Object.keys(content);
+    for (var i = 0; i < types.length; i++) {
+      var media = content[types[i]];
+      if (media && typeof media === 'object' && media.schema && typeof media.schema === 'object') {
+        return _typeLabel(media.schema, '');
+      }
+    }
+    return '';
+  }
+
+  function _apiHeaderLines(schema) {
     var lines = [];
     var info = schema.info || {};
     lines.push('# API Information');
@@ -324,6 +577,145 @@
         else lines.push('- ' + url);
       });
     }
+    return lines;
+  }
+
+  function _operationLines(refs, method, operation) {
+    var lines = [];
+    var verb = method.toUpperCase();
+    var summary = operation.summary || '';
+    var desc = operation.description || '';
+
+    lines.push('### ' + verb);
+    if (summary) {
+      lines.push('**Summary:** ' + summary);
+    }
+    if (desc) {
+      lines.push('**Description:** ' + desc);
+    }
+
+    var tags = operation.tags || [];
+    if (tags.length > 0) {
+      lines.push('**Tags:** ' + tags.join(', '));
+    }
+
+    var params = operation.parameters || [];
+    if (params && params.length > 0) {
+      lines.push('');
+      lines.push('**Parameters:**');
+      params.forEach(function(param) {
+        if (typeof param !== 'object') return;
+        param = refs.resolve(param);
+        var name = param.name || 'unknown';
+        var inLoc = param.in || 'query';
+        var required = param.required ? '[required]' : '[optional]';
+        var pDesc = param.description || '';
+        lines.push('- `' + name + '` (' + inLoc + ', ' + required + ') - ' + pDesc);
+      });
+    }
+
+    var requestBody = refs.resolve(operation.requestBody);
+    if (requestBody && typeof requestBody === 'object') {
+      var content = requestBody.content || {};
+      if (Object.keys(content).length > 0) {
+        lines.push('');
+        lines.push('**Request Body:**');
+        Object.keys(content).forEach(function(contentType) {
+          var mediaType = content[contentType];
+          if (typeof mediaType !== 'object') return;
+          var schemaDef = mediaType.schema || {};
+          if (schemaDef && typeof schemaDef === 'object') {
+            lines.push('- Content-Type: `' + contentType + '`');
+            var resolvedSchema = refs.shape(schemaDef);
+            if (resolvedSchema !== schemaDef && _isRef(schemaDef)) {
+              var refPath = schemaDef['$ref'].replace(SCHEMA_REF_PREFIX, '');
+              lines.push('- Schema: `' + refPath + '`');
+            }
+            if (resolvedSchema.type === 'object' || resolvedSchema.properties) {
+              var props = resolvedSchema.properties || {};
+              var requiredFields = resolvedSchema.required || [];
+              var propKeys = Object.keys(props).slice(0, 10);
+              propKeys.forEach(function(pName) {
+                var pDef = props[pName] || {};
+                var pType = _typeLabel(pDef, 'any');
+                var pReq = requiredFields.indexOf(pName) >= 0 ? 'required' : 'optional';
+                var pDesc = pDef.description || '';
+                lines.push('  - `' + pName + '` (' + pType + ', ' + pReq + ')' + (pDesc ? ': ' + pDesc : ''));
+              });
+            }
+          }
+        });
+      }
+    }
+
+    var responses = operation.responses || {};
+    if (responses && Object.keys(responses).length > 0) {
+      lines.push('');
+      lines.push('**Responses:**');
+      Object.keys(responses).sort().forEach(function(statusCode) {
+        var response = refs.resolve(responses[statusCode]);
+        if (!response || typeof response !== 'object') return;
+        var resDesc = response.description || 'No description';
+        var model = _contentLabel(response.content);
+        lines.push('- `' + statusCode + '`: ' + resDesc + (model ? ' → `' + model + '`' : ''));
+      });
+    }
+    return lines;
+  }
+
+  function _schemaModelLines(schemaName, schemaDef) {
+    var lines = [];
+    lines.push('');
+    lines.push('## `' + schemaName + '`');
+
+    var desc = schemaDef.description || '';
+    if (desc) lines.push('*' + desc + '*');
+
+    var props = schemaDef.properties || {};
+    if (props && Object.keys(props).length > 0) {
+      lines.push('');
+      lines.push('**Properties:**');
+      var schemaRequired = schemaDef.required || [];
+      Object.keys(props).slice(0, 10).forEach(function(propName) {
+        var propDef = props[propName];
+        if (typeof propDef !== 'object') return;
+        var ptype = _typeLabel(propDef, 'any');
+        var preq = schemaRequired.indexOf(propName) >= 0 ? '[required]' : '[optional]';
+        var pdesc = propDef.description || '';
+        lines.push('- `' + propName + '` (' + ptype + ', ' + preq + '): ' + pdesc);
+      });
+    }
+    return lines;
+  }
+
+  // List every operation in schema order as { path, method, operation }.
+  function listOperations(schema) {
+    var ops = [];
+    var paths = (schema && schema.paths) || {};
+    Object.keys(paths).forEach(function(path) {
+      var pathItem = paths[path];
+      if (!pathItem || typeof pathItem !== 'object') return;
+      HTTP_METHODS.forEach(function(method) {
+        if (!pathItem[method] || typeof pathItem[method] !== 'object') return;
+        ops.push({ path: path, method: method, operation: pathItem[method] });
+      });
+    });
+    return ops;
+  }
+  DocBuddy.listOperations = listOperations;
+
+  function buildOpenApiContext(schema, query) {
+    if (!schema || typeof schema !== 'object') return '';
+
+    if (query !== undefined && query !== null) {
+      var index = getOperationIndex(schema);
+      if (index.operations.length > RETRIEVAL_OPTIONS.minOperations) {
+        return _buildRetrievalContext(schema, index, String(query));
+      }
+    }
+
+    var refs = getRefIndex(schema);
+    var lines = _apiHeaderLines(schema);
 
     var paths = schema.paths || {};
     if (paths && Object.keys(paths).length > 0) {
@@ -337,94 +729,9 @@
         lines.push('');
         lines.push('## `' + path + '`');
 
-        ['get', 'post', 'put', 'patch', 'delete', 'head', 'options'].forEach(function(method) {
+        HTTP_METHODS.forEach(function(method) {
           if (!pathItem[method] || typeof pathItem[method] !== 'object') return;
-
-          var operation = pathItem[method];
-          var verb = method.toUpperCase();
-          var summary = operation.summary || '';
-          var desc = operation.description || '';
-
-          lines.push('### ' + verb);
-          if (summary) {
-            lines.push('**Summary:** ' + summary);
-          }
-          if (desc) {
-            lines.push('**Description:** ' + desc);
-          }
-
-          var tags = operation.tags || [];
-          if (tags.length > 0) {
-            lines.push('**Tags:** ' + tags.join(', '));
-          }
-
-          var params = operation.parameters || [];
-          if (params && params.length > 0) {
-            lines.push('');
-            lines.push('**Parameters:**');
-            params.forEach(function(param) {
-              if (typeof param !== 'object') return;
-              var name = param.name || 'unknown';
-              var inLoc = param.in || 'query';
-              var required = param.required ? '[required]' : '[optional]';
-              var pDesc = param.description || '';
-              lines.push('- `' + name + '` (' + inLoc + ', ' + required + ') - ' + pDesc);
-            });
-          }
-
-          var requestBody = operation.requestBody;
-          if (requestBody && typeof requestBody === 'object') {
-            var content = requestBody.content || {};
-            if (Object.keys(content).length > 0) {
-              lines.push('');
-              lines.push('**Request Body:**');
-              Object.keys(content).forEach(function(contentType) {
-                var mediaType = content[contentType];
-                if (typeof mediaType !== 'object') return;
-                var schemaDef = mediaType.schema || {};
-                if (schemaDef && typeof schemaDef === 'object') {
-                  lines.push('- Content-Type: `' + contentType + '`');
-                  var resolvedSchema = schemaDef;
-                  if (schemaDef['$ref'] && typeof schemaDef['$ref'] === 'string') {
-                    var refPath = schemaDef['$ref'].replace('#/components/schemas/', '');
-                    var compSchemas = (schema.components || {}).schemas || {};
-                    if (compSchemas[refPath]) {
-                      resolvedSchema = compSchemas[refPath];
-                      lines.push('- Schema: `' + refPath + '`');
-                    }
-                  }
-                  if (resolvedSchema.type === 'object' || resolvedSchema.properties) {
-                    var props = resolvedSchema.properties || {};
-                    var requiredFields = resolvedSchema.required || [];
-                    var propKeys = Object.keys(props).slice(0, 10);
-                    propKeys.forEach(function(pName) {
-                      var pDef = props[pName] || {};
-                      var pType = pDef.type || 'any';
-                      if (pType === 'array' && pDef.items) {
-                        var itemRef = (pDef.items['$ref'] || '').replace('#/components/schemas/', '');
-                        pType = 'array[' + (itemRef || pDef.items.type || 'object') + ']';
-                      }
-                      var pReq = requiredFields.indexOf(pName) >= 0 ? 'required' : 'optional';
-                      var pDesc = pDef.description || '';
-                      lines.push('  - `' + pName + '` (' + pType + ', ' + pReq + ')' + (pDesc ? ': ' + pDesc : ''));
-                    });
-                  }
-                }
-              });
-            }
-          }
-
-          var responses = operation.responses || {};
-          if (responses && Object.keys(responses).length > 0) {
-            lines.push('');
-            lines.push('**Responses:**');
-            Object.keys(responses).sort().forEach(function(statusCode) {
-              var response = responses[statusCode];
-              if (typeof response !== 'object') return;
-              var resDesc = response.description || 'No description';
-              lines.push('- `' + statusCode + '`: ' + resDesc);
-            });
-          }
+          lines.push.apply(lines, _operationLines(refs, method, pathItem[method]));
         });
       });
     }
@@ -439,27 +746,7 @@
         Object.keys(schemas).slice(0, 20).forEach(function(schemaName) {
           var schemaDef = schemas[schemaName];
           if (typeof schemaDef !== 'object') return;
-
-          lines.push('');
-          lines.push('## `' + schemaName + '`');
-
-          var desc = schemaDef.description || '';
-          if (desc) lines.push('*' + desc + '*');
-
-          var props = schemaDef.properties || {};
-          if (props && Object.keys(props).length > 0) {
-            lines.push('');
-            lines.push('**Properties:**');
-            var schemaRequired = schemaDef.required || [];
-            Object.keys(props).slice(0, 10).forEach(function(propName) {
-              var propDef = props[propName];
-              if (typeof propDef !== 'object') return;
-              var ptype = propDef.type || 'any';
-              var preq = schemaRequired.indexOf(propName) >= 0 ? '[required]' : '[optional]';
-              var pdesc = propDef.description || '';
-              lines.push('- `' + propName + '` (' + ptype + ', ' + preq + '): ' + pdesc);
-            });
-          }
+          lines.push.apply(lines, _schemaModelLines(schemaName, refs.shape(schemaDef)));
         });
       }
     }
@@ -468,6 +755,196 @@
   }
   DocBuddy.buildOpenApiContext = buildOpenApiContext;
 
+  // ── Operation retrieval (BM25) ────────────────────────────────────────────
+  // A small lexical index over operations (path, summary, description, tags,
+  // parameters and schema names), mirrored in docbuddy/digest.py.
+  var BM25_K1 = 1.2;
+  var BM25_B = 0.75;
+  var STOPWORDS = {};
+  ('a an and are as at be by can do for from get how i in is it me my of on or ' +
+   'please show that the this to what which with you your').split(' ').forEach(function(w) {
+    STOPWORDS[w] = true;
+  });
+
+  function tokenize(text) {
+    var words = String(text || '')
+      .replace(/([a-z0-9])([A-Z])/g, '$1 $2')
+      .toLowerCase()
+      .split(/[^a-z0-9]+/);
+    var tokens = [];
+    words.forEach(function(w) {
+      if (w.length < 2 || STOPWORDS[w]) return;
+      // Light plural stemming so "invoices" matches "invoice"
+      if (w.length > 3 && w.charAt(w.length - 1) === 's' && w.charAt(w.length - 2) !== 's') {
+        w = w.slice(0, -1);
+      }
+      tokens.push(w);
+    });
+    return tokens;
+  }
+  DocBuddy.tokenize = tokenize;
+
+  function _refName(node) {
+    if (!node || typeof node !== 'object') return '';
+    var ref = node['$ref'];
+    if (typeof ref !== 'string' && node.items && typeof node.items === 'object') ref = node.items['$ref'];
+    if (typeof ref !== 'string') return '';
+    return ref.slice(ref.lastIndexOf('/') + 1);
+  }
+
+  // Names of component schemas referenced by an operation's bodies/responses.
+  // With ``refs``, referenced request bodies and responses are resolved first.
+  function _operationSchemaNames(operation, refs) {
+    var names = [];
+    var add = function(name) {
+      if (name && names.indexOf(name) < 0) names.push(name);
+    };
+    var fromContent = function(content) {
+      if (!content || typeof content !== 'object') return;
+      Object.keys(content).forEach(function(ct) {
+        var media = content[ct];
+        if (media && typeof media === 'object') add(_refName(media.schema));
+      });
+    };
+    var requestBody = refs ? refs.resolve(operation.requestBody) : operation.requestBody;
+    if (requestBody && typeof requestBody === 'object') {
+      fromContent(requestBody.content);
+    }
+    var responses = operation.responses;
+    if (responses && typeof responses === 'object') {
+      Object.keys(responses).sort().forEach(function(code) {
+        var res = refs ? refs.resolve(responses[code]) : responses[code];
+        if (res && typeof res === 'object') fromContent(res.content);
+      });
+    }
+    return names;
+  }
+
+  function _operationText(op) {
+    var operation = op.operation;
+    var parts = [op.path, operation.operationId, operation.summary, operation.description];
+    if (Array.isArray(operation.tags)) parts = parts.concat(operation.tags);
+    if (Array.isArray(operation.parameters)) {
+      operation.parameters.forEach(function(param) {
+        if (param && typeof param === 'object') parts.push(param.name, param.description);
+      });
+    }
+    parts = parts.concat(_operationSchemaNames(operation));
+    return parts.filter(function(p) { return typeof p === 'string'; }).join(' ');
+  }
+
+  function buildOperationIndex(schema) {
+    var operations = listOperations(schema);
+    var docs = [];
+    var df = {};
+    var totalLength = 0;
+    operations.forEach(function(op) {
+      var tokens = tokenize(_operationText(op));
+      var tf = {};
+      tokens.forEach(function(t) { tf[t] = (tf[t] || 0) + 1; });
+      Object.keys(tf).forEach(function(t) { df[t] = (df[t] || 0) + 1; });
+      docs.push({ tf: tf, length: tokens.length });
+      totalLength += tokens.length;
+    });
+    return {
+      operations: operations,
+      docs: docs,
+      df: df,
+      avgLength: operations.length ? totalLength / operations.length : 0
+    };
+  }
+  DocBuddy.buildOperationIndex = buildOperationIndex;
+
+  // Return the indices of the top-k operations for a query, best first.
+  function searchOperations(index, query, k) {
+    var n = index.operations.length;
+    var terms = [];
+    tokenize(query).forEach(function(t) {
+      if (terms.indexOf(t) < 0 && index.df[t]) terms.push(t);
+    });
+    if (!terms.length) return [];
+    var scored = [];
+    index.docs.forEach(function(doc, i) {
+      var score = 0;
+      terms.forEach(function(t) {
+        var f = doc.tf[t];
+        if (!f) return;
+        var idf = Math.log(1 + (n - index.df[t] + 0.5) / (index.df[t] + 0.5));
+        var norm = index.avgLength ? doc.length / index.avgLength : 0;
+        score += idf * (f * (BM25_K1 + 1)) / (f + BM25_K1 * (1 - BM25_B + BM25_B * norm));
+      });
+      if (score > 0) scored.push({ i: i, score: score });
+    });
+    scored.sort(function(a, b) { return b.score - a.score || a.i - b.i; });
+    return scored.slice(0, k).map(function(s) { return s.i; });
+  }
+  DocBuddy.searchOperations = searchOperations;
+
+  function _compactIndexLines(index) {
+    var lines = [];
+    var ops = index.operations;
+    var limit = Math.min(ops.length, RETRIEVAL_OPTIONS.maxIndexEntries);
+    for (var i = 0; i < limit; i++) {
+      var summary = ops[i].operation.summary;
+      lines.push('- ' + ops[i].method.toUpperCase() + ' ' + ops[i].path +
+        (summary && typeof summary === 'string' ? ' — ' + summary : ''));
+    }
+    if (ops.length > limit) {
+      lines.push('- … ' + (ops.length - limit) + ' more operations not listed');
+    }
+    return lines;
+  }
+
+  // The query-independent part of the retrieval layout: header and index
+  function _retrievalIndexLines(schema, index) {
+    var lines = _apiHeaderLines(schema);
+    lines.push('');
+    lines.push('# API Endpoints');
+    lines.push('This API has ' + index.operations.length + ' operations. Compact index:');
+    lines.push.apply(lines, _compactIndexLines(index));
+    return lines;
+  }
+
+  // Full details of the operations (and their models) relevant to ``query``
+  function _relevantEndpointLines(schema, index, query) {
+    var lines = [];
+    var hits = searchOperations(index, query, RETRIEVAL_OPTIONS.topK);
+    if (hits.length) {
+      var refs = getRefIndex(schema);
+      var modelNames = [];
+      lines.push('');
+      lines.push('# Relevant Endpoints');
+      lines.push('Full details for the operations most relevant to the current request:');
+      hits.forEach(function(i) {
+        var op = index.operations[i];
+        lines.push('');
+        lines.push('## `' + op.path + '`');
+        lines.push.apply(lines, _operationLines(refs, op.method, op.operation));
+        _operationSchemaNames(op.operation, refs).forEach(function(name) {
+          if (modelNames.indexOf(name) < 0) modelNames.push(name);
+        });
+      });
+
+      // Include the models those reference (line items of an invoice, ...)
+      var schemas = (schema.components || {}).schemas || {};
+      modelNames = refs.relatedModels(modelNames, 20);
+      if (modelNames.length) {
+        lines.push('');
+        lines.push('# Data Models (Schemas)');
+        modelNames.forEach(function(name) {
+          lines.push.apply(lines, _schemaModelLines(name, refs.shape(schemas[name])));
+        });
+      }
+    }
+    return lines;
+  }
+
+  function _buildRetrievalContext(schema, index, query) {
+    return _retrievalIndexLines(schema, index)
+      .concat(_relevantEndpointLines(schema, index, query))
+      .join('\n');
+  }
+
   // ── Build curl command from tool call arguments ───────────────────────────
   function shellEscape(val) {
     return String(val).replace(/'/g, "'\\''").replace(/\$/g, '\\$').replace(/`/g, '\\`').replace(/\\/g, '\\\\').replace(/!/g, '\\!');
@@ -506,6 +983,7 @@
   function buildApiRequestTool(schema) {
     var endpoints = [];
     var methodsEnum = new Set(['GET', 'POST', 'PUT', 'PATCH', 'DELETE']);
+    var refs = getRefIndex(schema);
     var paths = schema.paths || {};
 
     Object.keys(paths).forEach(function(path) {
@@ -521,13 +999,26 @@
         if (summary) {
           desc += ' — ' + summary;
         }
+        var requestBody = refs.resolve(op.requestBody);
+        var body = requestBody && typeof requestBody === 'object' ? _contentLabel(requestBody.content) : '';
+        if (body) {
+          desc += ' (body: ' + body + ')';
+        }
         endpoints.push(desc);
       });
     });
 
+    // Keep the tool description bounded for very large APIs
+    var omitted = endpoints.length - RETRIEVAL_OPTIONS.maxIndexEntries;
+    if (omitted > 0) {
+      endpoints = endpoints.slice(0, RETRIEVAL_OPTIONS.maxIndexEntries);
+    }
     var endpointList = endpoints.length > 0
       ? '\n' + endpoints.map(function(e) { return '- ' + e; }).join('\n')
       : 'No endpoints found.';
+    if (omitted > 0) {
+      endpointList += '\n- … ' + omitted + ' more endpoints (see the API index in the system prompt)';
+    }
 
     return {
       type: 'function',
@@ -572,6 +1063,273 @@
   }
   DocBuddy.buildApiRequestTool = buildApiRequestTool;
 
+  // ── Schema-derived prompt data (computed once per schema) ─────────────────
+  // The OpenAPI context and tool definition only depend on the schema, so
+  // they are memoized per schema object. When the server provides a digest
+  // for the same schema (see ensureOpenapiSchemaCached) it seeds this cache
+  // and the browser never walks the schema at all.
+  var _schemaDerived = new WeakMap();
+
+  function _derivedFor(schema) {
+    var entry = _schemaDerived.get(schema);
+    if (!entry) {
+      entry = {};
+      _schemaDerived.set(schema, entry);
+    }
+    return entry;
+  }
+
+  function getRefIndex(schema) {
+    var entry = _derivedFor(schema);
+    if (entry.refs === undefined) entry.refs = createRefIndex(schema);
+    return entry.refs;
+  }
+  DocBuddy.getRefIndex = getRefIndex;
+
+  function getOperationIndex(schema) {
+    var entry = _derivedFor(schema);
+    if (entry.index === undefined) entry.index = buildOperationIndex(schema);
+    return entry.index;
+  }
+  DocBuddy.getOperationIndex = getOperationIndex;
+
+  // With a query, large schemas get the retrieval layout (compact index plus
+  // the top-k relevant operations); everything else uses the full context.
+  function getOpenApiContext(schema, query) {
+    if (!schema || typeof schema !== 'object') return '';
+    if (query !== undefined && query !== null &&
+        getOperationIndex(schema).operations.length > RETRIEVAL_OPTIONS.minOperations) {
+      return buildOpenApiContext(schema, query);
+    }
+    var entry = _derivedFor(schema);
+    if (entry.context === undefined) entry.context = buildOpenApiContext(schema);
+    return entry.context;
+  }
+  DocBuddy.getOpenApiContext = getOpenApiContext;
+
+  function getApiRequestTool(schema) {
+    if (!schema || typeof schema !== 'object') return buildApiRequestTool({});
+    var entry = _derivedFor(schema);
+    if (entry.tool === undefined) entry.tool = buildApiRequestTool(schema);
+    return entry.tool;
+  }
+  DocBuddy.getApiRequestTool = getApiRequestTool;
+
+  function applyOpenApiDigest(schema, digest) {
+    if (!schema || !digest || typeof digest.context !== 'string' || !digest.tool) return;
+    var entry = _derivedFor(schema);
+    entry.context = digest.context;
+    entry.tool = digest.tool;
+  }
+  DocBuddy.applyOpenApiDigest = applyOpenApiDigest;
+
+  // ── Schema worker ─────────────────────────────────────────────────────────
+  // For large schemas, building the operation index, the prompt context and
+  // the tool definition on the main thread freezes the page when a message
+  // is sent. A dedicated worker loads this script, keeps its own parsed copy
+  // of the schema (sent as a transferred buffer) and answers context, tool
+  // and search requests. warmSchemaPrompt stores the answers in the
+  // per-schema cache above, so getPromptLayout and getApiRequestTool then
+  // return them without walking the schema. Without workers, or if the
+  // worker fails, the same work runs synchronously as before.
+  var SCHEMA_WORKER_TIMEOUT_MS = 30000;
+
+  // URL of the script defining DocBuddy (core.js or the bundle); the worker
+  // imports it. Only known when loaded through a <script> element.
+  DocBuddy._coreScriptUrl = (typeof document !== 'undefined' && document.currentScript &&
+    document.currentScript.src) || null;
+
+  // Original bytes of fetched schemas, handed to the worker instead of
+  // serializing the parsed object again
+  var _schemaSources = new WeakMap();
+  var _schemaWorker = null;
+  var _schemaWorkerBroken = false;
+
+  // The worker has no DOM or storage; stub what loading the modules touches
+  function _schemaWorkerSource(scriptUrl) {
+    return [
+      'var noop = function () {};',
+      'var el = function () { return { style: {}, appendChild: noop, setAttribute: noop, addEventListener: noop }; };',
+      'self.window = self;',
+      'self.document = { addEventListener: noop, getElementById: function () { return null; },',
+      '  querySelector: function () { return null; }, createElement: el,',
+      '  head: { appendChild: noop }, body: { appendChild: noop },',
+      '  documentElement: { style: { setProperty: noop } } };',
+      'self.localStorage = { getItem: function () { return null; }, setItem: noop, removeItem: noop };',
+      'importScripts(' + JSON.stringify(scriptUrl) + ');'
+    ].join('\n');
+  }
+
+  function _startSchemaWorker() {
+    if (_schemaWorker || _schemaWorkerBroken) return _schemaWorker;
+    var scriptUrl = DocBuddy._coreScriptUrl;
+    if (!scriptUrl || typeof Worker === 'undefined' || typeof Blob === 'undefined' ||
+        typeof URL === 'undefined' || !URL.createObjectURL || typeof TextEncoder === 'undefined') {
+      return null;
+    }
+    var client = { worker: null, schema: null, pending: {}, nextId: 1 };
+    var blobUrl = null;
+    try {
+      blobUrl = URL.createObjectURL(new Blob([_schemaWorkerSource(scriptUrl)], { type: 'text/javascript' }));
+      client.worker = new Worker(blobUrl);
+    } catch (err) {
+      // e.g. a Content-Security-Policy without worker-src blob:
+      _schemaWorkerBroken = true;
+      return null;
+    }
+    client.worker.onmessage = function(event) {
+      if (blobUrl) {
+        URL.revokeObjectURL(blobUrl);
+        blobUrl = null;
+      }
+      var msg = event.data || {};
+      var waiter = client.pending[msg.id];
+      if (!waiter) return;
+      delete client.pending[msg.id];
+      clearTimeout(waiter.timer);
+      if (msg.error) waiter.reject(new Error(msg.error));
+      else waiter.resolve(msg.result);
+    };
+    client.worker.onerror = function(event) {
+      _stopSchemaWorker(new Error((event && event.message) || 'Schema worker failed'));
+    };
+    _schemaWorker = client;
+    return client;
+  }
+
+  // Stop the worker for the rest of the page; pending requests fail and
+  // their callers fall back to the synchronous path.
+  function _stopSchemaWorker(err) {
+    var client = _schemaWorker;
+    _schemaWorker = null;
+    _schemaWorkerBroken = true;
+    if (!client) return;
+    try { client.worker.terminate(); } catch (e) { /* already gone */ }
+    Object.keys(client.pending).forEach(function(id) {
+      clearTimeout(client.pending[id].timer);
+      client.pending[id].reject(err);
+    });
+    client.pending = {};
+  }
+
+  function _schemaWorkerRequest(client, message, transfer) {
+    return new Promise(function(resolve, reject) {
+      var id = client.nextId++;
+      var timer = setTimeout(function() {
+        _stopSchemaWorker(new Error('Schema worker timed out'));
+      }, SCHEMA_WORKER_TIMEOUT_MS);
+      client.pending[id] = { resolve: resolve, reject: reject, timer: timer };
+      message.id = id;
+      client.worker.postMessage(message, transfer || []);
+    });
+  }
+
+  // Returns the worker with ``schema`` loaded, or null when the schema is
+  // small enough to handle inline or workers are unavailable.
+  function _schemaWorkerFor(schema) {
+    var entry = _derivedFor(schema);
+    if (entry.operationCount === undefined) entry.operationCount = listOperations(schema).length;
+    if (entry.operationCount <= RETRIEVAL_OPTIONS.minOperations) return null;
+    var client = _startSchemaWorker();
+    if (!client) return null;
+    if (client.schema !== schema) {
+      client.schema = schema;
+      var buffer = _schemaSources.get(schema);
+      _schemaSources.delete(schema);
+      if (!buffer) buffer = new TextEncoder().encode(JSON.stringify(schema)).buffer;
+      // Requests are handled in order, so later ones see this schema
+      _schemaWorkerRequest(client, { type: 'load', buffer: buffer }, [buffer]).catch(function() {
+        if (client.schema === schema) client.schema = null;
+      });
+    }
+    return client;
+  }
+
+  function _endpointMatches(schema, query, k) {
+    var index = getOperationIndex(schema);
+    return searchOperations(index, query, k).map(function(i) {
+      var op = index.operations[i];
+      var summary = op.operation.summary;
+      return {
+        method: op.method.toUpperCase(),
+        path: op.path,
+        summary: typeof summary === 'string' ? summary : ''
+      };
+    });
+  }
+
+  // Precompute, off the main thread, what the next prompt for ``query``
+  // needs. Always resolves; on failure getPromptLayout/getApiRequestTool
+  // simply compute the missing parts themselves.
+  function warmSchemaPrompt(schema, query, includeTool) {
+    if (!schema || typeof schema !== 'object') return Promise.resolve();
+    var client = _schemaWorkerFor(schema);
+    if (!client) return Promise.resolve();
+    var entry = _derivedFor(schema);
+    var q = query ? String(query) : '';
+    var jobs = [];
+    if (!entry.promptParts || !entry.promptParts.has(q)) {
+      jobs.push(_schemaWorkerRequest(client, { type: 'context', query: q }).then(function(parts) {
+        _rememberPromptParts(entry, parts);
+      }));
+    }
+    if (includeTool && entry.tool === undefined) {
+      jobs.push(_schemaWorkerRequest(client, { type: 'tool' }).then(function(tool) {
+        entry.tool = tool;
+      }));
+    }
+    return Promise.all(jobs).then(function() {}, function(err) {
+      console.warn('Schema worker failed, building the prompt on the main thread:', err);
+    });
+  }
+  DocBuddy.warmSchemaPrompt = warmSchemaPrompt;
+
+  // Top-k operations for ``query`` as { method, path, summary }
+  function searchEndpoints(schema, query, k) {
+    if (!schema || typeof schema !== 'object') return Promise.resolve([]);
+    var q = query ? String(query) : '';
+    var limit = k || RETRIEVAL_OPTIONS.topK;
+    var client = _schemaWorkerFor(schema);
+    if (!client) return Promise.resolve(_endpointMatches(schema, q, limit));
+    return _schemaWorkerRequest(client, { type: 'search', query: q, k: limit })
+      .catch(function() { return _endpointMatches(schema, q, limit); });
+  }
+  DocBuddy.searchEndpoints = searchEndpoints;
+
+  // Worker side: answer requests against the most recently loaded schema
+  function _serveSchemaRequests(scope) {
+    var schema = null;
+    scope.onmessage = function(event) {
+      var msg = event.data || {};
+      var reply = { id: msg.id };
+      try {
+        if (msg.type === 'load') {
+          schema = null;
+          schema = JSON.parse(new TextDecoder().decode(msg.buffer));
+          reply.result = true;
+        } else if (!schema) {
+          throw new Error('No schema loaded');
+        } else if (msg.type === 'context') {
+          reply.result = _promptContextParts(schema, msg.query || '');
+        } else if (msg.type === 'tool') {
+          reply.result = getApiRequestTool(schema);
+        } else if (msg.type === 'search') {
+          reply.result = _endpointMatches(schema, msg.query || '', msg.k);
+        } else {
+          throw new Error('Unknown request: ' + msg.type);
+        }
+      } catch (err) {
+        reply.error = String((err && err.message) || err);
+      }
+      scope.postMessage(reply);
+    };
+  }
+  DocBuddy._serveSchemaRequests = _serveSchemaRequests;
+
+  if (typeof WorkerGlobalScope !== 'undefined' && self instanceof WorkerGlobalScope) {
+    _serveSchemaRequests(self);
+  }
+
   // ── Markdown parser initialization (marked.js) ────────────────────────────
   var marked = (typeof window.marked !== 'undefined') ? window.marked : null;
   function initMarked() {
@@ -650,6 +1408,203 @@
   }
   DocBuddy.parseMarkdown = parseMarkdown;
 
+  // ── Incremental markdown rendering ──────────────────────────────────────────
+  // Streaming replies grow by a few characters per token. Re-parsing and
+  // re-sanitizing the whole reply for every token is quadratic, so replies are
+  // split into top-level blocks (separated by blank lines outside fenced code)
+  // and only blocks that changed are rendered again. Completed blocks keep
+  // their sanitized HTML in a per-message cache.
+
+  var MARKDOWN_CACHE_LIMIT = 200;
+
+  var MARKDOWN_LIST_ITEM = /^ {0,3}(?:[-*+]|\d{1,9}[.)])(?:[ \t]|$)/;
+  var MARKDOWN_LINK_DEFINITION = /^ {0,3}\[[^\]\n]+\]:/;
+
+  // Returns the offsets, after ``start`` (which must be at a block start),
+  // at which a new top-level block begins: the first unindented line after a
+  // blank line. Indented lines continue the previous block (nested content),
+  // as do further items of a list (so loose lists stay one list) and link
+  // reference definitions.
+  function _markdownBoundaries(text, start) {
+    var boundaries = [];
+    var fence = null;
+    var prevBlank = false;
+    var inList = false;
+    var pos = start;
+    while (pos < text.length) {
+      var nl = text.indexOf('\n', pos);
+      if (nl === -1) {
+        // The last line may still be growing, but once it starts with a
+        // non-space character after a blank line it begins a new block,
+        // unless it is (or may still become) a list item or a definition.
+        var last = text.slice(pos);
+        var pending = (inList && /^(?:[-*+]|\d{1,9}[.)]?)$/.test(last)) ||
+          /^\[[^\]]*\]?$/.test(last) || MARKDOWN_LINK_DEFINITION.test(last) ||
+          (inList && MARKDOWN_LIST_ITEM.test(last));
+        if (!fence && prevBlank && /^\S/.test(last) && !pending) boundaries.push(pos);
+        break;
+      }
+      var line = text.slice(pos, nl);
+      var fenceMatch = /^ {0,3}(`{3,}|~{3,})(.*)$/.exec(line);
+      if (fence) {
+        if (fenceMatch && fenceMatch[1].charAt(0) === fence.charAt(0) &&
+            fenceMatch[1].length >= fence.length && !fenceMatch[2].trim()) {
+          fence = null;
+        }
+      } else if (!line.trim()) {
+        prevBlank = true;
+        pos = nl + 1;
+        continue;
+      } else {
+        var isItem = MARKDOWN_LIST_ITEM.test(line);
+        var continues = /^[ \t]/.test(line) || (inList && isItem) ||
+          MARKDOWN_LINK_DEFINITION.test(line);
+        if (prevBlank && !continues) {
+          boundaries.push(pos);
+          inList = false;
+        }
+        if (isItem) inList = true;
+        if (fenceMatch) fence = fenceMatch[1];
+      }
+      prevBlank = false;
+      pos = nl + 1;
+    }
+    return boundaries;
+  }
+
+  // Splits ``text`` into top-level markdown blocks. The last block may still
+  // be unfinished; all the others are complete.
+  function splitMarkdownBlocks(text) {
+    if (!text) return [];
+    var boundaries = _markdownBoundaries(text, 0);
+    var blocks = [];
+    var start = 0;
+    for (var i = 0; i < boundaries.length; i++) {
+      blocks.push(text.slice(start, boundaries[i]));
+      start = boundaries[i];
+    }
+    blocks.push(text.slice(start));
+    return blocks;
+  }
+
+  // All link reference definitions in ``text``, one per line
+  function _markdownLinkDefinitions(text) {
+    return text.split('\n').filter(function(line) {
+      return MARKDOWN_LINK_DEFINITION.test(line);
+    }).join('\n');
+  }
+
+  // Creates a renderer for one message. ``render(text)`` returns sanitized
+  // HTML for ``text``; when ``text`` extends the previously rendered text,
+  // completed blocks are reused and only new blocks are parsed. Link
+  // reference definitions apply to the whole message, so every block is
+  // parsed with them appended, and all blocks are parsed again when they
+  // change.
+  function createMarkdownRenderer(parse) {
+    parse = parse || parseMarkdown;
+    var doneSource = '';  // text of all completed blocks
+    var doneHtml = '';
+    var doneDefinitions = '';
+    var tailSource = null;
+    var tailHtml = '';
+
+    return {
+      render: function(text) {
+        text = text || '';
+        var definitions = _markdownLinkDefinitions(text);
+        if (definitions !== doneDefinitions) {
+          doneDefinitions = definitions;
+          tailSource = null;
+          doneSource = '';
+          doneHtml = '';
+        } else if (text.slice(0, doneSource.length) !== doneSource) {
+          doneSource = '';
+          doneHtml = '';
+        }
+        var parseBlock = function(block) {
+          return parse(definitions ? block + '\n\n' + definitions : block);
+        };
+        var start = doneSource.length;
+        var boundaries = _markdownBoundaries(text, start);
+        for (var i = 0; i < boundaries.length; i++) {
+          var block = text.slice(start, boundaries[i]);
+          // Usually the block was the unfinished tail on the previous render
+          doneHtml += block === tailSource ? tailHtml : parseBlock(block);
+          start = boundaries[i];
+        }
+        doneSource = text.slice(0, start);
+        var tail = text.slice(start);
+        if (tail !== tailSource) {
+          tailSource = tail;
+          tailHtml = tail.trim() ? parseBlock(tail) : '';
+        }
+        return doneHtml + tailHtml;
+      }
+    };
+  }
+
+  // Renderers keyed by message id, so every re-render of the history reuses
+  // the HTML of messages (and blocks) that have not changed.
+  var _markdownRenderers = new Map();
+
+  function renderMarkdownCached(key, text) {
+    if (key == null) return parseMarkdown(text);
+    var renderer = _markdownRenderers.get(key);
+    if (renderer) {
+      _markdownRenderers.delete(key);  // re-insert to keep recently used last
+    } else {
+      renderer = createMarkdownRenderer();
+      if (_markdownRenderers.size >= MARKDOWN_CACHE_LIMIT) {
+        _markdownRenderers.delete(_markdownRenderers.keys().next().value);
+      }
+    }
+    _markdownRenderers.set(key, renderer);
+    return renderer.render(text);
+  }
+
+  // Coalesces rapid updates into at most one ``flush(value)`` per animation
+  // frame, always with the most recent value. ``flush()`` on the batcher runs
+  // a pending update immediately and ``cancel()`` drops it.
+  function createFrameBatcher(flush) {
+    var pending = false;
+    var value;
+    var handle = null;
+    var raf = typeof requestAnimationFrame === 'function'
+      ? function(fn) { return requestAnimationFrame(fn); }
+      : function(fn) { return setTimeout(fn, 16); };
+    var caf = typeof cancelAnimationFrame === 'function'
+      ? function(h) { cancelAnimationFrame(h); }
+      : function(h) { clearTimeout(h); };
+
+    function run() {
+      handle = null;
+      if (!pending) return;
+      pending = false;
+      flush(value);
+    }
+
+    return {
+      push: function(next) {
+        value = next;
+        pending = true;
+        if (handle === null) handle = raf(run);
+      },
+      flush: function() {
+        if (handle !== null) { caf(handle); handle = null; }
+        run();
+      },
+      cancel: function() {
+        if (handle !== null) { caf(handle); handle = null; }
+        pending = false;
+      }
+    };
+  }
+
+  DocBuddy.splitMarkdownBlocks = splitMarkdownBlocks;
+  DocBuddy.createMarkdownRenderer = createMarkdownRenderer;
+  DocBuddy.renderMarkdownCached = renderMarkdownCached;
+  DocBuddy.createFrameBatcher = createFrameBatcher;
+
   // ── Theme default configurations ─────────────────────────────────────────────
   var THEME_DEFINITIONS = {
     dark: {
@@ -692,6 +1647,58 @@
   var AGENT_HISTORY_KEY = 'docbuddy-agent-history';
   var API_BASE_URL_KEY = "docbuddy-api-base-url";
   var AUTO_DETECT_API_URL_KEY = "docbuddy-auto-detect-api-url";
+  var MODEL_CACHE_KEY = "docbuddy-model-cache";
+
+  // ── Persistent OpenAPI schema cache ───────────────────────────────────────
+  // The schema response is kept in Cache Storage along with its validators.
+  // Page loads send a conditional GET and, on the usual 304, read the stored
+  // copy instead of downloading the whole document again. Responses without
+  // an ETag or Last-Modified are not stored. Without Cache Storage (insecure
+  // origins, old browsers) this is a plain fetch.
+  var SCHEMA_CACHE_NAME = 'docbuddy-openapi-v1';
+
+  function _schemaJson(res) {
+    if (!res.ok) throw new Error('HTTP ' + res.status);
+    if (typeof Worker === 'undefined' || typeof res.arrayBuffer !== 'function' ||
+        typeof TextDecoder === 'undefined') {
+      return res.json();
+    }
+    // Keep the bytes for the schema worker (see _schemaWorkerFor)
+    return res.arrayBuffer().then(function(buffer) {
+      var schema = JSON.parse(new TextDecoder().decode(buffer));
+      if (schema && typeof schema === 'object' &&
+          listOperations(schema).length > RETRIEVAL_OPTIONS.minOperations) {
+        _schemaSources.set(schema, buffer);
+      }
+      return schema;
+    });
+  }
+
+  function fetchOpenApiSchema(url) {
+    if (typeof caches === 'undefined') return fetch(url).then(_schemaJson);
+    return caches.open(SCHEMA_CACHE_NAME).then(function(cache) {
+      return cache.match(url).then(function(stored) {
+        var headers = {};
+        var etag = stored && stored.headers.get('ETag');
+        var lastModified = stored && stored.headers.get('Last-Modified');
+        if (etag) headers['If-None-Match'] = etag;
+        else if (lastModified) headers['If-Modified-Since'] = lastModified;
+        // no-store keeps the HTTP cache from turning the 304 into a 200
+        return fetch(url, { headers: headers, cache: 'no-store' }).then(function(res) {
+          if (res.status === 304 && stored) return _schemaJson(stored);
+          if (res.ok && (res.headers.get('ETag') || res.headers.get('Last-Modified'))) {
+            cache.put(url, res.clone()).catch(function() {});
+          } else if (stored) {
+            cache.delete(url).catch(function() {});
+          }
+          return _schemaJson(res);
+        });
+      });
+    }, function() {
+      return fetch(url).then(_schemaJson);
+    });
+  }
+  DocBuddy.fetchOpenApiSchema = fetchOpenApiSchema;
 
   // ── In-memory cache for OpenAPI schema ────────────────────────────────────
   DocBuddy._cachedOpenapiSchema = null;
@@ -699,6 +1706,44 @@
   DocBuddy._schemaFetchUrl = null;
   DocBuddy._schemaFetchFailed = false;
 
+  // Caches the schema ``schemaReady`` resolves to as the document at
+  // ``fetchUrl``. The server digest describes the app's own schema; it is
+  // fetched alongside and ignored on failure (the browser builds it instead).
+  function _trackSchemaLoad(fetchUrl, schemaReady) {
+    DocBuddy._schemaFetchUrl = fetchUrl;
+    DocBuddy._schemaFetchFailed = false;
+    var digestUrl = window.DOCBUDDY_DIGEST_URL;
+    var digestReady = (digestUrl && fetchUrl === window.DOCBUDDY_OPENAPI_URL)
+      ? fetch(digestUrl)
+          .then(function(res) { return res.ok ? res.json() : null; })
+          .catch(function() { return null; })
+      : Promise.resolve(null);
+    DocBuddy._openapiSchemaFetchPromise = schemaReady
+      .then(function(schema) {
+        return Promise.all([schema, digestReady]);
+      })
+      .then(function(results) {
+        var schema = results[0];
+        var digest = results[1];
+        if (digest && digest.openapi_url === fetchUrl) {
+          applyOpenApiDigest(schema, digest);
+        }
+        // Only cache if this fetch is still current (prevents race conditions)
+        if (DocBuddy._schemaFetchUrl === fetchUrl) {
+          DocBuddy._cachedOpenapiSchema = schema;
+          DocBuddy._openapiSchemaFetchPromise = null;
+        }
+        return schema;
+      })
+      .catch(function(err) {
+        if (DocBuddy._schemaFetchUrl === fetchUrl) {
+          DocBuddy._schemaFetchFailed = true;
+          DocBuddy._openapiSchemaFetchPromise = null;
+        }
+        console.warn('Failed to fetch OpenAPI schema:', err);
+      });
+  }
+
   function ensureOpenapiSchemaCached(onDone) {
     var targetUrl = window.DOCBUDDY_OPENAPI_URL || "/openapi.json";
     if (DocBuddy._cachedOpenapiSchema) {
@@ -717,29 +1762,7 @@
       return;
     }
     if (!DocBuddy._openapiSchemaFetchPromise) {
-      var fetchUrl = targetUrl;
-      DocBuddy._schemaFetchUrl = fetchUrl;
-      DocBuddy._schemaFetchFailed = false;
-      DocBuddy._openapiSchemaFetchPromise = fetch(fetchUrl)
-        .then(function(res) {
-          if (!res.ok) throw new Error('HTTP ' + res.status);
-          return res.json();
-        })
-        .then(function(schema) {
-          // Only cache if this fetch is still current (prevents race conditions)
-          if (DocBuddy._schemaFetchUrl === fetchUrl) {
-            DocBuddy._cachedOpenapiSchema = schema;
-            DocBuddy._openapiSchemaFetchPromise = null;
-          }
-          return schema;
-        })
-        .catch(function(err) {
-          if (DocBuddy._schemaFetchUrl === fetchUrl) {
-            DocBuddy._schemaFetchFailed = true;
-            DocBuddy._openapiSchemaFetchPromise = null;
-          }
-          console.warn('Failed to fetch OpenAPI schema:', err);
-        });
+      _trackSchemaLoad(targetUrl, fetchOpenApiSchema(targetUrl));
     }
     if (onDone) {
       DocBuddy._openapiSchemaFetchPromise.then(onDone).catch(function() {});
@@ -747,6 +1770,38 @@
   }
   DocBuddy.ensureOpenapiSchemaCached = ensureOpenapiSchemaCached;
 
+  // ── Sharing Swagger UI's copy of the schema ───────────────────────────────
+  // Swagger UI downloads and parses ``openapi_url`` itself. Rather than
+  // fetching the same document again, DocBuddyPlugin calls awaitSwaggerSpec()
+  // when Swagger UI is created, so ensureOpenapiSchemaCached waits for the
+  // spec, and adoptSwaggerSpec() with the parsed document (or null if the
+  // download failed, in which case DocBuddy fetches it after all).
+  var _pendingSwaggerSpec = null;
+
+  function awaitSwaggerSpec(url) {
+    var targetUrl = window.DOCBUDDY_OPENAPI_URL || "/openapi.json";
+    if (!url || url !== targetUrl) return false;
+    if (DocBuddy._schemaFetchUrl === url &&
+        (DocBuddy._cachedOpenapiSchema || DocBuddy._openapiSchemaFetchPromise)) {
+      return false;
+    }
+    var pending = { url: url };
+    var specReady = new Promise(function(resolve) { pending.resolve = resolve; });
+    _pendingSwaggerSpec = pending;
+    _trackSchemaLoad(url, specReady);
+    return true;
+  }
+  DocBuddy.awaitSwaggerSpec = awaitSwaggerSpec;
+
+  function adoptSwaggerSpec(url, spec) {
+    var pending = _pendingSwaggerSpec;
+    if (!pending || pending.url !== url) return false;
+    _pendingSwaggerSpec = null;
+    pending.resolve(spec && typeof spec === 'object' ? spec : fetchOpenApiSchema(url));
+    return true;
+  }
+  DocBuddy.adoptSwaggerSpec = adoptSwaggerSpec;
+
   // ── Theme loading/saving functions ─────────────────────────────────────────
   function loadTheme() {
     try {
@@ -792,6 +1847,297 @@
   }
   DocBuddy.saveToStorage = saveToStorage;
 
+  // ── Conversation history store ────────────────────────────────────────────
+  // Chat and agent messages are kept in IndexedDB, one record per message keyed
+  // by [conversation, id], with a per-conversation sequence number for
+  // ordering. Saving a history array only writes the messages whose object
+  // changed since the last save (React state replaces updated messages with
+  // new objects), so a long session costs one small asynchronous write per new
+  // message instead of re-serializing the whole array into localStorage.
+  // Older messages are loaded a page at a time. When IndexedDB is unavailable
+  // the store falls back to the previous (truncated) localStorage format.
+
+  var HISTORY_DB_NAME = 'docbuddy-history';
+  var HISTORY_DB_VERSION = 2;
+  var HISTORY_STORE_NAME = 'messages';
+  var WORKFLOW_CACHE_STORE_NAME = 'workflow-cache';
+  var HISTORY_PAGE_SIZE = 50;
+
+  var _historyDbPromise = null;
+
+  // Resolves to an open database, or null when IndexedDB cannot be used.
+  function _openHistoryDb() {
+    if (_historyDbPromise) return _historyDbPromise;
+    _historyDbPromise = new Promise(function(resolve) {
+      var request;
+      try {
+        if (typeof indexedDB === 'undefined' || !indexedDB) { resolve(null); return; }
+        request = indexedDB.open(HISTORY_DB_NAME, HISTORY_DB_VERSION);
+      } catch (e) {
+        resolve(null);
+        return;
+      }
+      request.onupgradeneeded = function() {
+        var db = request.result;
+        if (!db.objectStoreNames.contains(HISTORY_STORE_NAME)) {
+          var store = db.createObjectStore(HISTORY_STORE_NAME, { keyPath: ['conversation', 'id'] });
+          store.createIndex('seq', ['conversation', 'seq']);
+        }
+        if (!db.objectStoreNames.contains(WORKFLOW_CACHE_STORE_NAME)) {
+          db.createObjectStore(WORKFLOW_CACHE_STORE_NAME, { keyPath: 'key' }).createIndex('usedAt', 'usedAt');
+        }
+      };
+      request.onsuccess = function() {
+        var db = request.result;
+        // Let the standalone page delete the database when it loads a new API
+        db.onversionchange = function() {
+          db.close();
+          _historyDbPromise = null;
+        };
+        resolve(db);
+      };
+      request.onerror = function() {
+        console.warn('IndexedDB unavailable, keeping history in localStorage:', request.error);
+        resolve(null);
+      };
+      request.onblocked = function() { resolve(null); };
+    });
+    return _historyDbPromise;
+  }
+
+  function _idbRequest(request) {
+    return new Promise(function(resolve, reject) {
+      request.onsuccess = function() { resolve(request.result); };
+      request.onerror = function() { reject(request.error); };
+    });
+  }
+
+  function _seqRange(conversation, before) {
+    return IDBKeyRange.bound(
+      [conversation, -Infinity],
+      [conversation, before == null ? Infinity : before],
+      false,
+      before != null
+    );
+  }
+
+  // Reads up to ``limit`` records with seq < ``before``, newest first.
+  function _readHistoryRecords(db, conversation, before, limit) {
+    return new Promise(function(resolve, reject) {
+      var records = [];
+      var tx = db.transaction(HISTORY_STORE_NAME, 'readonly');
+      var request = tx.objectStore(HISTORY_STORE_NAME).index('seq')
+        .openCursor(_seqRange(conversation, before), 'prev');
+      request.onsuccess = function() {
+        var cursor = request.result;
+        if (cursor && records.length < limit) {
+          records.push(cursor.value);
+          cursor.continue();
+        } else {
+          resolve(records);
+        }
+      };
+      request.onerror = function() { reject(request.error); };
+    });
+  }
+
+  var _anonymousMessageIds = typeof WeakMap === 'function' ? new WeakMap() : null;
+
+  function _historyMessageId(msg) {
+    if (msg.messageId) return msg.messageId;
+    if (!_anonymousMessageIds) return null;
+    var id = _anonymousMessageIds.get(msg);
+    if (!id) {
+      id = generateMessageId();
+      _anonymousMessageIds.set(msg, id);
+    }
+    return id;
+  }
+
+  // Compares ``messages`` with the messages last written (``written``, a Map
+  // of id -> message object) and returns what has to be stored or removed.
+  function _diffHistory(written, messages) {
+    var put = [];
+    var present = new Map();
+    for (var i = 0; i < messages.length; i++) {
+      var id = _historyMessageId(messages[i]);
+      if (id == null) continue;
+      present.set(id, true);
+      if (written.get(id) !== messages[i]) put.push({ id: id, message: messages[i] });
+    }
+    var remove = [];
+    written.forEach(function(_, id) {
+      if (!present.has(id)) remove.push(id);
+    });
+    return { put: put, remove: remove };
+  }
+
+  // Creates the store for one conversation. ``legacyKey``/``legacyLimit``
+  // describe the localStorage format used before (and as the fallback).
+  function createHistoryStore(conversation, legacyKey, legacyLimit) {
+    var written = new Map();  // id -> message object last stored
+    var seqs = new Map();     // id -> sequence number
+    var nextSeq = 0;
+    var oldestSeq = null;
+    var ready = null;
+    var readyFor = null;
+    var pending = Promise.resolve();
+
+    function loadLegacy() {
+      try {
+        var raw = localStorage.getItem(legacyKey);
+        return raw ? JSON.parse(raw) : [];
+      } catch (e) {
+        return [];
+      }
+    }
+
+    function saveLegacy(messages) {
+      try {
+        localStorage.setItem(legacyKey, JSON.stringify(messages.slice(-legacyLimit)));
+      } catch (e) {
+        // ignore
+      }
+    }
+
+    // Opens the database, finds the next sequence number and migrates any
+    // history left in localStorage. Resolves to the database or null.
+    function init() {
+      // Start over if the database was closed (deleted by the standalone page)
+      if (ready && readyFor === _openHistoryDb()) return ready;
+      readyFor = _openHistoryDb();
+      written.clear();
+      seqs.clear();
+      oldestSeq = null;
+      ready = readyFor.then(function(db) {
+        if (!db) return null;
+        return _readHistoryRecords(db, conversation, null, 1).then(function(last) {
+          nextSeq = last.length ? last[0].seq + 1 : 0;
+          var legacy = loadLegacy();
+          if (!legacy.length) return db;
+          return (nextSeq === 0 ? write(db, { put: legacy.map(function(m) {
+            return { id: _historyMessageId(m), message: m };
+          }), remove: [] }) : Promise.resolve()).then(function() {
+            try { localStorage.removeItem(legacyKey); } catch (e) {}
+            return db;
+          });
+        });
+      }).catch(function(err) {
+        console.warn('Failed to open history store:', err);
+        return null;
+      });
+      return ready;
+    }
+
+    function write(db, changes) {
+      return new Promise(function(resolve, reject) {
+        var tx = db.transaction(HISTORY_STORE_NAME, 'readwrite');
+        var store = tx.objectStore(HISTORY_STORE_NAME);
+        changes.put.forEach(function(entry) {
+          var seq = seqs.get(entry.id);
+          if (seq == null) {
+            seq = nextSeq++;
+            seqs.set(entry.id, seq);
+          }
+          store.put({ conversation: conversation, id: entry.id, seq: seq, message: entry.message });
+          written.set(entry.id, entry.message);
+        });
+        changes.remove.forEach(function(id) {
+          store.delete([conversation, id]);
+          written.delete(id);
+          seqs.delete(id);
+        });
+        tx.oncomplete = function() { resolve(); };
+        tx.onerror = function() { reject(tx.error); };
+        tx.onabort = function() { reject(tx.error); };
+      });
+    }
+
+    // Chains ``fn(db)`` after earlier writes so they apply in order.
+    function enqueue(fn) {
+      pending = pending.then(init).then(function(db) {
+        return fn(db);
+      }).catch(function(err) {
+        console.warn('Failed to update history store:', err);
+      });
+      return pending;
+    }
+
+    function remember(records) {
+      var messages = [];
+      for (var i = records.length - 1; i >= 0; i--) {
+        written.set(records[i].id, records[i].message);
+        seqs.set(records[i].id, records[i].seq);
+        messages.push(records[i].message);
+      }
+      if (records.length) oldestSeq = records[records.length - 1].seq;
+      return messages;
+    }
+
+    return {
+      // Resolves to ``{ messages, hasMore }`` with the most recent ``limit``
+      // messages (oldest first). Pass ``{ older: true }`` to load the page
+      // before the oldest message loaded so far.
+      loadPage: function(options) {
+        var opts = options || {};
+        var limit = opts.limit || HISTORY_PAGE_SIZE;
+        return pending.then(init).then(function(db) {
+          if (!db) return { messages: opts.older ? [] : loadLegacy(), hasMore: false };
+          if (opts.older && oldestSeq === null) return { messages: [], hasMore: false };
+          var before = opts.older ? oldestSeq : null;
+          return _readHistoryRecords(db, conversation, before, limit + 1).then(function(records) {
+            var hasMore = records.length > limit;
+            return { messages: remember(records.slice(0, limit)), hasMore: hasMore };
+          });
+        });
+      },
+
+      // Persists ``messages`` (the loaded part of the history) asynchronously.
+      // An empty array clears the whole conversation.
+      save: function(messages) {
+        if (!messages.length) return this.clear();
+        var snapshot = messages.slice();
+        return enqueue(function(db) {
+          if (!db) { saveLegacy(snapshot); return; }
+          var changes = _diffHistory(written, snapshot);
+          if (changes.put.length || changes.remove.length) return write(db, changes);
+        });
+      },
+
+      clear: function() {
+        return enqueue(function(db) {
+          written.clear();
+          seqs.clear();
+          oldestSeq = null;
+          try { localStorage.removeItem(legacyKey); } catch (e) {}
+          if (!db) return;
+          var tx = db.transaction(HISTORY_STORE_NAME, 'readwrite');
+          return _idbRequest(tx.objectStore(HISTORY_STORE_NAME).delete(
+            IDBKeyRange.bound([conversation, ''], [conversation, []])
+          ));
+        });
+      }
+    };
+  }
+  DocBuddy.createHistoryStore = createHistoryStore;
+  DocBuddy._diffHistory = _diffHistory;
+
+  // Combines a page loaded from the store with the messages already shown.
+  // Messages added while the page was loading are kept after the page;
+  // messages without an id can only have come from the legacy format, which
+  // the page already contains.
+  function mergeLoadedHistory(loaded, current) {
+    var ids = {};
+    loaded.forEach(function(m) { if (m.messageId) ids[m.messageId] = true; });
+    return loaded.concat((current || []).filter(function(m) {
+      return m.messageId && !ids[m.messageId];
+    }));
+  }
+  DocBuddy.mergeLoadedHistory = mergeLoadedHistory;
+
+  var chatHistoryStore = createHistoryStore('chat', CHAT_HISTORY_KEY, 20);
+  DocBuddy.chatHistoryStore = chatHistoryStore;
+
   function loadChatHistory() {
     try {
       var raw = localStorage.getItem(CHAT_HISTORY_KEY);
@@ -803,11 +2149,7 @@
   DocBuddy.loadChatHistory = loadChatHistory;
 
   function saveChatHistory(messages) {
-    try {
-      localStorage.setItem(CHAT_HISTORY_KEY, JSON.stringify(messages.slice(-20)));
-    } catch (e) {
-      // ignore
-    }
+    chatHistoryStore.save(messages);
   }
   DocBuddy.saveChatHistory = saveChatHistory;
 
@@ -826,27 +2168,258 @@
     } catch (e) {
       console.error('Failed to export:', e);
     }
-  }
-  DocBuddy.exportAsJson = exportAsJson;
+  }
+  DocBuddy.exportAsJson = exportAsJson;
+
+  function loadToolSettings() {
+    try {
+      var raw = localStorage.getItem(TOOL_SETTINGS_KEY);
+      return raw ? JSON.parse(raw) : { enableTools: false, autoExecute: false, apiKey: '' };
+    } catch (e) {
+      return { enableTools: false, autoExecute: false, apiKey: '' };
+    }
+  }
+  DocBuddy.loadToolSettings = loadToolSettings;
+
+  function saveToolSettings(settings) {
+    try {
+      localStorage.setItem(TOOL_SETTINGS_KEY, JSON.stringify(settings));
+    } catch (e) {
+      // ignore
+    }
+  }
+  DocBuddy.saveToolSettings = saveToolSettings;
+
+  // ── API tool execution ─────────────────────────────────────────────────────
+  // Tool calls with these methods do not change server state, so the agent
+  // may run several of them from one assistant turn concurrently.
+  var SAFE_TOOL_METHODS = ['GET', 'HEAD'];
+  var DEFAULT_MAX_PARALLEL_REQUESTS = 4;
+  DocBuddy.DEFAULT_MAX_PARALLEL_REQUESTS = DEFAULT_MAX_PARALLEL_REQUESTS;
+
+  function _toolCallArgs(toolCall) {
+    try {
+      return JSON.parse((toolCall && toolCall.function && toolCall.function.arguments) || '{}') || {};
+    } catch (e) {
+      return {};
+    }
+  }
+  DocBuddy.toolCallArgs = _toolCallArgs;
+
+  function isSafeToolCall(toolCall) {
+    var method = String(_toolCallArgs(toolCall).method || 'GET').toUpperCase();
+    return SAFE_TOOL_METHODS.indexOf(method) !== -1;
+  }
+  DocBuddy.isSafeToolCall = isSafeToolCall;
+
+  // Configured concurrency limit for safe tool calls (at least 1)
+  function getMaxParallelRequests(toolSettings) {
+    var n = parseInt((toolSettings || loadToolSettings()).maxParallelRequests, 10);
+    return n >= 1 ? n : DEFAULT_MAX_PARALLEL_REQUESTS;
+  }
+  DocBuddy.getMaxParallelRequests = getMaxParallelRequests;
+
+  // Executes ``api_request`` tool arguments ({method, path, path_params,
+  // query_params, body}) against the target API. Resolves to
+  // {status, statusText, body} and never rejects: invalid paths and network
+  // failures resolve with status 0 so they can be reported to the model.
+  // Pass a ``cache`` (see createToolResponseCache) to reuse GET/HEAD answers
+  // within a session.
+  function executeApiRequest(args, signal, cache) {
+    var method = String(args.method || 'GET').toUpperCase();
+    var url = args.path || '';
+    try { url = decodeURIComponent(url); } catch (e) { console.warn('Failed to decode URL component:', e); }
+    if (!url || !/^\//.test(url)) {
+      return Promise.resolve({ status: 0, statusText: 'Blocked', body: 'Tool call path must be a relative URL starting with /' });
+    }
+
+    var pathParams = args.path_params || {};
+    Object.keys(pathParams).forEach(function(key) {
+      url = url.replace('{' + key + '}', encodeURIComponent(pathParams[key]));
+    });
+    // Re-validate after substitution so parameter values cannot escape the path
+    if (/\.\./.test(url)) {
+      return Promise.resolve({ status: 0, statusText: 'Blocked', body: 'Tool call path must not contain ".."' });
+    }
+
+    var queryParams = args.query_params || {};
+    var queryKeys = Object.keys(queryParams);
+    if (queryKeys.length > 0) {
+      var qs = queryKeys.map(function(k) {
+        return encodeURIComponent(k) + '=' + encodeURIComponent(queryParams[k]);
+      }).join('&');
+      url += (url.indexOf('?') >= 0 ? '&' : '?') + qs;
+    }
+    url = resolveApiBaseUrl(DocBuddy._cachedOpenapiSchema) + url;
+
+    var headers = {};
+    var toolSettings = loadToolSettings();
+    var toolApiKey = toolSettings.apiKey && typeof toolSettings.apiKey === 'string' ? toolSettings.apiKey.trim() : '';
+    if (toolApiKey) {
+      headers['Authorization'] = 'Bearer ' + toolApiKey;
+    }
+    var fetchOpts = { method: method, headers: headers };
+    if ((method === 'POST' || method === 'PUT' || method === 'PATCH') && args.body != null) {
+      headers['Content-Type'] = 'application/json';
+      fetchOpts.body = typeof args.body === 'string' ? args.body : JSON.stringify(args.body);
+    }
+    if (signal) fetchOpts.signal = signal;
+
+    return (cache ? cache.request(url, fetchOpts) : _fetchText(url, fetchOpts).then(_plainResponse))
+      .catch(function(err) {
+        console.error('[Agent Tool Call Error]', err.message);
+        return { status: 0, statusText: err.name === 'AbortError' ? 'Aborted' : 'Network Error', body: err.message };
+      });
+  }
+  DocBuddy.executeApiRequest = executeApiRequest;
+
+  function _fetchText(url, fetchOpts) {
+    return fetch(url, fetchOpts).then(function(res) {
+      return res.text().then(function(text) {
+        return { status: res.status, statusText: res.statusText, body: text, headers: res.headers };
+      });
+    });
+  }
+
+  function _plainResponse(res) {
+    return { status: res.status, statusText: res.statusText, body: res.body };
+  }
+
+  // ── Session cache for tool responses ──────────────────────────────────────
+  // Agent loops and retries often repeat the same GET. Each panel session
+  // keeps the 2xx answers to GET/HEAD calls for TOOL_CACHE_TTL_MS (shorter
+  // when Cache-Control max-age says so, never with no-store). Stale entries
+  // with an ETag or Last-Modified are revalidated with a conditional request.
+  // Any other method invalidates every entry whose path overlaps its own
+  // (the same path, a parent or a child), before and after it runs. Entries
+  // are keyed by the credentials sent too, so switching the tool API key
+  // never serves another identity's answer.
+  var TOOL_CACHE_TTL_MS = 30000;
+
+  function _splitRequestUrl(url) {
+    var q = url.indexOf('?');
+    var path = (q < 0 ? url : url.slice(0, q)).replace(/\/+$/, '');
+    var query = q < 0 ? '' : url.slice(q + 1).split('&').filter(Boolean).sort().join('&');
+    return { path: path, key: path + (query ? '?' + query : '') };
+  }
+
+  function _pathsOverlap(a, b) {
+    return a === b || a.indexOf(b + '/') === 0 || b.indexOf(a + '/') === 0;
+  }
+
+  // Freshness in ms allowed by a Cache-Control header, or null if the
+  // response must not be stored
+  function _toolCacheLifetime(cacheControl, ttl) {
+    var cc = String(cacheControl || '').toLowerCase();
+    if (/(^|[,\s])no-store\b/.test(cc)) return null;
+    if (/(^|[,\s])no-cache\b/.test(cc)) return 0;
+    var maxAge = /(^|[,\s])max-age\s*=\s*(\d+)/.exec(cc);
+    return maxAge ? Math.min(parseInt(maxAge[2], 10) * 1000, ttl) : ttl;
+  }
+
+  function createToolResponseCache(ttlMs) {
+    var ttl = ttlMs != null ? ttlMs : TOOL_CACHE_TTL_MS;
+    var entries = new Map();
+    // GETs in flight; an overlapping write (or clear()) marks them stale so
+    // they do not store what they read
+    var pending = new Set();
+
+    function invalidate(path) {
+      entries.forEach(function(entry, key) {
+        if (_pathsOverlap(entry.path, path)) entries.delete(key);
+      });
+      pending.forEach(function(read) {
+        if (path === null || _pathsOverlap(read.path, path)) read.stale = true;
+      });
+    }
 
-  function loadToolSettings() {
-    try {
-      var raw = localStorage.getItem(TOOL_SETTINGS_KEY);
-      return raw ? JSON.parse(raw) : { enableTools: false, autoExecute: false, apiKey: '' };
-    } catch (e) {
-      return { enableTools: false, autoExecute: false, apiKey: '' };
+    // Like fetch followed by res.text(): resolves to {status, statusText,
+    // body} (plus ``cached: true`` when answered from the cache) and rejects
+    // on network errors.
+    function request(url, fetchOpts) {
+      var method = String(fetchOpts.method || 'GET').toUpperCase();
+      var target = _splitRequestUrl(url);
+      if (SAFE_TOOL_METHODS.indexOf(method) === -1) {
+        invalidate(target.path);
+        return _fetchText(url, fetchOpts).then(function(res) {
+          invalidate(target.path);
+          return _plainResponse(res);
+        });
+      }
+
+      var auth = fetchOpts.headers && fetchOpts.headers['Authorization'];
+      var key = method + ' ' + target.key + (auth ? ' ' + hashString(auth) : '');
+      var entry = entries.get(key);
+      var now = Date.now();
+      if (entry && now < entry.expires) {
+        return Promise.resolve(Object.assign({ cached: true }, entry.response));
+      }
+      var headers = Object.assign({}, fetchOpts.headers);
+      if (entry && entry.etag) headers['If-None-Match'] = entry.etag;
+      else if (entry && entry.lastModified) headers['If-Modified-Since'] = entry.lastModified;
+      var read = { path: target.path, stale: false };
+      pending.add(read);
+      var done = function() { pending.delete(read); };
+
+      return _fetchText(url, Object.assign({}, fetchOpts, { headers: headers })).then(function(res) {
+        done();
+        var lifetime = _toolCacheLifetime(res.headers && res.headers.get('Cache-Control'), ttl);
+        if (res.status === 304 && entry) {
+          if (lifetime == null) entries.delete(key);
+          else entry.expires = now + lifetime;
+          return Object.assign({ cached: true }, entry.response);
+        }
+        var response = _plainResponse(res);
+        var etag = res.headers && res.headers.get('ETag');
+        var lastModified = res.headers && res.headers.get('Last-Modified');
+        if (res.status >= 200 && res.status < 300 && lifetime != null &&
+            (lifetime > 0 || etag || lastModified) && !read.stale) {
+          entries.set(key, {
+            path: target.path, response: response, expires: now + lifetime,
+            etag: etag, lastModified: lastModified
+          });
+        } else {
+          entries.delete(key);
+        }
+        return response;
+      }, function(err) {
+        done();
+        throw err;
+      });
     }
-  }
-  DocBuddy.loadToolSettings = loadToolSettings;
 
-  function saveToolSettings(settings) {
-    try {
-      localStorage.setItem(TOOL_SETTINGS_KEY, JSON.stringify(settings));
-    } catch (e) {
-      // ignore
+    return {
+      request: request,
+      invalidate: invalidate,
+      clear: function() { entries.clear(); invalidate(null); },
+      size: function() { return entries.size; }
+    };
+  }
+  DocBuddy.createToolResponseCache = createToolResponseCache;
+
+  // Calls ``worker(item, index)`` for every item with at most ``limit`` calls
+  // pending at once. Resolves to the results in input order, whatever order
+  // they completed in.
+  function mapWithConcurrency(items, limit, worker) {
+    var results = new Array(items.length);
+    var next = 0;
+    function runNext() {
+      if (next >= items.length) return Promise.resolve();
+      var i = next++;
+      return Promise.resolve()
+        .then(function() { return worker(items[i], i); })
+        .then(function(value) {
+          results[i] = value;
+          return runNext();
+        });
+    }
+    var runners = [];
+    for (var k = 0; k < Math.min(Math.max(1, limit), items.length); k++) {
+      runners.push(runNext());
     }
+    return Promise.all(runners).then(function() { return results; });
   }
-  DocBuddy.saveToolSettings = saveToolSettings;
+  DocBuddy.mapWithConcurrency = mapWithConcurrency;
 
   // ── API Base URL helpers ───────────────────────────────────────────────────
   function loadApiBaseUrl() {
@@ -916,7 +2489,205 @@
   }
   DocBuddy.createDefaultBlock = createDefaultBlock;
 
+  // ── Workflow dependency graph ──────────────────────────────────────────────
+  // A block may list the ids of earlier blocks it needs in ``dependsOn``.
+  // Blocks without ``dependsOn`` (including every workflow saved before
+  // dependencies existed) depend on the block right before them, so plain
+  // workflows still run strictly in sequence. Returns the dependency indices
+  // of every block. Only earlier blocks count, so the graph has no cycles.
+  function workflowDependencies(blocks) {
+    var indexById = {};
+    blocks.forEach(function(block, i) { indexById[block.id] = i; });
+    return blocks.map(function(block, i) {
+      if (!Array.isArray(block.dependsOn)) return i > 0 ? [i - 1] : [];
+      var deps = [];
+      block.dependsOn.forEach(function(id) {
+        var j = indexById[id];
+        if (j !== undefined && j < i && deps.indexOf(j) === -1) deps.push(j);
+      });
+      return deps.sort(function(a, b) { return a - b; });
+    });
+  }
+  DocBuddy.workflowDependencies = workflowDependencies;
+
+  // Indices of all blocks ``idx`` depends on, directly or transitively, in
+  // block order
+  function workflowUpstream(deps, idx) {
+    var seen = {};
+    var stack = deps[idx].slice();
+    while (stack.length) {
+      var j = stack.pop();
+      if (!seen[j]) {
+        seen[j] = true;
+        stack.push.apply(stack, deps[j]);
+      }
+    }
+    return Object.keys(seen).map(Number).sort(function(a, b) { return a - b; });
+  }
+  DocBuddy.workflowUpstream = workflowUpstream;
+
+  // Calls ``runTask(i)`` (which may return a promise) for every node once all
+  // of ``deps[i]`` have finished, with at most ``limit`` tasks in flight.
+  // Ready nodes start in index order. Once ``shouldStop()`` returns true no
+  // new task starts. Resolves when nothing is running any more.
+  function runTaskGraph(deps, limit, runTask, shouldStop) {
+    var max = Math.max(1, limit || 1);
+    var state = deps.map(function() { return 'waiting'; });
+    var active = 0;
+    return new Promise(function(resolve) {
+      function start(i) {
+        state[i] = 'running';
+        active++;
+        var finish = function() {
+          state[i] = 'done';
+          active--;
+          pump();
+        };
+        Promise.resolve().then(function() { return runTask(i); }).then(finish, finish);
+      }
+      function pump() {
+        if (!(shouldStop && shouldStop())) {
+          for (var i = 0; i < deps.length && active < max; i++) {
+            if (state[i] === 'waiting' && deps[i].every(function(d) { return state[d] === 'done'; })) {
+              start(i);
+            }
+          }
+        }
+        if (active === 0) resolve();
+      }
+      pump();
+    });
+  }
+  DocBuddy.runTaskGraph = runTaskGraph;
+
+  // ── Workflow block cache ───────────────────────────────────────────────────
+  // A finished block's output and tool-call transcript are stored under a hash
+  // of the request that produced them: the model, sampling settings, system
+  // prompt (which embeds the API context), the upstream blocks' messages and
+  // the block's own prompt. Re-running a workflow after editing one block
+  // therefore replays the unchanged blocks from the cache and only calls the
+  // LLM from the first block whose request differs. Entries live in the
+  // history database (so loading another API in the standalone page drops
+  // them too) and the least recently used ones are evicted beyond
+  // WORKFLOW_CACHE_LIMIT. Without IndexedDB the cache is per page load.
+
+  var WORKFLOW_CACHE_LIMIT = 200;
+  // Bump to invalidate every stored entry when the key or entry format changes
+  var WORKFLOW_CACHE_VERSION = 1;
+
+  // 53-bit non-cryptographic string hash (cyrb53), as 14 hex digits
+  function hashString(str) {
+    var h1 = 0xdeadbeef;
+    var h2 = 0x41c6ce57;
+    for (var i = 0; i < str.length; i++) {
+      var ch = str.charCodeAt(i);
+      h1 = Math.imul(h1 ^ ch, 2654435761);
+      h2 = Math.imul(h2 ^ ch, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    var hi = ((h2 >>> 0) & 0x1fffff).toString(16);
+    var lo = (h1 >>> 0).toString(16);
+    return '000000'.slice(hi.length) + hi + '00000000'.slice(lo.length) + lo;
+  }
+  DocBuddy.hashString = hashString;
+
+  // Cache key of a block's chat completion request. ``stream`` does not change
+  // the answer, so it is left out.
+  function workflowCacheKey(url, payload) {
+    var request = Object.assign({}, payload);
+    delete request.stream;
+    return hashString(JSON.stringify([WORKFLOW_CACHE_VERSION, url, request]));
+  }
+  DocBuddy.workflowCacheKey = workflowCacheKey;
+
+  // Creates a cache of ``{ output, messages, durationMs }`` entries keyed by
+  // workflowCacheKey(). ``get`` resolves to the entry or null, ``put`` and
+  // ``clear`` resolve once stored. Storage errors only cost cache hits.
+  function createWorkflowCache(limit) {
+    var max = limit || WORKFLOW_CACHE_LIMIT;
+    var memory = new Map();  // key -> entry, least recently used first
+
+    function remember(entry) {
+      memory.delete(entry.key);
+      memory.set(entry.key, entry);
+      while (memory.size > max) memory.delete(memory.keys().next().value);
+    }
+
+    function withStore(mode, fn) {
+      return _openHistoryDb().then(function(db) {
+        if (!db) return null;
+        var tx = db.transaction(WORKFLOW_CACHE_STORE_NAME, mode);
+        return fn(tx.objectStore(WORKFLOW_CACHE_STORE_NAME), tx);
+      }).catch(function(err) {
+        console.warn('Workflow cache unavailable:', err);
+        return null;
+      });
+    }
+
+    // Deletes the least recently used entries beyond ``max``
+    function evict(store) {
+      return _idbRequest(store.count()).then(function(count) {
+        var excess = count - max;
+        if (excess <= 0) return;
+        return new Promise(function(resolve, reject) {
+          var request = store.index('usedAt').openCursor();
+          request.onsuccess = function() {
+            var cursor = request.result;
+            if (cursor && excess-- > 0) {
+              cursor.delete();
+              cursor.continue();
+            } else {
+              resolve();
+            }
+          };
+          request.onerror = function() { reject(request.error); };
+        });
+      });
+    }
+
+    return {
+      get: function(key) {
+        var entry = memory.get(key);
+        if (entry) {
+          remember(entry);
+          return Promise.resolve(entry);
+        }
+        return withStore('readwrite', function(store) {
+          return _idbRequest(store.get(key)).then(function(found) {
+            if (!found) return null;
+            found.usedAt = Date.now();
+            store.put(found);
+            remember(found);
+            return found;
+          });
+        });
+      },
+
+      put: function(key, value) {
+        var entry = Object.assign({}, value, { key: key, usedAt: Date.now() });
+        remember(entry);
+        return withStore('readwrite', function(store) {
+          store.put(entry);
+          return evict(store);
+        });
+      },
+
+      clear: function() {
+        memory.clear();
+        return withStore('readwrite', function(store) {
+          return _idbRequest(store.clear());
+        });
+      }
+    };
+  }
+  DocBuddy.createWorkflowCache = createWorkflowCache;
+  DocBuddy.workflowCache = createWorkflowCache(WORKFLOW_CACHE_LIMIT);
+
   // ── Agent storage helpers ──────────────────────────────────────────────────
+  var agentHistoryStore = createHistoryStore('agent', AGENT_HISTORY_KEY, 30);
+  DocBuddy.agentHistoryStore = agentHistoryStore;
+
   function loadAgentHistory() {
     try {
       var raw = localStorage.getItem(AGENT_HISTORY_KEY);
@@ -928,11 +2699,7 @@
   DocBuddy.loadAgentHistory = loadAgentHistory;
 
   function saveAgentHistory(messages) {
-    try {
-      localStorage.setItem(AGENT_HISTORY_KEY, JSON.stringify(messages.slice(-30)));
-    } catch (e) {
-      // ignore
-    }
+    agentHistoryStore.save(messages);
   }
   DocBuddy.saveAgentHistory = saveAgentHistory;
 
@@ -944,7 +2711,6 @@
   var SET_TEMPERATURE = "LLM_SET_TEMPERATURE";
   var SET_CONNECTION_STATUS = "LLM_SET_CONNECTION_STATUS";
   var SET_PROVIDER = "LLM_SET_PROVIDER";
-  var SET_OPENAPI_SCHEMA = "LLM_SET_OPENAPI_SCHEMA";
   var SET_THEME = "LLM_SET_THEME";
   var SET_CUSTOM_COLOR = "LLM_SET_CUSTOM_COLOR";
 
@@ -953,12 +2719,11 @@
   var storedTheme = loadTheme();
   var storedToolSettings = loadToolSettings();
 
+  // The schema is not prefetched here: Swagger UI downloads it and
+  // DocBuddyPlugin shares that copy (see awaitSwaggerSpec). On the standalone
+  // page the URL isn't known until the user clicks Load.
   document.addEventListener('DOMContentLoaded', function() {
     window.applyLLMTheme(storedTheme.theme, storedTheme.customColors);
-    // Skip eager prefetch on standalone page — URL isn't known until user clicks Load
-    if (!IS_STANDALONE) {
-      ensureOpenapiSchemaCached();
-    }
   });
 
   var DEFAULT_STATE = {
@@ -966,6 +2731,7 @@
     apiKey: storedSettings.apiKey || "",
     modelId: storedSettings.modelId || "llama3",
     maxTokens: storedSettings.maxTokens != null ? storedSettings.maxTokens : 4096,
+    contextWindow: storedSettings.contextWindow != null ? storedSettings.contextWindow : 32768,
     temperature: storedSettings.temperature != null ? storedSettings.temperature : 0.7,
     provider: storedSettings.provider || "ollama",
     connectionStatus: "disconnected",
@@ -1041,8 +2807,6 @@
           provider: action.payload,
           baseUrl: provider.url
         });
-      case SET_OPENAPI_SCHEMA:
-        return Object.assign({}, state, { openapiSchema: action.payload });
       case SET_THEME:
         var newTheme = action.payload;
         if (!THEME_DEFINITIONS[newTheme]) {
@@ -1075,7 +2839,6 @@
     setTemperature: function (value) { return { type: SET_TEMPERATURE, payload: value }; },
     setConnectionStatus: function (value) { return { type: SET_CONNECTION_STATUS, payload: value }; },
     setProvider: function (value) { return { type: SET_PROVIDER, payload: value }; },
-    setOpenApiSchema: function (schema) { return { type: SET_OPENAPI_SCHEMA, payload: schema }; },
     setTheme: function (value) { return { type: SET_THEME, payload: value }; },
     setCustomColor: function (value) { return { type: SET_CUSTOM_COLOR, payload: value }; },
     // Tool settings actions
@@ -1095,7 +2858,6 @@
     getConnectionStatus: function (state) { return state.connectionStatus; },
     getProvider: function (state) { return state.provider; },
     getChatHistory: function (state) { return state.chatHistory || []; },
-    getOpenApiSchema: function (state) { return state.openapiSchema; },
     getLastError: function (state) { return state.lastError; },
     getTheme: function (state) { return state.theme; },
     getCustomColors: function (state) { return state.customColors; },
@@ -1431,6 +3193,185 @@
   }
   DocBuddy.createCodeBlock = createCodeBlock;
 
+  // ── VirtualList Component - windowed rendering for long message lists ─────
+  // Only the rows near the viewport are mounted. Row heights are measured
+  // after render (and on resize) and cached by key; rows that have never been
+  // mounted use an estimate. A list scrolled to the bottom stays pinned there
+  // as rows grow, which keeps streaming replies in view.
+
+  // Returns the rows to mount: ``start``..``end`` (exclusive) plus the space
+  // taken by the rows before and after them. ``heights`` are full row heights,
+  // including the gap each row renders as bottom padding.
+  function computeVirtualWindow(heights, scrollTop, viewportHeight, overscan) {
+    var top = Math.max(0, scrollTop - overscan);
+    var bottom = scrollTop + viewportHeight + overscan;
+    var offset = 0;
+    var start = 0;
+    while (start < heights.length && offset + heights[start] <= top) {
+      offset += heights[start];
+      start++;
+    }
+    var before = offset;
+    var end = start;
+    while (end < heights.length && offset < bottom) {
+      offset += heights[end];
+      end++;
+    }
+    var after = 0;
+    for (var i = end; i < heights.length; i++) after += heights[i];
+    return { start: start, end: end, before: before, after: after };
+  }
+  DocBuddy.computeVirtualWindow = computeVirtualWindow;
+
+  var STICK_TO_BOTTOM_THRESHOLD = 32;
+
+  function createVirtualList(React) {
+    return class VirtualList extends React.Component {
+      constructor(props) {
+        super(props);
+        this.state = { scrollTop: 0, viewportHeight: 800, measured: 0 };
+        this._heights = new Map();   // key -> measured height
+        this._rows = new Map();      // key -> mounted row element
+        this._rowRefs = new Map();   // key -> memoized ref callback
+        this._container = null;
+        this._headerHeight = 0;
+        this._atBottom = true;
+        this._setContainer = this._setContainer.bind(this);
+        this._handleScroll = this._handleScroll.bind(this);
+        var self = this;
+        this._scrollBatcher = createFrameBatcher(function() {
+          var el = self._container;
+          if (el) self.setState({ scrollTop: el.scrollTop, viewportHeight: el.clientHeight });
+        });
+        this._resizeObserver = typeof ResizeObserver === 'function'
+          ? new ResizeObserver(function() { self._measure(); self._scrollBatcher.push(); })
+          : null;
+      }
+
+      componentDidMount() {
+        this._measure();
+        if (this._container) {
+          this.setState({ viewportHeight: this._container.clientHeight });
+          if (this._resizeObserver) this._resizeObserver.observe(this._container);
+        }
+      }
+
+      componentDidUpdate() {
+        this._measure();
+        this._pinToBottom();
+      }
+
+      componentWillUnmount() {
+        this._scrollBatcher.cancel();
+        if (this._resizeObserver) this._resizeObserver.disconnect();
+      }
+
+      _setContainer(el) {
+        this._container = el;
+      }
+
+      _rowRef(key) {
+        var ref = this._rowRefs.get(key);
+        if (!ref) {
+          var self = this;
+          ref = function(el) {
+            var previous = self._rows.get(key);
+            if (previous && self._resizeObserver) self._resizeObserver.unobserve(previous);
+            if (el) {
+              self._rows.set(key, el);
+              if (self._resizeObserver) self._resizeObserver.observe(el);
+            } else {
+              self._rows.delete(key);
+              self._rowRefs.delete(key);
+            }
+          };
+          this._rowRefs.set(key, ref);
+        }
+        return ref;
+      }
+
+      // Reads the heights of the mounted rows; re-renders if any changed.
+      _measure() {
+        var changed = false;
+        var heights = this._heights;
+        this._rows.forEach(function(el, key) {
+          var height = el.offsetHeight;
+          if (height && heights.get(key) !== height) {
+            heights.set(key, height);
+            changed = true;
+          }
+        });
+        if (this._header) this._headerHeight = this._header.offsetHeight;
+        if (changed) {
+          this._pinToBottom();
+          this.setState(function(prev) { return { measured: prev.measured + 1 }; });
+        }
+      }
+
+      _pinToBottom() {
+        var el = this._container;
+        if (el && this._atBottom && el.scrollTop + el.clientHeight < el.scrollHeight) {
+          el.scrollTop = el.scrollHeight;
+        }
+      }
+
+      _handleScroll() {
+        var el = this._container;
+        if (!el) return;
+        this._atBottom = el.scrollTop + el.clientHeight >= el.scrollHeight - STICK_TO_BOTTOM_THRESHOLD;
+        this._scrollBatcher.push();
+      }
+
+      render() {
+        var self = this;
+        var props = this.props;
+        var items = props.items || [];
+        var gap = props.gap || 0;
+        // Measured heights include the row's bottom padding; estimates don't
+        var estimate = (props.estimatedHeight || 80) + gap;
+        var keys = [];
+        var heights = [];
+        for (var i = 0; i < items.length; i++) {
+          var key = props.getKey(items[i], i);
+          keys.push(key);
+          heights.push(this._heights.has(key) ? this._heights.get(key) : estimate);
+        }
+        var win = computeVirtualWindow(
+          heights,
+          Math.max(0, this.state.scrollTop - this._headerHeight),
+          this.state.viewportHeight,
+          props.overscan != null ? props.overscan : 600
+        );
+
+        var children = [];
+        if (props.header) {
+          children.push(React.createElement("div", {
+            key: "__header",
+            ref: function(el) { self._header = el; }
+          }, props.header));
+        }
+        if (!items.length && props.empty) children.push(React.createElement("div", { key: "__empty" }, props.empty));
+        children.push(React.createElement("div", { key: "__before", style: { height: win.before + "px" } }));
+        for (var j = win.start; j < win.end; j++) {
+          children.push(React.createElement("div", {
+            key: keys[j],
+            ref: this._rowRef(keys[j]),
+            style: { display: "flow-root", paddingBottom: gap + "px" }
+          }, props.renderItem(items[j], j)));
+        }
+        children.push(React.createElement("div", { key: "__after", style: { height: win.after + "px" } }));
+
+        return React.createElement("div", {
+          id: props.id,
+          ref: this._setContainer,
+          onScroll: this._handleScroll,
+          style: props.style
+        }, children);
+      }
+    };
+  }
+  DocBuddy.createVirtualList = createVirtualList;
+
   // ── Helper: map chat history to API message format ──────────────────────────
   function buildApiMessages(history) {
     return history.map(function(m) {
@@ -1444,6 +3385,363 @@
   }
   DocBuddy.buildApiMessages = buildApiMessages;
 
+  // ── Token-budgeted prompt assembly ─────────────────────────────────────────
+  // The request has to fit in the model's context window together with the
+  // reply (``max_tokens``) and the tool definitions. Token counts are
+  // estimated (no tokenizer is shipped); when the prompt is too large, the
+  // lowest-value parts go first: old tool results are condensed, then the
+  // oldest turns are dropped, then tool results of the current turn are
+  // condensed and, as a last resort, the system context is truncated.
+
+  var DEFAULT_CONTEXT_WINDOW = 32768;
+  var PROMPT_OPTIONS = {
+    safetyMargin: 0.05,        // fraction of the budget kept free for estimation error
+    lowWaterMark: 0.75,        // after trimming, history fills at most this fraction
+    condensedToolTokens: 200,  // size old tool results are condensed to
+    minSystemShare: 0.25       // the system context keeps at least this share
+  };
+  var MESSAGE_OVERHEAD_TOKENS = 4;
+
+  // Approximates BPE token counts: about one token per 4 letters of a word,
+  // per 3 digits and per symbol or non-ASCII character; whitespace is free.
+  function estimateTokens(text) {
+    if (!text) return 0;
+    if (typeof text !== 'string') text = JSON.stringify(text);
+    var count = 0;
+    var re = /[A-Za-z]+|[0-9]+|\S/g;
+    var match;
+    while ((match = re.exec(text)) !== null) {
+      var run = match[0];
+      var c = run.charCodeAt(0);
+      if (c >= 48 && c <= 57) count += Math.ceil(run.length / 3);
+      else if (run.length > 1 || (c >= 65 && c <= 90) || (c >= 97 && c <= 122)) count += Math.ceil(run.length / 4);
+      else count += 1;
+    }
+    return count;
+  }
+  DocBuddy.estimateTokens = estimateTokens;
+
+  function estimateMessageTokens(msg) {
+    var tokens = MESSAGE_OVERHEAD_TOKENS + estimateTokens(msg.content);
+    if (msg.tool_calls) tokens += estimateTokens(JSON.stringify(msg.tool_calls));
+    return tokens;
+  }
+  DocBuddy.estimateMessageTokens = estimateMessageTokens;
+
+  // Cuts ``text`` to about ``maxTokens`` tokens, keeping the beginning.
+  function truncateToTokens(text, maxTokens) {
+    var tokens = estimateTokens(text);
+    if (tokens <= maxTokens) return text;
+    var note = '\n…[truncated ' + text.length + ' characters]';
+    var keep = Math.max(0, Math.floor(text.length * (maxTokens - estimateTokens(note)) / tokens));
+    return text.slice(0, keep) + '\n…[truncated ' + (text.length - keep) + ' characters]';
+  }
+  DocBuddy.truncateToTokens = truncateToTokens;
+
+  // Groups messages into units that must be kept or dropped together: an
+  // assistant message with tool calls stays with the tool results answering it.
+  function _promptUnits(messages) {
+    var units = [];
+    for (var i = 0; i < messages.length; i++) {
+      var msg = messages[i];
+      if (msg.role === 'tool' && units.length && units[units.length - 1].hasToolCalls) {
+        units[units.length - 1].messages.push(msg);
+      } else {
+        units.push({ messages: [msg], hasToolCalls: !!(msg.tool_calls && msg.tool_calls.length) });
+      }
+    }
+    return units;
+  }
+
+  function _unitTokens(unit) {
+    var total = 0;
+    for (var i = 0; i < unit.messages.length; i++) total += estimateMessageTokens(unit.messages[i]);
+    return total;
+  }
+
+  function _condenseToolResults(unit, maxTokens) {
+    var changed = false;
+    var messages = unit.messages.map(function(msg) {
+      if (msg.role !== 'tool' || typeof msg.content !== 'string') return msg;
+      var content = condenseToolMessage(msg.content, maxTokens);
+      if (content === msg.content) return msg;
+      changed = true;
+      return Object.assign({}, msg, { content: content });
+    });
+    return changed ? { messages: messages, hasToolCalls: unit.hasToolCalls } : unit;
+  }
+
+  // Builds the message list for one request.
+  //
+  // options:
+  //   system        — system prompt text
+  //   history       — API messages (see buildApiMessages), oldest first; the
+  //                   current turn starts at the last user message
+  //   tools         — tool definitions sent with the request (counted only)
+  //   contextWindow — model context size in tokens
+  //   maxTokens     — tokens reserved for the reply
+  //   context       — optional context for the current turn (see
+  //                   getPromptLayout)
+  //   note          — optional per-request state (e.g. agent mode and
+  //                   iteration)
+  //
+  // context and note are appended to the last user message in a <context>
+  // block, so the prompt keeps exactly one leading system message and the
+  // system prefix stays byte-stable across turns.
+  //   trimState     — optional object kept per conversation; once history has
+  //                   been trimmed the cut point only moves forward, so the
+  //                   prompt prefix stays stable across turns
+  //
+  // Returns { messages, tokens, budget, dropped, condensed }.
+  function assemblePrompt(options) {
+    var history = options.history || [];
+    var contextWindow = parseInt(options.contextWindow, 10) || DEFAULT_CONTEXT_WINDOW;
+    var maxTokens = parseInt(options.maxTokens, 10) || 0;
+    var budget = Math.floor((contextWindow - maxTokens - estimateTokens(options.tools && JSON.stringify(options.tools))) *
+      (1 - PROMPT_OPTIONS.safetyMargin));
+    var trimState = options.trimState || {};
+    if (!(trimState.start <= history.length)) trimState.start = 0;
+
+    var currentStart = history.length;
+    for (var i = history.length - 1; i >= 0; i--) {
+      if (history[i].role === 'user') { currentStart = i; break; }
+    }
+    var start = Math.min(trimState.start, currentStart);
+    var past = _promptUnits(history.slice(start, currentStart));
+    var current = _promptUnits(history.slice(currentStart));
+
+    var system = options.system || '';
+    var turnContext = [options.context, options.note].filter(Boolean).join('\n\n');
+    var suffix = turnContext ? '<context>\n' + turnContext + '\n</context>' : '';
+    var extraTokens = !suffix ? 0 :
+      current.length ? estimateTokens('\n\n' + suffix) : estimateMessageTokens({ content: suffix });
+    var systemTokens = estimateMessageTokens({ content: system }) + extraTokens;
+    var sum = function(units) {
+      return units.reduce(function(total, unit) { return total + _unitTokens(unit); }, 0);
+    };
+    var currentTokens = sum(current);
+    var pastTokens = sum(past);
+    var dropped = start;
+    var condensed = 0;
+
+    if (systemTokens + currentTokens + pastTokens > budget) {
+      // 1. Condense tool results in earlier turns
+      past = past.map(function(unit) {
+        var next = _condenseToolResults(unit, PROMPT_OPTIONS.condensedToolTokens);
+        if (next !== unit) condensed++;
+        return next;
+      });
+      pastTokens = sum(past);
+    }
+    if (systemTokens + currentTokens + pastTokens > budget) {
+      // 2. Drop the oldest turns, down to the low-water mark so the next few
+      //    turns can be appended without trimming (and changing the prefix)
+      var target = Math.max(0, budget * PROMPT_OPTIONS.lowWaterMark - systemTokens - currentTokens);
+      while (past.length && pastTokens > target) {
+        var unit = past.shift();
+        pastTokens -= _unitTokens(unit);
+        dropped += unit.messages.length;
+        start += unit.messages.length;
+      }
+      // Never start the history with a reply
+      while (past.length && past[0].messages[0].role !== 'user') {
+        var reply = past.shift();
+        pastTokens -= _unitTokens(reply);
+        dropped += reply.messages.length;
+        start += reply.messages.length;
+      }
+    }
+    if (systemTokens + currentTokens + pastTokens > budget) {
+      // 3. Condense tool results of the current turn to share what is left
+      var toolCount = 0;
+      var toolTokens = 0;
+      current.forEach(function(unit) {
+        unit.messages.forEach(function(msg) {
+          if (msg.role === 'tool') {
+            toolCount++;
+            toolTokens += estimateTokens(msg.content);
+          }
+        });
+      });
+      if (toolCount) {
+        var available = budget - systemTokens - pastTokens - (currentTokens - toolTokens);
+        var share = Math.max(PROMPT_OPTIONS.condensedToolTokens, Math.floor(available / toolCount));
+        current = current.map(function(unit) {
+          var next = _condenseToolResults(unit, share);
+          if (next !== unit) condensed++;
+          return next;
+        });
+        currentTokens = sum(current);
+      }
+    }
+    if (systemTokens + currentTokens + pastTokens > budget) {
+      // 4. Truncate the system context
+      var systemBudget = Math.max(Math.floor(budget * PROMPT_OPTIONS.minSystemShare),
+        budget - currentTokens - pastTokens) - MESSAGE_OVERHEAD_TOKENS;
+      if (systemBudget < systemTokens) {
+        system = truncateToTokens(system, systemBudget - extraTokens);
+        systemTokens = estimateMessageTokens({ content: system }) + extraTokens;
+        condensed++;
+      }
+    }
+    trimState.start = start;
+
+    var messages = [{ role: 'system', content: system }];
+    past.forEach(function(unit) {
+      messages.push.apply(messages, unit.messages);
+    });
+    current.forEach(function(unit, i) {
+      if (i === 0 && suffix) {
+        var user = unit.messages[0];
+        messages.push(Object.assign({}, user, { content: (user.content || '') + '\n\n' + suffix }));
+        messages.push.apply(messages, unit.messages.slice(1));
+      } else {
+        messages.push.apply(messages, unit.messages);
+      }
+    });
+    if (!current.length && suffix) messages.push({ role: 'user', content: suffix });
+    return {
+      messages: messages,
+      tokens: systemTokens + pastTokens + currentTokens,
+      budget: budget,
+      dropped: dropped,
+      condensed: condensed
+    };
+  }
+  DocBuddy.assemblePrompt = assemblePrompt;
+  DocBuddy.PROMPT_OPTIONS = PROMPT_OPTIONS;
+
+  // ── Tool result condensation ──────────────────────────────────────────────
+  // API responses are cut to a token budget before they reach the model.
+  // JSON bodies are shrunk structurally so they stay valid JSON: arrays keep
+  // their first items plus a note with the total, long strings and key names
+  // are elided, objects keep their first keys and name the rest, and deep
+  // nesting is summarised. Each level is stricter than the one before; the
+  // first that fits the budget wins. If none fits, the body is replaced by a
+  // summary of its shape (still JSON). Anything else is truncated as text.
+  var TOOL_RESULT_TOKENS = 1000;
+  var TOOL_CONDENSE_LEVELS = [
+    { items: 50, chars: 500, keys: 50, keyChars: 64, depth: 8 },
+    { items: 20, chars: 200, keys: 30, keyChars: 48, depth: 6 },
+    { items: 10, chars: 100, keys: 20, keyChars: 32, depth: 5 },
+    { items: 5, chars: 60, keys: 12, keyChars: 24, depth: 4 },
+    { items: 3, chars: 40, keys: 8, keyChars: 16, depth: 3 },
+    { items: 1, chars: 20, keys: 5, keyChars: 12, depth: 2 }
+  ];
+  // Keys listed by the shape summary, from most to fewest
+  var TOOL_SUMMARY_KEYS = [50, 20, 5, 0];
+  DocBuddy.TOOL_RESULT_TOKENS = TOOL_RESULT_TOKENS;
+
+  function _shortKey(key, chars) {
+    return key.length <= chars ? key : key.slice(0, chars) + '…';
+  }
+
+  function _condenseJson(value, level, depth) {
+    if (typeof value === 'string') {
+      if (value.length <= level.chars) return value;
+      return value.slice(0, level.chars) + '…[+' + (value.length - level.chars) + ' chars]';
+    }
+    if (value === null || typeof value !== 'object') return value;
+    if (Array.isArray(value)) {
+      if (depth >= level.depth && value.length) return '…[' + value.length + ' items]';
+      var items = value.slice(0, level.items).map(function(item) {
+        return _condenseJson(item, level, depth + 1);
+      });
+      if (value.length > level.items) {
+        items.push('…[' + (value.length - level.items) + ' more items, ' + value.length + ' total]');
+      }
+      return items;
+    }
+    var keys = Object.keys(value);
+    if (depth >= level.depth && keys.length) return '…{' + keys.length + ' keys}';
+    var out = {};
+    keys.slice(0, level.keys).forEach(function(key) {
+      var name = _shortKey(key, level.keyChars);
+      if (name !== key && Object.prototype.hasOwnProperty.call(out, name)) name = key;
+      out[name] = _condenseJson(value[key], level, depth + 1);
+    });
+    if (keys.length > level.keys) {
+      var omitted = keys.slice(level.keys);
+      out['…omitted'] = omitted.length + ' keys: ' + omitted.slice(0, level.keys).map(function(key) {
+        return _shortKey(key, level.keyChars);
+      }).join(', ') + (omitted.length > level.keys ? ', …' : '');
+    }
+    return out;
+  }
+
+  // ``string(12)``, ``array(3)``, ``object(5)``, ``number``, ...
+  function _jsonShape(value) {
+    if (value === null) return 'null';
+    if (typeof value === 'string') return 'string(' + value.length + ')';
+    if (Array.isArray(value)) return 'array(' + value.length + ')';
+    if (typeof value === 'object') return 'object(' + Object.keys(value).length + ')';
+    return typeof value;
+  }
+
+  // Last resort: the type and length of ``value`` and of its first ``limit``
+  // members (the first item of an array)
+  function _summarizeJson(value, limit) {
+    var last = TOOL_CONDENSE_LEVELS[TOOL_CONDENSE_LEVELS.length - 1];
+    if (Array.isArray(value)) {
+      var summary = { '…summary': 'array of ' + value.length + ' items' };
+      if (limit && value.length) summary['…first item'] = _jsonShape(value[0]);
+      return summary;
+    }
+    var keys = Object.keys(value);
+    var out = { '…summary': 'object with ' + keys.length + ' keys' };
+    if (limit && keys.length) {
+      var shapes = {};
+      keys.slice(0, limit).forEach(function(key) {
+        shapes[_shortKey(key, last.keyChars)] = _jsonShape(value[key]);
+      });
+      out['…keys'] = shapes;
+    }
+    return out;
+  }
+
+  // Fits a response body into ``maxTokens`` (default TOOL_RESULT_TOKENS),
+  // keeping JSON objects and arrays valid.
+  function condenseToolResponse(body, maxTokens) {
+    var text = body == null ? '' : String(body);
+    var budget = maxTokens || TOOL_RESULT_TOKENS;
+    if (estimateTokens(text) <= budget) return text;
+    var value;
+    try {
+      value = JSON.parse(text);
+    } catch (e) {
+      return truncateToTokens(text, budget);
+    }
+    if (value === null || typeof value !== 'object') return truncateToTokens(text, budget);
+    var condensed = text;
+    for (var i = 0; i < TOOL_CONDENSE_LEVELS.length; i++) {
+      condensed = JSON.stringify(_condenseJson(value, TOOL_CONDENSE_LEVELS[i], 0));
+      if (estimateTokens(condensed) <= budget) return condensed;
+    }
+    for (var j = 0; j < TOOL_SUMMARY_KEYS.length; j++) {
+      condensed = JSON.stringify(_summarizeJson(value, TOOL_SUMMARY_KEYS[j]));
+      if (estimateTokens(condensed) <= budget) return condensed;
+    }
+    // Smaller than any budget worth using; still valid JSON
+    return condensed;
+  }
+  DocBuddy.condenseToolResponse = condenseToolResponse;
+
+  // Tool message content for an executeApiRequest response
+  function formatToolResult(response, maxTokens) {
+    return 'Status: ' + response.status + ' ' + (response.statusText || '') + '\n\n' +
+      condenseToolResponse(response.body, maxTokens);
+  }
+  DocBuddy.formatToolResult = formatToolResult;
+
+  // Condenses the body of a formatted tool message, keeping its status line
+  function condenseToolMessage(content, maxTokens) {
+    var match = /^(Status: [^\n]*\n\n)([\s\S]*)$/.exec(content);
+    if (!match) return condenseToolResponse(content, maxTokens);
+    if (estimateTokens(content) <= maxTokens) return content;
+    return match[1] + condenseToolResponse(match[2], Math.max(1, maxTokens - estimateTokens(match[1])));
+  }
+  DocBuddy.condenseToolMessage = condenseToolMessage;
+
   // ── CSS injection helper ───────────────────────────────────────────────────
   function injectStyles(id, css) {
     if (typeof document === 'undefined') return;
@@ -1652,6 +3950,200 @@
   // Eagerly load system prompt config at module init (before DOMContentLoaded)
   loadSystemPromptConfig();
 
+  // ── LLM endpoint resolution ───────────────────────────────────────────────
+  // When the server mounts the LLM proxy (setup_docs(llm_proxy=...)), all
+  // provider calls go through it; otherwise the browser calls the provider.
+  function getLLMBaseUrl(settings) {
+    if (window.DOCBUDDY_LLM_PROXY_URL) return window.DOCBUDDY_LLM_PROXY_URL;
+    return ((settings && settings.baseUrl) || '').replace(/\/+$/, '');
+  }
+  DocBuddy.getLLMBaseUrl = getLLMBaseUrl;
+
+  // ── Model list cache and provider probing ─────────────────────────────────
+  // /models answers are cached per base URL for MODEL_CACHE_TTL_MS so the
+  // Settings model dropdown fills instantly when switching providers. Failed
+  // probes are cached for as long, so a closed port is not probed again every
+  // time Settings opens (an explicit refresh probes regardless). Probes run
+  // concurrently with a short timeout, so providers that are not running
+  // cost one PROVIDER_PROBE_TIMEOUT_MS in total rather than a timeout each.
+  var MODEL_CACHE_TTL_MS = 5 * 60 * 1000;
+  var MODEL_FETCH_TIMEOUT_MS = 10000;
+  var PROVIDER_PROBE_TIMEOUT_MS = 1500;
+  DocBuddy.MODEL_FETCH_TIMEOUT_MS = MODEL_FETCH_TIMEOUT_MS;
+
+  function _modelCacheUrl(baseUrl) {
+    return String(baseUrl || '').replace(/\/+$/, '');
+  }
+
+  function _loadModelCache() {
+    try {
+      var raw = localStorage.getItem(MODEL_CACHE_KEY);
+      var cache = raw ? JSON.parse(raw) : {};
+      return cache && typeof cache === 'object' ? cache : {};
+    } catch (e) {
+      return {};
+    }
+  }
+
+  // Cached model ids for ``baseUrl``, or null when missing or expired
+  function getCachedModels(baseUrl, now) {
+    var entry = _loadModelCache()[_modelCacheUrl(baseUrl)];
+    var t = now != null ? now : Date.now();
+    if (!entry || !Array.isArray(entry.models) || !(t - entry.fetchedAt < MODEL_CACHE_TTL_MS)) {
+      return null;
+    }
+    return entry.models;
+  }
+  DocBuddy.getCachedModels = getCachedModels;
+
+  // Error of a failed probe of ``baseUrl`` still within the TTL, or null
+  function getCachedProbeFailure(baseUrl, now) {
+    var entry = _loadModelCache()[_modelCacheUrl(baseUrl)];
+    var t = now != null ? now : Date.now();
+    if (!entry || typeof entry.error !== 'string' || !(t - entry.fetchedAt < MODEL_CACHE_TTL_MS)) {
+      return null;
+    }
+    return entry.error;
+  }
+  DocBuddy.getCachedProbeFailure = getCachedProbeFailure;
+
+  function _saveModelCacheEntry(baseUrl, entry, now) {
+    var t = now != null ? now : Date.now();
+    var cache = _loadModelCache();
+    // Drop expired entries so the cache does not grow with every URL typed
+    Object.keys(cache).forEach(function(url) {
+      if (!(cache[url] && t - cache[url].fetchedAt < MODEL_CACHE_TTL_MS)) delete cache[url];
+    });
+    cache[_modelCacheUrl(baseUrl)] = Object.assign({ fetchedAt: t }, entry);
+    try {
+      localStorage.setItem(MODEL_CACHE_KEY, JSON.stringify(cache));
+    } catch (e) {
+      // ignore
+    }
+  }
+
+  function saveCachedModels(baseUrl, models, now) {
+    _saveModelCacheEntry(baseUrl, { models: models }, now);
+  }
+  DocBuddy.saveCachedModels = saveCachedModels;
+
+  function clearModelCache() {
+    try {
+      localStorage.removeItem(MODEL_CACHE_KEY);
+    } catch (e) {
+      // ignore
+    }
+  }
+  DocBuddy.clearModelCache = clearModelCache;
+
+  // GET ``baseUrl``/models and resolve to the sorted model ids, refreshing the
+  // cache. Rejects with the HTTP or network error (an AbortError on timeout).
+  function fetchModels(baseUrl, apiKey, timeoutMs) {
+    var url = _modelCacheUrl(baseUrl);
+    var headers = { "Content-Type": "application/json" };
+    if (apiKey) {
+      headers["Authorization"] = "Bearer " + apiKey;
+    }
+    var controller = new AbortController();
+    var timeoutId = setTimeout(function() { controller.abort(); }, timeoutMs || MODEL_FETCH_TIMEOUT_MS);
+
+    return fetch(url + "/models", { method: 'GET', headers: headers, signal: controller.signal })
+      .then(function(res) {
+        if (!res.ok) {
+          return res.text().then(function(text) {
+            throw new Error('HTTP ' + res.status + ': ' + res.statusText + (text ? " - " + text : ""));
+          });
+        }
+        return res.json();
+      })
+      .then(function(data) {
+        clearTimeout(timeoutId);
+        if (data && data.error) {
+          throw new Error(data.details || data.error);
+        }
+        var models = [];
+        if (data && Array.isArray(data.data)) {
+          models = data.data
+            .map(function(m) { return m.id || m.name || ''; })
+            .filter(function(id) { return id !== ''; })
+            .sort();
+        }
+        saveCachedModels(url, models);
+        return models;
+      }, function(err) {
+        clearTimeout(timeoutId);
+        throw err;
+      });
+  }
+  DocBuddy.fetchModels = fetchModels;
+
+  // Probes every ``{url, apiKey}`` target at once and resolves to a map of
+  // base URL -> {ok, models, cached} (or {ok: false, error, cached}). Targets
+  // with a fresh cache entry, successful or not, are answered without a
+  // request unless ``force`` is set.
+  function probeModelEndpoints(targets, options) {
+    options = options || {};
+    var seen = {};
+    var unique = (targets || []).filter(function(t) {
+      var url = _modelCacheUrl(t && t.url);
+      if (!url || seen[url]) return false;
+      seen[url] = true;
+      return true;
+    });
+    return Promise.all(unique.map(function(t) {
+      var url = _modelCacheUrl(t.url);
+      var cached = options.force ? null : getCachedModels(url);
+      if (cached) {
+        return Promise.resolve([url, { ok: true, models: cached, cached: true }]);
+      }
+      var failure = options.force ? null : getCachedProbeFailure(url);
+      if (failure) {
+        return Promise.resolve([url, { ok: false, error: failure, cached: true }]);
+      }
+      return fetchModels(url, t.apiKey, options.timeoutMs || PROVIDER_PROBE_TIMEOUT_MS)
+        .then(function(models) {
+          return [url, { ok: true, models: models, cached: false }];
+        }, function(err) {
+          var error = err.name === 'AbortError' ? 'timeout' : (err.message || 'failed');
+          _saveModelCacheEntry(url, { error: error });
+          return [url, { ok: false, error: error }];
+        });
+    })).then(function(pairs) {
+      var results = {};
+      pairs.forEach(function(pair) { results[pair[0]] = pair[1]; });
+      return results;
+    });
+  }
+  DocBuddy.probeModelEndpoints = probeModelEndpoints;
+
+  function _isPageOrigin(url) {
+    try {
+      return !!(window.location && new URL(url).origin === window.location.origin);
+    } catch (e) {
+      return false;
+    }
+  }
+
+  // Probe targets for the Settings panel: the configured base URL and, with
+  // ``all`` (an explicit refresh), every other preset. Presets served from
+  // this page's own origin (e.g. a docs app on uvicorn's default :8000) are
+  // skipped. The API key is only sent to the configured URL, never to other
+  // presets. With the LLM proxy mounted there is a single endpoint.
+  function providerProbeTargets(settings, all) {
+    if (window.DOCBUDDY_LLM_PROXY_URL) {
+      return [{ url: window.DOCBUDDY_LLM_PROXY_URL, apiKey: settings && settings.apiKey }];
+    }
+    var current = _modelCacheUrl(settings && settings.baseUrl);
+    var targets = current ? [{ url: current, apiKey: settings.apiKey }] : [];
+    if (!all) return targets;
+    Object.keys(LLM_PROVIDERS).forEach(function(key) {
+      var url = _modelCacheUrl(LLM_PROVIDERS[key].url);
+      if (url && url !== current && !_isPageOrigin(url)) targets.push({ url: url, apiKey: '' });
+    });
+    return targets;
+  }
+  DocBuddy.providerProbeTargets = providerProbeTargets;
+
   // ── Shared SSE streaming helper ───────────────────────────────────────────
   // Handles the fetch + SSE parse loop so chat.js and agent.js share one
   // implementation. Callbacks let each panel wire its own state updates.
@@ -1706,8 +4198,10 @@
               try {
                 var chunk = JSON.parse(payloadData);
                 if (chunk.error) {
+                  var errMsg = typeof chunk.error === 'string' ? chunk.error
+                    : (chunk.error.message || JSON.stringify(chunk.error));
                   callbacks.onNetworkError(
-                    new Error(chunk.error + (chunk.details ? ': ' + chunk.details : '')),
+                    new Error(errMsg + (chunk.details ? ': ' + chunk.details : '')),
                     accumulated
                   );
                   return;
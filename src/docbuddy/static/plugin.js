@@ -292,6 +292,41 @@
 
     return {
       statePlugins: {
+        // Share Swagger UI's download of the schema with DocBuddy instead of
+        // fetching it a second time (see DocBuddy.awaitSwaggerSpec).
+        spec: {
+          wrapActions: {
+            download: function (oriAction, sys) {
+              return function (url) {
+                DB.awaitSwaggerSpec(url || sys.specSelectors.url());
+                return oriAction.apply(null, arguments);
+              };
+            },
+            updateSpec: function (oriAction, sys) {
+              return function () {
+                var result = oriAction.apply(null, arguments);
+                // Parsing dispatches updateJsonSpec synchronously; a spec that
+                // fails to parse never does, so fall back to DocBuddy's own fetch.
+                Promise.resolve().then(function () {
+                  DB.adoptSwaggerSpec(sys.specSelectors.url(), null);
+                });
+                return result;
+              };
+            },
+            updateJsonSpec: function (oriAction, sys) {
+              return function (json) {
+                DB.adoptSwaggerSpec(sys.specSelectors.url(), json);
+                return oriAction.apply(null, arguments);
+              };
+            },
+            updateLoadingStatus: function (oriAction, sys) {
+              return function (status) {
+                if (status === "failed") DB.adoptSwaggerSpec(sys.specSelectors.url(), null);
+                return oriAction.apply(null, arguments);
+              };
+            },
+          },
+        },
         llmSettings: {
           actions: DB.actions,
           reducers: { llmSettings: DB.llmSettingsReducer },
@@ -22,16 +22,19 @@
           apiKey: s.apiKey || DB.DEFAULT_STATE.apiKey,
           modelId: s.modelId || DB.DEFAULT_STATE.modelId,
           maxTokens: s.maxTokens != null && s.maxTokens !== '' ? s.maxTokens : DB.DEFAULT_STATE.maxTokens,
+          contextWindow: s.contextWindow != null && s.contextWindow !== '' ? s.contextWindow : DB.DEFAULT_STATE.contextWindow,
           temperature: s.temperature != null && s.temperature !== '' ? s.temperature : DB.DEFAULT_STATE.temperature,
           provider: s.provider || DB.DEFAULT_STATE.provider,
           theme: DB.DEFAULT_STATE.theme,
           customColors: DB.DEFAULT_STATE.customColors,
           connectionStatus: "disconnected",
           lastError: "",
-          availableModels: [],
+          availableModels: DB.getCachedModels(DB.getLLMBaseUrl({ baseUrl: s.baseUrl || DB.DEFAULT_STATE.baseUrl })) || [],
+          providerHealth: {},
           enableTools: ts.enableTools || false,
           autoExecute: ts.autoExecute || false,
           toolApiKey: ts.apiKey || '',
+          maxParallelRequests: ts.maxParallelRequests != null && ts.maxParallelRequests !== '' ? ts.maxParallelRequests : DB.DEFAULT_MAX_PARALLEL_REQUESTS,
           apiBaseUrl: DB.loadApiBaseUrl() || '',
           autoDetectApiUrl: DB.loadAutoDetectApiUrl(),
           systemPromptPreset: s.systemPromptPreset || 'api_assistant',
@@ -43,11 +46,13 @@
         this.handleApiKeyChange = this.handleApiKeyChange.bind(this);
         this.handleModelIdChange = this.handleModelIdChange.bind(this);
         this.handleMaxTokensChange = this.handleMaxTokensChange.bind(this);
+        this.handleContextWindowChange = this.handleContextWindowChange.bind(this);
         this.handleTemperatureChange = this.handleTemperatureChange.bind(this);
         this.handleThemeChange = this.handleThemeChange.bind(this);
         this.handleEnableToolsChange = this.handleEnableToolsChange.bind(this);
         this.handleAutoExecuteChange = this.handleAutoExecuteChange.bind(this);
         this.handleToolApiKeyChange = this.handleToolApiKeyChange.bind(this);
+        this.handleMaxParallelRequestsChange = this.handleMaxParallelRequestsChange.bind(this);
         this.handleTestConnection = this.handleTestConnection.bind(this);
       }
 
@@ -57,6 +62,7 @@
           apiKey: this.state.apiKey,
           modelId: this.state.modelId,
           maxTokens: this.state.maxTokens !== '' ? this.state.maxTokens : null,
+          contextWindow: this.state.contextWindow !== '' ? this.state.contextWindow : null,
           temperature: this.state.temperature !== '' ? this.state.temperature : null,
           provider: this.state.provider,
         };
@@ -65,6 +71,7 @@
           enableTools: this.state.enableTools,
           autoExecute: this.state.autoExecute,
           apiKey: this.state.toolApiKey,
+          maxParallelRequests: this.state.maxParallelRequests !== '' ? this.state.maxParallelRequests : null,
         });
         DB.saveApiBaseUrl(this.state.apiBaseUrl || '');
         DB.saveAutoDetectApiUrl(this.state.autoDetectApiUrl);
@@ -79,6 +86,31 @@
           theme: stored.theme || DB.DEFAULT_STATE.theme,
           customColors: stored.customColors || {}
         });
+        this._probeProviders(false);
+      }
+
+      componentWillUnmount() {
+        this._unmounted = true;
+      }
+
+      // Checks the selected provider in the background (answered from the
+      // cache when possible). ``refresh`` (the "Check providers" button)
+      // probes every preset again, so the dropdown shows which are running and
+      // switching to one fills its model list from the cache.
+      _probeProviders(refresh) {
+        var self = this;
+        var targets = DB.providerProbeTargets({ baseUrl: this.state.baseUrl, apiKey: this.state.apiKey }, refresh);
+        DB.probeModelEndpoints(targets, { force: refresh }).then(function(results) {
+          if (self._unmounted) return;
+          var health = Object.assign({}, self.state.providerHealth);
+          Object.keys(results).forEach(function(url) { health[url] = results[url].ok; });
+          var newState = { providerHealth: health };
+          var current = results[DB.getLLMBaseUrl(self.state)];
+          if (current && current.ok && self.state.availableModels.length === 0) {
+            newState.availableModels = current.models;
+          }
+          self.setState(newState);
+        });
       }
 
       componentDidUpdate(prevProps, prevState) {
@@ -98,46 +130,17 @@
         self.setState({ connectionStatus: "connecting", lastError: "" });
         DB.dispatchAction(system, 'setConnectionStatus', "connecting");
 
-        var headers = { "Content-Type": "application/json" };
-        if (settings.apiKey) {
-          headers["Authorization"] = "Bearer " + settings.apiKey;
-        }
+        var baseUrl = DB.getLLMBaseUrl(settings);
 
-        var baseUrl = (settings.baseUrl || "").replace(/\/+$/, "");
-
-        var controller = new AbortController();
-        var timeoutId = setTimeout(function() { controller.abort(); }, 10000);
-
-        fetch(baseUrl + "/models", {
-          method: 'GET',
-          headers: headers,
-          signal: controller.signal
-        })
-          .then(function (res) {
-            if (!res.ok) {
-              return res.text().then(function(text) {
-                throw new Error('HTTP ' + res.status + ': ' + res.statusText + (text ? " - " + text : ""));
-              });
-            }
-            return res.json();
-          })
-          .then(function (data) {
-            clearTimeout(timeoutId);
-            if (data && data.error) {
-              throw new Error(data.details || data.error);
-            }
-            var models = [];
-            if (data && Array.isArray(data.data)) {
-              models = data.data
-                .map(function(m) { return m.id || m.name || ''; })
-                .filter(function(id) { return id !== ''; })
-                .sort();
-            }
+        DB.fetchModels(baseUrl, settings.apiKey, DB.MODEL_FETCH_TIMEOUT_MS)
+          .then(function (models) {
             var newState = { connectionStatus: "connected", availableModels: models };
             if (models.length > 0 && models.indexOf(self.state.modelId) === -1) {
               newState.modelId = models[0];
               DB.dispatchAction(system, 'setModelId', models[0]);
             }
+            newState.providerHealth = Object.assign({}, self.state.providerHealth);
+            newState.providerHealth[baseUrl] = true;
             self.setState(newState);
             DB.saveToStorage(Object.assign({}, DB.loadFromStorage(), {
               baseUrl: self.state.baseUrl,
@@ -147,7 +150,6 @@
             DB.dispatchAction(system, 'setConnectionStatus', "connected");
           })
           .catch(function (err) {
-            clearTimeout(timeoutId);
             var errorMsg = err.name === 'AbortError' ? 'Connection timed out (10s)' : (err.message || "Connection failed");
 
             // Detect CORS errors and provide helpful guidance
@@ -179,7 +181,10 @@
       handleProviderChange(e) {
         var value = e.target.value;
         var provider = DB.LLM_PROVIDERS[value] || DB.LLM_PROVIDERS.custom;
-        this.setState({ provider: value, baseUrl: provider.url, availableModels: [], connectionStatus: "disconnected" });
+        var cached = DB.getCachedModels(DB.getLLMBaseUrl({ baseUrl: provider.url }));
+        var self = this;
+        this.setState({ provider: value, baseUrl: provider.url, availableModels: cached || [], connectionStatus: "disconnected" },
+          function() { if (provider.url) self._probeProviders(false); });
         DB.dispatchAction(system, 'setProvider', value);
         this._debouncedSave();
       }
@@ -208,6 +213,11 @@
         this._debouncedSave();
       }
 
+      handleContextWindowChange(e) {
+        this.setState({ contextWindow: e.target.value });
+        this._debouncedSave();
+      }
+
       handleTemperatureChange(e) {
         this.setState({ temperature: e.target.value });
         DB.dispatchAction(system, 'setTemperature', e.target.value);
@@ -247,6 +257,11 @@
         this._debouncedSave();
       }
 
+      handleMaxParallelRequestsChange(e) {
+        this.setState({ maxParallelRequests: e.target.value });
+        this._debouncedSave();
+      }
+
       handleApiBaseUrlChange(e) {
         this.setState({ apiBaseUrl: e.target.value });
         DB.saveApiBaseUrl(e.target.value || '');
@@ -282,17 +297,33 @@
         var fieldStyle = { marginBottom: "12px" };
 
         var providerOptions = Object.keys(DB.LLM_PROVIDERS).map(function (key) {
+          var health = s.providerHealth[DB.LLM_PROVIDERS[key].url];
+          var suffix = health === true ? " (running)" : health === false ? " (not reachable)" : "";
           return React.createElement(
             "option",
             { key: key, value: key },
-            DB.LLM_PROVIDERS[key].name
+            DB.LLM_PROVIDERS[key].name + (key === "custom" ? "" : suffix)
           );
         });
 
         var providerField = React.createElement(
           "div",
           { style: fieldStyle },
-          React.createElement("label", { style: labelStyle }, "LLM Provider"),
+          React.createElement(
+            "div",
+            { style: { display: "flex", justifyContent: "space-between", alignItems: "baseline" } },
+            React.createElement("label", { style: labelStyle }, "LLM Provider"),
+            React.createElement(
+              "button",
+              {
+                type: "button",
+                onClick: function() { self._probeProviders(true); },
+                title: "Check which local providers are running",
+                style: { background: "none", border: "none", color: "var(--theme-primary)", cursor: "pointer", fontSize: "12px", padding: 0 }
+              },
+              "Check providers"
+            )
+          ),
           React.createElement(
             "select",
             {
@@ -369,6 +400,19 @@
               onChange: this.handleMaxTokensChange,
             })
           ),
+          React.createElement(
+            "div",
+            { style: fieldStyle },
+            React.createElement("label", { style: labelStyle }, "Context Window (tokens)"),
+            React.createElement("input", {
+              type: "number",
+              value: s.contextWindow !== '' ? s.contextWindow : "",
+              min: 1,
+              placeholder: "32768",
+              style: inputStyle,
+              onChange: this.handleContextWindowChange,
+            })
+          ),
           React.createElement(
             "div",
             { style: fieldStyle },
@@ -503,6 +547,23 @@
                 disabled: !s.enableTools,
                 onChange: this.handleToolApiKeyChange
               })
+            ),
+            React.createElement(
+              "div",
+              { style: fieldStyle },
+              React.createElement("label", { style: labelStyle }, "Parallel Requests"),
+              React.createElement("input", {
+                type: "number",
+                value: s.maxParallelRequests,
+                min: 1,
+                placeholder: String(DB.DEFAULT_MAX_PARALLEL_REQUESTS),
+                style: inputStyle,
+                disabled: !s.enableTools,
+                onChange: this.handleMaxParallelRequestsChange
+              }),
+              React.createElement("div", { style: { color: "var(--theme-text-secondary)", fontSize: "11px", marginTop: "4px" } },
+                "Concurrent GET/HEAD calls per agent step"
+              )
             )
           )
         );
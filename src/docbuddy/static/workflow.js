@@ -6,6 +6,14 @@
 
   var DB = window.DocBuddy;
 
+  // ── Constants ─────────────────────────────────────────────────────────────
+  // Independent blocks stream at the same time, up to this many at once
+  var MAX_PARALLEL_BLOCKS = 3;
+
+  function formatDuration(ms) {
+    return ms < 1000 ? ms + ' ms' : (ms / 1000).toFixed(1) + ' s';
+  }
+
   // ── Workflow panel component ───────────────────────────────────────────────
   function WorkflowPanelFactory(system) {
     var React = system.React;
@@ -19,7 +27,8 @@
           initialBlocks = saved.blocks.map(function (block) {
             return Object.assign({}, block, {
               output: '',
-              status: 'idle'
+              status: 'idle',
+              durationMs: null
             });
           });
         } else {
@@ -28,19 +37,21 @@
         this.state = {
           blocks: initialBlocks,
           running: false,
-          currentBlockIdx: -1,
           aborted: false,
           copiedBlockId: null,
           runningSingleBlock: false,
+          lastRunMs: null,
         };
         this._abortController = null;
         this.handleStart = this.handleStart.bind(this);
         this.handleStop = this.handleStop.bind(this);
         this.handleReset = this.handleReset.bind(this);
+        this.handleClearCache = this.handleClearCache.bind(this);
         this.handleAddBlock = this.handleAddBlock.bind(this);
         this.handleRemoveBlock = this.handleRemoveBlock.bind(this);
         this.handleBlockContentChange = this.handleBlockContentChange.bind(this);
         this.handleToggleBlockTools = this.handleToggleBlockTools.bind(this);
+        this.handleToggleDependency = this.handleToggleDependency.bind(this);
         this.handleRunSingleBlock = this.handleRunSingleBlock.bind(this);
         this.runWorkflow = this.runWorkflow.bind(this);
       }
@@ -52,13 +63,16 @@
       componentDidUpdate(prevProps, prevState) {
         if (prevState.blocks !== this.state.blocks && !this.state.running) {
           var persistedBlocks = this.state.blocks.map(function(b) {
-            return { id: b.id, type: b.type, content: b.content, enableTools: b.enableTools !== false };
+            var persisted = { id: b.id, type: b.type, content: b.content, enableTools: b.enableTools !== false };
+            if (Array.isArray(b.dependsOn)) persisted.dependsOn = b.dependsOn;
+            return persisted;
           });
           DB.saveWorkflow({ blocks: persistedBlocks });
         }
       }
 
       componentWillUnmount() {
+        this._unmounted = true;
         if (this._abortController) {
           this._abortController.abort();
           this._abortController = null;
@@ -101,6 +115,23 @@
         });
       }
 
+      handleToggleDependency(blockId, depId) {
+        this.setState(function(prev) {
+          var deps = DB.workflowDependencies(prev.blocks);
+          return {
+            blocks: prev.blocks.map(function(b, i) {
+              if (b.id !== blockId) return b;
+              // Make the implicit "previous block" dependency explicit first
+              var dependsOn = deps[i].map(function(j) { return prev.blocks[j].id; });
+              var pos = dependsOn.indexOf(depId);
+              if (pos >= 0) dependsOn.splice(pos, 1);
+              else dependsOn.push(depId);
+              return Object.assign({}, b, { dependsOn: dependsOn });
+            })
+          };
+        });
+      }
+
       handleRunSingleBlock(idx) {
         var self = this;
         var blocks = self.state.blocks;
@@ -108,21 +139,16 @@
         if (!block || !block.content || !block.content.trim()) return;
         if (self.state.running) return;
 
-        // Validate all prior blocks have output
-        for (var i = 0; i < idx; i++) {
-          if (!blocks[i].output || !blocks[i].output.trim()) {
-            alert('Cannot run Block ' + (idx + 1) + ': Block ' + (i + 1) + ' has not been run yet. Run all blocks first or run earlier blocks individually.');
+        // Validate all upstream blocks have output
+        var upstream = DB.workflowUpstream(DB.workflowDependencies(blocks), idx);
+        for (var i = 0; i < upstream.length; i++) {
+          var j = upstream[i];
+          if (!blocks[j].output || !blocks[j].output.trim()) {
+            alert('Cannot run Block ' + (idx + 1) + ': Block ' + (j + 1) + ' has not been run yet. Run all blocks first or run earlier blocks individually.');
             return;
           }
         }
 
-        // Build conversation history from prior blocks' stored outputs
-        var prebuiltHistory = [];
-        for (var j = 0; j < idx; j++) {
-          prebuiltHistory.push({ role: 'user', content: blocks[j].content || '' });
-          prebuiltHistory.push({ role: 'assistant', content: blocks[j].output || '' });
-        }
-
         if (self._abortController) {
           self._abortController.abort();
           self._abortController = null;
@@ -131,15 +157,15 @@
 
         // Clear only the target block's output/status
         var updatedBlocks = blocks.slice();
-        updatedBlocks[idx] = Object.assign({}, updatedBlocks[idx], { output: '', status: 'idle' });
+        updatedBlocks[idx] = Object.assign({}, updatedBlocks[idx], { output: '', status: 'idle', durationMs: null });
         self.setState({
           blocks: updatedBlocks,
           running: true,
           aborted: false,
-          currentBlockIdx: idx,
           runningSingleBlock: true,
+          lastRunMs: null,
         }, function() {
-          self.runWorkflow(idx, idx + 1, prebuiltHistory);
+          self.runWorkflow(idx);
         });
       }
 
@@ -156,10 +182,10 @@
           return {
             running: true,
             aborted: false,
-            currentBlockIdx: 0,
             runningSingleBlock: false,
+            lastRunMs: null,
             blocks: prev.blocks.map(function(b) {
-              return Object.assign({}, b, { output: '', status: 'idle' });
+              return Object.assign({}, b, { output: '', status: 'idle', durationMs: null });
             })
           };
         }, function() {
@@ -172,7 +198,7 @@
           this._abortController.abort();
         }
         window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: false } }));
-        this.setState({ running: false, aborted: true, currentBlockIdx: -1, runningSingleBlock: false });
+        this.setState({ running: false, aborted: true, runningSingleBlock: false });
       }
 
       handleReset() {
@@ -184,33 +210,72 @@
         this.setState({
           blocks: [defaultBlock],
           running: false,
-          currentBlockIdx: -1,
           aborted: false,
           runningSingleBlock: false,
+          lastRunMs: null,
         });
         DB.saveWorkflow({ blocks: [defaultBlock] });
       }
 
-      runWorkflow(startIdx, endIdx, initialHistory) {
+      // Forgets every cached block output, so the next run calls the LLM for
+      // all blocks
+      handleClearCache() {
+        DB.workflowCache.clear();
+        this.setState(function(prev) {
+          return {
+            blocks: prev.blocks.map(function(b) {
+              return b.cached ? Object.assign({}, b, { cached: false }) : b;
+            })
+          };
+        });
+      }
+
+      _updateBlock(idx, patch) {
+        this.setState(function(prev) {
+          var blocks = prev.blocks.slice();
+          blocks[idx] = Object.assign({}, blocks[idx], patch);
+          return { blocks: blocks };
+        });
+      }
+
+      // Runs every block (or only ``onlyIdx``) once its upstream blocks are
+      // done. Independent blocks stream concurrently, at most
+      // MAX_PARALLEL_BLOCKS at a time, and each block only sees the prompts
+      // and outputs of the blocks it depends on. A full run replays blocks
+      // whose request is unchanged from DB.workflowCache; running a single
+      // block always calls the LLM again.
+      runWorkflow(onlyIdx) {
         var self = this;
-        var conversationHistory = initialHistory || [];
-        var firstIdx = startIdx || 0;
-        var stopIdx = (endIdx != null) ? endIdx : self.state.blocks.length;
+        var blocks = self.state.blocks;
+        var deps = DB.workflowDependencies(blocks);
+        var controller = new AbortController();
+        self._abortController = controller;
+        var runStartedAt = Date.now();
+        // GET/HEAD tool responses are shared by the blocks of this run
+        var toolCache = DB.createToolResponseCache();
+
+        // Conversation contributed by each block: its prompt, any tool
+        // messages, and its answer. Seeded from stored outputs for single runs.
+        var blockHistory = blocks.map(function(b) {
+          return [{ role: 'user', content: b.content || '' }, { role: 'assistant', content: b.output || '' }];
+        });
+
+        var isAborted = function() {
+          return controller.signal.aborted || self.state.aborted || self._unmounted;
+        };
 
         function runBlock(idx) {
-          var currentBlocks = self.state.blocks;
-          if (idx >= stopIdx || self.state.aborted) {
-            window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: false } }));
-            self.setState({ running: false, currentBlockIdx: -1, runningSingleBlock: false });
-            return;
-          }
+          if (onlyIdx != null && idx !== onlyIdx) return null;
+          if (isAborted()) return null;
 
-          self.setState({ currentBlockIdx: idx });
+          var block = blocks[idx];
+          var startedAt = Date.now();
+          self._updateBlock(idx, { status: 'running', output: '', durationMs: null, cached: false });
 
-          var block = currentBlocks[idx];
-          var updatedBlocks = currentBlocks.slice();
-          updatedBlocks[idx] = Object.assign({}, updatedBlocks[idx], { status: 'running', output: '' });
-          self.setState({ blocks: updatedBlocks });
+          var conversationHistory = [];
+          DB.workflowUpstream(deps, idx).forEach(function(j) {
+            conversationHistory = conversationHistory.concat(blockHistory[j]);
+          });
 
           var settings = DB.loadFromStorage();
           var toolSettings = DB.loadToolSettings();
@@ -224,306 +289,170 @@
             DB.ensureOpenapiSchemaCached(function() { resolve(); });
           });
 
-          Promise.all([configReady, schemaReady]).then(function() {
-          var systemPrompt = DB.getSystemPromptForPreset(selectedPreset, DB._cachedOpenapiSchema);
-
-          if (blockToolsEnabled) {
-            systemPrompt = systemPrompt.replace(/## Tool Calling Instructions[\s\S]*$/, '').trimEnd();
-            systemPrompt += '\n\nUse the `api_request` tool via native tool calling when the user asks to call an API endpoint. Do NOT output tool calls as JSON text — the system handles tool execution automatically.';
-          }
-          systemPrompt += '\n\nYou are executing a multi-step workflow. Be concise. Execute each instruction precisely.';
-
-          var currentUserMessage = { role: 'user', content: block.content || '' };
-
-          var messages = [{ role: 'system', content: systemPrompt }]
-            .concat(conversationHistory)
-            .concat([currentUserMessage]);
-
-          var payload = {
-            messages: messages,
-            model: settings.modelId || 'llama3',
-            max_tokens: settings.maxTokens != null && settings.maxTokens !== '' ? parseInt(settings.maxTokens) : 4096,
-            temperature: settings.temperature != null && settings.temperature !== '' ? parseFloat(settings.temperature) : 0.7,
-            stream: true,
-          };
-
-          if (blockToolsEnabled) {
-            var fullSchema = DB._cachedOpenapiSchema;
-            if (fullSchema) {
-              payload.tools = [DB.buildApiRequestTool(fullSchema)];
-              payload.tool_choice = 'auto';
-            }
-          }
+          return Promise.all([configReady, schemaReady]).then(function() {
+            return DB.warmSchemaPrompt(DB._cachedOpenapiSchema, block.content || '', blockToolsEnabled);
+          }).then(function() {
+            return new Promise(function(resolve) {
+              var layout = DB.getPromptLayout(selectedPreset, DB._cachedOpenapiSchema, '', block.content || '');
+              var systemPrompt = layout.system;
 
-          var fetchHeaders = { 'Content-Type': 'application/json' };
-          if (settings.apiKey) {
-            fetchHeaders['Authorization'] = 'Bearer ' + settings.apiKey;
-          }
+              if (blockToolsEnabled) {
+                systemPrompt = systemPrompt.replace(/## Tool Calling Instructions[\s\S]*$/, '').trimEnd();
+                systemPrompt += '\n\nUse the `api_request` tool via native tool calling when the user asks to call an API endpoint. Do NOT output tool calls as JSON text — the system handles tool execution automatically.';
+              }
+              systemPrompt += '\n\nYou are executing a multi-step workflow. Be concise. Execute each instruction precisely.';
+
+              var currentUserMessage = { role: 'user', content: block.content || '' };
+
+              var payload = {
+                messages: [],
+                model: settings.modelId || 'llama3',
+                max_tokens: settings.maxTokens != null && settings.maxTokens !== '' ? parseInt(settings.maxTokens) : 4096,
+                temperature: settings.temperature != null && settings.temperature !== '' ? parseFloat(settings.temperature) : 0.7,
+                stream: true,
+              };
+
+              if (blockToolsEnabled) {
+                var fullSchema = DB._cachedOpenapiSchema;
+                if (fullSchema) {
+                  payload.tools = [DB.getApiRequestTool(fullSchema)];
+                  payload.tool_choice = 'auto';
+                }
+              }
 
-          var baseUrl = (settings.baseUrl || '').replace(/\/+$/, '');
+              payload.messages = DB.assemblePrompt({
+                system: systemPrompt,
+                context: layout.context,
+                history: conversationHistory.concat([currentUserMessage]),
+                tools: payload.tools,
+                contextWindow: settings.contextWindow,
+                maxTokens: payload.max_tokens,
+                trimState: {}
+              }).messages;
+
+              var fetchHeaders = { 'Content-Type': 'application/json' };
+              if (settings.apiKey) {
+                fetchHeaders['Authorization'] = 'Bearer ' + settings.apiKey;
+              }
 
-          if (self._abortController && typeof self._abortController.abort === 'function') {
-            try { self._abortController.abort(); } catch (e) {}
-          }
+              var completionUrl = DB.getLLMBaseUrl(settings) + '/chat/completions';
+              var cacheKey = DB.workflowCacheKey(completionUrl, payload);
+              var accumulated = '';
+              var blockMessages = [];
+              var outputBatcher = DB.createFrameBatcher(function(text) {
+                self._updateBlock(idx, { output: text });
+              });
 
-          self._abortController = new AbortController();
-          var accumulated = '';
-          var accumulatedToolCalls = {};
-
-          var blockMessages = [];
-
-          fetch(baseUrl + '/chat/completions', {
-            method: 'POST',
-            headers: fetchHeaders,
-            body: JSON.stringify(payload),
-            signal: self._abortController.signal
-          })
-            .then(function(res) {
-              if (!res.ok) {
-                return res.text().then(function(text) {
-                  throw new Error('HTTP ' + res.status + ': ' + res.statusText + (text ? ' - ' + text : ''));
+              // Only complete answers are cached, never errors or aborted runs
+              function finishBlock(output, cacheable) {
+                outputBatcher.cancel();
+                var durationMs = Date.now() - startedAt;
+                // Tool messages are followed by an assistant summary so that a
+                // downstream block's "user" message never directly follows a
+                // "tool" role (which causes HTTP 400 from most LLM providers).
+                var messages = blockMessages.concat([{ role: 'assistant', content: output || accumulated || '' }]);
+                blockHistory[idx] = [currentUserMessage].concat(messages);
+                if (cacheable && !isAborted()) {
+                  DB.workflowCache.put(cacheKey, { output: output, messages: messages, durationMs: durationMs });
+                }
+                self._updateBlock(idx, {
+                  output: output || '(no output)',
+                  status: 'done',
+                  durationMs: durationMs
                 });
+                resolve();
               }
-              var reader = res.body.getReader();
-              var decoder = new TextDecoder();
-              var buffer = '';
-
-              function processChunk() {
-                return reader.read().then(function(result) {
-                  if (self.state.aborted) return;
-                  if (result.done) {
-                    return finishBlock(accumulated, blockMessages);
-                  }
-
-                  buffer += decoder.decode(result.value, { stream: true });
-                  var lines = buffer.split('\n');
-                  buffer = lines.pop() || '';
-
-                  for (var i = 0; i < lines.length; i++) {
-                    var line = lines[i].trim();
-                    if (!line || !line.startsWith('data: ')) continue;
-                    var payloadData = line.substring(6);
-                    if (payloadData === '[DONE]') {
-                      return finishBlock(accumulated, blockMessages);
-                    }
-
-                    try {
-                      var chunk = JSON.parse(payloadData);
-                      if (chunk.error) {
-                        var errMsg = typeof chunk.error === 'string' ? chunk.error
-                          : (chunk.error.message || JSON.stringify(chunk.error));
-                        return finishBlock('Error: ' + errMsg, blockMessages);
-                      }
-                      var choice = chunk.choices && chunk.choices[0];
-                      if (!choice) continue;
-
-                      if (choice.delta && choice.delta.content) {
-                        accumulated += choice.delta.content;
-                        var currentBlocks = self.state.blocks.slice();
-                        currentBlocks[idx] = Object.assign({}, currentBlocks[idx], { output: accumulated });
-                        self.setState({ blocks: currentBlocks });
-                      }
-
-                      if (choice.delta && choice.delta.tool_calls) {
-                        choice.delta.tool_calls.forEach(function(tc) {
-                          var tcIdx = tc.index != null ? tc.index : 0;
-                          if (!accumulatedToolCalls[tcIdx]) {
-                            accumulatedToolCalls[tcIdx] = { id: '', function: { name: '', arguments: '' } };
-                          }
-                          if (tc.id) accumulatedToolCalls[tcIdx].id = tc.id;
-                          if (tc.function) {
-                            if (tc.function.name) accumulatedToolCalls[tcIdx].function.name = tc.function.name;
-                            if (tc.function.arguments) accumulatedToolCalls[tcIdx].function.arguments += tc.function.arguments;
-                          }
-                        });
-                      }
-
-                      if (choice.finish_reason === 'tool_calls') {
-                        var toolCallsList = Object.keys(accumulatedToolCalls).map(function(k) {
-                          return accumulatedToolCalls[k];
-                        });
-                        if (toolCallsList.length > 0) {
-                          // Push the assistant message with all tool calls
-                          blockMessages.push({
-                            role: 'assistant',
-                            content: null,
-                            tool_calls: toolCallsList.map(function(tc) {
-                              return { id: tc.id, type: 'function', function: { name: tc.function.name, arguments: tc.function.arguments } };
-                            })
-                          });
 
-                          // Execute all tool calls sequentially
-                          var toolIdx = 0;
-                          function executeNextToolCall() {
-                            if (toolIdx >= toolCallsList.length) {
-                              var currentBlocks2 = self.state.blocks.slice();
-                              currentBlocks2[idx] = Object.assign({}, currentBlocks2[idx], { output: accumulated });
-                              self.setState({ blocks: currentBlocks2 });
-                              finishBlock(accumulated, blockMessages);
-                              return;
-                            }
-                            var currentTc = toolCallsList[toolIdx];
-                            executeToolCall(currentTc, toolCallsList, function(toolOutput) {
-                              blockMessages.push({
-                                role: 'tool',
-                                tool_call_id: currentTc.id,
-                                content: toolOutput
-                              });
-
-                              var tcArgs = {};
-                              try { tcArgs = JSON.parse(currentTc.function.arguments || '{}'); } catch (e) {}
-                              var curlCmd = DB.buildCurlCommand(
-                                tcArgs.method || 'GET',
-                                tcArgs.path || '',
-                                tcArgs.query_params || {},
-                                tcArgs.path_params || {},
-                                tcArgs.body || {}
-                              );
-                              accumulated += '\n\n[Tool Call]\n' + curlCmd + '\n\n[Tool Result]\n' + toolOutput;
-                              toolIdx++;
-                              executeNextToolCall();
-                            });
-                          }
-                          executeNextToolCall();
-                          return;
-                        }
-                      }
-                    } catch (e) {
-                      console.error('Error processing streaming chunk:', payloadData, e);
-                    }
-                  }
-
-                  return processChunk();
+              function replayBlock(entry) {
+                outputBatcher.cancel();
+                blockHistory[idx] = [currentUserMessage].concat(entry.messages);
+                self._updateBlock(idx, {
+                  output: entry.output || '(no output)',
+                  status: 'done',
+                  durationMs: entry.durationMs,
+                  cached: true
                 });
+                resolve();
               }
 
-              return processChunk();
-            })
-            .catch(function(err) {
-              self._abortController = null;
-              if (err && err.name === 'AbortError') {
-                // On abort, mark the block as done so it doesn't stay stuck in 'running'
-                var currentBlocks = self.state.blocks.slice();
-                currentBlocks[idx] = Object.assign({}, currentBlocks[idx], {
-                  output: accumulated || '(aborted)',
-                  status: 'done'
+              function executeToolCall(tc) {
+                return DB.executeApiRequest(DB.toolCallArgs(tc), controller.signal, toolCache).then(function(res) {
+                  if (isAborted()) return '(aborted)';
+                  if (res.status === 0) return 'Error: ' + res.body;
+                  return DB.formatToolResult(res);
                 });
-                self.setState({ blocks: currentBlocks, running: false, currentBlockIdx: -1 });
-                return;
               }
-              finishBlock('Error: ' + (err && err.message ? err.message : 'Request failed'), blockMessages);
-            });
 
-          function executeToolCall(tc, toolCallsList, callback) {
-            var args = {};
-            try { args = JSON.parse(tc.function.arguments || '{}'); } catch (e) { console.warn('Failed to parse tool call arguments:', e); }
-            var method = args.method || 'GET';
-            var url = args.path || '';
-
-            try { url = decodeURIComponent(url); } catch (e) { console.warn('Failed to decode URL component:', e); }
-            if (!url || !/^\//.test(url)) {
-              callback('Error: Tool call path must be a relative URL starting with /');
-              return;
-            }
-
-            try {
-              var pathParams = args.path_params || {};
-              Object.keys(pathParams).forEach(function(key) {
-                url = url.replace('{' + key + '}', encodeURIComponent(pathParams[key]));
-              });
-              // Re-validate after path params substitution to prevent bypass via path param values
-              if (/\.\./.test(url)) {
-                callback('Error: Tool call path must not contain ".."');
-                return;
-              }
-            } catch (e) { console.warn('Failed to apply path params:', e); }
-
-            try {
-              var queryParams = args.query_params || {};
-              var queryKeys = Object.keys(queryParams);
-              if (queryKeys.length > 0) {
-                var qs = queryKeys.map(function(k) {
-                  return encodeURIComponent(k) + '=' + encodeURIComponent(queryParams[k]);
-                }).join('&');
-                url += (url.indexOf('?') >= 0 ? '&' : '?') + qs;
-              }
-            } catch (e) { console.warn('Failed to apply query params:', e); }
-
-            // Use the new resolveApiBaseUrl function which handles:
-            // 1. User-configured API Base URL (highest priority)
-            // 2. OpenAPI schema servers array
-            // 3. Auto-detect from loaded schema URL
-            // 4. Fallback to page origin (for local development)
-            var apiBaseUrl = DB.resolveApiBaseUrl(DB._cachedOpenapiSchema);
-            url = apiBaseUrl + url;
-
-            var toolFetchHeaders = {};
-            var tSettings = DB.loadToolSettings();
-            var toolApiKey = tSettings.apiKey && typeof tSettings.apiKey === 'string' ? tSettings.apiKey.trim() : '';
-            if (toolApiKey) {
-              toolFetchHeaders['Authorization'] = 'Bearer ' + toolApiKey;
-            }
-
-            var hasBody = args.body && (method === 'POST' || method === 'PUT' || method === 'PATCH');
-            if (hasBody) {
-              toolFetchHeaders['Content-Type'] = 'application/json';
-            }
-
-            var fetchOpts = { method: method, headers: toolFetchHeaders };
-            if (hasBody) {
-              fetchOpts.body = JSON.stringify(args.body);
-            }
-
-            if (self._abortController) {
-              fetchOpts.signal = self._abortController.signal;
-            }
-
-            fetch(url, fetchOpts)
-              .then(function(res) {
-                if (self.state.aborted) { callback('(aborted)'); return; }
-                return res.text().then(function(text) {
-                  if (self.state.aborted) { callback('(aborted)'); return; }
-                  callback('Status: ' + res.status + ' ' + res.statusText + '\n\n' + text.substring(0, 4000));
-                });
-              })
-              .catch(function(err) {
-                if (err && err.name === 'AbortError') { callback('(aborted)'); return; }
-                callback('Error: ' + err.message);
+              var lookup = onlyIdx == null ? DB.workflowCache.get(cacheKey) : Promise.resolve(null);
+              lookup.then(function(entry) {
+                if (entry && !isAborted()) replayBlock(entry);
+                else streamBlock();
               });
-          }
-
-          function finishBlock(output, historyMessages) {
-            // Include the user message for this block in conversation history
-            // so that subsequent blocks maintain proper user/assistant alternation
-            // (required by LM Studio, OpenAI, and most LLM providers)
-            conversationHistory.push({ role: 'user', content: block.content || '' });
 
-            if (historyMessages && historyMessages.length > 0) {
-              // Include all tool call messages in conversation history
-              historyMessages.forEach(function(msg) {
-                conversationHistory.push(msg);
-              });
-              // After tool messages, add an assistant summary so the next block's
-              // "user" message doesn't immediately follow a "tool" role (which
-              // causes HTTP 400 from most LLM providers).
-              conversationHistory.push({ role: 'assistant', content: output || accumulated || '' });
-            } else {
-              conversationHistory.push({ role: 'assistant', content: output || accumulated || '' });
-            }
-
-            var currentBlocks = self.state.blocks.slice();
-            currentBlocks[idx] = Object.assign({}, currentBlocks[idx], {
-              output: output || '(no output)',
-              status: 'done'
-            });
-            self.setState({ blocks: currentBlocks }, function() {
-              runBlock(idx + 1);
+              function streamBlock() {
+                DB.streamLLMCompletion(
+                  completionUrl,
+                  payload,
+                  fetchHeaders,
+                  controller.signal,
+                  {
+                    onContent: function(delta, accum) {
+                      accumulated = accum;
+                      outputBatcher.push(accum);
+                    },
+                    onToolCalls: function(toolCallsList) {
+                      outputBatcher.cancel();
+                      blockMessages.push({
+                        role: 'assistant',
+                        content: null,
+                        tool_calls: toolCallsList.map(function(tc) {
+                          return { id: tc.id, type: 'function', function: { name: tc.function.name, arguments: tc.function.arguments } };
+                        })
+                      });
+                      // Reads run concurrently; a batch with any write runs in order
+                      var limit = toolCallsList.every(DB.isSafeToolCall) ? DB.getMaxParallelRequests(toolSettings) : 1;
+                      DB.mapWithConcurrency(toolCallsList, limit, executeToolCall).then(function(toolOutputs) {
+                        toolCallsList.forEach(function(tc, i) {
+                          blockMessages.push({ role: 'tool', tool_call_id: tc.id, content: toolOutputs[i] });
+                          var tcArgs = DB.toolCallArgs(tc);
+                          var curlCmd = DB.buildCurlCommand(
+                            tcArgs.method || 'GET',
+                            tcArgs.path || '',
+                            tcArgs.query_params || {},
+                            tcArgs.path_params || {},
+                            tcArgs.body || {}
+                          );
+                          accumulated += '\n\n[Tool Call]\n' + curlCmd + '\n\n[Tool Result]\n' + toolOutputs[i];
+                        });
+                        finishBlock(accumulated, true);
+                      });
+                    },
+                    onDone: function(accum) { finishBlock(accum, !!accumulated); },
+                    // On abort, mark the block as done so it doesn't stay stuck in 'running'
+                    onAbort: function(accum) { finishBlock(accum || '(aborted)'); },
+                    onNetworkError: function(err, accum) {
+                      if (err && err.name === 'AbortError') {
+                        finishBlock(accum || '(aborted)');
+                      } else {
+                        finishBlock('Error: ' + (err && err.message ? err.message : 'Request failed'));
+                      }
+                    },
+                    onChunkError: function(e, data) {
+                      console.error('Error processing streaming chunk:', data, e);
+                    }
+                  }
+                );
+              }
             });
-          }
-          }); // end ensureSystemPromptConfig().then
+          });
         }
 
-        runBlock(firstIdx);
+        DB.runTaskGraph(deps, MAX_PARALLEL_BLOCKS, runBlock, isAborted).then(function() {
+          if (self._abortController !== controller || self._unmounted) return;
+          self._abortController = null;
+          window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: false } }));
+          self.setState({ running: false, runningSingleBlock: false, lastRunMs: Date.now() - runStartedAt });
+        });
       }
 
       render() {
@@ -579,6 +508,13 @@
         var startDisabled = s.running || !hasContent;
         var globalToolSettings = DB.loadToolSettings();
         var globalToolsEnabled = globalToolSettings.enableTools;
+        var blockDeps = DB.workflowDependencies(s.blocks);
+        var runningIdx = [];
+        var doneCount = 0;
+        s.blocks.forEach(function(b, i) {
+          if (b.status === 'running') runningIdx.push(i);
+          else if (b.status === 'done') doneCount++;
+        });
 
         return React.createElement(
           'div',
@@ -600,6 +536,12 @@
               onClick: self.handleReset,
               style: btnStyle('var(--theme-accent)')
             }, '↺ Reset'),
+            React.createElement('button', {
+              onClick: self.handleClearCache,
+              disabled: s.running,
+              title: 'Unchanged blocks reuse their cached output when the workflow runs again. Clear the cache to run every block.',
+              style: Object.assign({}, btnStyle('var(--theme-secondary)'), { color: 'var(--theme-text-primary)' }, s.running ? { opacity: 0.5, cursor: 'not-allowed' } : {})
+            }, '⌫ Clear Cache'),
             React.createElement('div', { style: { width: '1px', height: '24px', background: 'var(--theme-border-color)' } }),
             React.createElement('button', {
               onClick: self.handleAddBlock,
@@ -610,8 +552,16 @@
               onClick: function() {
                 var blocks = self.state.blocks || [];
                 if (blocks.length === 0) return;
+                var deps = DB.workflowDependencies(blocks);
                 var exportData = blocks.map(function(b, i) {
-                  return { block: i + 1, prompt: b.content || '', output: b.output || '', status: b.status || 'idle' };
+                  return {
+                    block: i + 1,
+                    dependsOn: deps[i].map(function(j) { return j + 1; }),
+                    prompt: b.content || '',
+                    output: b.output || '',
+                    status: b.status || 'idle',
+                    durationMs: b.durationMs != null ? b.durationMs : null
+                  };
                 });
                 DB.exportAsJson(exportData, 'workflow-' + new Date().toISOString().slice(0, 10) + '.json');
               },
@@ -621,9 +571,12 @@
             s.running ? React.createElement('span', {
               style: { fontSize: '12px', color: 'var(--theme-text-secondary)', marginLeft: 'auto' }
             }, s.runningSingleBlock
-              ? 'Running block ' + (s.currentBlockIdx + 1) + '…'
-              : 'Running block ' + (s.currentBlockIdx + 1) + ' of ' + s.blocks.length + '…'
-            ) : null
+              ? 'Running block ' + (runningIdx[0] + 1) + '…'
+              : 'Running block' + (runningIdx.length > 1 ? 's ' : ' ') + runningIdx.map(function(i) { return i + 1; }).join(', ') +
+                ' (' + doneCount + ' of ' + s.blocks.length + ' done)…'
+            ) : (s.lastRunMs != null ? React.createElement('span', {
+              style: { fontSize: '12px', color: 'var(--theme-text-secondary)', marginLeft: 'auto' }
+            }, 'Finished in ' + formatDuration(s.lastRunMs)) : null)
           ),
           React.createElement(
             'div',
@@ -633,7 +586,7 @@
                   style: { textAlign: 'center', color: 'var(--theme-text-secondary)', padding: '40px', fontSize: '14px' }
                 }, 'No blocks yet. Click "+ Add Block" to get started.')
               : s.blocks.map(function(block, idx) {
-                  var isActive = s.running && s.currentBlockIdx === idx;
+                  var isActive = s.running && block.status === 'running';
                   var isDone = block.status === 'done';
 
                   var blockWrapperStyle = {
@@ -663,10 +616,39 @@
                     }, 'RUNNING');
                   } else if (block.status === 'done') {
                     statusBadge = React.createElement('span', {
+                      title: block.cached ? 'Replayed from the cache: the prompt, upstream outputs and settings are unchanged' : undefined,
                       style: { fontSize: '10px', fontWeight: '600', color: '#fff', background: '#10b981', padding: '2px 8px', borderRadius: '4px' }
-                    }, 'DONE');
+                    }, (block.cached ? 'CACHED' : 'DONE') + (block.durationMs != null ? ' · ' + formatDuration(block.durationMs) : ''));
                   }
 
+                  // One toggle per earlier block: which outputs this block waits for
+                  var dependencyToggles = idx > 0 ? React.createElement(
+                    'div',
+                    {
+                      style: { display: 'flex', alignItems: 'center', gap: '4px', flexWrap: 'wrap', padding: '6px 12px', borderBottom: '1px solid var(--theme-border-color)', fontSize: '11px', color: 'var(--theme-text-secondary)' },
+                      title: 'Blocks whose output this block uses. Blocks that do not depend on each other run in parallel.'
+                    },
+                    'Depends on:',
+                    s.blocks.slice(0, idx).map(function(dep, depIdx) {
+                      var selected = blockDeps[idx].indexOf(depIdx) !== -1;
+                      return React.createElement('button', {
+                        key: dep.id,
+                        onClick: !s.running ? function() { self.handleToggleDependency(block.id, dep.id); } : null,
+                        style: {
+                          background: selected ? 'var(--theme-primary)' : 'transparent',
+                          border: '1px solid ' + (selected ? 'var(--theme-primary)' : 'var(--theme-border-color)'),
+                          color: selected ? '#fff' : 'var(--theme-text-secondary)',
+                          cursor: s.running ? 'default' : 'pointer',
+                          fontSize: '11px',
+                          padding: '1px 8px',
+                          borderRadius: '10px',
+                          opacity: s.running ? 0.5 : 1,
+                        }
+                      }, String(depIdx + 1));
+                    }),
+                    blockDeps[idx].length === 0 ? React.createElement('span', { style: { fontStyle: 'italic' } }, 'none (starts immediately)') : null
+                  ) : null;
+
                   return React.createElement(
                     'div',
                     { key: block.id, style: blockWrapperStyle },
@@ -755,6 +737,7 @@
                         }, '✕') : null
                       )
                     ),
+                    dependencyToggles,
                     React.createElement('textarea', {
                       value: block.content,
                       onChange: function(e) { self.handleBlockContentChange(block.id, e.target.value); },
@@ -972,16 +972,20 @@ def test_request_body_schema_ref_resolution():
 # ── Schema pre-fetch / persistence tests ───────────────────────────────────────
 
 
-def test_openapi_schema_prefetched_on_domcontentloaded():
-    """Verify OpenAPI schema is fetched eagerly at DOMContentLoaded, not only when ChatPanel mounts."""
+def test_openapi_schema_shared_with_swagger_ui():
+    """Verify the plugin hands Swagger UI's downloaded spec to DocBuddy."""
     client = TestClient(make_app())
 
     js_content = get_all_plugin_js(client)
 
-    # DOMContentLoaded handler should include a fetch of /openapi.json
     assert "DOMContentLoaded" in js_content
-    # The pre-fetch block must guard against double-fetching
     assert "_cachedOpenapiSchema" in js_content
+    # The spec statePlugin wraps Swagger UI's download and parse actions
+    assert "DB.awaitSwaggerSpec(" in js_content
+    assert "DB.adoptSwaggerSpec(" in js_content
+    assert "updateJsonSpec" in js_content
+    # The schema is no longer duplicated into the llmSettings Redux state
+    assert "setOpenApiSchema" not in js_content
 
 
 def test_workflow_panel_fetches_schema_on_mount():
@@ -1847,6 +1851,22 @@ def test_cli_main_exits_on_missing_standalone(monkeypatch, tmp_path):
     assert exc_info.value.code == 1
 
 
+def test_cli_main_rejects_non_positive_workers(monkeypatch, capsys):
+    """--workers below 1 is a usage error, not a server that never answers."""
+    import sys
+
+    import pytest
+
+    import docbuddy.cli as cli_module
+
+    monkeypatch.setattr(sys, "argv", ["docbuddy", "--workers", "0"])
+
+    with pytest.raises(SystemExit) as exc_info:
+        cli_module.main()
+    assert exc_info.value.code == 2
+    assert "--workers must be at least 1" in capsys.readouterr().err
+
+
 # ── API Base URL resolution tests ─────────────────────────────────────────────
 
 
@@ -2036,10 +2056,10 @@ def test_cli_uses_directory_not_chdir(monkeypatch, tmp_path):
     monkeypatch.setattr(cli_module, "_pkg_dir", lambda: tmp_path)
     monkeypatch.setattr(sys, "argv", ["docbuddy"])
 
-    # Capture the handler passed to HTTPServer to verify directory= is set
+    # Capture the handler passed to the server to verify directory= is set
     captured_handler = {}
 
-    def fake_http_server(addr, handler):
+    def fake_http_server(addr, handler, **kwargs):
         captured_handler["handler"] = handler
         mock_httpd = MagicMock()
         mock_httpd.__enter__ = lambda s: s
@@ -2048,7 +2068,7 @@ def test_cli_uses_directory_not_chdir(monkeypatch, tmp_path):
         return mock_httpd
 
     with (
-        patch("http.server.HTTPServer", side_effect=fake_http_server),
+        patch.object(cli_module, "DocBuddyHTTPServer", side_effect=fake_http_server),
         patch("webbrowser.open"),
     ):
         try:
@@ -2057,7 +2077,7 @@ def test_cli_uses_directory_not_chdir(monkeypatch, tmp_path):
             pass
 
     handler = captured_handler.get("handler")
-    assert handler is not None, "HTTPServer must be called with a handler"
+    assert handler is not None, "the server must be called with a handler"
     # The handler must be a functools.partial with directory= keyword set
     assert isinstance(handler, functools.partial), "handler must be a functools.partial"
     assert (
@@ -2067,3 +2087,2935 @@ def test_cli_uses_directory_not_chdir(monkeypatch, tmp_path):
     assert handler.keywords["directory"] == str(
         tmp_path
     ), "directory= must be the package directory"
+
+
+# ── Pre-rendered docs page ────────────────────────────────────────────────────
+
+
+def test_docs_response_has_strong_etag():
+    """The docs page should carry a strong (non-weak) ETag."""
+    client = TestClient(make_app())
+    response = client.get("/docs")
+    etag = response.headers["etag"]
+    assert etag.startswith('"') and etag.endswith('"')
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_docs_returns_304_for_matching_etag():
+    """A conditional request with the current ETag should get 304 and no body."""
+    client = TestClient(make_app())
+    etag = client.get("/docs").headers["etag"]
+    response = client.get("/docs", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_docs_returns_200_for_stale_etag():
+    """A conditional request with a different ETag should get the full page."""
+    client = TestClient(make_app())
+    response = client.get("/docs", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert "swagger-ui-bundle" in response.text
+
+
+def test_docs_page_rendered_once(monkeypatch):
+    """Outside debug mode the template should be rendered only once."""
+    import docbuddy.plugin as plugin_module
+
+    calls = []
+    original = plugin_module._render_swagger_ui
+
+    def counting_render(**kwargs):
+        calls.append(kwargs)
+        return original(**kwargs)
+
+    monkeypatch.setattr(plugin_module, "_render_swagger_ui", counting_render)
+    client = TestClient(make_app())
+    bodies = {client.get("/docs").content for _ in range(3)}
+    assert len(calls) == 1
+    assert len(bodies) == 1
+
+
+def test_debug_docs_page_rendered_per_request(monkeypatch):
+    """Debug mode should re-render the template on every request."""
+    import docbuddy.plugin as plugin_module
+
+    calls = []
+    original = plugin_module._render_swagger_ui
+
+    def counting_render(**kwargs):
+        calls.append(kwargs)
+        return original(**kwargs)
+
+    monkeypatch.setattr(plugin_module, "_render_swagger_ui", counting_render)
+    client = TestClient(make_debug_app())
+    client.get("/docs")
+    client.get("/docs")
+    assert len(calls) == 2
+
+
+def test_docs_handler_is_async():
+    """The docs route handler should be a coroutine so it skips the threadpool."""
+    import inspect
+
+    from starlette.routing import Route
+
+    app = make_app()
+    route = next(
+        r for r in app.router.routes if isinstance(r, Route) and r.path == "/docs"
+    )
+    assert inspect.iscoroutinefunction(route.endpoint)
+
+
+# ── Precompressed, content-hashed static assets ───────────────────────────────
+
+
+def test_docs_script_urls_carry_content_hash():
+    """Plugin script URLs in the docs page should include a content hash."""
+    import re
+
+    client = TestClient(make_app())
+    html = client.get("/docs").text
+    for f in DOCBUDDY_JS_FILES:
+        assert re.search(rf"/docbuddy-static/{f}\?v=[0-9a-f]{{16}}", html), f
+
+
+def test_default_theme_url_carries_content_hash():
+    """The bundled theme stylesheet URL should be versioned too."""
+    client = TestClient(make_app())
+    html = client.get("/docs").text
+    assert "/docbuddy-static/themes/light-theme.css?v=" in html
+
+
+def test_hashed_static_url_is_immutable():
+    """Requests with the current content hash should be cached as immutable."""
+    import re
+
+    client = TestClient(make_app())
+    html = client.get("/docs").text
+    url = re.search(r'src="(/docbuddy-static/core\.js\?v=[0-9a-f]+)"', html).group(1)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+
+
+def test_unhashed_static_url_revalidates():
+    """Requests without a (matching) hash should revalidate via ETag."""
+    client = TestClient(make_app())
+    for url in ("/docbuddy-static/core.js", "/docbuddy-static/core.js?v=stale"):
+        response = client.get(url)
+        assert response.headers["cache-control"] == "no-cache"
+        assert response.headers["etag"]
+
+
+def test_static_gzip_variant_served():
+    """gzip should be used when it is the only accepted encoding."""
+    client = TestClient(make_app())
+    response = client.get(
+        "/docbuddy-static/core.js", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    # httpx transparently decodes the body
+    assert "DocBuddy" in response.text
+
+
+def test_static_identity_when_no_encoding_accepted():
+    """Without Accept-Encoding the uncompressed file should be served."""
+    client = TestClient(make_app())
+    response = client.get(
+        "/docbuddy-static/core.js", headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"].strip('"').count("-") == 0
+
+
+def test_static_brotli_variant_served():
+    """brotli should be preferred when installed and accepted."""
+    import pytest
+
+    pytest.importorskip("brotli")
+    client = TestClient(make_app())
+    response = client.get(
+        "/docbuddy-static/core.js", headers={"Accept-Encoding": "gzip, br"}
+    )
+    assert response.headers["content-encoding"] == "br"
+
+
+def test_static_304_on_matching_etag():
+    """A conditional request with the representation's ETag should get 304."""
+    client = TestClient(make_app())
+    headers = {"Accept-Encoding": "gzip"}
+    etag = client.get("/docbuddy-static/chat.js", headers=headers).headers["etag"]
+    response = client.get(
+        "/docbuddy-static/chat.js", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_static_head_request_has_no_body():
+    """HEAD requests should return headers only."""
+    client = TestClient(make_app())
+    response = client.head("/docbuddy-static/core.js")
+    assert response.status_code == 200
+    assert response.content == b""
+
+
+def test_select_encoding_respects_q_values():
+    """Accept-Encoding q-values should drive encoding selection."""
+    from docbuddy.assets import select_encoding
+
+    assert select_encoding("gzip, br", ["br", "gzip"]) == "br"
+    assert select_encoding("gzip;q=1.0, br;q=0.5", ["br", "gzip"]) == "gzip"
+    assert select_encoding("br;q=0", ["br", "gzip"]) is None
+    assert select_encoding("*", ["gzip"]) == "gzip"
+    assert select_encoding("", ["br", "gzip"]) is None
+
+
+def test_static_compresses_off_the_event_loop(monkeypatch, tmp_path):
+    """A variant that is not precompressed yet is built on a worker thread."""
+    import asyncio
+    import threading
+
+    import docbuddy.assets as assets_module
+
+    (tmp_path / "app.js").write_text("console.log('DocBuddy');\n" * 200)
+    static = assets_module.StaticAssets(tmp_path)
+    compress = assets_module._compress
+    threads = []
+
+    def record(body, encoding):
+        threads.append(threading.current_thread())
+        return compress(body, encoding)
+
+    monkeypatch.setattr(assets_module, "_compress", record)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/app.js",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(static(scope, None, send))
+    assert threads and threading.main_thread() not in threads
+    assert (b"content-encoding", b"gzip") in sent[0]["headers"]
+
+
+# ── Bundled DocBuddy script ───────────────────────────────────────────────────
+
+
+def make_bundle_app() -> FastAPI:
+    """Return a fresh FastAPI app serving the single-script bundle."""
+    app = FastAPI(title="Test App Bundle")
+    setup_docs(app, bundle=True)
+    return app
+
+
+def test_bundle_option_emits_single_script():
+    """With bundle=True the page should load one bundle instead of six modules."""
+    client = TestClient(make_bundle_app())
+    html = client.get("/docs").text
+    assert "/docbuddy-static/docbuddy.bundle.js?v=" in html
+    for f in DOCBUDDY_JS_FILES:
+        assert f"/docbuddy-static/{f}" not in html
+    assert html.find("swagger-ui-bundle") < html.find("docbuddy.bundle.js")
+
+
+def test_bundle_default_is_individual_modules():
+    """Without the option the page should keep loading the individual modules."""
+    html = get_swagger_ui_html(openapi_url="/openapi.json", title="T").body.decode()
+    assert "docbuddy.bundle.js" not in html
+    assert "/docbuddy-static/core.js" in html
+
+
+def test_bundle_is_served_minified_with_source_map():
+    """The bundle should be smaller than its sources and reference a source map."""
+    client = TestClient(make_bundle_app())
+    bundle = client.get("/docbuddy-static/docbuddy.bundle.js").text
+    sources = get_all_plugin_js(client)
+    assert len(bundle) < len(sources)
+    assert bundle.rstrip().endswith("//# sourceMappingURL=docbuddy.bundle.js.map")
+    for marker in ("window.DocBuddy", "DocBuddyPlugin", "AgentPanelFactory"):
+        assert marker in bundle
+
+    source_map = client.get("/docbuddy-static/docbuddy.bundle.js.map").json()
+    assert source_map["version"] == 3
+    assert source_map["sources"] == DOCBUDDY_JS_FILES
+
+
+def test_bundle_source_map_points_at_original_lines():
+    """Every mapped bundle line should start with text from its source line."""
+    import json
+    from pathlib import Path
+
+    import docbuddy
+    from docbuddy.bundle import build_bundle
+
+    static_dir = Path(docbuddy.__file__).parent / "static"
+    bundle, raw_map = build_bundle(static_dir)
+    source_map = json.loads(raw_map)
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+    def decode(segment):
+        values, value, shift = [], 0, 0
+        for c in segment:
+            digit = alphabet.index(c)
+            value |= (digit & 31) << shift
+            if digit & 32:
+                shift += 5
+            else:
+                values.append(-(value >> 1) if value & 1 else value >> 1)
+                value, shift = 0, 0
+        return values
+
+    sources = [
+        (static_dir / f).read_text(encoding="utf-8").split("\n")
+        for f in source_map["sources"]
+    ]
+    out_lines = bundle.decode("utf-8").split("\n")
+    src = line = col = 0
+    for i, segment in enumerate(source_map["mappings"].split(";")):
+        if not segment:
+            continue
+        _, d_src, d_line, d_col = decode(segment)
+        src, line, col = src + d_src, line + d_line, col + d_col
+        assert sources[src][line][col:].startswith(out_lines[i][:8])
+
+
+def test_minifier_preserves_strings_regexes_and_templates():
+    """Comment-like text inside literals must survive minification."""
+    from docbuddy.bundle import minify_lines
+
+    source = (
+        "var url = 'http://example.com'; // trailing comment\n"
+        "/* block\n   comment */\n"
+        "    var re = /\\/\\*[^/]*\\*\\//g;\n"
+        "var t = `line one // not a comment\n"
+        "  ${a ? `nested ${b}` : '/* x */'} end`;\n"
+        "var half = total / 2 / count;\n"
+    )
+    text = "\n".join(t for _, _, t in minify_lines(source))
+    assert "trailing comment" not in text
+    assert "block" not in text
+    assert "'http://example.com'" in text
+    assert "/\\/\\*[^/]*\\*\\//g" in text
+    assert "`line one // not a comment\n  ${a ? `nested ${b}` : '/* x */'} end`" in text
+    assert "var half = total / 2 / count;" in text
+
+
+def test_standalone_page_loads_scripts_in_parallel():
+    """The standalone page should not chain script loads one after another."""
+    from pathlib import Path
+
+    import docbuddy
+
+    html = (Path(docbuddy.__file__).parent / "standalone.html").read_text()
+    assert "loadNext" not in html
+    assert "s.async = false" in html
+
+
+# ── Server-side OpenAPI digest ────────────────────────────────────────────────
+
+
+_NODE_CORE_HARNESS = r"""
+const fs = require('fs');
+const noop = () => {};
+const el = () => ({ style: {}, appendChild: noop, setAttribute: noop, addEventListener: noop });
+global.window = global;
+global.document = {
+  addEventListener: noop, getElementById: () => null, createElement: el,
+  head: { appendChild: noop }, body: { appendChild: noop },
+  documentElement: { style: { setProperty: noop } }, querySelector: () => null,
+};
+const store = {};
+global.localStorage = {
+  getItem: k => (k in store ? store[k] : null),
+  setItem: (k, v) => { store[k] = String(v); }, removeItem: k => { delete store[k]; },
+};
+global.fetch = () => new Promise(noop);
+(0, eval)(fs.readFileSync(process.argv[1], 'utf8'));
+const input = JSON.parse(fs.readFileSync(0, 'utf8'));
+const fn = new Function('DocBuddy', 'input', 'return (' + input.expr + ');');
+Promise.resolve(fn(window.DocBuddy, input.arg)).then(
+  (value) => process.stdout.write(JSON.stringify(value)));
+"""
+
+
+def run_core_js(expr, arg=None):
+    """Evaluate ``expr`` against core.js in node (skips when node is missing)."""
+    import json
+    import shutil
+    import subprocess
+    from pathlib import Path
+
+    import pytest
+
+    import docbuddy
+
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node is not installed")
+    core_js = Path(docbuddy.__file__).parent / "static" / "core.js"
+    result = subprocess.run(
+        [node, "-e", _NODE_CORE_HARNESS, str(core_js)],
+        input=json.dumps({"expr": expr, "arg": arg}),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def make_items_app() -> FastAPI:
+    """Return an app with a couple of documented routes and a request model."""
+    from pydantic import BaseModel
+
+    class Item(BaseModel):
+        name: str
+        tags: list = []
+
+    app = FastAPI(title="Items", description="Item store")
+
+    @app.get("/items/{item_id}", summary="Get an item", tags=["items"])
+    def get_item(item_id: int, q: str = ""):
+        return {"id": item_id}
+
+    @app.post("/items", summary="Create an item", tags=["items"])
+    def create_item(item: Item):
+        return item
+
+    setup_docs(app)
+    return app
+
+
+def test_digest_endpoint_serves_context_and_tool():
+    """/docbuddy-digest should serve the prompt context and tool definition."""
+    client = TestClient(make_items_app())
+    response = client.get("/docbuddy-digest")
+    assert response.status_code == 200
+    digest = response.json()
+    assert digest["openapi_url"] == "/openapi.json"
+    assert "## `/items/{item_id}`" in digest["context"]
+    assert "**Summary:** Create an item" in digest["context"]
+    assert digest["tool"]["function"]["name"] == "api_request"
+    assert (
+        "GET /items/{item_id} — Get an item"
+        in digest["tool"]["function"]["description"]
+    )
+
+
+def test_digest_endpoint_etag_and_304():
+    """The digest should carry an ETag and answer conditional requests with 304."""
+    client = TestClient(make_items_app())
+    etag = client.get("/docbuddy-digest").headers["etag"]
+    response = client.get("/docbuddy-digest", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_digest_computed_once_until_routes_change(monkeypatch):
+    """The digest should be cached and rebuilt only when the routes change."""
+    import docbuddy.plugin as plugin_module
+
+    calls = []
+    original = plugin_module.build_digest
+
+    def counting_build(schema, openapi_url):
+        calls.append(openapi_url)
+        return original(schema, openapi_url)
+
+    monkeypatch.setattr(plugin_module, "build_digest", counting_build)
+    app = make_items_app()
+    client = TestClient(app)
+    first = client.get("/docbuddy-digest")
+    client.get("/docbuddy-digest")
+    assert len(calls) == 1
+
+    @app.delete("/items/{item_id}", summary="Delete an item")
+    def delete_item(item_id: int):
+        return None
+
+    app.openapi_schema = None
+    second = client.get("/docbuddy-digest")
+    assert len(calls) == 2
+    assert second.headers["etag"] != first.headers["etag"]
+    assert "DELETE /items/{item_id}" in second.json()["tool"]["function"]["description"]
+
+
+def test_digest_url_in_docs_page():
+    """The docs page should tell the client where the digest and schema live."""
+    client = TestClient(make_app())
+    html = client.get("/docs").text
+    assert 'window.DOCBUDDY_DIGEST_URL = "/docbuddy-digest"' in html
+    assert 'window.DOCBUDDY_OPENAPI_URL = "/openapi.json"' in html
+
+
+def test_digest_disabled_for_external_openapi_url():
+    """No digest should be served when the page loads a different schema."""
+    app = FastAPI(title="External")
+    setup_docs(app, openapi_url="https://example.com/openapi.json")
+    client = TestClient(app)
+    assert client.get("/docbuddy-digest").status_code == 404
+    assert "window.DOCBUDDY_DIGEST_URL = null" in client.get("/docs").text
+
+
+def test_client_uses_digest_and_memoizes_context():
+    """core.js should seed its schema cache from the digest and memoize fallbacks."""
+    client = TestClient(make_app())
+    js = client.get("/docbuddy-static/core.js").text
+    assert "window.DOCBUDDY_DIGEST_URL" in js
+    assert "applyOpenApiDigest" in js
+    assert "new WeakMap()" in js
+    for f in ("chat.js", "agent.js", "workflow.js"):
+        assert "DB.getApiRequestTool(" in client.get(f"/docbuddy-static/{f}").text
+
+
+def test_python_digest_matches_core_js_for_demo_schema():
+    """The Python port must produce byte-identical output to core.js."""
+    import sys
+    from pathlib import Path
+
+    from docbuddy.digest import build_api_request_tool, build_openapi_context
+
+    examples = Path(__file__).resolve().parent.parent / "examples"
+    sys.path.insert(0, str(examples))
+    try:
+        import demo_server
+    finally:
+        sys.path.remove(str(examples))
+
+    schema = demo_server.app.openapi()
+    js = run_core_js(
+        "[DocBuddy.buildOpenApiContext(input), DocBuddy.buildApiRequestTool(input)]",
+        schema,
+    )
+    assert js[0] == build_openapi_context(schema)
+    assert js[1] == build_api_request_tool(schema)
+
+
+def test_python_digest_matches_core_js_for_edge_cases():
+    """JavaScript truthiness, key order and string conversion must be mirrored."""
+    from docbuddy.digest import build_api_request_tool, build_openapi_context
+
+    schema = {
+        "info": {"title": "", "version": 2.0, "description": "Edge"},
+        "servers": [{"url": "/v1"}, "bogus", {"url": "/v2", "description": "two"}],
+        "paths": {
+            "/b": {
+                "get": {
+                    "tags": ["x", None, 3],
+                    "parameters": [{"name": "p", "required": 1}, "skip", []],
+                    "responses": {
+                        "404": {},
+                        "200": {"description": "ok"},
+                        "default": "x",
+                    },
+                },
+                "head": {"summary": "Head"},
+            },
+            "/a": [],
+            "/c": {
+                "post": {
+                    "requestBody": {
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/M"}
+                            },
+                            "text/plain": {
+                                "schema": {"type": "object", "properties": {}}
+                            },
+                        }
+                    }
+                }
+            },
+        },
+        "components": {
+            "schemas": {
+                "M": {
+                    "properties": {
+                        "10": {"type": ["string", "null"]},
+                        "2": {
+                            "type": "array",
+                            "items": {"$ref": "#/components/schemas/N"},
+                        },
+                        "z": {"type": "array", "items": {}},
+                        "a": True,
+                    },
+                    "required": ["2"],
+                },
+                "N": [],
+            }
+        },
+    }
+    js = run_core_js(
+        "[DocBuddy.buildOpenApiContext(input), DocBuddy.buildApiRequestTool(input)]",
+        schema,
+    )
+    assert js[0] == build_openapi_context(schema)
+    assert js[1] == build_api_request_tool(schema)
+
+
+# ── Relevance-ranked endpoint retrieval ──────────────────────────────────────
+
+
+def make_large_schema(n_resources: int = 15) -> dict:
+    """Return a schema with ``4 * n_resources`` operations across many resources."""
+    nouns = [
+        "invoice", "customer", "payment", "shipment", "warehouse", "product",
+        "refund", "coupon", "supplier", "employee", "ticket", "report",
+        "webhook", "subscription", "address", "category", "review", "cart",
+    ]  # fmt: skip
+    paths = {}
+    schemas = {}
+    for noun in nouns[:n_resources]:
+        model = noun.capitalize()
+        schemas[model] = {
+            "description": f"A {noun} record",
+            "properties": {"id": {"type": "integer"}, "name": {"type": "string"}},
+            "required": ["id"],
+        }
+        ref = {"$ref": f"#/components/schemas/{model}"}
+        paths[f"/{noun}s"] = {
+            "get": {
+                "operationId": f"list{model}s",
+                "summary": f"List {noun}s",
+                "tags": [noun],
+                "parameters": [{"name": "limit", "in": "query"}],
+                "responses": {"200": {"description": "OK"}},
+            },
+            "post": {
+                "operationId": f"create{model}",
+                "summary": f"Create a {noun}",
+                "requestBody": {"content": {"application/json": {"schema": ref}}},
+                "responses": {"201": {"description": "Created"}},
+            },
+        }
+        paths[f"/{noun}s/{{{noun}_id}}"] = {
+            "get": {
+                "operationId": f"get{model}",
+                "summary": f"Get a {noun} by id",
+                "parameters": [{"name": f"{noun}_id", "in": "path", "required": True}],
+                "responses": {
+                    "200": {
+                        "description": "OK",
+                        "content": {"application/json": {"schema": ref}},
+                    }
+                },
+            },
+            "delete": {
+                "operationId": f"delete{model}",
+                "summary": f"Delete a {noun}",
+                "responses": {"204": {"description": "Deleted"}},
+            },
+        }
+    return {
+        "openapi": "3.1.0",
+        "info": {"title": "Big", "version": "1"},
+        "paths": paths,
+        "components": {"schemas": schemas},
+    }
+
+
+def test_tokenize_splits_camel_case_and_stems_plurals():
+    """tokenize lowercases, splits camelCase and drops stopwords and plural s."""
+    from docbuddy.digest import tokenize
+
+    assert tokenize("listInvoices for the customer_id") == [
+        "list",
+        "invoice",
+        "customer",
+        "id",
+    ]
+    assert tokenize("address status") == ["address", "statu"]
+
+
+def test_operation_index_ranks_relevant_operations_first():
+    """BM25 search returns the operations matching the query, best first."""
+    from docbuddy.digest import OperationIndex
+
+    index = OperationIndex(make_large_schema())
+    hits = [index.operations[i] for i in index.search("delete an invoice", 3)]
+    assert (hits[0].method, hits[0].path) == ("delete", "/invoices/{invoice_id}")
+    assert all("invoice" in op.path for op in hits)
+    assert index.search("zzz unrelated", 3) == []
+
+
+def test_retrieval_context_for_large_schema():
+    """Large schemas get a compact index plus details for relevant operations."""
+    from docbuddy.digest import build_openapi_context
+
+    schema = make_large_schema()
+    full = build_openapi_context(schema)
+    ctx = build_openapi_context(schema, "refund a payment")
+
+    assert len(ctx) < len(full)
+    assert "This API has 60 operations. Compact index:" in ctx
+    assert "- GET /webhooks — List webhooks" in ctx
+    relevant = ctx.split("# Relevant Endpoints", 1)[1]
+    assert "## `/refunds`" in relevant
+    assert "## `/webhooks`" not in relevant
+    assert "## `Refund`" in relevant
+    assert "## `Webhook`" not in relevant
+
+
+def test_retrieval_skipped_for_small_schema():
+    """Schemas under the threshold keep the full context even with a query."""
+    from docbuddy.digest import build_openapi_context
+
+    schema = make_large_schema(5)
+    assert build_openapi_context(schema, "invoice") == build_openapi_context(schema)
+
+
+def test_tool_description_capped_for_huge_schema():
+    """The api_request tool lists at most max_index_entries endpoints."""
+    from docbuddy.digest import RETRIEVAL_OPTIONS, build_api_request_tool
+
+    schema = {"paths": {f"/r{i}": {"get": {}} for i in range(300)}}
+    desc = build_api_request_tool(schema)["function"]["description"]
+    assert desc.count("\n- GET ") == RETRIEVAL_OPTIONS["max_index_entries"]
+    assert "… 50 more endpoints" in desc
+
+
+def test_retrieval_matches_core_js():
+    """core.js ranks and renders retrieval contexts exactly like digest.py."""
+    from docbuddy.digest import (
+        OperationIndex,
+        build_api_request_tool,
+        build_openapi_context,
+        tokenize,
+    )
+
+    schema = make_large_schema()
+    schema["paths"]["/extra"] = {"get": {"tags": [1, None], "parameters": [[]]}}
+    schema["paths"]["/big"] = {f"{m}": {"summary": 5} for m in ("put", "patch")}
+    queries = ["Show me unpaid invoices", "createCustomer", "", "zzz"]
+    js = run_core_js(
+        "[input.queries.map(function(q) {"
+        "  return [DocBuddy.buildOpenApiContext(input.schema, q),"
+        "          DocBuddy.searchOperations("
+        "            DocBuddy.buildOperationIndex(input.schema), q, 8),"
+        "          DocBuddy.tokenize(q)];"
+        "}), DocBuddy.buildApiRequestTool(input.big)]",
+        {
+            "schema": schema,
+            "queries": queries,
+            "big": {"paths": {f"/r{i}": {"get": {}} for i in range(260)}},
+        },
+    )
+    index = OperationIndex(schema)
+    for q, (ctx, hits, tokens) in zip(queries, js[0]):
+        assert ctx == build_openapi_context(schema, q)
+        assert hits == index.search(q, 8)
+        assert tokens == tokenize(q)
+    assert js[1] == build_api_request_tool(
+        {"paths": {f"/r{i}": {"get": {}} for i in range(260)}}
+    )
+
+
+# ── LLM proxy ────────────────────────────────────────────────────────────────
+
+
+def make_fake_provider(calls: list):
+    """Return an httpx transport acting as an OpenAI-compatible provider."""
+    import json
+
+    import httpx
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if request.url.path == "/v1/models":
+            return httpx.Response(200, json={"data": [{"id": "fake-model"}]})
+        if request.url.path != "/v1/chat/completions":
+            return httpx.Response(404, json={"error": "not found"})
+        payload = json.loads(request.content)
+
+        async def events():
+            for word in ("Hello", " world"):
+                chunk = {"choices": [{"delta": {"content": word}}]}
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+            yield b"data: [DONE]\n\n"
+
+        if not payload.get("stream"):
+            return httpx.Response(200, json={"model": payload["model"]})
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, content=events()
+        )
+
+    return httpx.MockTransport(handler)
+
+
+def make_proxy_app(calls: list, **kwargs) -> FastAPI:
+    from docbuddy.proxy import LLMProxy
+
+    app = FastAPI(title="Proxy App")
+    proxy = LLMProxy(
+        "http://provider.test/v1/", transport=make_fake_provider(calls), **kwargs
+    )
+    setup_docs(app, llm_proxy=proxy)
+    return app
+
+
+def test_llm_proxy_relays_sse_stream():
+    """The proxy streams the provider's SSE bytes through unchanged."""
+    calls = []
+    client = TestClient(make_proxy_app(calls))
+    response = client.post(
+        "/docbuddy-llm/chat/completions",
+        json={"model": "fake-model", "stream": True, "messages": []},
+        headers={"Authorization": "Bearer browser-key", "Cookie": "session=1"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/event-stream"
+    assert response.headers["x-accel-buffering"] == "no"
+    assert response.text.endswith("data: [DONE]\n\n")
+    assert '"content": " world"' in response.text
+
+    upstream = calls[0]
+    assert str(upstream.url) == "http://provider.test/v1/chat/completions"
+    assert upstream.headers["authorization"] == "Bearer browser-key"
+    assert upstream.headers["accept-encoding"] == "identity"
+    assert "cookie" not in upstream.headers
+
+
+def test_llm_proxy_models_and_server_api_key():
+    """GET /models is relayed and a server-side key replaces the browser's."""
+    calls = []
+    client = TestClient(make_proxy_app(calls, api_key="server-key"))
+    response = client.get(
+        "/docbuddy-llm/models", headers={"Authorization": "Bearer browser-key"}
+    )
+    assert response.json() == {"data": [{"id": "fake-model"}]}
+    assert calls[0].headers["authorization"] == "Bearer server-key"
+
+
+def test_llm_proxy_streams_without_buffering():
+    """Each upstream chunk is relayed before the provider sends the next."""
+    import asyncio
+
+    import httpx
+    from starlette.requests import Request
+
+    from docbuddy.proxy import LLMProxy
+
+    async def run():
+        release = asyncio.Event()
+
+        async def events():
+            yield b"data: first\n\n"
+            await release.wait()
+            yield b"data: second\n\n"
+
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=events())
+        )
+        proxy = LLMProxy("http://provider.test/v1", transport=transport)
+
+        async def receive():
+            return {"type": "http.request", "body": b"{}", "more_body": False}
+
+        request = Request(
+            {
+                "type": "http",
+                "method": "POST",
+                "path": "/",
+                "headers": [],
+                "query_string": b"",
+            },
+            receive,
+        )
+        response = await proxy.forward(request, "chat/completions")
+        chunks = response.body_iterator.__aiter__()
+        first = await asyncio.wait_for(chunks.__anext__(), timeout=1)
+        release.set()
+        second = await asyncio.wait_for(chunks.__anext__(), timeout=1)
+        await proxy.aclose()
+        return first, second
+
+    assert asyncio.run(run()) == (b"data: first\n\n", b"data: second\n\n")
+
+
+def test_llm_proxy_shares_one_connection_pool():
+    """All requests go through a single pooled client with the given limits."""
+    from docbuddy.proxy import LLMProxy
+
+    proxy = LLMProxy(
+        "http://provider.test/v1", max_connections=7, max_keepalive_connections=3
+    )
+    pool = proxy._client._transport._pool
+    assert pool._max_connections == 7
+    assert pool._max_keepalive_connections == 3
+
+
+def test_llm_proxy_unreachable_provider_returns_502():
+    """Connection errors become a JSON 502 the panels can display."""
+    import httpx
+
+    from docbuddy.proxy import LLMProxy
+
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    app = FastAPI(title="Proxy App")
+    setup_docs(
+        app,
+        llm_proxy=LLMProxy(
+            "http://provider.test/v1", transport=httpx.MockTransport(refuse)
+        ),
+    )
+    response = TestClient(app).post("/docbuddy-llm/chat/completions", json={})
+    assert response.status_code == 502
+    assert response.json()["error"] == "LLM provider unreachable"
+
+
+def test_llm_proxy_reports_upstream_errors_mid_stream():
+    """A provider dropping mid-stream ends the SSE reply with an error event."""
+    import json
+
+    import httpx
+
+    from docbuddy.proxy import LLMProxy
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        async def events():
+            yield b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+            raise httpx.ReadError("connection reset", request=request)
+
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, content=events()
+        )
+
+    app = FastAPI(title="Proxy App")
+    transport = httpx.MockTransport(handler)
+    setup_docs(app, llm_proxy=LLMProxy("http://provider.test/v1", transport=transport))
+    response = TestClient(app).post("/docbuddy-llm/chat/completions", json={})
+    assert response.status_code == 200
+    events = [e for e in response.text.split("\n\n") if e.startswith("data: ")]
+    assert '"Hel"' in events[0]
+    assert json.loads(events[-1][len("data: ") :]) == {
+        "error": "LLM provider connection lost",
+        "details": "connection reset",
+    }
+
+
+def test_llm_proxy_closed_on_shutdown_with_lifespan_app():
+    """The pool is closed on shutdown even for apps built with ``lifespan=``."""
+    import contextlib
+
+    from docbuddy.proxy import LLMProxy
+
+    phases = []
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        phases.append("startup")
+        yield
+        phases.append("shutdown")
+
+    app = FastAPI(title="Proxy App", lifespan=lifespan)
+    proxy = LLMProxy("http://provider.test/v1", transport=make_fake_provider([]))
+    setup_docs(app, llm_proxy=proxy)
+    with TestClient(app):
+        assert phases == ["startup"] and not proxy._client.is_closed
+    assert phases == ["startup", "shutdown"]
+    assert proxy._client.is_closed
+
+
+def test_llm_proxy_url_in_page_and_js():
+    """The page exposes the proxy URL and the panels route through it."""
+    app = make_proxy_app([])
+    client = TestClient(app)
+    html = client.get("/docs").text
+    assert 'window.DOCBUDDY_LLM_PROXY_URL = "/docbuddy-llm";' in html
+
+    plain = TestClient(make_app()).get("/docs").text
+    assert "window.DOCBUDDY_LLM_PROXY_URL = null;" in plain
+    assert "/docbuddy-llm/models" not in [r.path for r in make_app().routes]
+
+    js = get_all_plugin_js(client)
+    assert "DOCBUDDY_LLM_PROXY_URL" in js
+    assert js.count("DB.getLLMBaseUrl(settings)") == 4
+
+
+def test_llm_proxy_from_url_string():
+    """A provider URL string is accepted and wrapped in an LLMProxy."""
+    app = FastAPI(title="Proxy App")
+    setup_docs(app, llm_proxy="http://localhost:11434/v1")
+    paths = {getattr(r, "path", None) for r in app.routes}
+    assert {"/docbuddy-llm/chat/completions", "/docbuddy-llm/models"} <= paths
+
+
+# ── Benchmarks ───────────────────────────────────────────────────────────────
+
+
+def import_benchmark(name: str):
+    """Import a module from the top-level ``benchmarks`` directory."""
+    import importlib
+    import sys
+    from pathlib import Path
+
+    benchmarks = Path(__file__).resolve().parent.parent / "benchmarks"
+    sys.path.insert(0, str(benchmarks))
+    try:
+        return importlib.import_module(name)
+    finally:
+        sys.path.remove(str(benchmarks))
+
+
+def test_benchmark_schema_generator_sizes():
+    """Synthetic schemas have exactly the requested number of operations."""
+    from docbuddy.digest import build_openapi_context, list_operations
+
+    schemas = import_benchmark("schemas")
+    for size in (1, 10, 1000):
+        schema = schemas.make_schema(size)
+        assert len(list_operations(schema)) == size
+    schema = schemas.make_schema(12)
+    assert "/v2/health" in schema["paths"]
+    refs = str(schema["paths"]["/v1/invoices"])
+    assert "#/components/schemas/CreateInvoiceV1" in refs
+    assert "CreateInvoiceV1" in schema["components"]["schemas"]
+    assert "Synthetic API (12 operations)" in build_openapi_context(schema)
+
+
+def test_benchmark_compare_reports_changes():
+    """--compare lines up metrics from two result files."""
+    run = import_benchmark("run")
+    old = {"meta": {}, "docs_page": {"warm": {"mean_ms": 2.0, "iterations": 5}}}
+    new = {"meta": {}, "docs_page": {"warm": {"mean_ms": 3.0, "iterations": 5}}}
+    lines = run.compare(old, new)
+    assert len(lines) == 2
+    assert lines[1].startswith("docs_page.warm.mean_ms")
+    assert lines[1].endswith("+50.0%")
+
+
+# ── CLI server ───────────────────────────────────────────────────────────────
+
+
+def cli_server():
+    """Context manager running the docbuddy CLI server on a free port.
+
+    Yields the ``(host, port)`` address.
+    """
+    import contextlib
+    import functools
+    import threading
+
+    import docbuddy.cli as cli_module
+
+    @contextlib.contextmanager
+    def run():
+        handler = functools.partial(
+            cli_module.DocBuddyRequestHandler, directory=str(cli_module._pkg_dir())
+        )
+        server = cli_module.DocBuddyHTTPServer(("127.0.0.1", 0), handler, workers=4)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield server.server_address
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    return run()
+
+
+def test_cli_server_keep_alive_and_gzip():
+    """Several requests share one HTTP/1.1 connection; text is gzip-encoded."""
+    import gzip
+    import http.client
+
+    with cli_server() as address:
+        conn = http.client.HTTPConnection(*address, timeout=5)
+        conn.request("GET", "/standalone.html", headers={"Accept-Encoding": "gzip"})
+        page = conn.getresponse()
+        html = gzip.decompress(page.read()).decode()
+        assert page.version == 11
+        assert page.getheader("Content-Encoding") == "gzip"
+        assert page.getheader("Cache-Control") == "no-cache"
+        assert "window.DOCBUDDY_ASSET_VERSIONS = {" in html
+
+        sock = conn.sock
+        conn.request("GET", "/static/core.js")
+        core = conn.getresponse()
+        assert core.status == 200
+        assert "DocBuddy" in core.read().decode()
+        assert conn.sock is sock, "connection should be kept alive"
+        conn.close()
+
+
+def test_cli_server_closes_idle_connections_quietly(monkeypatch, capsys):
+    """An idle keep-alive connection is closed without logging a timeout."""
+    import http.client
+
+    import docbuddy.cli as cli_module
+
+    monkeypatch.setattr(cli_module.DocBuddyRequestHandler, "timeout", 0.2)
+    with cli_server() as address:
+        conn = http.client.HTTPConnection(*address, timeout=5)
+        conn.request("GET", "/standalone.html")
+        conn.getresponse().read()
+        assert conn.sock.recv(1) == b"", "idle connection should be closed"
+        conn.close()
+    assert "timed out" not in capsys.readouterr().err
+
+
+def test_cli_server_hashed_assets_are_immutable():
+    """Asset URLs carrying the current hash get a long-lived cache policy."""
+    import http.client
+    import re
+
+    with cli_server() as address:
+        conn = http.client.HTTPConnection(*address, timeout=5)
+        conn.request("GET", "/standalone.html")
+        html = conn.getresponse().read().decode()
+        digest = re.search(r'"core\.js": "([0-9a-f]+)"', html).group(1)
+        assert "'?v=' + versions[name]" in html
+
+        conn.request("GET", f"/static/core.js?v={digest}")
+        response = conn.getresponse()
+        response.read()
+        assert (
+            response.getheader("Cache-Control") == "public, max-age=31536000, immutable"
+        )
+
+        conn.request("GET", "/static/core.js?v=stale")
+        response = conn.getresponse()
+        response.read()
+        assert response.getheader("Cache-Control") == "no-cache"
+        conn.close()
+
+
+def test_cli_server_conditional_requests():
+    """ETag and Last-Modified validators both produce 304 responses."""
+    import http.client
+
+    with cli_server() as address:
+        conn = http.client.HTTPConnection(*address, timeout=5)
+        conn.request("GET", "/static/chat.js")
+        first = conn.getresponse()
+        first.read()
+        etag, last_modified = first.getheader("ETag"), first.getheader("Last-Modified")
+        assert etag and last_modified
+
+        conn.request("GET", "/static/chat.js", headers={"If-None-Match": etag})
+        response = conn.getresponse()
+        assert response.status == 304 and response.read() == b""
+
+        conn.request(
+            "GET", "/static/chat.js", headers={"If-Modified-Since": last_modified}
+        )
+        response = conn.getresponse()
+        assert response.status == 304 and response.read() == b""
+
+        conn.request("HEAD", "/static/chat.js")
+        response = conn.getresponse()
+        assert response.status == 200
+        assert int(response.getheader("Content-Length")) > 0
+        assert response.read() == b""
+        conn.close()
+
+
+def test_cli_server_only_exposes_the_standalone_site():
+    """Package sources are not served; / redirects to the standalone page."""
+    import http.client
+
+    with cli_server() as address:
+        conn = http.client.HTTPConnection(*address, timeout=5)
+        for path in ("/cli.py", "/static/../cli.py", "/templates/swagger_ui.html"):
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            assert response.status == 404, path
+        conn.request("GET", "/")
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 302
+        assert response.getheader("Location") == "/standalone.html"
+        conn.close()
+
+
+def test_cli_server_idle_client_does_not_block_others():
+    """A connection that never sends a request does not stall other clients."""
+    import http.client
+    import socket
+
+    with cli_server() as address:
+        idle = socket.create_connection(address, timeout=5)
+        try:
+            conn = http.client.HTTPConnection(*address, timeout=5)
+            conn.request("GET", "/standalone.html")
+            assert conn.getresponse().status == 200
+            conn.close()
+        finally:
+            idle.close()
+
+
+def test_static_route_honours_if_modified_since():
+    """The /docbuddy-static route also answers If-Modified-Since with 304."""
+    client = TestClient(make_app())
+    first = client.get("/docbuddy-static/core.js")
+    last_modified = first.headers["last-modified"]
+    response = client.get(
+        "/docbuddy-static/core.js", headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+    stale = client.get(
+        "/docbuddy-static/core.js",
+        headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"},
+    )
+    assert stale.status_code == 200
+
+
+# ── Lazy package imports ─────────────────────────────────────────────────────
+
+
+def test_import_docbuddy_does_not_import_web_stack():
+    """``import docbuddy`` and the CLI must not pull in FastAPI and friends."""
+    import subprocess
+    import sys
+
+    heavy = ("fastapi", "starlette", "jinja2", "pydantic", "httpx")
+    code = (
+        "import sys, docbuddy, docbuddy.cli; "
+        f"print([m for m in {heavy!r} if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_lazy_public_attributes():
+    """Public names resolve on first access and unknown names still fail."""
+    import pytest
+
+    import docbuddy
+    from docbuddy import plugin, proxy
+
+    assert docbuddy.setup_docs is plugin.setup_docs
+    assert docbuddy.get_swagger_ui_html is plugin.get_swagger_ui_html
+    assert docbuddy.LLMProxy is proxy.LLMProxy
+    assert isinstance(docbuddy.__version__, str)
+    assert {"setup_docs", "LLMProxy", "__version__"} <= set(dir(docbuddy))
+    with pytest.raises(AttributeError):
+        docbuddy.not_a_real_attribute
+
+
+# ── Streaming markdown rendering ─────────────────────────────────────────────
+
+
+def test_split_markdown_blocks():
+    """Blocks split at blank lines, but never inside fences or indented content."""
+    text = (
+        "# Title\n\nFirst paragraph\nstill first\n\n"
+        "```python\nx = 1\n\ny = 2\n```\n\n"
+        "- item\n\n  continued item\n\nTail"
+    )
+    blocks = run_core_js("DocBuddy.splitMarkdownBlocks(input)", text)
+    assert "".join(blocks) == text
+    assert blocks == [
+        "# Title\n\n",
+        "First paragraph\nstill first\n\n",
+        "```python\nx = 1\n\ny = 2\n```\n\n",
+        "- item\n\n  continued item\n\n",
+        "Tail",
+    ]
+
+
+def test_split_markdown_blocks_keeps_loose_lists_together():
+    """Items of a loose list, bulleted or numbered, stay in one block."""
+    text = "Steps:\n\n1. first\n\n2. second\n\n- a\n\n- b\n\nDone"
+    blocks = run_core_js("DocBuddy.splitMarkdownBlocks(input)", text)
+    assert blocks == ["Steps:\n\n", "1. first\n\n2. second\n\n- a\n\n- b\n\n", "Done"]
+    # The next item may still be streaming in: no boundary is committed yet
+    partial = run_core_js("DocBuddy.splitMarkdownBlocks(input)", "- a\n\n-")
+    assert partial == ["- a\n\n-"]
+
+
+def test_streaming_renderer_resolves_reference_links():
+    """Link reference definitions reach every block, wherever they appear."""
+    text = "See [the docs][1].\n\nMore text\n\n[1]: https://example.com/docs"
+    result = run_core_js(
+        "(function() {"
+        "  var parsed = [];"
+        "  var parse = function(s) { parsed.push(s); return '<p>'; };"
+        "  var r = DocBuddy.createMarkdownRenderer(parse);"
+        "  for (var i = 1; i <= input.length; i++) r.render(input.slice(0, i));"
+        "  return [DocBuddy.splitMarkdownBlocks(input), parsed.slice(-2)];"
+        "})()",
+        text,
+    )
+    blocks, last = result
+    assert blocks == [
+        "See [the docs][1].\n\n",
+        "More text\n\n[1]: https://example.com/docs",
+    ]
+    definition = "[1]: https://example.com/docs"
+    assert last[0] == blocks[0] + "\n\n" + definition
+    assert last[1].startswith("More text") and last[1].endswith(definition)
+
+
+def test_streaming_renderer_parses_each_completed_block_once():
+    """Token-by-token rendering reuses completed blocks and matches a full render."""
+    text = "Intro text\n\n```js\nvar a;\n\nvar b;\n```\n\n| a |\n|---|\n| 1 |\n\nEnd."
+    result = run_core_js(
+        "(function() {"
+        "  var calls = {};"
+        "  var parse = function(s) { calls[s] = (calls[s] || 0) + 1;"
+        "    return '<' + s.length + '>'; };"
+        "  var r = DocBuddy.createMarkdownRenderer(parse);"
+        "  var out;"
+        "  for (var i = 1; i <= input.length; i++) out = r.render(input.slice(0, i));"
+        "  var full = DocBuddy.splitMarkdownBlocks(input).map(parse).join('');"
+        "  return [out === full, calls, r.render('Other'), r.render('Other')];"
+        "})()",
+        text,
+    )
+    same, calls, other, again = result
+    assert same is True
+    blocks = run_core_js("DocBuddy.splitMarkdownBlocks(input)", text)
+    # 2 calls each: one while streaming, one for the reference render above
+    for block in blocks[:-1]:
+        assert calls[block] == 2
+    assert other == again == "<5>"
+
+
+def test_cached_markdown_falls_back_to_escaped_text():
+    """Without DOMPurify the cached renderer escapes, like parseMarkdown."""
+    text = "<b>hi</b>\n\nsecond"
+    cached, plain = run_core_js(
+        "[DocBuddy.renderMarkdownCached('m1', input),"
+        " DocBuddy.splitMarkdownBlocks(input).map(function(b) {"
+        "   return DocBuddy.parseMarkdown(b); }).join('')]",
+        text,
+    )
+    assert cached == plain
+    assert "<b>" not in cached
+
+
+def test_frame_batcher_coalesces_updates():
+    """Only the latest pushed value is flushed, once."""
+    flushed, cancelled = run_core_js(
+        "(function() {"
+        "  var seen = [];"
+        "  var b = DocBuddy.createFrameBatcher(function(v) { seen.push(v); });"
+        "  b.push('a'); b.push('ab'); b.push('abc'); b.flush(); b.flush();"
+        "  var dropped = [];"
+        "  var c = DocBuddy.createFrameBatcher(function(v) { dropped.push(v); });"
+        "  c.push('x'); c.cancel(); c.flush();"
+        "  return [seen, dropped];"
+        "})()"
+    )
+    assert flushed == ["abc"]
+    assert cancelled == []
+
+
+def test_chat_panels_batch_stream_updates():
+    """Chat and agent panels render streamed tokens once per frame, incrementally."""
+    from pathlib import Path
+
+    import docbuddy
+
+    static = Path(docbuddy.__file__).parent / "static"
+    for name in ("chat.js", "agent.js"):
+        source = (static / name).read_text()
+        assert "DB.createFrameBatcher(" in source
+        assert "contentBatcher.push(accum)" in source
+        assert "DB.renderMarkdownCached(messageId, content)" in source
+        assert "DB.parseMarkdown(" not in source
+
+
+# ── Conversation history store ───────────────────────────────────────────────
+
+
+def test_history_diff_writes_only_changed_messages():
+    """Saving compares message objects, so unchanged messages are not rewritten."""
+    put, remove = run_core_js(
+        "(function() {"
+        "  var a = { messageId: 'a', content: 'hi' };"
+        "  var b = { messageId: 'b', content: 'partial' };"
+        "  var gone = { messageId: 'gone' };"
+        "  var written = new Map([['a', a], ['b', b], ['gone', gone]]);"
+        "  var b2 = { messageId: 'b', content: 'partial reply' };"
+        "  var c = { messageId: 'c', content: 'new' };"
+        "  var d = DocBuddy._diffHistory(written, [a, b2, c]);"
+        "  return [d.put.map(function(e) { return e.id; }), d.remove];"
+        "})()"
+    )
+    assert put == ["b", "c"]
+    assert remove == ["gone"]
+
+
+def test_history_store_falls_back_to_local_storage():
+    """Without IndexedDB the store keeps the previous localStorage format."""
+    page, stored, cleared = run_core_js(
+        "(function() {"
+        "  var msgs = [];"
+        "  for (var i = 0; i < 25; i++) msgs.push({ role: 'user', content: 'm' + i, messageId: 'id' + i });"
+        "  var store = DocBuddy.chatHistoryStore;"
+        "  return store.save(msgs).then(function() { return store.loadPage(); })"
+        "    .then(function(page) {"
+        "      var stored = JSON.parse(localStorage.getItem('docbuddy-chat-history')).length;"
+        "      return store.save([]).then(function() { return store.loadPage(); })"
+        "        .then(function(empty) { return [page, stored, empty]; });"
+        "    });"
+        "})()"
+    )
+    assert stored == 20
+    assert page["hasMore"] is False
+    assert [m["content"] for m in page["messages"]] == [f"m{i}" for i in range(5, 25)]
+    assert cleared == {"messages": [], "hasMore": False}
+
+
+def test_merge_loaded_history_keeps_new_messages():
+    """Messages sent while history was loading are kept after the loaded page."""
+    merged = run_core_js(
+        "DocBuddy.mergeLoadedHistory("
+        "  [{ messageId: 'a' }, { content: 'legacy' }],"
+        "  [{ content: 'legacy' }, { messageId: 'a' }, { messageId: 'new' }])"
+    )
+    assert merged == [{"messageId": "a"}, {"content": "legacy"}, {"messageId": "new"}]
+
+
+def test_history_panels_page_through_indexeddb_store():
+    """Panels load history pages asynchronously and the standalone page clears it."""
+    from pathlib import Path
+
+    import docbuddy
+
+    package = Path(docbuddy.__file__).parent
+    core = (package / "static" / "core.js").read_text()
+    assert "indexedDB.open(HISTORY_DB_NAME" in core
+    assert "createHistoryStore('chat', CHAT_HISTORY_KEY" in core
+    assert "createHistoryStore('agent', AGENT_HISTORY_KEY" in core
+    for name, store in (
+        ("chat.js", "chatHistoryStore"),
+        ("agent.js", "agentHistoryStore"),
+    ):
+        source = (package / "static" / name).read_text()
+        assert f"DB.{store}.loadPage(" in source
+        assert "Load earlier messages" in source
+    html = (package / "standalone.html").read_text()
+    assert html.count("indexedDB.deleteDatabase('docbuddy-history')") == 2
+
+
+# ── Virtualized message lists ────────────────────────────────────────────────
+
+
+def test_virtual_window_mounts_only_rows_near_viewport():
+    """Only rows overlapping the viewport (plus overscan) are mounted."""
+    window = run_core_js(
+        "DocBuddy.computeVirtualWindow(input.heights, 5000, 400, 200)",
+        {"heights": [100] * 1000},
+    )
+    # Each row takes 100px: rows 48..55 overlap [4800, 5600)
+    assert window == {"start": 48, "end": 56, "before": 4800, "after": 94400}
+
+    empty = run_core_js("DocBuddy.computeVirtualWindow([], 0, 400, 600)")
+    assert empty == {"start": 0, "end": 0, "before": 0, "after": 0}
+
+    bottom = run_core_js(
+        "DocBuddy.computeVirtualWindow(input, 10000, 500, 0)", [100] * 10
+    )
+    assert bottom == {"start": 10, "end": 10, "before": 1000, "after": 0}
+
+
+def test_virtual_window_does_not_count_row_padding_twice():
+    """Measured row heights already include the gap rendered as padding."""
+    # 90px of content plus the 10px paddingBottom, as read from offsetHeight
+    heights = [90 + 10] * 20
+    window = run_core_js("DocBuddy.computeVirtualWindow(input, 1000, 300, 0)", heights)
+    assert window == {"start": 10, "end": 13, "before": 1000, "after": 700}
+    assert window["before"] + window["after"] + 100 * 3 == sum(heights)
+
+
+def test_chat_panels_use_virtual_list():
+    """Chat and agent panels render history through the windowed list."""
+    from pathlib import Path
+
+    import docbuddy
+
+    static = Path(docbuddy.__file__).parent / "static"
+    for name, element_id in (
+        ("chat.js", "llm-chat-messages"),
+        ("agent.js", "llm-agent-messages"),
+    ):
+        source = (static / name).read_text()
+        assert "DB.createVirtualList(React)" in source
+        assert (
+            f'React.createElement(VirtualList, {{\n            id: "{element_id}"'
+            in source
+        )
+        assert ".map(this.renderMessage)" not in source
+
+
+# ── Token-budgeted prompt assembly ───────────────────────────────────────────
+
+
+def test_estimate_tokens_approximates_bpe_counts():
+    """The estimate counts word pieces, numbers and symbols; whitespace is free."""
+    counts = run_core_js(
+        "input.map(function(t) { return DocBuddy.estimateTokens(t); })",
+        ["", "hello world", "internationalization", "12345", "a.b", "   \n\t"],
+    )
+    assert counts == [0, 4, 5, 2, 3, 0]
+
+
+def make_prompt_history(turns, tool_size=0):
+    """Return API messages for ``turns`` user/assistant turns, with tool calls."""
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"question {i} " + "word " * 50})
+        if tool_size:
+            call = {
+                "id": f"call_{i}",
+                "type": "function",
+                "function": {"name": "api_request", "arguments": "{}"},
+            }
+            history.append({"role": "assistant", "tool_calls": [call]})
+            history.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": f"call_{i}",
+                    "content": "x " * tool_size,
+                }
+            )
+        history.append({"role": "assistant", "content": f"answer {i} " + "word " * 50})
+    return history
+
+
+def test_assemble_prompt_keeps_everything_that_fits():
+    history = make_prompt_history(3)
+    result = run_core_js(
+        "DocBuddy.assemblePrompt({ system: 'sys', history: input,"
+        " contextWindow: 32768, maxTokens: 4096 })",
+        history,
+    )
+    assert result["messages"] == [{"role": "system", "content": "sys"}] + history
+    assert result["dropped"] == 0
+    assert result["condensed"] == 0
+    assert result["tokens"] <= result["budget"]
+
+
+def test_assemble_prompt_condenses_tool_results_before_dropping_turns():
+    history = make_prompt_history(6, tool_size=2000) + [
+        {"role": "user", "content": "latest question"}
+    ]
+    result = run_core_js(
+        "DocBuddy.assemblePrompt({ system: 'sys', history: input,"
+        " contextWindow: 8192, maxTokens: 1024 })",
+        history,
+    )
+    messages = result["messages"]
+    assert result["tokens"] <= result["budget"]
+    assert result["dropped"] == 0
+    assert result["condensed"] == 6
+    assert len(messages) == len(history) + 1
+    assert messages[-1] == {"role": "user", "content": "latest question"}
+    assert all("…[truncated" in m["content"] for m in messages if m["role"] == "tool")
+
+
+def test_assemble_prompt_drops_oldest_turns_with_stable_cut():
+    """Whole turns are dropped oldest first and the cut point only moves forward."""
+    history = make_prompt_history(40, tool_size=20)
+    first, second = run_core_js(
+        "(function() {"
+        "  var state = {};"
+        "  var opts = function(h) { return { system: 'sys', history: h,"
+        "    contextWindow: 4096, maxTokens: 1024, trimState: state }; };"
+        "  var a = DocBuddy.assemblePrompt(opts(input));"
+        "  var more = input.concat([{ role: 'user', content: 'next' }]);"
+        "  var b = DocBuddy.assemblePrompt(opts(more));"
+        "  return [a, b];"
+        "})()",
+        history,
+    )
+    for result in (first, second):
+        assert result["tokens"] <= result["budget"]
+        assert result["dropped"] > 0
+        # The history starts at a user message and tool results keep their call
+        kept = result["messages"][1:]
+        assert kept[0]["role"] == "user"
+        for i, msg in enumerate(kept):
+            if msg["role"] == "tool":
+                assert kept[i - 1]["tool_calls"][0]["id"] == msg["tool_call_id"]
+    # Trimmed to the low-water mark, so the next turn reuses the same prefix
+    assert second["dropped"] == first["dropped"]
+    assert second["messages"][: len(first["messages"])] == first["messages"]
+
+
+def test_assemble_prompt_truncates_system_context_last():
+    result = run_core_js(
+        "DocBuddy.assemblePrompt({ system: input, contextWindow: 2048, maxTokens: 1024,"
+        " history: [{ role: 'user', content: 'hi' }] })",
+        "schema " * 5000,
+    )
+    assert result["tokens"] <= result["budget"]
+    assert result["messages"][0]["content"].endswith("characters]")
+    assert result["messages"][1] == {"role": "user", "content": "hi"}
+
+
+def test_panels_assemble_prompts_within_budget():
+    from pathlib import Path
+
+    import docbuddy
+
+    static = Path(docbuddy.__file__).parent / "static"
+    for name in ("chat.js", "agent.js", "workflow.js"):
+        source = (static / name).read_text()
+        assert "payload.messages = DB.assemblePrompt({" in source
+        assert "contextWindow: settings.contextWindow" in source
+    assert "Context Window (tokens)" in (static / "settings.js").read_text()
+
+
+# ── Prefix-cache-friendly prompt layout ──────────────────────────────────────
+
+
+def test_prompt_layout_system_is_stable_across_queries():
+    layouts = run_core_js(
+        "['list invoices', 'delete the webhook'].map(q =>"
+        " DocBuddy.getPromptLayout('agent', input, '', q))",
+        make_large_schema(),
+    )
+    assert layouts[0]["system"] == layouts[1]["system"]
+    assert "# Relevant Endpoints" not in layouts[0]["system"]
+    for layout in layouts:
+        assert layout["context"].startswith("# Relevant Endpoints")
+    assert layouts[0]["context"] != layouts[1]["context"]
+
+
+def test_prompt_layout_small_schema_has_no_turn_context():
+    layout = run_core_js(
+        "DocBuddy.getPromptLayout('custom', input, 'API: {openapi_context}', 'list pets')",
+        {"openapi": "3.0.0", "info": {"title": "Pets", "version": "1"}, "paths": {}},
+    )
+    assert "Pets" in layout["system"]
+    assert layout["context"] == ""
+
+
+def test_assemble_prompt_appends_context_and_note_to_user_message():
+    result = run_core_js(
+        "DocBuddy.assemblePrompt({ system: 'S', context: 'C', note: 'N',"
+        " history: input, contextWindow: 8192, maxTokens: 512 })",
+        [
+            {"role": "user", "content": "first"},
+            {"role": "assistant", "content": "ok"},
+            {"role": "user", "content": "second"},
+            {"role": "assistant", "content": "working"},
+        ],
+    )
+    messages = result["messages"]
+    assert len([m for m in messages if m["role"] == "system"]) == 1
+    assert messages[0] == {"role": "system", "content": "S"}
+    assert [m["content"] for m in messages] == [
+        "S",
+        "first",
+        "ok",
+        "second\n\n<context>\nC\n\nN\n</context>",
+        "working",
+    ]
+    assert messages[3]["role"] == "user"
+
+
+def test_assemble_prompt_keeps_one_system_message_without_user_turn():
+    result = run_core_js(
+        "DocBuddy.assemblePrompt({ system: 'S', context: 'C',"
+        " history: input, contextWindow: 8192, maxTokens: 512 })",
+        [],
+    )
+    messages = result["messages"]
+    assert messages[0]["role"] == "system"
+    assert len([m for m in messages if m["role"] == "system"]) == 1
+    assert messages[-1] == {"role": "user", "content": "<context>\nC\n</context>"}
+
+
+def test_panels_use_stable_prompt_layout():
+    from pathlib import Path
+
+    import docbuddy
+
+    static = Path(docbuddy.__file__).parent / "static"
+    for name in ("chat.js", "agent.js", "workflow.js"):
+        source = (static / name).read_text()
+        assert "DB.getPromptLayout(" in source
+        assert "context: layout.context" in source
+    assert "note: modeNote" in (static / "agent.js").read_text()
+
+
+def test_benchmark_prompt_prefix_reuses_more_with_stable_layout():
+    import pytest
+
+    result = import_benchmark("run").bench_prompt_prefix(size=100)
+    if result is None:
+        pytest.skip("node is not installed")
+    baseline, stable = result["baseline"], result["stable_layout"]
+    assert baseline["requests"] == stable["requests"] == 10
+    assert stable["reuse_ratio"] > baseline["reuse_ratio"]
+    assert stable["prefill_bytes"] < baseline["prefill_bytes"]
+
+
+# ── Concurrent agent tool calls ──────────────────────────────────────────────
+
+
+def test_map_with_concurrency_keeps_order_and_limit():
+    result = run_core_js(
+        "(() => {"
+        "  let active = 0, peak = 0;"
+        "  const delays = [40, 5, 30, 1, 20, 10];"
+        "  return DocBuddy.mapWithConcurrency(delays, 3, (ms, i) => {"
+        "    active++; peak = Math.max(peak, active);"
+        "    return new Promise(r => setTimeout(() => { active--; r(i); }, ms));"
+        "  }).then(results => ({ results, peak }));"
+        "})()"
+    )
+    assert result == {"results": [0, 1, 2, 3, 4, 5], "peak": 3}
+
+
+def test_safe_tool_calls_are_get_and_head():
+    def call(args):
+        return {"id": "c", "function": {"name": "api_request", "arguments": args}}
+
+    result = run_core_js(
+        "input.map(tc => DocBuddy.isSafeToolCall(tc))",
+        [
+            call('{"method": "GET", "path": "/a"}'),
+            call('{"method": "head", "path": "/a"}'),
+            call('{"path": "/a"}'),
+            call('{"method": "POST", "path": "/a"}'),
+            call('{"method": "DELETE", "path": "/a"}'),
+        ],
+    )
+    assert result == [True, True, True, False, False]
+
+
+def test_execute_api_request_runs_calls_concurrently():
+    result = run_core_js(
+        "(() => {"
+        "  const seen = [];"
+        "  let active = 0, peak = 0;"
+        "  global.fetch = (url, opts) => {"
+        "    seen.push(opts.method + ' ' + url);"
+        "    active++; peak = Math.max(peak, active);"
+        "    const ms = url.endsWith('/a') ? 30 : 5;"
+        "    return new Promise(r => setTimeout(() => { active--; r({"
+        "      status: 200, statusText: 'OK', text: () => Promise.resolve(url) }); }, ms));"
+        "  };"
+        "  window.DOCBUDDY_API_BASE_URL = 'http://api.test';"
+        "  console.debug = () => {};"
+        "  const calls = ['/a', '/b/{id}', '/../x'].map(p => ({"
+        "    path: p, method: 'GET', path_params: { id: 'x y' }, query_params: { q: 1 } }));"
+        "  return DocBuddy.mapWithConcurrency(calls, 4, a => DocBuddy.executeApiRequest(a))"
+        "    .then(responses => ({ responses, seen, peak }));"
+        "})()"
+    )
+    assert result["peak"] == 2
+    bodies = [r["body"] for r in result["responses"]]
+    assert bodies[:2] == ["http://api.test/a?q=1", "http://api.test/b/x%20y?q=1"]
+    assert result["responses"][2]["statusText"] == "Blocked"
+    assert len(result["seen"]) == 2
+
+
+def test_agent_batches_safe_tool_calls():
+    from pathlib import Path
+
+    import docbuddy
+
+    static = Path(docbuddy.__file__).parent / "static"
+    agent = (static / "agent.js").read_text()
+    assert "DB.mapWithConcurrency(batch, DB.getMaxParallelRequests(" in agent
+    assert "DB.isSafeToolCall(queue[safeCount])" in agent
+    assert "self._startToolCalls(toolCallsList" in agent
+    assert "Parallel Requests" in (static / "settings.js").read_text()
+
+
+def test_agent_aborted_tool_batch_answers_every_call():
+    """Aborting a batch leaves no tool_calls message without its results."""
+    from pathlib import Path
+
+    import docbuddy
+
+    agent_js = Path(docbuddy.__file__).parent / "static" / "agent.js"
+    calls = [
+        {"id": f"call_{i}", "type": "function", "function": {"name": "api_request"}}
+        for i in range(3)
+    ]
+    history = run_core_js(
+        "(() => {"
+        "  global.CustomEvent = class {};"
+        "  window.dispatchEvent = () => {};"
+        "  (0, eval)(require('fs').readFileSync(input.agentJs, 'utf8'));"
+        "  const aborted = { status: 0, statusText: 'Aborted', body: '' };"
+        "  DocBuddy.executeApiRequest = (args, signal) => new Promise(resolve =>"
+        "    signal.aborted ? resolve(aborted)"
+        "      : signal.addEventListener('abort', () => resolve(aborted)));"
+        "  class Component {"
+        "    constructor(props) { this.props = props; }"
+        "    setState(update, done) {"
+        "      Object.assign(this.state,"
+        "        typeof update === 'function' ? update(this.state) : update);"
+        "      if (done) done();"
+        "    }"
+        "  }"
+        "  const Panel = DocBuddy.AgentPanelFactory({ React: { Component } });"
+        "  const panel = new Panel({});"
+        "  panel.state.agentHistory = [];"
+        "  panel.state.pendingToolCallQueue = input.calls.slice(2);"
+        "  panel._pendingToolCallMsg = { role: 'assistant', tool_calls: input.calls };"
+        "  panel._executeToolCallBatch(input.calls.slice(0, 2), {});"
+        "  panel._currentCancelToken.abort();"
+        "  return new Promise(r => setTimeout(r, 50))"
+        "    .then(() => DocBuddy.buildApiMessages(panel.state.agentHistory));"
+        "})()",
+        {"agentJs": str(agent_js), "calls": calls},
+    )
+    assert history[0]["tool_calls"] == calls
+    assert [(m["role"], m.get("tool_call_id")) for m in history[1:]] == [
+        ("tool", "call_0"),
+        ("tool", "call_1"),
+        ("tool", "call_2"),
+    ]
+    assert {m["content"] for m in history[1:]} == {"Aborted by user"}
+
+
+# ── Parallel workflow blocks ─────────────────────────────────────────────────
+
+
+def test_workflow_dependencies_default_to_previous_block():
+    blocks = [
+        {"id": "a"},
+        {"id": "b"},
+        {"id": "c", "dependsOn": []},
+        {"id": "d", "dependsOn": ["c", "a", "missing", "d", "e"]},
+        {"id": "e"},
+    ]
+    result = run_core_js(
+        "(() => { const deps = DocBuddy.workflowDependencies(input);"
+        " return { deps, upstream: DocBuddy.workflowUpstream(deps, 4) }; })()",
+        blocks,
+    )
+    # Saved workflows without dependsOn keep running in sequence; only earlier
+    # blocks can be dependencies, so the graph has no cycles
+    assert result["deps"] == [[], [0], [], [0, 2], [3]]
+    assert result["upstream"] == [0, 2, 3]
+
+
+def test_run_task_graph_runs_ready_tasks_concurrently():
+    result = run_core_js(
+        "(() => {"
+        "  const log = []; let active = 0, peak = 0;"
+        "  const deps = [[], [], [], [0, 1], [3]];"
+        "  const ms = [30, 10, 20, 5, 5];"
+        "  return DocBuddy.runTaskGraph(deps, 2, i => {"
+        "    log.push('start ' + i); active++; peak = Math.max(peak, active);"
+        "    return new Promise(r => setTimeout(() => {"
+        "      active--; log.push('end ' + i); r(); }, ms[i]));"
+        "  }).then(() => ({ log, peak }));"
+        "})()"
+    )
+    log = result["log"]
+    assert result["peak"] == 2
+    assert log[:2] == ["start 0", "start 1"]
+    # A task starts only after all of its dependencies ended
+    assert log.index("start 3") > max(log.index("end 0"), log.index("end 1"))
+    assert log.index("start 4") > log.index("end 3")
+    assert len(log) == 10
+
+
+def test_run_task_graph_stops_starting_tasks():
+    result = run_core_js(
+        "(() => { const started = []; let stop = false;"
+        "  return DocBuddy.runTaskGraph([[], [0], [1]], 3, i => {"
+        "    started.push(i); stop = true; }, () => stop).then(() => started); })()"
+    )
+    assert result == [0]
+
+
+def test_workflow_panel_runs_block_graph():
+    from pathlib import Path
+
+    import docbuddy
+
+    workflow = (Path(docbuddy.__file__).parent / "static" / "workflow.js").read_text()
+    assert "DB.runTaskGraph(deps, MAX_PARALLEL_BLOCKS, runBlock, isAborted)" in workflow
+    assert "DB.workflowUpstream(deps, idx)" in workflow
+    assert "DB.streamLLMCompletion(" in workflow
+    assert "var durationMs = Date.now() - startedAt;" in workflow
+    assert "persisted.dependsOn = b.dependsOn" in workflow
+
+
+# ── Headless workflow runner ─────────────────────────────────────────────────
+
+
+def start_fake_llm(delay: float = 0.2):
+    """Start a streaming /chat/completions stand-in; returns (server, base_url, log).
+
+    Each reply is ``echo: <last user message>`` split into two SSE chunks. A
+    prompt containing ``CALL`` gets an ``api_request`` tool call to ``/items``
+    instead.
+    """
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    log = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            start = time.monotonic()
+            time.sleep(delay)
+            prompt = payload["messages"][-1]["content"]
+            if "CALL" in prompt:
+                args = json.dumps(
+                    {"method": "GET", "path": "/items/{id}", "path_params": {"id": "7"}}
+                )
+                deltas = [
+                    {
+                        "tool_calls": [
+                            {
+                                "index": 0,
+                                "id": "call_1",
+                                "function": {"name": "api_request", "arguments": args},
+                            }
+                        ]
+                    }
+                ]
+                finish = "tool_calls"
+            else:
+                deltas = [{"content": "echo: "}, {"content": prompt}]
+                finish = "stop"
+            chunks = [{"choices": [{"delta": d}]} for d in deltas]
+            chunks.append({"choices": [{"delta": {}, "finish_reason": finish}]})
+            chunks.append({"choices": [], "usage": {"completion_tokens": 5}})
+            body = (
+                "".join(f"data: {json.dumps(c)}\n\n" for c in chunks)
+                + "data: [DONE]\n\n"
+            )
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            self.wfile.write(body.encode())
+            log.append({"payload": payload, "start": start, "end": time.monotonic()})
+
+        def do_GET(self):
+            body = json.dumps({"path": self.path}).encode()
+            self.send_response(200, "OK")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", log
+
+
+def test_runner_loads_exported_and_saved_workflows():
+    from docbuddy.runner import load_workflow, upstream
+
+    exported = [
+        {"block": 1, "prompt": "a", "output": "", "status": "done"},
+        {"block": 2, "prompt": "b"},
+        {"block": 3, "prompt": "c", "dependsOn": []},
+        {"block": 4, "prompt": "d", "dependsOn": [1, 3, 4, 9]},
+    ]
+    blocks = load_workflow(exported)
+    assert [b.deps for b in blocks] == [[], [0], [], [0, 2]]
+    assert upstream(blocks, 3) == [0, 2]
+    saved = {
+        "blocks": [
+            {"id": "x", "content": "a"},
+            {"id": "y", "content": "b", "dependsOn": []},
+        ]
+    }
+    assert [(b.prompt, b.deps) for b in load_workflow(saved)] == [("a", []), ("b", [])]
+
+
+def test_runner_rejects_workflow_items_that_are_not_objects(tmp_path, capsys):
+    import json
+    import sys
+
+    import pytest
+
+    from docbuddy import cli
+    from docbuddy.runner import load_workflow
+
+    for data in (["a"], {"blocks": [1, 2]}):
+        with pytest.raises(ValueError):
+            load_workflow(data)
+
+    workflow = tmp_path / "workflow.json"
+    workflow.write_text(json.dumps(["a"]))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(sys, "argv", ["docbuddy", "run", str(workflow)])
+        with pytest.raises(SystemExit) as exc_info:
+            cli.main()
+    assert exc_info.value.code == 1
+    assert capsys.readouterr().err.startswith("Error: ")
+
+
+def test_runner_runs_independent_blocks_concurrently(tmp_path):
+    import json
+    import sys
+
+    from docbuddy import cli
+
+    server, url, log = start_fake_llm()
+    workflow = tmp_path / "workflow.json"
+    workflow.write_text(
+        json.dumps(
+            [
+                {"block": 1, "prompt": "first", "dependsOn": []},
+                {"block": 2, "prompt": "second", "dependsOn": []},
+                {"block": 3, "prompt": "third", "dependsOn": [1]},
+            ]
+        )
+    )
+    out = tmp_path / "out.jsonl"
+    argv = [
+        "docbuddy",
+        "run",
+        str(workflow),
+        "--base-url",
+        url + "/v1",
+        "--format",
+        "jsonl",
+        "--repeat",
+        "2",
+        "-o",
+        str(out),
+    ]
+    try:
+        import pytest
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(sys, "argv", argv)
+            with pytest.raises(SystemExit) as exc_info:
+                cli.main()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert exc_info.value.code == 0
+
+    events = [json.loads(line) for line in out.read_text().splitlines()]
+    blocks = [e for e in events if e["event"] == "block"]
+    assert len(blocks) == 6
+    assert {e["output"] for e in blocks} == {
+        "echo: first",
+        "echo: second",
+        "echo: third",
+    }
+    for e in blocks:
+        assert e["completion_tokens"] == 5 and not e["tokens_estimated"]
+        assert e["latency_ms"] >= 200 and e["ttft_ms"] is not None
+    summary = events[-1]
+    assert summary["event"] == "summary"
+    assert summary["runs"] == 2 and summary["blocks"] == 6 and summary["errors"] == 0
+
+    # Block 3 only sees block 1, and the four independent blocks overlapped
+    third = [
+        e["payload"]["messages"]
+        for e in log
+        if e["payload"]["messages"][-1]["content"] == "third"
+    ][0]
+    assert [m["content"] for m in third[1:]] == ["first", "echo: first", "third"]
+    first_wave = sorted(log, key=lambda e: e["start"])[:4]
+    assert max(e["start"] for e in first_wave) < min(e["end"] for e in first_wave)
+    # Two waves of 0.2 s, not six sequential requests
+    assert summary["elapsed_ms"] < 1000
+
+
+def test_runner_text_stream_labels_lines_and_joins_executor(tmp_path, capsys):
+    import io
+    import json
+    import sys
+    import threading
+
+    from docbuddy import cli
+    from docbuddy.runner import _text_writer
+
+    out = io.StringIO()
+    write = _text_writer(out)
+    for block, text in ((1, "one\ntw"), (2, "alpha"), (1, "o"), (2, "\nbeta")):
+        write({"event": "delta", "run": 1, "block": block, "content": text})
+    block_event = {
+        "event": "block",
+        "run": 1,
+        "latency_ms": 10,
+        "completion_tokens": 2,
+        "tokens_per_sec": None,
+    }
+    write(dict(block_event, block=1, output="one\ntwo"))
+    write(dict(block_event, block=2, output="alpha\nbeta\n\n[Tool Call]\nGET /x"))
+    lines = out.getvalue().splitlines()
+    # Interleaved deltas come out as whole, labelled lines...
+    assert lines[:2] == ["[1.1] one", "[1.2] alpha"]
+    assert "[1.1] two" in lines and "[1.2] beta" in lines
+    # ...and a finished block prints only what was not streamed
+    assert lines.count("two") == 0 and lines.count("beta") == 0
+    assert lines[-1] == "GET /x"
+
+    server, url, _ = start_fake_llm(delay=0)
+    workflow = tmp_path / "workflow.json"
+    workflow.write_text(
+        json.dumps(
+            [
+                {"block": 1, "prompt": "first", "dependsOn": []},
+                {"block": 2, "prompt": "second", "dependsOn": []},
+            ]
+        )
+    )
+    argv = ["docbuddy", "run", str(workflow), "--base-url", url + "/v1", "--stream"]
+    try:
+        import pytest
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(sys, "argv", argv)
+            with pytest.raises(SystemExit) as exc_info:
+                cli.main()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert exc_info.value.code == 0
+    printed = capsys.readouterr().out.splitlines()
+    assert "[1.1] echo: first" in printed and "[1.2] echo: second" in printed
+    assert "echo: first" not in printed
+    # No executor thread outlives the run
+    assert not [t for t in threading.enumerate() if t.name.startswith("docbuddy-run")]
+
+
+def test_runner_executes_tool_calls(tmp_path):
+    import asyncio
+
+    from docbuddy.runner import Block, RunnerConfig, run_block
+
+    server, url, log = start_fake_llm(delay=0)
+    config = RunnerConfig(
+        base_url=url,
+        tools=True,
+        api_base_url=url + "/api",
+        schema={
+            "openapi": "3.0.0",
+            "info": {"title": "T", "version": "1"},
+            "paths": {},
+        },
+    )
+    try:
+        result = asyncio.run(run_block(config, Block(0, "CALL it", []), [], None))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert log[0]["payload"]["tools"][0]["function"]["name"] == "api_request"
+    assert "[Tool Call]\nGET " + url + "/api/items/7" in result["output"]
+    assert 'Status: 200 OK\n\n{"path": "/api/items/7"}' in result["output"]
+    roles = [m["role"] for m in result["messages"]]
+    assert roles == ["user", "assistant", "tool", "assistant"]
+    assert result["tool_calls"] == 1
+
+
+def test_runner_reports_malformed_http_responses_as_block_errors():
+    import asyncio
+    import socket
+    import threading
+
+    from docbuddy.runner import Block, RunnerConfig, run_block
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+
+    def serve():
+        conn, _ = listener.accept()
+        with conn:
+            conn.recv(65536)
+            conn.sendall(b"NOT HTTP\r\n\r\n")
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{listener.getsockname()[1]}"
+    try:
+        config = RunnerConfig(base_url=url, timeout=5)
+        result = asyncio.run(run_block(config, Block(0, "hi", []), [], None))
+    finally:
+        thread.join(5)
+        listener.close()
+    assert result["output"].startswith("Error: ")
+
+
+# ── Workflow block cache ─────────────────────────────────────────────────────
+
+
+def test_workflow_cache_key_tracks_the_request():
+    result = run_core_js(
+        "(() => {"
+        "  const url = 'http://llm/v1/chat/completions';"
+        "  const payload = { model: 'm', temperature: 0.7, stream: true,"
+        "    messages: [{ role: 'system', content: 'S' }, { role: 'user', content: 'hi' }] };"
+        "  const key = p => DocBuddy.workflowCacheKey(url, Object.assign({}, payload, p));"
+        "  return {"
+        "    base: key({}), again: key({}), unstreamed: key({ stream: false }),"
+        "    model: key({ model: 'other' }), temperature: key({ temperature: 0 }),"
+        "    upstream: key({ messages: payload.messages.concat([{ role: 'assistant', content: 'x' }]) }),"
+        "    url: DocBuddy.workflowCacheKey('http://other/v1/chat/completions', payload),"
+        "    hashes: [DocBuddy.hashString(''), DocBuddy.hashString('a'), DocBuddy.hashString('b')],"
+        "  };"
+        "})()"
+    )
+    assert result["base"] == result["again"] == result["unstreamed"]
+    others = {result[k] for k in ("model", "temperature", "upstream", "url")}
+    assert result["base"] not in others and len(others) == 4
+    assert len(set(result["hashes"])) == 3
+    assert all(len(h) == 14 for h in result["hashes"])
+
+
+def test_workflow_cache_evicts_least_recently_used():
+    result = run_core_js(
+        "(() => {"
+        "  const cache = DocBuddy.createWorkflowCache(2);"
+        "  const entry = output => ({ output, messages: [{ role: 'assistant', content: output }] });"
+        "  return cache.put('a', entry('A'))"
+        "    .then(() => cache.put('b', entry('B')))"
+        "    .then(() => cache.get('a'))"
+        "    .then(() => cache.put('c', entry('C')))"
+        "    .then(() => Promise.all(['a', 'b', 'c'].map(k => cache.get(k))))"
+        "    .then(hits => cache.clear().then(() => cache.get('a'))"
+        "      .then(cleared => ({ hits: hits.map(h => h && h.output), cleared })));"
+        "})()"
+    )
+    assert result["hits"] == ["A", None, "C"]
+    assert result["cleared"] is None
+
+
+def test_workflow_panel_replays_cached_blocks():
+    from pathlib import Path
+
+    import docbuddy
+
+    package = Path(docbuddy.__file__).parent
+    workflow = (package / "static" / "workflow.js").read_text()
+    assert "DB.workflowCacheKey(completionUrl, payload)" in workflow
+    # Full runs read the cache; running a single block always calls the LLM
+    assert "onlyIdx == null ? DB.workflowCache.get(cacheKey)" in workflow
+    assert "DB.workflowCache.put(cacheKey" in workflow
+    assert "DB.workflowCache.clear()" in workflow
+    assert "Clear Cache" in workflow
+    core = (package / "static" / "core.js").read_text()
+    assert "var HISTORY_DB_VERSION = 2;" in core
+    assert "createObjectStore(WORKFLOW_CACHE_STORE_NAME" in core
+
+
+# ── Model list cache and provider probing ────────────────────────────────────
+
+
+def test_model_cache_expires_after_ttl():
+    result = run_core_js(
+        "(() => {"
+        "  DocBuddy.saveCachedModels('http://llm/v1/', ['b', 'a'], 1000);"
+        "  return {"
+        "    fresh: DocBuddy.getCachedModels('http://llm/v1', 1000 + 60000),"
+        "    expired: DocBuddy.getCachedModels('http://llm/v1', 1000 + 10 * 60000),"
+        "    other: DocBuddy.getCachedModels('http://other/v1', 1000),"
+        "  };"
+        "})()"
+    )
+    assert result == {"fresh": ["b", "a"], "expired": None, "other": None}
+
+
+def test_probe_model_endpoints_runs_concurrently_with_short_timeout():
+    result = run_core_js(
+        "(() => {"
+        "  const seen = [];"
+        "  global.fetch = (url, opts) => {"
+        "    seen.push([url, opts.headers.Authorization || null]);"
+        "    if (url.startsWith('http://down')) return new Promise((_, reject) =>"
+        "      opts.signal.addEventListener('abort', () => {"
+        "        const e = new Error('aborted'); e.name = 'AbortError'; reject(e); }));"
+        "    return Promise.resolve({ ok: true, json: () => Promise.resolve("
+        "      { data: [{ id: 'zeta' }, { id: 'alpha' }] }) });"
+        "  };"
+        "  DocBuddy.saveCachedModels('http://cached/v1', ['c']);"
+        "  const targets = [{ url: 'http://up/v1/', apiKey: 'k' }, { url: 'http://up/v1' },"
+        "    { url: 'http://down/v1' }, { url: 'http://cached/v1' }];"
+        "  const start = Date.now();"
+        "  return DocBuddy.probeModelEndpoints(targets, { timeoutMs: 50 }).then(results => ({"
+        "    results, seen, elapsed: Date.now() - start,"
+        "    cached: DocBuddy.getCachedModels('http://up/v1'),"
+        "    presets: DocBuddy.providerProbeTargets("
+        "      { baseUrl: 'http://mine/v1', apiKey: 'k' }, true),"
+        "  }));"
+        "})()"
+    )
+    assert result["seen"] == [
+        ["http://up/v1/models", "Bearer k"],
+        ["http://down/v1/models", None],
+    ]
+    assert result["results"] == {
+        "http://up/v1": {"ok": True, "models": ["alpha", "zeta"], "cached": False},
+        "http://down/v1": {"ok": False, "error": "timeout"},
+        "http://cached/v1": {"ok": True, "models": ["c"], "cached": True},
+    }
+    assert result["elapsed"] < 1000
+    assert result["cached"] == ["alpha", "zeta"]
+    # The API key only goes to the configured endpoint, not the other presets
+    assert result["presets"][0] == {"url": "http://mine/v1", "apiKey": "k"}
+    assert all(t["apiKey"] == "" for t in result["presets"][1:])
+    assert len(result["presets"]) == 4
+
+
+def test_provider_probe_caches_failures_and_skips_other_presets():
+    result = run_core_js(
+        "(() => {"
+        "  let calls = 0;"
+        "  global.fetch = () => { calls++; return Promise.reject(new TypeError('refused')); };"
+        "  window.location = { origin: 'http://localhost:8000' };"
+        "  const targets = [{ url: 'http://down/v1' }];"
+        "  const probe = opts => DocBuddy.probeModelEndpoints(targets, opts)"
+        "    .then(r => Object.assign(r['http://down/v1'], { calls }));"
+        "  return probe().then(first => probe().then(second =>"
+        "    probe({ force: true }).then(forced => ({"
+        "      first, second, forced,"
+        "      selected: DocBuddy.providerProbeTargets({ baseUrl: 'http://mine/v1' }),"
+        "      all: DocBuddy.providerProbeTargets({ baseUrl: 'http://mine/v1' }, true),"
+        "    }))));"
+        "})()"
+    )
+    assert result["first"] == {"ok": False, "error": "refused", "calls": 1}
+    # A closed port is not probed again within the TTL...
+    assert result["second"] == {
+        "ok": False,
+        "error": "refused",
+        "cached": True,
+        "calls": 1,
+    }
+    # ...unless the user asks for a refresh
+    assert result["forced"]["calls"] == 2
+    assert [t["url"] for t in result["selected"]] == ["http://mine/v1"]
+    urls = [t["url"] for t in result["all"]]
+    assert "http://localhost:11434/v1" in urls
+    # vLLM's default port is this page's own origin here (uvicorn's default)
+    assert "http://localhost:8000/v1" not in urls
+
+
+def test_settings_panel_uses_model_cache():
+    from pathlib import Path
+
+    import docbuddy
+
+    settings = (Path(docbuddy.__file__).parent / "static" / "settings.js").read_text()
+    assert "DB.probeModelEndpoints(targets, { force: refresh })" in settings
+    assert "this._probeProviders(false);" in settings
+    assert "self._probeProviders(true);" in settings
+    assert "DB.fetchModels(baseUrl, settings.apiKey" in settings
+    assert "DB.getCachedModels(DB.getLLMBaseUrl({ baseUrl: provider.url }))" in settings
+
+
+# ── Tool result condensation ─────────────────────────────────────────────────
+
+
+def make_invoices(count):
+    """Return a JSON body with ``count`` invoices, like a paginated list route."""
+    import json
+
+    invoices = [
+        {
+            "id": i,
+            "customer": f"customer-{i}",
+            "note": "lorem ipsum " * 80,
+            "lines": [{"sku": f"sku-{j}", "qty": j} for j in range(4)],
+        }
+        for i in range(count)
+    ]
+    return json.dumps({"total": count, "page": 1, "invoices": invoices})
+
+
+def test_condense_tool_response_keeps_valid_json():
+    import json
+
+    body = make_invoices(200)
+    result = run_core_js(
+        "({ small: DocBuddy.condenseToolResponse('{\"a\": 1}'),"
+        "  text: DocBuddy.condenseToolResponse('x'.repeat(20000), 100),"
+        "  big: DocBuddy.condenseToolResponse(input),"
+        "  tokens: DocBuddy.estimateTokens(DocBuddy.condenseToolResponse(input)),"
+        "  wide: DocBuddy.condenseToolResponse(JSON.stringify(Object.fromEntries("
+        "    Array.from({ length: 300 }, (_, i) => ['key' + i, i]))), 200) })",
+        body,
+    )
+    assert result["small"] == '{"a": 1}'
+    assert "…[truncated" in result["text"]
+    assert result["tokens"] <= 1000
+    data = json.loads(result["big"])
+    assert data["total"] == 200
+    invoices = data["invoices"]
+    assert invoices[0]["id"] == 0 and invoices[0]["customer"] == "customer-0"
+    assert invoices[-1].startswith("…[")
+    assert invoices[-1].endswith(" more items, 200 total]")
+    assert "chars]" in invoices[0]["note"]
+    wide = json.loads(result["wide"])
+    assert wide["key0"] == 0
+    assert wide["…omitted"].startswith(f"{300 - len(wide) + 1} keys: ")
+
+
+def test_condense_tool_message_keeps_status_line():
+    import json
+
+    body = make_invoices(50)
+    result = run_core_js(
+        "DocBuddy.condenseToolMessage(DocBuddy.formatToolResult("
+        "{ status: 200, statusText: 'OK', body: input }, 100000), 300)",
+        body,
+    )
+    status, _, rest = result.partition("\n\n")
+    assert status == "Status: 200 OK"
+    assert json.loads(rest)["total"] == 50
+
+
+def test_python_condense_tool_response_matches_core_js():
+    from docbuddy.runner import condense_tool_response
+
+    bodies = [
+        make_invoices(120),
+        make_invoices(3),
+        '["' + "y" * 9000 + '"]',
+        "plain " * 3000,
+    ]
+    expected = run_core_js(
+        "input.map(b => DocBuddy.condenseToolResponse(b, 400))", bodies
+    )
+    assert [condense_tool_response(b, 400) for b in bodies] == expected
+
+
+def test_condense_tool_response_stays_json_at_tiny_budgets():
+    import json
+
+    from docbuddy.runner import condense_tool_response
+
+    long_keys = json.dumps(
+        {f"{i}_{'property_name_' * 6}": "v" * 300 for i in range(40)}
+    )
+    bodies = [make_invoices(200), long_keys, json.dumps([{"a": 1}] * 500)]
+    budgets = [1, 5, 20, 60]
+    expected = run_core_js(
+        "input.bodies.map(b => input.budgets.map(n =>"
+        " DocBuddy.condenseToolResponse(b, n)))",
+        {"bodies": bodies, "budgets": budgets},
+    )
+    python = [[condense_tool_response(b, n) for n in budgets] for b in bodies]
+    assert python == expected
+    for results in expected:
+        for result in results:
+            json.loads(result)
+    assert json.loads(expected[0][0]) == {"…summary": "object with 3 keys"}
+    assert json.loads(expected[2][1])["…summary"] == "array of 500 items"
+    # Long key names are shortened before whole keys are dropped
+    shortened = json.loads(condense_tool_response(long_keys, 400))
+    assert all(len(key) <= 65 for key in shortened)
+
+
+def test_panels_condense_tool_results():
+    from pathlib import Path
+
+    import docbuddy
+
+    static = Path(docbuddy.__file__).parent / "static"
+    for name in ("chat.js", "agent.js", "workflow.js"):
+        source = (static / name).read_text()
+        assert "DB.formatToolResult(" in source
+        assert "substring(0, 4000)" not in source
+
+
+# ── Tool response session cache ──────────────────────────────────────────────
+
+
+_FAKE_API_FETCH = (
+    "const seen = [];"
+    "const api = { version: 1, headers: {} };"
+    "global.fetch = (url, opts) => {"
+    "  seen.push([opts.method, url, opts.headers['If-None-Match'] || null]);"
+    "  const h = Object.assign({ ETag: '\"v' + api.version + '\"' }, api.headers);"
+    "  const notModified = opts.headers['If-None-Match'] === h.ETag;"
+    "  return Promise.resolve({ status: notModified ? 304 : 200,"
+    "    statusText: notModified ? 'Not Modified' : 'OK',"
+    "    headers: { get: k => (k in h ? h[k] : null) },"
+    "    text: () => Promise.resolve(notModified ? '' : url + ' v' + api.version) });"
+    "};"
+    "window.DOCBUDDY_API_BASE_URL = 'http://api.test';"
+    "console.debug = () => {};"
+    "const get = (cache, path, query) => DocBuddy.executeApiRequest("
+    "  { method: 'GET', path, query_params: query || {} }, null, cache);"
+)
+
+
+def run_with_fake_api(body):
+    """Run ``body`` in node with ``fetch`` answering from a fake ETag-aware API."""
+    return run_core_js("(() => {" + _FAKE_API_FETCH + body + "})()")
+
+
+def test_tool_cache_reuses_normalized_get_requests():
+    result = run_with_fake_api(
+        "const cache = DocBuddy.createToolResponseCache();"
+        "  return get(cache, '/invoices', { a: 1, b: 2 })"
+        "    .then(first => get(cache, '/invoices', { b: 2, a: 1 }).then(second =>"
+        "      get(cache, '/invoices', { a: 2 }).then(other =>"
+        "        get(null, '/invoices', { a: 1, b: 2 }).then(uncached =>"
+        "          ({ first, second, other, uncached, seen })))));"
+    )
+    assert result["first"] == {
+        "status": 200,
+        "statusText": "OK",
+        "body": "http://api.test/invoices?a=1&b=2 v1",
+    }
+    assert result["second"] == dict(result["first"], cached=True)
+    assert "cached" not in result["other"]
+    assert "cached" not in result["uncached"]
+    assert len(result["seen"]) == 3
+
+
+def test_tool_cache_revalidates_and_invalidates_overlapping_paths():
+    result = run_with_fake_api(
+        "const cache = DocBuddy.createToolResponseCache(0);"
+        "  const out = {};"
+        "  return get(cache, '/invoices/7')"
+        "    .then(() => get(cache, '/invoices/7')).then(r => { out.revalidated = r; })"
+        "    .then(() => get(cache, '/customers'))"
+        "    .then(() => { api.version = 2; return DocBuddy.executeApiRequest("
+        "      { method: 'POST', path: '/invoices', body: {} }, null, cache); })"
+        "    .then(() => { out.size = cache.size(); return get(cache, '/invoices/7'); })"
+        "    .then(r => { out.after = r; api.headers = { 'Cache-Control': 'no-store' };"
+        "      return get(cache, '/orders'); })"
+        "    .then(() => Object.assign(out, { seen, final: cache.size() }));"
+    )
+    # A stale entry is revalidated with its ETag and answered from the cache
+    assert result["seen"][1] == ["GET", "http://api.test/invoices/7", '"v1"']
+    assert result["revalidated"]["cached"] is True
+    assert result["revalidated"]["body"] == "http://api.test/invoices/7 v1"
+    # POST /invoices drops /invoices/7 but keeps /customers
+    assert result["size"] == 1
+    assert result["seen"][4] == ["GET", "http://api.test/invoices/7", None]
+    assert result["after"]["body"] == "http://api.test/invoices/7 v2"
+    # no-store responses are not kept
+    assert result["final"] == 2
+
+
+def test_tool_cache_is_keyed_by_credentials():
+    result = run_with_fake_api(
+        "const cache = DocBuddy.createToolResponseCache();"
+        "  const as = key => { DocBuddy.saveToolSettings({ apiKey: key });"
+        "    return get(cache, '/me'); };"
+        "  return as('alice').then(a => as('bob').then(b => as('alice').then(again =>"
+        "    ({ a, b, again, seen: seen.length, size: cache.size() }))));"
+    )
+    assert "cached" not in result["a"]
+    assert "cached" not in result["b"]
+    assert result["again"]["cached"] is True
+    assert result["seen"] == 2
+    assert result["size"] == 2
+
+
+def test_tool_cache_skips_reads_overlapping_a_write():
+    result = run_with_fake_api(
+        "const cache = DocBuddy.createToolResponseCache();"
+        "  const read = get(cache, '/invoices/7');"
+        "  cache.invalidate('http://api.test/invoices');"
+        "  return read.then(() => ({ size: cache.size() }));"
+    )
+    assert result["size"] == 0
+
+
+def test_panels_share_tool_cache_per_session():
+    from pathlib import Path
+
+    import docbuddy
+
+    static = Path(docbuddy.__file__).parent / "static"
+    chat = (static / "chat.js").read_text()
+    agent = (static / "agent.js").read_text()
+    workflow = (static / "workflow.js").read_text()
+    for source in (chat, agent):
+        assert "this._toolCache = DB.createToolResponseCache();" in source
+        assert "this._toolCache.clear();" in source
+    assert "self._toolCache.request(url, fetchOpts)" in chat
+    assert "cancelToken.signal, self._toolCache)" in agent
+    assert "controller.signal, toolCache)" in workflow
+
+
+# ── Cached OpenAPI schema ────────────────────────────────────────────────────
+
+
+def test_openapi_schema_served_with_etag_and_gzip():
+    import json
+
+    app = make_items_app()
+    client = TestClient(app)
+    response = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.json() == app.openapi()
+    etag = response.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    not_modified = client.get(
+        "/openapi.json", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    # The stored body is what FastAPI's own route would have sent
+    raw = client.get("/openapi.json", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    expected = json.dumps(app.openapi(), ensure_ascii=False, separators=(",", ":"))
+    assert raw.content == expected.encode("utf-8")
+    assert [r.path for r in app.router.routes].count("/openapi.json") == 1
+
+
+def test_openapi_schema_etag_changes_with_routes():
+    app = make_items_app()
+    client = TestClient(app)
+    first = client.get("/openapi.json").headers["etag"]
+    assert client.get("/openapi.json").headers["etag"] == first
+
+    @app.delete("/items/{item_id}")
+    def delete_item(item_id: int):
+        return None
+
+    app.openapi_schema = None
+    response = client.get("/openapi.json", headers={"If-None-Match": first})
+    assert response.status_code == 200
+    assert response.headers["etag"] != first
+    assert "delete" in response.json()["paths"]["/items/{item_id}"]
+
+
+def test_openapi_schema_keeps_root_path_server():
+    app = FastAPI(title="Behind a proxy", root_path="/api")
+    setup_docs(app)
+    schema = TestClient(app).get("/openapi.json").json()
+    assert schema["servers"][0] == {"url": "/api"}
+
+
+def test_external_openapi_url_keeps_fastapi_route():
+    app = FastAPI()
+    setup_docs(app, openapi_url="https://example.com/openapi.json")
+    response = TestClient(app).get("/openapi.json")
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+
+
+def test_schema_kept_in_cache_storage_and_revalidated():
+    result = run_core_js(
+        "(() => {"
+        "  const stored = new Map(), seen = [];"
+        "  const body = JSON.stringify({ openapi: '3.0.0', paths: {} });"
+        "  const response = (status, headers, text) => ({"
+        "    status, ok: status >= 200 && status < 300,"
+        "    headers: { get: k => headers[k] || null },"
+        "    json: () => Promise.resolve(JSON.parse(text)),"
+        "    clone() { return response(status, headers, text); } });"
+        "  global.caches = { open: () => Promise.resolve({"
+        "    match: url => Promise.resolve(stored.get(url)),"
+        "    put: (url, res) => Promise.resolve(stored.set(url, res)),"
+        "    delete: url => Promise.resolve(stored.delete(url)) }) };"
+        "  global.fetch = (url, opts) => {"
+        "    const inm = opts.headers['If-None-Match'] || null;"
+        "    seen.push([inm, opts.cache]);"
+        "    return Promise.resolve(inm === '\"s1\"' ? response(304, {}, '')"
+        "      : response(200, { ETag: '\"s1\"' }, body));"
+        "  };"
+        "  return DocBuddy.fetchOpenApiSchema('/openapi.json')"
+        "    .then(first => DocBuddy.fetchOpenApiSchema('/openapi.json')"
+        "      .then(second => ({ first, second, seen, stored: stored.size })));"
+        "})()"
+    )
+    assert result["first"] == result["second"] == {"openapi": "3.0.0", "paths": {}}
+    assert result["seen"] == [[None, "no-store"], ['"s1"', "no-store"]]
+    assert result["stored"] == 1
+
+
+def test_schema_fetch_without_cache_storage():
+    result = run_core_js(
+        "(() => {"
+        "  global.fetch = url => Promise.resolve({ status: 200, ok: true,"
+        "    json: () => Promise.resolve({ url }) });"
+        "  return DocBuddy.fetchOpenApiSchema('/openapi.json');"
+        "})()"
+    )
+    assert result == {"url": "/openapi.json"}
+
+
+def test_swagger_spec_adopted_without_second_download():
+    result = run_core_js(
+        "(() => {"
+        "  const seen = [];"
+        "  global.fetch = url => { seen.push(url); return Promise.reject(new Error('offline')); };"
+        "  const waiting = DocBuddy.awaitSwaggerSpec('/openapi.json');"
+        "  const ignored = DocBuddy.adoptSwaggerSpec('/other.json', { paths: {} });"
+        "  const ready = new Promise(resolve => DocBuddy.ensureOpenapiSchemaCached(resolve));"
+        "  DocBuddy.adoptSwaggerSpec('/openapi.json', { openapi: '3.0.0', paths: {} });"
+        "  return ready.then(schema => ({ waiting, ignored, schema, seen,"
+        "    cached: DocBuddy._cachedOpenapiSchema === schema,"
+        "    again: DocBuddy.awaitSwaggerSpec('/openapi.json') }));"
+        "})()"
+    )
+    assert result["waiting"] is True
+    assert result["ignored"] is False
+    assert result["schema"] == {"openapi": "3.0.0", "paths": {}}
+    assert result["seen"] == []
+    assert result["cached"] is True
+    assert result["again"] is False
+
+
+def test_swagger_spec_failure_falls_back_to_fetch():
+    result = run_core_js(
+        "(() => {"
+        "  const seen = [];"
+        "  global.fetch = url => { seen.push(url); return Promise.resolve({"
+        "    status: 200, ok: true, json: () => Promise.resolve({ fetched: url }) }); };"
+        "  DocBuddy.awaitSwaggerSpec('/openapi.json');"
+        "  DocBuddy.adoptSwaggerSpec('/openapi.json', null);"
+        "  return new Promise(resolve => DocBuddy.ensureOpenapiSchemaCached(resolve))"
+        "    .then(schema => ({ schema, seen }));"
+        "})()"
+    )
+    assert result == {"schema": {"fetched": "/openapi.json"}, "seen": ["/openapi.json"]}
+
+
+# Runs DocBuddy's worker-side handler in-process behind a fake ``Worker``
+_FAKE_SCHEMA_WORKER = (
+    "  const posted = [];"
+    "  global.Worker = function () {"
+    "    const worker = this, scope = { postMessage: m => setTimeout(() =>"
+    "      worker.onmessage({ data: JSON.parse(JSON.stringify(m)) })) };"
+    "    DocBuddy._serveSchemaRequests(scope);"
+    "    this.postMessage = (m, transfer) => {"
+    "      posted.push([m.type, (transfer || []).length]);"
+    "      setTimeout(() => scope.onmessage({ data: m }));"
+    "    };"
+    "    this.terminate = () => {};"
+    "  };"
+    "  DocBuddy._coreScriptUrl = 'http://test/core.js';"
+)
+
+
+def test_schema_worker_builds_prompt_parts():
+    """Large schemas get their prompt context and tool from the worker."""
+    from docbuddy.digest import (
+        OperationIndex,
+        build_api_request_tool,
+        build_openapi_context,
+    )
+
+    schema = make_large_schema()
+    result = run_core_js(
+        "(() => {" + _FAKE_SCHEMA_WORKER + "  const schema = input;"
+        "  const query = 'refund a payment';"
+        "  return DocBuddy.warmSchemaPrompt(schema, query, true).then(() => {"
+        "    const warmed = posted.slice();"
+        "    DocBuddy._serveSchemaRequests = null;"
+        "    const layout = DocBuddy.getPromptLayout('api_assistant', schema, '', query);"
+        "    const inline = DocBuddy.getPromptLayout('api_assistant',"
+        "      JSON.parse(JSON.stringify(schema)), '', query);"
+        "    return DocBuddy.searchEndpoints(schema, query, 2).then(hits => ({"
+        "      warmed, posted, layout, inline, hits,"
+        "      tool: DocBuddy.getApiRequestTool(schema) }));"
+        "  });"
+        "})()",
+        schema,
+    )
+    assert result["warmed"] == [["load", 1], ["context", 0], ["tool", 0]]
+    assert result["posted"][-1] == ["search", 0]
+    assert result["layout"] == result["inline"]
+    relevant = result["layout"]["context"]
+    assert relevant and relevant in build_openapi_context(schema, "refund a payment")
+    assert result["tool"] == build_api_request_tool(schema)
+    index = OperationIndex(schema)
+    expected = [index.operations[i] for i in index.search("refund a payment", 2)]
+    assert [(h["method"], h["path"]) for h in result["hits"]] == [
+        (op.method.upper(), op.path) for op in expected
+    ]
+
+
+def test_schema_worker_skipped_for_small_schema_or_without_workers():
+    result = run_core_js(
+        "(() => {"
+        + _FAKE_SCHEMA_WORKER
+        + "  const small = input.small, large = input.large;"
+        "  return DocBuddy.warmSchemaPrompt(small, 'invoice', true).then(() => {"
+        "    const afterSmall = posted.length;"
+        "    delete global.Worker;"
+        "    return DocBuddy.searchEndpoints(large, 'refund', 1).then(hits => ({"
+        "      afterSmall, hits, posted: posted.length }));"
+        "  });"
+        "})()",
+        {"small": make_large_schema(5), "large": make_large_schema()},
+    )
+    assert result["afterSmall"] == 0
+    assert result["posted"] == 0
+    assert result["hits"][0]["path"].startswith("/refunds")
+
+
+def make_ref_schema() -> dict:
+    """Return a schema using parameter, body, response and recursive refs."""
+    schemas = "#/components/schemas/"
+    return {
+        "openapi": "3.1.0",
+        "info": {"title": "Refs", "version": "1"},
+        "paths": {
+            "/trees/{id}": {
+                "get": {
+                    "summary": "Get a tree",
+                    "parameters": [
+                        {"$ref": "#/components/parameters/TreeId"},
+                        {"$ref": "#/components/parameters/Missing"},
+                    ],
+                    "responses": {
+                        "200": {"$ref": "#/components/responses/TreeResponse"},
+                        "404": {"description": "Not found"},
+                    },
+                },
+                "put": {
+                    "requestBody": {"$ref": "#/components/requestBodies/TreeBody"},
+                    "responses": {
+                        "200": {
+                            "description": "Saved",
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "array",
+                                        "items": {"$ref": schemas + "Node"},
+                                    }
+                                }
+                            },
+                        }
+                    },
+                },
+            }
+        },
+        "components": {
+            "parameters": {
+                "TreeId": {
+                    "name": "id",
+                    "in": "path",
+                    "required": True,
+                    "description": "Tree id",
+                }
+            },
+            "responses": {
+                "TreeResponse": {
+                    "description": "A tree",
+                    "content": {
+                        "application/json": {"schema": {"$ref": schemas + "Tree"}}
+                    },
+                }
+            },
+            "requestBodies": {
+                "TreeBody": {
+                    "content": {
+                        "application/json": {"schema": {"$ref": schemas + "Alias"}}
+                    }
+                }
+            },
+            "schemas": {
+                "Alias": {"$ref": schemas + "Tree"},
+                "Tree": {
+                    "allOf": [{"$ref": schemas + "Named"}],
+                    "properties": {
+                        "root": {"$ref": schemas + "Node"},
+                        "parent": {
+                            "anyOf": [{"$ref": schemas + "Tree"}, {"type": "null"}]
+                        },
+                    },
+                    "required": ["root"],
+                },
+                "Named": {
+                    "description": "Has a name",
+                    "properties": {"name": {"type": "string"}},
+                    "required": ["name"],
+                },
+                "Node": {
+                    "properties": {
+                        "children": {
+                            "type": "array",
+                            "items": {"$ref": schemas + "Node"},
+                        }
+                    }
+                },
+                "Loop": {
+                    "allOf": [{"$ref": schemas + "Loop"}],
+                    "properties": {"x": {"type": "integer"}},
+                },
+                "Ping": {"$ref": schemas + "Pong"},
+                "Pong": {"$ref": schemas + "Ping"},
+            },
+        },
+    }
+
+
+def test_refs_resolved_in_context_and_tool():
+    """Parameter, body and response refs resolve, including recursive models."""
+    from docbuddy.digest import build_api_request_tool, build_openapi_context
+
+    schema = make_ref_schema()
+    ctx = build_openapi_context(schema)
+
+    assert "- `id` (path, [required]) - Tree id" in ctx
+    assert "- `200`: A tree → `Tree`" in ctx
+    assert "- `200`: Saved → `array[Node]`" in ctx
+    assert "- Schema: `Alias`" in ctx
+    assert "  - `name` (string, required)" in ctx
+    assert "  - `root` (Node, required)" in ctx
+    assert "  - `parent` (Tree | null, optional)" in ctx
+    assert "## `Tree`\n*Has a name*" in ctx
+    assert "- `children` (array[Node], [optional]): " in ctx
+    assert "## `Loop`\n\n**Properties:**\n- `x` (integer, [optional]): " in ctx
+    tool = build_api_request_tool(schema)["function"]["description"]
+    assert "- PUT /trees/{id} (body: Alias)" in tool
+
+    js = run_core_js(
+        "(() => {"
+        "  const refs = DocBuddy.getRefIndex(input);"
+        "  const tree = { $ref: '#/components/schemas/Tree' };"
+        "  return [DocBuddy.buildOpenApiContext(input),"
+        "    DocBuddy.buildApiRequestTool(input),"
+        "    refs === DocBuddy.getRefIndex(input)"
+        "      && refs.shape(tree) === refs.shape({ ...tree }),"
+        "    refs.resolve({ $ref: '#/components/schemas/Ping' })];"
+        "})()",
+        schema,
+    )
+    assert js[0] == ctx
+    assert js[1] == build_api_request_tool(schema)
+    assert js[2] is True
+    assert js[3] == {"$ref": "#/components/schemas/Ping"}
+
+
+def test_retrieval_includes_nested_models():
+    """Relevant endpoints bring along the models their models reference."""
+    from docbuddy.digest import build_openapi_context
+
+    schema = make_large_schema()
+    models = schema["components"]["schemas"]
+    models["Refund"]["properties"]["reason"] = {
+        "$ref": "#/components/schemas/RefundReason"
+    }
+    models["RefundReason"] = {
+        "properties": {
+            "code": {"type": "string"},
+            "refund": {"$ref": "#/components/schemas/Refund"},
+        }
+    }
+    ctx = build_openapi_context(schema, "refund a payment")
+    relevant = ctx.split("# Data Models (Schemas)", 1)[1]
+    assert "## `RefundReason`" in relevant
+    assert "- `reason` (RefundReason, [optional]): " in relevant
+    assert (
+        run_core_js("DocBuddy.buildOpenApiContext(input, 'refund a payment')", schema)
+        == ctx
+    )